@@ -0,0 +1,7 @@
+from django.apps import AppConfig
+
+
+class AiModelsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'ai_models'
+    verbose_name = 'AI Models'
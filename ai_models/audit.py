@@ -0,0 +1,181 @@
+import atexit
+import logging
+import threading
+from datetime import timedelta
+from typing import Dict, List, Any, Optional, Type
+
+from django.conf import settings
+from django.db import InterfaceError, OperationalError, close_old_connections, models, transaction
+from django.utils import timezone
+from .models import Prediction, NLQueryLog
+
+logger = logging.getLogger(__name__)
+
+AUDIT_MODELS = (Prediction, NLQueryLog)
+
+
+class AuditWriter:
+    """Buffers audit rows (Prediction, NLQueryLog) and writes them with bulk_create.
+
+    ``record()`` only appends to an in-memory buffer, keeping INSERTs off the
+    request path. A background thread flushes every ``flush_interval``
+    seconds, and a buffer reaching ``batch_size`` is flushed straight away.
+    Rows still buffered at interpreter exit are flushed by an atexit hook.
+
+    A batch the database rejects is retried row by row, and rows that still
+    fail are logged and dropped, so one bad row never blocks the buffer.
+    Only rows that could not be written because the database is unreachable
+    are kept for the next flush.
+    """
+
+    def __init__(self, batch_size: int = 500, flush_interval: float = 2.0, max_buffer: int = 50000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self._buffers: Dict[Type[models.Model], List[models.Model]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def record(self, instance: models.Model) -> None:
+        if not isinstance(instance, AUDIT_MODELS):
+            raise TypeError(f"{type(instance).__name__} is not an audit model")
+        self._ensure_thread()
+        with self._lock:
+            buffer = self._buffers.setdefault(type(instance), [])
+            if len(buffer) >= self.max_buffer:
+                # Database unavailable for a long time: shed the oldest rows
+                # rather than growing without bound
+                del buffer[:self.batch_size]
+                logger.warning(f"Audit buffer full, dropped {self.batch_size} {type(instance).__name__} rows")
+            buffer.append(instance)
+            full = len(buffer) >= self.batch_size
+        if full:
+            self._wakeup.set()
+
+    def pending(self) -> int:
+        with self._lock:
+            return sum(len(buffer) for buffer in self._buffers.values())
+
+    def flush(self) -> int:
+        """Write every buffered row; returns the number of rows written"""
+        with self._flush_lock:
+            with self._lock:
+                buffers, self._buffers = self._buffers, {}
+            written = 0
+            for model, rows in buffers.items():
+                written += self._write(model, rows)
+            return written
+
+    def _write(self, model: Type[models.Model], rows: List[models.Model]) -> int:
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create(rows, batch_size=self.batch_size)
+            return len(rows)
+        except (OperationalError, InterfaceError) as e:
+            logger.error(f"Database unavailable, keeping {len(rows)} {model.__name__} rows: {str(e)}")
+            self._requeue(model, rows)
+            return 0
+        except Exception as e:
+            logger.warning(f"Batch of {len(rows)} {model.__name__} rows failed, retrying one by one: {str(e)}")
+
+        written = 0
+        for position, row in enumerate(rows):
+            try:
+                with transaction.atomic():
+                    model.objects.bulk_create([row])
+                written += 1
+            except (OperationalError, InterfaceError) as e:
+                logger.error(f"Database unavailable, keeping {len(rows) - position} {model.__name__} rows: {str(e)}")
+                self._requeue(model, rows[position:])
+                break
+            except Exception as e:
+                logger.error(f"Dropped {model.__name__} row that cannot be written: {str(e)}")
+        return written
+
+    def _requeue(self, model: Type[models.Model], rows: List[models.Model]) -> None:
+        with self._lock:
+            self._buffers.setdefault(model, [])[:0] = rows
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if self.pending():
+                close_old_connections()
+                self.flush()
+
+
+_writer: Optional[AuditWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_audit_writer() -> AuditWriter:
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            config = getattr(settings, 'AI_AUDIT', {})
+            _writer = AuditWriter(
+                batch_size=config.get('BATCH_SIZE', 500),
+                flush_interval=config.get('FLUSH_INTERVAL', 2.0),
+                max_buffer=config.get('MAX_BUFFER', 50000),
+            )
+            atexit.register(_writer.stop)
+    return _writer
+
+
+def record_prediction(**fields: Any) -> Prediction:
+    """Queue a Prediction row for a buffered write"""
+    prediction = Prediction(**fields)
+    get_audit_writer().record(prediction)
+    return prediction
+
+
+def record_query(**fields: Any) -> NLQueryLog:
+    """Queue an NLQueryLog row for a buffered write"""
+    query_log = NLQueryLog(**fields)
+    get_audit_writer().record(query_log)
+    return query_log
+
+
+def prune_audit_logs(retention_days: Optional[int] = None, chunk_size: int = 10000) -> Dict[str, int]:
+    """Delete audit rows older than the retention window in bounded chunks.
+
+    Each chunk is selected by primary key through the ``created_at`` index and
+    deleted in its own short statement, so pruning never holds long locks.
+    """
+    if retention_days is None:
+        retention_days = getattr(settings, 'AI_AUDIT', {}).get('RETENTION_DAYS', 90)
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    deleted = {}
+    for model in AUDIT_MODELS:
+        total = 0
+        while True:
+            ids = list(model.objects.filter(created_at__lt=cutoff).order_by().values_list(
+                'pk', flat=True
+            )[:chunk_size])
+            if not ids:
+                break
+            # No dependants or signals, so Django issues a single fast DELETE
+            total += model.objects.filter(pk__in=ids).delete()[0]
+        deleted[model.__name__] = total
+        if total:
+            logger.info(f"Pruned {total} {model.__name__} rows older than {cutoff:%Y-%m-%d}")
+    return deleted
@@ -0,0 +1,414 @@
+import logging
+import math
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Any, Callable, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db.models import Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .models import TrainingDataset
+from .monitoring import DEFAULT_BINS, StreamingHistogram
+
+logger = logging.getLogger(__name__)
+
+FEATURE_STORE_SOURCE = 'feature_store'
+NUMERIC_KINDS = ('int64', 'float64')
+
+
+class FeatureSource:
+    """One extractable table: columns as (name, kind, source field) like the exporters"""
+
+    def __init__(self, name: str, dataset_type: str, description: str, key: str,
+                 columns: List[Tuple[str, str, str]], queryset: Callable[[], Any],
+                 watermark_field: str, targets: Optional[List[str]] = None,
+                 enrich: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None):
+        self.name = name
+        self.dataset_type = dataset_type
+        self.description = description
+        self.key = key
+        self.columns = columns
+        self.queryset = queryset
+        self.watermark_field = watermark_field
+        self.targets = targets or []
+        self.enrich = enrich
+
+
+def _calculation_source() -> FeatureSource:
+    from lca_core.models import LCACalculation, CalculationResult
+    from lca_core.services import LCACalculationService
+
+    impacts = list(LCACalculationService().impact_methods)
+
+    def add_impact_totals(frame: pd.DataFrame) -> pd.DataFrame:
+        totals = pd.DataFrame.from_records(
+            CalculationResult.objects.filter(
+                calculation_id__in=frame['calculation_id'].tolist(), impact__in=impacts
+            ).values('calculation_id', 'impact').annotate(total=Sum('value')).values_list(
+                'calculation_id', 'impact', 'total'
+            ),
+            columns=['calculation_id', 'impact', 'total'],
+        ).pivot(index='calculation_id', columns='impact', values='total')
+        totals = totals.reindex(columns=impacts).add_prefix('impact_')
+        return frame.join(totals, on='calculation_id')
+
+    return FeatureSource(
+        name='calculations',
+        dataset_type='lca_data',
+        description='Calculation totals with per-impact sums of the stored step results',
+        key='calculation_id',
+        columns=[
+            ('calculation_id', 'int64', 'id'),
+            ('project_id', 'int64', 'project_id'),
+            ('carbon_footprint', 'float64', 'carbon_footprint'),
+            ('energy_use', 'float64', 'energy_use'),
+            ('water_use', 'float64', 'water_use'),
+            ('updated_at', 'timestamp', 'updated_at'),
+        ],
+        queryset=lambda: LCACalculation.objects.all(),
+        watermark_field='updated_at',
+        targets=[f"impact_{impact}" for impact in impacts],
+        enrich=add_impact_totals,
+    )
+
+
+def _material_property_source() -> FeatureSource:
+    from materials.models import MaterialProperty
+
+    return FeatureSource(
+        name='material_properties',
+        dataset_type='material_properties',
+        description='Material properties joined with material circularity attributes',
+        key='property_id',
+        columns=[
+            ('property_id', 'string', 'id'),
+            ('material_id', 'string', 'material_id'),
+            ('material_name', 'string', 'material__name'),
+            ('material_type', 'string', 'material__material_type'),
+            ('property_name', 'string', 'property_name'),
+            ('property_type', 'string', 'property_type'),
+            ('value', 'float64', 'value'),
+            ('unit', 'string', 'unit'),
+            ('uncertainty_value', 'float64', 'uncertainty_value'),
+            ('density', 'float64', 'material__density'),
+            ('recycling_efficiency', 'float64', 'material__recycling_efficiency'),
+            ('durability_score', 'float64', 'material__durability_score'),
+            ('reusability_potential', 'float64', 'material__reusability_potential'),
+            # MaterialProperty has no updated_at; rows are immutable once created
+            ('updated_at', 'timestamp', 'created_at'),
+        ],
+        queryset=lambda: MaterialProperty.objects.all(),
+        watermark_field='created_at',
+        targets=['value'],
+    )
+
+
+def _process_source() -> FeatureSource:
+    from processes.models import Process
+
+    def add_flow_totals(frame: pd.DataFrame) -> pd.DataFrame:
+        def mass(flows):
+            return float(sum(flow.get('quantity', 0) or 0 for flow in flows or [] if isinstance(flow, dict)))
+
+        frame['input_mass'] = frame.pop('input_materials').map(mass)
+        frame['output_mass'] = frame.pop('output_materials').map(mass)
+        frame['energy_total'] = frame.pop('energy_requirements').map(
+            lambda energy: float(sum(v for v in (energy or {}).values() if isinstance(v, (int, float))))
+        )
+        return frame
+
+    return FeatureSource(
+        name='processes',
+        dataset_type='process_parameters',
+        description='Process attributes with input/output mass and total energy requirement',
+        key='process_id',
+        columns=[
+            ('process_id', 'string', 'id'),
+            ('name', 'string', 'name'),
+            ('process_type', 'string', 'process_type'),
+            ('efficiency', 'float64', 'efficiency'),
+            ('capacity', 'float64', 'capacity'),
+            ('data_quality_score', 'float64', 'data_quality_score'),
+            ('input_materials', 'json', 'input_materials'),
+            ('output_materials', 'json', 'output_materials'),
+            ('energy_requirements', 'json', 'energy_requirements'),
+            ('updated_at', 'timestamp', 'updated_at'),
+        ],
+        queryset=lambda: Process.objects.all(),
+        watermark_field='updated_at',
+        enrich=add_flow_totals,
+    )
+
+
+def _circularity_source() -> FeatureSource:
+    from circularity.models import CircularityAnalysis
+
+    return FeatureSource(
+        name='circularity',
+        dataset_type='circularity_metrics',
+        description='Circularity analysis results per calculation',
+        key='calculation_id',
+        columns=[
+            ('calculation_id', 'int64', 'calculation_id'),
+            ('overall_circularity_score', 'float64', 'overall_circularity_score'),
+            ('material_circularity_score', 'float64', 'material_circularity_score'),
+            ('recycled_content_rate', 'float64', 'recycled_content_rate'),
+            ('recyclability_rate', 'float64', 'recyclability_rate'),
+            ('reuse_potential', 'float64', 'reuse_potential'),
+            ('material_efficiency', 'float64', 'material_efficiency'),
+            ('virgin_material_input', 'float64', 'virgin_material_input'),
+            ('recycled_material_input', 'float64', 'recycled_material_input'),
+            ('material_losses', 'float64', 'material_losses'),
+            ('waste_output', 'float64', 'waste_output'),
+            ('recovered_materials', 'float64', 'recovered_materials'),
+            ('updated_at', 'timestamp', 'updated_at'),
+        ],
+        queryset=lambda: CircularityAnalysis.objects.all(),
+        watermark_field='updated_at',
+        targets=['overall_circularity_score'],
+    )
+
+
+FEATURE_SOURCES = {
+    'calculations': _calculation_source,
+    'material_properties': _material_property_source,
+    'processes': _process_source,
+    'circularity': _circularity_source,
+}
+
+
+class StreamingStatistics:
+    """Per-column count/mean/std/min/max/histogram merged batch by batch.
+
+    Means and variances are combined with Chan's parallel update, so the
+    stored statistics of earlier runs are extended rather than recomputed.
+    Histogram edges are fixed by the first batch a column appears in; later
+    values outside them fall into the outer bins. The stored layout is the
+    one ``DriftMonitor`` reads from ``TrainingDataset.statistics``.
+    """
+
+    def __init__(self, stored: Optional[Dict[str, Any]] = None):
+        self.features: Dict[str, Dict[str, Any]] = {}
+        self.histograms: Dict[str, StreamingHistogram] = {}
+        self.missing: Dict[str, int] = {}
+        for name, stats in (stored or {}).get('features', {}).items():
+            self.features[name] = dict(stats)
+            self.missing[name] = stats.get('missing', 0)
+            if stats.get('bin_edges'):
+                histogram = StreamingHistogram(np.asarray(stats['bin_edges'], dtype=np.float64))
+                histogram.counts = np.asarray(stats['bin_counts'], dtype=np.int64)
+                self.histograms[name] = histogram
+
+    def update(self, name: str, values: np.ndarray) -> None:
+        finite = values[np.isfinite(values)]
+        self.missing[name] = self.missing.get(name, 0) + int(len(values) - len(finite))
+        if not len(finite):
+            return
+
+        stats = self.features.get(name)
+        count, mean, m2 = len(finite), float(finite.mean()), float(((finite - finite.mean()) ** 2).sum())
+        if stats and stats.get('count'):
+            total = stats['count'] + count
+            delta = mean - stats['mean']
+            m2 += stats['std'] ** 2 * stats['count'] + delta ** 2 * stats['count'] * count / total
+            mean = stats['mean'] + delta * count / total
+            low, high = min(stats['min'], float(finite.min())), max(stats['max'], float(finite.max()))
+            count = total
+        else:
+            low, high = float(finite.min()), float(finite.max())
+        self.features[name] = {'count': count, 'mean': mean, 'std': math.sqrt(m2 / count), 'min': low, 'max': high}
+
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            span = high - low or max(abs(low), 1.0)
+            edges = np.linspace(low - span * 0.05, high + span * 0.05, DEFAULT_BINS + 1)
+            histogram = self.histograms[name] = StreamingHistogram(edges)
+        histogram.update(finite)
+
+    def as_dict(self) -> Dict[str, Any]:
+        features = {}
+        for name, stats in self.features.items():
+            histogram = self.histograms.get(name)
+            features[name] = dict(
+                stats,
+                bin_edges=histogram.edges.tolist() if histogram else [],
+                bin_counts=histogram.counts.tolist() if histogram else [],
+                missing=self.missing.get(name, 0),
+            )
+        return {'features': features}
+
+
+class FeatureStore:
+    """Incremental extraction of training features into partitioned Parquet.
+
+    Each source keeps a ``TrainingDataset`` whose ``statistics['watermark']``
+    is the newest change already extracted. A run reads only rows changed
+    after it (on the primary, so replica lag cannot skip rows), appends them
+    as a new file under ``<root>/<source>/date=YYYY-MM-DD/`` and folds them
+    into the streaming statistics. A changed row is appended again; ``read()``
+    keeps the newest version of each key.
+    """
+
+    def __init__(self, root: Optional[Path] = None, batch_size: Optional[int] = None):
+        config = getattr(settings, 'FEATURE_STORE', {})
+        self.root = Path(root or config.get('ROOT', Path(settings.BASE_DIR) / 'feature_store'))
+        self.batch_size = batch_size or config.get('BATCH_SIZE', 5000)
+
+    def source(self, name: str) -> FeatureSource:
+        if name not in FEATURE_SOURCES:
+            raise ValueError(f"Unknown feature source: {name}")
+        return FEATURE_SOURCES[name]()
+
+    def dataset(self, source: FeatureSource) -> TrainingDataset:
+        dataset, _ = TrainingDataset.objects.get_or_create(
+            name=f"{FEATURE_STORE_SOURCE}:{source.name}",
+            source=FEATURE_STORE_SOURCE,
+            defaults={
+                'description': source.description,
+                'dataset_type': source.dataset_type,
+                'size': 0,
+                'feature_count': 0,
+                'target_count': len(source.targets),
+                'file_path': str(self.root / source.name),
+                'file_format': 'parquet',
+                'file_size': 0,
+            },
+        )
+        return dataset
+
+    def refresh_all(self) -> Dict[str, int]:
+        written = {}
+        for name in FEATURE_SOURCES:
+            try:
+                written[name] = self.refresh(name)
+            except Exception as e:
+                logger.error(f"Feature store refresh of {name} failed: {str(e)}")
+        return written
+
+    def refresh(self, name: str) -> int:
+        """Append rows changed since the watermark; returns the number of rows written"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        source = self.source(name)
+        dataset = self.dataset(source)
+        statistics = StreamingStatistics(dataset.statistics)
+        watermark = parse_datetime(dataset.statistics.get('watermark') or '')
+
+        queryset = source.queryset()
+        if watermark:
+            queryset = queryset.filter(**{f"{source.watermark_field}__gt": watermark})
+        queryset = queryset.order_by(source.watermark_field)
+
+        run_id = f"{timezone.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        writers: Dict[str, Any] = {}
+        written, missing_cells, total_cells = 0, 0, 0
+        newest = watermark
+        schema = None
+        try:
+            for frame in self._frames(source, queryset):
+                newest = frame['updated_at'].max().to_pydatetime()
+                for column in frame.select_dtypes(include='number').columns:
+                    # Identifiers are not features
+                    if column != source.key and not column.endswith('_id'):
+                        statistics.update(column, frame[column].to_numpy(dtype=np.float64, na_value=np.nan))
+                missing_cells += int(frame.isna().sum().sum())
+                total_cells += frame.size
+
+                partitions = frame['updated_at'].dt.strftime('%Y-%m-%d')
+                for partition, rows in frame.groupby(partitions):
+                    table = pa.Table.from_pandas(rows, preserve_index=False)
+                    schema = schema or table.schema
+                    writer = writers.get(partition)
+                    if writer is None:
+                        path = self.root / source.name / f"date={partition}" / f"part-{run_id}.parquet"
+                        path.parent.mkdir(parents=True, exist_ok=True)
+                        writer = writers[partition] = pq.ParquetWriter(path, schema, compression='snappy')
+                    writer.write_table(table.cast(schema))
+                written += len(frame)
+        finally:
+            for writer in writers.values():
+                writer.close()
+
+        if not written:
+            return 0
+        self._update_metadata(dataset, source, statistics, schema, newest, written,
+                              missing_cells, total_cells)
+        logger.info(f"Feature store: appended {written} {source.name} rows")
+        return written
+
+    def _frames(self, source: FeatureSource, queryset) -> Iterator[pd.DataFrame]:
+        names = [name for name, _, _ in source.columns]
+        fields = [field for _, _, field in source.columns]
+        rows = queryset.values_list(*fields).iterator(chunk_size=self.batch_size)
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                yield self._frame(source, names, batch)
+                batch = []
+        if batch:
+            yield self._frame(source, names, batch)
+
+    def _frame(self, source: FeatureSource, names: List[str], batch: List[tuple]) -> pd.DataFrame:
+        frame = pd.DataFrame.from_records(batch, columns=names)
+        for name, kind, _ in source.columns:
+            if kind == 'string':
+                frame[name] = frame[name].astype('string')
+            elif kind in NUMERIC_KINDS:
+                frame[name] = pd.to_numeric(frame[name], errors='coerce').astype('float64' if kind == 'float64' else 'Int64')
+        frame['updated_at'] = pd.to_datetime(frame['updated_at'], utc=True)
+        if source.enrich:
+            frame = source.enrich(frame)
+        return frame
+
+    def _update_metadata(self, dataset: TrainingDataset, source: FeatureSource, statistics: StreamingStatistics,
+                         schema, newest: datetime, written: int, missing_cells: int, total_cells: int) -> None:
+        directory = self.root / source.name
+        previous_cells = dataset.size * max(len(dataset.schema.get('columns', {})), 1)
+        completeness = (
+            (dataset.completeness_score * previous_cells + (total_cells - missing_cells))
+            / (previous_cells + total_cells)
+        ) if total_cells else dataset.completeness_score
+        columns = {field.name: str(field.type) for field in schema} if schema is not None else {}
+
+        dataset.size += written
+        dataset.feature_count = len([
+            name for name in columns
+            if name not in source.targets and name not in (source.key, 'updated_at') and not name.endswith('_id')
+        ])
+        dataset.target_count = len(source.targets)
+        dataset.file_path = str(directory)
+        dataset.file_format = 'parquet'
+        dataset.file_size = sum(path.stat().st_size for path in directory.rglob('*.parquet'))
+        dataset.schema = {
+            'columns': columns,
+            'key': source.key,
+            'targets': source.targets,
+            'partitioning': 'date',
+        }
+        dataset.statistics = dict(statistics.as_dict(), watermark=newest.isoformat())
+        dataset.completeness_score = completeness
+        dataset.collection_date = timezone.now()
+        dataset.save()
+
+    def read(self, name: str, columns: Optional[List[str]] = None, latest: bool = True) -> pd.DataFrame:
+        """Memory-mapped read of a source's Parquet files, newest version per key by default"""
+        import pyarrow.parquet as pq
+
+        source = self.source(name)
+        directory = self.root / source.name
+        if not directory.exists():
+            return pd.DataFrame(columns=columns or [])
+        wanted = None
+        if columns is not None:
+            wanted = list(dict.fromkeys(columns + ([source.key, 'updated_at'] if latest else [])))
+        frame = pq.read_table(directory, columns=wanted, memory_map=True, partitioning='hive').to_pandas()
+        frame = frame.drop(columns=['date'], errors='ignore')
+        if latest and len(frame):
+            frame = frame.sort_values('updated_at').drop_duplicates(source.key, keep='last')
+        return frame[columns] if columns is not None else frame.reset_index(drop=True)
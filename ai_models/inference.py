@@ -0,0 +1,205 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Any, Optional, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections
+from .models import AIModel
+from .services import ParameterPredictionService, record_usage
+
+logger = logging.getLogger(__name__)
+
+BATCHED_MODEL_TYPES = ('prediction', 'regression')
+
+
+class UsageAccumulator:
+    """Collects per-batch timings and writes them to AIModel in aggregate"""
+
+    def __init__(self, model_id, flush_interval: float):
+        self.model_id = model_id
+        self.flush_interval = flush_interval
+        self.count = 0
+        self.total_ms = 0.0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add(self, count: int, elapsed_ms: float) -> None:
+        with self._lock:
+            self.count += count
+            self.total_ms += elapsed_ms
+
+    def due(self) -> bool:
+        return self.count > 0 and time.monotonic() - self._last_flush >= self.flush_interval
+
+    def flush(self) -> None:
+        with self._lock:
+            count, total_ms = self.count, self.total_ms
+            self.count, self.total_ms = 0, 0.0
+            self._last_flush = time.monotonic()
+        if not count:
+            return
+        try:
+            record_usage(self.model_id, count, total_ms)
+        except Exception as e:
+            logger.warning(f"Could not record usage for model {self.model_id}: {str(e)}")
+            self.add(count, total_ms)
+
+
+class MicroBatcher:
+    """Queues single-row requests for one model and runs them in micro-batches.
+
+    A background thread waits for the first queued request, then keeps
+    collecting until ``max_batch_size`` rows are queued or ``max_wait_ms`` has
+    passed, and answers the whole batch with one estimator call. Callers get a
+    ``Future`` resolving to that row's predictions.
+    """
+
+    def __init__(self, ai_model: AIModel, service: Optional[ParameterPredictionService] = None,
+                 max_batch_size: int = 64, max_wait_ms: float = 5.0, stats_flush_interval: float = 5.0):
+        self.ai_model = ai_model
+        self.service = service or ParameterPredictionService()
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.usage = UsageAccumulator(ai_model.pk, stats_flush_interval)
+        self._queue: queue.Queue = queue.Queue()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name=f"inference-{ai_model.pk}", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, features: Dict[str, float]) -> Future:
+        if self._stopped.is_set():
+            raise RuntimeError('Inference batcher has been stopped')
+        future = Future()
+        self._queue.put((features, future))
+        return future
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stopped.set()
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self.usage.flush()
+
+    def _collect(self) -> List[Tuple[Dict[str, float], Future]]:
+        try:
+            first = self._queue.get(timeout=self.usage.flush_interval)
+        except queue.Empty:
+            return []
+        if first is None:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._stopped.set()
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            # Drop requests whose callers already gave up
+            batch = [(features, future) for features, future in batch if future.set_running_or_notify_cancel()]
+            if batch:
+                self._execute(batch)
+            if self.usage.due():
+                close_old_connections()
+                self.usage.flush()
+            if self._stopped.is_set() and self._queue.empty():
+                break
+
+    def _execute(self, batch: List[Tuple[Dict[str, float], Future]]) -> None:
+        targets = self.ai_model.output_targets
+        try:
+            predictions, uncertainty, elapsed_ms = self.service.predict_rows(
+                self.ai_model, [features for features, _ in batch]
+            )
+        except Exception as e:
+            logger.error(f"Batch prediction with {self.ai_model} failed: {str(e)}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        self.usage.add(len(batch), elapsed_ms)
+        for row, (_, future) in enumerate(batch):
+            future.set_result({
+                'predictions': dict(zip(targets, predictions[row].tolist())),
+                'uncertainty': (
+                    dict(zip(targets, uncertainty[row].tolist())) if uncertainty is not None else {}
+                ),
+                'batch_size': len(batch),
+                'prediction_time': elapsed_ms / len(batch),
+            })
+
+
+class InferenceServer:
+    """Process-wide registry of micro-batchers, one per deployed model version"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = config if config is not None else getattr(settings, 'AI_INFERENCE', {})
+        self._batchers: Dict[tuple, MicroBatcher] = {}
+        self._lock = threading.Lock()
+
+    def batcher(self, ai_model: AIModel) -> MicroBatcher:
+        if ai_model.model_type not in BATCHED_MODEL_TYPES:
+            raise ValueError(f"Model type {ai_model.model_type} does not support batched inference")
+        # Retraining in place changes last_trained (and possibly input_features),
+        # so the batcher holding the old AIModel is replaced
+        key = (ai_model.pk, ai_model.version, ai_model.model_path, ai_model.scaler_path, ai_model.last_trained)
+        with self._lock:
+            batcher = self._batchers.get(key)
+            if batcher is None:
+                # A redeployed model gets a fresh batcher; retire the old one
+                for stale in [k for k in self._batchers if k[0] == ai_model.pk]:
+                    self._batchers.pop(stale).stop(timeout=0)
+                batcher = MicroBatcher(
+                    ai_model,
+                    max_batch_size=self.config.get('MAX_BATCH_SIZE', 64),
+                    max_wait_ms=self.config.get('MAX_WAIT_MS', 5.0),
+                    stats_flush_interval=self.config.get('STATS_FLUSH_INTERVAL', 5.0),
+                )
+                self._batchers[key] = batcher
+        return batcher
+
+    def submit(self, ai_model: AIModel, features: Dict[str, float]) -> Future:
+        return self.batcher(ai_model).submit(features)
+
+    def predict_many(self, ai_model: AIModel, rows: List[Dict[str, float]],
+                     timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Submit rows individually so they share batches with concurrent callers"""
+        timeout = timeout if timeout is not None else self.config.get('TIMEOUT', 10.0)
+        batcher = self.batcher(ai_model)
+        futures = [batcher.submit(row) for row in rows]
+        return [future.result(timeout=timeout) for future in futures]
+
+    def shutdown(self) -> None:
+        with self._lock:
+            batchers, self._batchers = list(self._batchers.values()), {}
+        for batcher in batchers:
+            batcher.stop()
+
+
+_server: Optional[InferenceServer] = None
+_server_lock = threading.Lock()
+
+
+def get_inference_server() -> InferenceServer:
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = InferenceServer()
+            atexit.register(_server.shutdown)
+    return _server
@@ -0,0 +1,154 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AIModel',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=200)),
+                ('description', models.TextField()),
+                ('model_type', models.CharField(choices=[('prediction', 'Parameter Prediction'), ('recommendation', 'Recommendation Engine'), ('optimization', 'Process Optimization'), ('classification', 'Material Classification'), ('regression', 'Impact Regression'), ('nlp', 'Natural Language Processing')], max_length=20)),
+                ('version', models.CharField(default='1.0', max_length=20)),
+                ('status', models.CharField(choices=[('training', 'Training'), ('trained', 'Trained'), ('deployed', 'Deployed'), ('deprecated', 'Deprecated')], default='training', max_length=20)),
+                ('algorithm', models.CharField(help_text='ML algorithm used', max_length=100)),
+                ('hyperparameters', models.JSONField(default=dict, help_text='Model hyperparameters')),
+                ('input_features', models.JSONField(default=list, help_text='List of input features')),
+                ('output_targets', models.JSONField(default=list, help_text='List of output targets')),
+                ('accuracy_score', models.FloatField(blank=True, null=True)),
+                ('precision_score', models.FloatField(blank=True, null=True)),
+                ('recall_score', models.FloatField(blank=True, null=True)),
+                ('f1_score', models.FloatField(blank=True, null=True)),
+                ('rmse', models.FloatField(blank=True, help_text='Root Mean Square Error', null=True)),
+                ('mae', models.FloatField(blank=True, help_text='Mean Absolute Error', null=True)),
+                ('r2_score', models.FloatField(blank=True, help_text='R-squared score', null=True)),
+                ('training_data_size', models.PositiveIntegerField(blank=True, null=True)),
+                ('training_duration', models.FloatField(blank=True, help_text='Training time in hours', null=True)),
+                ('last_trained', models.DateTimeField(blank=True, null=True)),
+                ('model_path', models.CharField(blank=True, help_text='Path to saved model', max_length=500)),
+                ('scaler_path', models.CharField(blank=True, help_text='Path to data scaler', max_length=500)),
+                ('feature_importance', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('prediction_count', models.PositiveIntegerField(default=0)),
+                ('avg_prediction_time', models.FloatField(default=0.0, help_text='Average prediction time in ms')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'unique_together': {('name', 'version')},
+            },
+        ),
+        migrations.CreateModel(
+            name='TrainingDataset',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=200)),
+                ('description', models.TextField()),
+                ('dataset_type', models.CharField(choices=[('lca_data', 'LCA Historical Data'), ('material_properties', 'Material Properties'), ('process_parameters', 'Process Parameters'), ('environmental_impacts', 'Environmental Impacts'), ('circularity_metrics', 'Circularity Metrics'), ('expert_knowledge', 'Expert Knowledge Base')], max_length=30)),
+                ('size', models.PositiveIntegerField(help_text='Number of records')),
+                ('feature_count', models.PositiveIntegerField(help_text='Number of features')),
+                ('target_count', models.PositiveIntegerField(default=1, help_text='Number of target variables')),
+                ('completeness_score', models.FloatField(default=1.0, help_text='Data completeness (0-1)')),
+                ('quality_score', models.FloatField(default=3.0, help_text='Overall data quality (1-5)')),
+                ('file_path', models.CharField(help_text='Path to dataset file', max_length=500)),
+                ('file_format', models.CharField(default='csv', max_length=20)),
+                ('file_size', models.PositiveBigIntegerField(help_text='File size in bytes')),
+                ('schema', models.JSONField(default=dict, help_text='Dataset schema definition')),
+                ('statistics', models.JSONField(default=dict, help_text='Dataset statistics')),
+                ('source', models.CharField(blank=True, max_length=200)),
+                ('collection_date', models.DateTimeField(blank=True, null=True)),
+                ('geographic_scope', models.CharField(default='Global', max_length=100)),
+                ('temporal_scope', models.CharField(blank=True, max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ModelPerformanceLog',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('accuracy', models.FloatField(blank=True, null=True)),
+                ('precision', models.FloatField(blank=True, null=True)),
+                ('recall', models.FloatField(blank=True, null=True)),
+                ('f1_score', models.FloatField(blank=True, null=True)),
+                ('rmse', models.FloatField(blank=True, null=True)),
+                ('mae', models.FloatField(blank=True, null=True)),
+                ('prediction_count', models.PositiveIntegerField(default=0)),
+                ('avg_prediction_time', models.FloatField(default=0.0)),
+                ('error_count', models.PositiveIntegerField(default=0)),
+                ('data_drift_score', models.FloatField(blank=True, null=True)),
+                ('model_drift_score', models.FloatField(blank=True, null=True)),
+                ('period_start', models.DateTimeField()),
+                ('period_end', models.DateTimeField()),
+                ('custom_metrics', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('model', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='performance_logs', to='ai_models.aimodel')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Prediction',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('prediction_type', models.CharField(choices=[('parameter_estimation', 'Parameter Estimation'), ('impact_prediction', 'Impact Prediction'), ('material_classification', 'Material Classification'), ('process_optimization', 'Process Optimization'), ('scenario_analysis', 'Scenario Analysis')], max_length=30)),
+                ('input_data', models.JSONField(help_text='Input features used for prediction')),
+                ('predictions', models.JSONField(help_text='Model predictions')),
+                ('confidence_scores', models.JSONField(default=dict, help_text='Confidence/probability scores')),
+                ('uncertainty_estimates', models.JSONField(default=dict, help_text='Uncertainty estimates')),
+                ('prediction_time', models.FloatField(help_text='Prediction time in milliseconds')),
+                ('actual_values', models.JSONField(blank=True, help_text='Actual values for validation', null=True)),
+                ('validation_metrics', models.JSONField(default=dict, help_text='Validation metrics')),
+                ('project_context', models.CharField(blank=True, max_length=200)),
+                ('calculation_context', models.CharField(blank=True, max_length=200)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('model', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='predictions', to='ai_models.aimodel')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='NLQueryLog',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('query_text', models.TextField(help_text='Original natural language query')),
+                ('query_type', models.CharField(choices=[('what_if', 'What-if Analysis'), ('comparison', 'Scenario Comparison'), ('recommendation', 'Recommendation Request'), ('explanation', 'Result Explanation'), ('data_query', 'Data Query'), ('general', 'General Question')], max_length=20)),
+                ('processed_query', models.JSONField(help_text='Processed/structured query')),
+                ('intent_classification', models.CharField(blank=True, max_length=100)),
+                ('entities_extracted', models.JSONField(default=list)),
+                ('response_text', models.TextField(help_text='Generated response')),
+                ('response_data', models.JSONField(default=dict, help_text='Structured response data')),
+                ('confidence_score', models.FloatField(default=0.0)),
+                ('processing_time', models.FloatField(help_text='Total processing time in seconds')),
+                ('user_rating', models.PositiveSmallIntegerField(blank=True, help_text='User rating (1-5)', null=True)),
+                ('user_feedback', models.TextField(blank=True)),
+                ('project_context', models.CharField(blank=True, max_length=200)),
+                ('session_id', models.CharField(blank=True, max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
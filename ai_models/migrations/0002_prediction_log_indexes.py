@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_models', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='nlquerylog',
+            index=models.Index(fields=['user', '-created_at'], name='ai_nlq_user_created'),
+        ),
+        migrations.AddIndex(
+            model_name='nlquerylog',
+            index=models.Index(fields=['created_at'], name='ai_nlq_created'),
+        ),
+        migrations.AddIndex(
+            model_name='prediction',
+            index=models.Index(fields=['model', '-created_at'], name='ai_pred_model_created'),
+        ),
+        migrations.AddIndex(
+            model_name='prediction',
+            index=models.Index(fields=['created_at'], name='ai_pred_created'),
+        ),
+    ]
@@ -165,6 +165,11 @@ class Prediction(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # "Recent predictions for model X" is an index range scan + LIMIT
+            models.Index(fields=['model', '-created_at'], name='ai_pred_model_created'),
+            models.Index(fields=['created_at'], name='ai_pred_created'),
+        ]
     
     def __str__(self):
         return f"Prediction by {self.model.name} at {self.created_at}"
@@ -252,6 +257,10 @@ class NLQueryLog(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='ai_nlq_user_created'),
+            models.Index(fields=['created_at'], name='ai_nlq_created'),
+        ]
     
     def __str__(self):
         return f"Query: {self.query_text[:50]}..."
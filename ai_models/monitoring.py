@@ -0,0 +1,283 @@
+import logging
+import math
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from django.db.models import Avg
+from django.utils import timezone
+from lca_tool.routers import use_replica
+from .models import AIModel, TrainingDataset, Prediction, ModelPerformanceLog
+
+logger = logging.getLogger(__name__)
+
+PSI_EPSILON = 1e-4
+DEFAULT_BINS = 10
+
+
+def feature_rows(input_data: Any) -> List[Dict[str, Any]]:
+    """Feature dicts from a Prediction.input_data payload (single row or batch)"""
+    rows = input_data if isinstance(input_data, list) else [input_data]
+    return [
+        row.get('features', row) for row in rows if isinstance(row, dict)
+    ]
+
+
+def target_rows(payload: Any) -> List[Dict[str, Any]]:
+    rows = payload if isinstance(payload, list) else [payload]
+    return [row for row in rows if isinstance(row, dict)]
+
+
+def reference_bins(feature_stats: Dict[str, Any]) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """Bin edges and expected probabilities for one feature of TrainingDataset.statistics.
+
+    Uses the stored histogram (``bin_edges``/``bin_counts``) when present,
+    otherwise a normal approximation from ``mean``/``std``.
+    """
+    if feature_stats.get('bin_edges') and feature_stats.get('bin_counts'):
+        edges = np.asarray(feature_stats['bin_edges'], dtype=np.float64)
+        counts = np.asarray(feature_stats['bin_counts'], dtype=np.float64)
+        if len(edges) == len(counts) + 1 and counts.sum() > 0:
+            return edges, counts / counts.sum()
+
+    mean, std = feature_stats.get('mean'), feature_stats.get('std')
+    if mean is None or not std:
+        return None
+    edges = mean + std * np.linspace(-3, 3, DEFAULT_BINS + 1)
+    cdf = np.array([0.5 * (1 + math.erf((edge - mean) / (std * math.sqrt(2)))) for edge in edges])
+    # Tails fold into the outer bins, matching how observations are clipped
+    cdf[0], cdf[-1] = 0.0, 1.0
+    return edges, np.diff(cdf)
+
+
+def population_stability_index(expected: np.ndarray, actual: np.ndarray) -> float:
+    expected = np.clip(expected, PSI_EPSILON, None)
+    actual = np.clip(actual, PSI_EPSILON, None)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def ks_statistic(expected: np.ndarray, actual: np.ndarray) -> float:
+    """Two-sample KS distance evaluated on the shared bin edges"""
+    return float(np.max(np.abs(np.cumsum(expected) - np.cumsum(actual))))
+
+
+class StreamingHistogram:
+    """Counts observations into fixed reference bins, one chunk at a time"""
+
+    def __init__(self, edges: np.ndarray):
+        self.edges = edges
+        self.counts = np.zeros(len(edges) - 1, dtype=np.int64)
+        self.missing = 0
+
+    def update(self, values: np.ndarray) -> None:
+        finite = np.isfinite(values)
+        self.missing += int((~finite).sum())
+        # Out-of-range values land in the outer bins
+        index = np.clip(np.searchsorted(self.edges, values[finite], side='right') - 1, 0, len(self.counts) - 1)
+        self.counts += np.bincount(index, minlength=len(self.counts))
+
+    @property
+    def total(self) -> int:
+        return int(self.counts.sum())
+
+    def probabilities(self) -> np.ndarray:
+        return self.counts / self.total if self.total else self.counts.astype(np.float64)
+
+
+class ErrorAccumulator:
+    """Running absolute/squared error sums per target"""
+
+    def __init__(self):
+        self.count: Dict[str, int] = {}
+        self.abs_error: Dict[str, float] = {}
+        self.sq_error: Dict[str, float] = {}
+
+    def update(self, frame: pd.DataFrame) -> None:
+        """``frame`` has columns target, predicted, actual"""
+        frame = frame.dropna()
+        if frame.empty:
+            return
+        error = frame['predicted'] - frame['actual']
+        totals = frame.assign(abs_error=error.abs(), sq_error=error ** 2).groupby('target').agg(
+            count=('abs_error', 'size'), abs_error=('abs_error', 'sum'), sq_error=('sq_error', 'sum')
+        )
+        for target, row in totals.iterrows():
+            self.count[target] = self.count.get(target, 0) + int(row['count'])
+            self.abs_error[target] = self.abs_error.get(target, 0.0) + float(row['abs_error'])
+            self.sq_error[target] = self.sq_error.get(target, 0.0) + float(row['sq_error'])
+
+    def metrics(self) -> Dict[str, Dict[str, float]]:
+        return {
+            target: {
+                'count': count,
+                'mae': self.abs_error[target] / count,
+                'rmse': math.sqrt(self.sq_error[target] / count),
+            }
+            for target, count in self.count.items() if count
+        }
+
+    def overall(self) -> Tuple[Optional[float], Optional[float]]:
+        total = sum(self.count.values())
+        if not total:
+            return None, None
+        return sum(self.abs_error.values()) / total, math.sqrt(sum(self.sq_error.values()) / total)
+
+
+class DriftMonitor:
+    """Computes data drift, model drift and error metrics per model and period.
+
+    Predictions are read in chunks through a server-side cursor and folded
+    into fixed-bin histograms and running error sums, so memory stays flat
+    no matter how many predictions fall inside a window.
+    """
+
+    def __init__(self, chunk_size: int = 5000):
+        self.chunk_size = chunk_size
+
+    def reference_dataset(self, ai_model: AIModel) -> Optional[TrainingDataset]:
+        """Dataset named in hyperparameters['training_dataset'], else the newest one covering the features"""
+        dataset_id = ai_model.hyperparameters.get('training_dataset')
+        if dataset_id:
+            dataset = TrainingDataset.objects.filter(pk=dataset_id).first()
+            if dataset:
+                return dataset
+        for dataset in TrainingDataset.objects.exclude(statistics={}).order_by('-updated_at'):
+            features = dataset.statistics.get('features', {})
+            if ai_model.input_features and all(name in features for name in ai_model.input_features):
+                return dataset
+        return None
+
+    def run(self, period: timedelta = timedelta(days=1), end: Optional[datetime] = None,
+            max_periods: int = 90) -> List[ModelPerformanceLog]:
+        """Write performance logs for every complete period not yet logged, per deployed model.
+
+        Each model is backfilled from the end of its latest log (or, before the
+        first one, from when it was last trained), so periods missed while the
+        task was not running are filled in. At most ``max_periods`` of the
+        most recent periods are computed per model and run.
+        """
+        end = end or timezone.now()
+        epoch = datetime(2000, 1, 1, tzinfo=end.tzinfo)
+        last_end = end - ((end - epoch) % period)
+        logs = []
+        for ai_model in AIModel.objects.filter(status='deployed'):
+            latest = ai_model.performance_logs.order_by('-period_end').values_list('period_end', flat=True).first()
+            start = latest or ai_model.last_trained or ai_model.created_at
+            period_start = max(start - ((start - epoch) % period), last_end - period * max_periods)
+            logged = set(ai_model.performance_logs.filter(period_start__gte=period_start).values_list(
+                'period_start', flat=True
+            ))
+            while period_start + period <= last_end:
+                if period_start not in logged:
+                    try:
+                        logs.append(self.evaluate(ai_model, period_start, period_start + period))
+                    except Exception as e:
+                        # Stop here so the next run retries this period first
+                        logger.error(f"Drift computation for {ai_model} failed: {str(e)}")
+                        break
+                period_start += period
+        return logs
+
+    @use_replica()
+    def _average_prediction_time(self, ai_model: AIModel, start: datetime, end: datetime) -> Optional[float]:
+        return Prediction.objects.filter(
+            model=ai_model, created_at__gte=start, created_at__lt=end
+        ).aggregate(avg_time=Avg('prediction_time'))['avg_time']
+
+    def _chunks(self, ai_model: AIModel, start: datetime, end: datetime) -> Iterator[List[tuple]]:
+        with use_replica():
+            rows = Prediction.objects.filter(
+                model=ai_model, created_at__gte=start, created_at__lt=end
+            ).order_by().values_list('input_data', 'predictions', 'actual_values').iterator(
+                chunk_size=self.chunk_size
+            )
+            chunk = []
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) >= self.chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+
+    def evaluate(self, ai_model: AIModel, start: datetime, end: datetime) -> ModelPerformanceLog:
+        dataset = self.reference_dataset(ai_model)
+        reference = {}
+        if dataset:
+            for name, stats in dataset.statistics.get('features', {}).items():
+                if name in ai_model.input_features:
+                    bins = reference_bins(stats)
+                    if bins is not None:
+                        reference[name] = bins
+        histograms = {name: StreamingHistogram(edges) for name, (edges, _) in reference.items()}
+        errors = ErrorAccumulator()
+        # A Prediction row may hold a whole batch, so rows are counted per payload
+        prediction_count = 0
+
+        for chunk in self._chunks(ai_model, start, end):
+            inputs, predicted, actual = zip(*chunk)
+            rows = [feature_rows(payload) for payload in inputs]
+            prediction_count += sum(
+                len(payload_rows) or len(target_rows(result)) for payload_rows, result in zip(rows, predicted)
+            )
+            if histograms:
+                features = pd.DataFrame.from_records(
+                    [row for payload_rows in rows for row in payload_rows],
+                    columns=list(histograms),
+                )
+                for name, histogram in histograms.items():
+                    histogram.update(pd.to_numeric(features[name], errors='coerce').to_numpy(dtype=np.float64))
+            errors.update(self._error_frame(predicted, actual))
+
+        per_feature = {}
+        for name, histogram in histograms.items():
+            if not histogram.total:
+                continue
+            expected = reference[name][1]
+            observed = histogram.probabilities()
+            per_feature[name] = {
+                'psi': population_stability_index(expected, observed),
+                'ks': ks_statistic(expected, observed),
+                'observations': histogram.total,
+                'missing': histogram.missing,
+            }
+
+        mae, rmse = errors.overall()
+        data_drift = max((values['psi'] for values in per_feature.values()), default=None)
+        model_drift = rmse / ai_model.rmse - 1 if rmse is not None and ai_model.rmse else None
+
+        log = ModelPerformanceLog.objects.create(
+            model=ai_model,
+            rmse=rmse,
+            mae=mae,
+            prediction_count=prediction_count,
+            avg_prediction_time=self._average_prediction_time(ai_model, start, end) or 0.0,
+            data_drift_score=data_drift,
+            model_drift_score=model_drift,
+            period_start=start,
+            period_end=end,
+            custom_metrics={
+                'reference_dataset': str(dataset.pk) if dataset else None,
+                'feature_drift': per_feature,
+                'target_errors': errors.metrics(),
+                'max_ks': max((values['ks'] for values in per_feature.values()), default=None),
+            },
+        )
+        if data_drift is not None and data_drift > 0.25:
+            logger.warning(f"Significant data drift for {ai_model}: PSI {data_drift:.3f}")
+        return log
+
+    def _error_frame(self, predicted: Iterable[Any], actual: Iterable[Any]) -> pd.DataFrame:
+        """Long frame of (target, predicted, actual) for rows that have actual values"""
+        records = []
+        for predicted_payload, actual_payload in zip(predicted, actual):
+            if not actual_payload:
+                continue
+            for predicted_row, actual_row in zip(target_rows(predicted_payload), target_rows(actual_payload)):
+                for target, actual_value in actual_row.items():
+                    if target in predicted_row:
+                        records.append((target, predicted_row[target], actual_value))
+        frame = pd.DataFrame.from_records(records, columns=['target', 'predicted', 'actual'])
+        frame[['predicted', 'actual']] = frame[['predicted', 'actual']].apply(pd.to_numeric, errors='coerce')
+        return frame
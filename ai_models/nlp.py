@@ -0,0 +1,389 @@
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Spelling variants and synonyms folded before matching
+SYNONYMS = {
+    'aluminium': 'aluminum',
+    'alu': 'aluminum',
+    'plastics': 'plastic',
+    'electricity': 'power',
+    'substitute': 'replace',
+    'swap': 'replace',
+    'exchange': 'replace',
+    'replacing': 'replace',
+    'substituting': 'replace',
+    'swapping': 'replace',
+    'switching': 'switch',
+    'moving': 'move',
+    'reducing': 'reduce',
+    'cutting': 'reduce',
+    'lowering': 'reduce',
+    'increasing': 'increase',
+    'doubling': 'double',
+    'halving': 'halve',
+    'lower': 'reduce',
+    'cut': 'reduce',
+    'decrease': 'reduce',
+    'raise': 'increase',
+    'boost': 'increase',
+    'percent': '%',
+    'pct': '%',
+}
+
+NUMBER_WORDS = {
+    'half': '50%', 'quarter': '25%', 'third': '33%', 'all': '100%', 'fully': '100%',
+    'ten': '10', 'twenty': '20', 'thirty': '30', 'forty': '40', 'fifty': '50',
+    'sixty': '60', 'seventy': '70', 'eighty': '80', 'ninety': '90', 'hundred': '100',
+}
+
+ENERGY_SOURCES = {
+    'renewable': 'electricity_renewable',
+    'green': 'electricity_renewable',
+    'solar': 'electricity_renewable',
+    'wind': 'electricity_renewable',
+    'hydro': 'electricity_renewable',
+    'grid': 'electricity_grid',
+    'natural gas': 'natural_gas',
+    'gas': 'natural_gas',
+    'coal': 'coal',
+}
+
+SCALE_TARGETS = {
+    'energy': 'energy', 'power': 'energy', 'energy use': 'energy', 'energy consumption': 'energy',
+    'transport': 'transport', 'transportation': 'transport', 'shipping': 'transport', 'distance': 'transport',
+    'waste': 'waste', 'scrap': 'waste',
+    'material': 'material', 'materials': 'material', 'material use': 'material',
+}
+
+MATERIAL = r'(?P<material>[a-z][a-z \-]*?)'
+PERCENT = r'(?P<percent>\d+(?:\.\d+)?)\s*%'
+ENERGY = r'(?P<energy>' + '|'.join(sorted(ENERGY_SOURCES, key=len, reverse=True)) + r')'
+SCALE = r'(?P<target>' + '|'.join(sorted(SCALE_TARGETS, key=len, reverse=True)) + r')'
+# Trailing qualifiers ("... in the frame", "... for packaging") don't change the overlay
+END = r'(?:\s+(?:in|for|on|across|throughout)\s+[a-z ]+)?\s*$'
+
+# (intent, pattern) pairs tried in order against each clause
+GRAMMAR = [
+    ('recycled_content', re.compile(
+        rf'(?:use|using|with|switch to|increase\w*|make it|source)?\s*(?:to\s+)?{PERCENT}\s+recycled\s+{MATERIAL}' + END
+    )),
+    ('recycled_content', re.compile(
+        rf'(?:use|using|make|set)?\s*(?:the\s+)?recycled content of\s+{MATERIAL}\s+(?:to|at|=)\s+{PERCENT}' + END
+    )),
+    ('recycled_content', re.compile(
+        rf'(?:use|using|switch to|source)\s+recycled\s+{MATERIAL}' + END
+    )),
+    ('energy_switch', re.compile(
+        rf'(?:use|using|switch(?: \w+)? to|move(?: \w+)? to|change(?: \w+)? to|run on|power\w* by)\s+'
+        rf'(?:{PERCENT}\s+)?{ENERGY}(?:\s+(?:power|energy))?(?:\s+instead of\s+(?P<source>[a-z ]+?))?' + END
+    )),
+    ('energy_switch', re.compile(
+        rf'(?:switch|move|shift)\s+{PERCENT}\s+(?:of\s+(?:the\s+)?[a-z]+\s+)?to\s+{ENERGY}(?:\s+(?:power|energy))?' + END
+    )),
+    ('substitution', re.compile(
+        rf'replace\s+(?:the\s+)?(?P<source>[a-z][a-z \-]*?)\s+(?:with|by|for)\s+{MATERIAL}' + END
+    )),
+    ('substitution', re.compile(
+        rf'(?:use|using)\s+{MATERIAL}\s+instead of\s+(?P<source>[a-z][a-z \-]*?)' + END
+    )),
+    ('scale', re.compile(
+        rf'(?P<direction>reduce|increase|double|halve)\s+(?:the\s+)?(?:(?P<subject>[a-z]+)\s+)?{SCALE}'
+        rf'(?:\s+(?:by|to)\s+{PERCENT})?' + END
+    )),
+    ('recovery_rate', re.compile(
+        rf'(?:recover|recycle|collect)\s+{PERCENT}\s+of\s+(?:the\s+)?(?:waste|scrap|end of life)\w*' + END
+    )),
+]
+
+QUERY_TYPE_KEYWORDS = [
+    ('comparison', re.compile(r'\b(compare|comparison|versus|vs)\b')),
+    ('recommendation', re.compile(r'\b(recommend\w*|suggest\w*|best|improve\w*|should i)\b')),
+    ('explanation', re.compile(r'\b(why|explain|how come)\b')),
+    ('data_query', re.compile(r'\b(show|list|which|most|least|top)\b')),
+]
+
+
+def normalize_query(text: str) -> str:
+    """Canonical form used as the intent cache key"""
+    text = text.lower().strip()
+    text = re.sub(r'[?!.,;:"\'`]+', ' ', text)
+    text = re.sub(r'(\d)\s*(percent|pct)\b', r'\1%', text)
+    words = []
+    for word in text.split():
+        word = NUMBER_WORDS.get(word, word)
+        words.append(SYNONYMS.get(word, word))
+    text = ' '.join(words)
+    text = re.sub(r'^(?:what|how)\s+(?:would|will)\s+happen\s+if\s+', '', text)
+    text = re.sub(r'^(?:what if|how about|what about|and if)\s+', '', text)
+    text = re.sub(r'^(?:i|we)\s+', '', text)
+    text = re.sub(r'\b(please|would|could|can)\b\s*', '', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+@dataclass
+class ParsedQuery:
+    normalized: str
+    query_type: str
+    intent: str
+    overlay: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+    entities: List[Dict[str, Any]] = field(default_factory=list)
+    confidence: float = 0.0
+    unparsed: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'normalized': self.normalized,
+            'query_type': self.query_type,
+            'intent': self.intent,
+            'overlay': self.overlay,
+            'entities': self.entities,
+            'confidence': self.confidence,
+            'unparsed': self.unparsed,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ParsedQuery':
+        return cls(**data)
+
+
+class WhatIfParser:
+    """Rule/grammar based parser turning what-if questions into scenario overlays.
+
+    A query is split into clauses on "and"/"then"; each clause is matched
+    against GRAMMAR and contributes one entry to the overlay accepted by
+    ``LCACalculationService.what_if_analysis``.
+    """
+
+    def parse(self, text: str) -> ParsedQuery:
+        normalized = normalize_query(text)
+        clauses = [clause.strip() for clause in re.split(r'\s+(?:and|then|also|plus)\s+|\s*&\s*', normalized)]
+        overlay: Dict[str, List[Dict[str, Any]]] = {}
+        entities: List[Dict[str, Any]] = []
+        unparsed = []
+
+        for clause in filter(None, clauses):
+            matched = self._parse_clause(clause)
+            if matched is None:
+                unparsed.append(clause)
+                continue
+            intent, change, clause_entities = matched
+            overlay.setdefault(intent, []).append(change)
+            entities.extend(clause_entities)
+
+        if overlay:
+            query_type = 'what_if'
+            intent = next(iter(overlay)) if len(overlay) == 1 else 'combined'
+        else:
+            query_type = next(
+                (name for name, pattern in QUERY_TYPE_KEYWORDS if pattern.search(normalized)), 'general'
+            )
+            intent = query_type
+        parsed_clauses = len(clauses) - len(unparsed)
+        confidence = round(parsed_clauses / len(clauses), 2) if clauses and overlay else 0.0
+        return ParsedQuery(normalized, query_type, intent, overlay, entities, confidence, unparsed)
+
+    def _parse_clause(self, clause: str) -> Optional[Tuple[str, Dict[str, Any], List[Dict[str, Any]]]]:
+        for intent, pattern in GRAMMAR:
+            match = pattern.search(clause)
+            if match:
+                handler = getattr(self, f"_{intent}")
+                result = handler(match.groupdict())
+                if result is not None:
+                    return intent, result[0], result[1]
+        return None
+
+    @staticmethod
+    def _percent(groups: Dict[str, Any], default: Optional[float] = None) -> Optional[float]:
+        value = groups.get('percent')
+        return float(value) if value is not None else default
+
+    def _recycled_content(self, groups):
+        material = groups['material'].strip()
+        value = min(self._percent(groups, 100.0), 100.0)
+        return (
+            {'material': material, 'value': value},
+            [{'type': 'material', 'value': material}, {'type': 'recycled_content', 'value': value}],
+        )
+
+    def _energy_switch(self, groups):
+        target = ENERGY_SOURCES[groups['energy']]
+        source = groups.get('source')
+        source = ENERGY_SOURCES.get(source.strip()) if source else None
+        share = min(self._percent(groups, 100.0), 100.0)
+        return (
+            {'from': source, 'to': target, 'share': share},
+            [{'type': 'energy_source', 'value': target}, {'type': 'share', 'value': share}],
+        )
+
+    def _substitution(self, groups):
+        source, substitute = groups['source'].strip(), groups['material'].strip()
+        if source == substitute:
+            return None
+        return (
+            {'from': source, 'to': substitute},
+            [{'type': 'material', 'value': source}, {'type': 'substitute', 'value': substitute}],
+        )
+
+    def _scale(self, groups):
+        direction = groups['direction']
+        target = SCALE_TARGETS[groups['target']]
+        if direction == 'double':
+            factor = 2.0
+        elif direction == 'halve':
+            factor = 0.5
+        else:
+            percent = self._percent(groups)
+            if percent is None:
+                return None
+            factor = 1 - percent / 100 if direction == 'reduce' else 1 + percent / 100
+        change = {'target': target, 'factor': max(factor, 0.0)}
+        entities = [{'type': 'scale_target', 'value': target}, {'type': 'factor', 'value': change['factor']}]
+        if groups.get('subject') and target == 'material':
+            change['material'] = groups['subject']
+            entities.append({'type': 'material', 'value': groups['subject']})
+        return change, entities
+
+    def _recovery_rate(self, groups):
+        value = min(self._percent(groups, 100.0), 100.0)
+        return {'value': value}, [{'type': 'recovery_rate', 'value': value}]
+
+
+def _digest(payload: Any) -> str:
+    encoded = json.dumps(payload, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class IntentCache:
+    """Parsed queries keyed by normalized text: in-process LRU in front of the Django cache"""
+
+    def __init__(self, max_entries: int = 1024, timeout: int = 24 * 60 * 60):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, normalized: str) -> Optional[ParsedQuery]:
+        with self._lock:
+            if normalized in self._entries:
+                self._entries.move_to_end(normalized)
+                return self._entries[normalized]
+        data = cache.get(f"nlq:intent:{_digest(normalized)}")
+        if data is None:
+            return None
+        parsed = ParsedQuery.from_dict(data)
+        self._remember(normalized, parsed)
+        return parsed
+
+    def set(self, parsed: ParsedQuery) -> None:
+        self._remember(parsed.normalized, parsed)
+        cache.set(f"nlq:intent:{_digest(parsed.normalized)}", parsed.to_dict(), self.timeout)
+
+    def _remember(self, normalized: str, parsed: ParsedQuery) -> None:
+        with self._lock:
+            self._entries[normalized] = parsed
+            self._entries.move_to_end(normalized)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+_config = getattr(settings, 'NL_QUERY', {})
+intent_cache = IntentCache(
+    max_entries=_config.get('INTENT_CACHE_SIZE', 1024),
+    timeout=_config.get('CACHE_TIMEOUT', 24 * 60 * 60),
+)
+
+
+class NLQueryService:
+    """Answers natural-language what-if questions about a calculation"""
+
+    def __init__(self, parser: Optional[WhatIfParser] = None, cache_timeout: Optional[int] = None):
+        self.parser = parser or WhatIfParser()
+        self.cache_timeout = cache_timeout if cache_timeout is not None else _config.get(
+            'CACHE_TIMEOUT', 24 * 60 * 60
+        )
+
+    def parse(self, text: str) -> ParsedQuery:
+        normalized = normalize_query(text)
+        parsed = intent_cache.get(normalized)
+        if parsed is None:
+            parsed = self.parser.parse(text)
+            intent_cache.set(parsed)
+        return parsed
+
+    def answer(self, calculation, text: str, user=None, session_id: str = '') -> Dict[str, Any]:
+        from lca_core.services import LCACalculationService
+        from .audit import record_query
+
+        started = time.perf_counter()
+        parsed = self.parse(text)
+        response_data: Dict[str, Any] = {'parsed': parsed.to_dict(), 'cached': False}
+
+        if parsed.query_type != 'what_if':
+            response_text = (
+                "I can answer what-if questions such as \"What if I use 50% recycled aluminium?\" "
+                "or \"What if we switch to renewable electricity and reduce transport by 20%?\""
+            )
+        else:
+            # Results depend only on the calculation's inputs and the overlay
+            key = f"nlq:whatif:{calculation.pk}:{_digest([calculation.inputs_version(), parsed.overlay])}"
+            result = cache.get(key)
+            if result is None:
+                result = LCACalculationService().what_if_analysis(calculation, parsed.overlay)
+                result = json.loads(json.dumps(result, default=str))
+                cache.set(key, result, self.cache_timeout)
+            else:
+                response_data['cached'] = True
+            response_data['comparison'] = result['comparison']
+            response_data['improvements'] = result['improvements']
+            response_text = self.describe(parsed, result)
+
+        processing_time = time.perf_counter() - started
+        response_data['processing_time'] = processing_time
+        try:
+            record_query(
+                user=user,
+                query_text=text,
+                query_type=parsed.query_type,
+                processed_query=parsed.overlay,
+                intent_classification=parsed.intent,
+                entities_extracted=parsed.entities,
+                response_text=response_text,
+                response_data={key: response_data[key] for key in ('cached', 'improvements') if key in response_data},
+                confidence_score=parsed.confidence,
+                processing_time=processing_time,
+                project_context=str(calculation.project_id),
+                session_id=session_id,
+            )
+        except Exception as e:
+            logger.warning(f"Could not log NL query: {str(e)}")
+
+        return {'response': response_text, **response_data}
+
+    def describe(self, parsed: ParsedQuery, result: Dict[str, Any]) -> str:
+        impacts = result['comparison']['environmental_impacts']
+        climate = impacts.get('climate_change')
+        parts = []
+        if climate is not None:
+            parts.append(
+                f"Climate change would go from {climate['baseline']:.3g} to {climate['scenario']:.3g} kg CO2-eq "
+                f"({climate['relative_change']:+.1f}%)."
+            )
+        if result['improvements']:
+            parts.append('Improvements: ' + '; '.join(result['improvements']) + '.')
+        elif climate is not None:
+            parts.append('No impact category improves by more than 5%.')
+        if parsed.unparsed:
+            parts.append('Not understood: ' + ', '.join(f'"{clause}"' for clause in parsed.unparsed) + '.')
+        return ' '.join(parts)
@@ -0,0 +1,32 @@
+from rest_framework import serializers
+from .models import AIModel, Prediction
+
+
+class AIModelSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AIModel
+        fields = [
+            'id', 'name', 'description', 'model_type', 'version', 'status', 'algorithm', 'hyperparameters',
+            'input_features', 'output_targets', 'accuracy_score', 'precision_score', 'recall_score', 'f1_score',
+            'rmse', 'mae', 'r2_score', 'training_data_size', 'training_duration', 'last_trained',
+            'model_path', 'scaler_path', 'feature_importance', 'prediction_count', 'avg_prediction_time',
+            'created_by', 'created_at', 'updated_at',
+        ]
+        # Usage statistics are maintained by the inference server
+        read_only_fields = [
+            'id', 'prediction_count', 'avg_prediction_time', 'created_by', 'created_at', 'updated_at',
+        ]
+
+
+class PredictionSerializer(serializers.ModelSerializer):
+    model_name = serializers.CharField(source='model.name', read_only=True)
+
+    class Meta:
+        model = Prediction
+        fields = [
+            'id', 'model', 'model_name', 'prediction_type', 'input_data', 'predictions', 'confidence_scores',
+            'uncertainty_estimates', 'prediction_time', 'actual_values', 'validation_metrics', 'user',
+            'project_context', 'calculation_context', 'created_at',
+        ]
+        # Predictions are written by the services that make them
+        read_only_fields = fields
@@ -0,0 +1,498 @@
+import numpy as np
+from django.conf import settings
+from django.db.models import F
+from typing import Dict, List, Any, Optional, Tuple
+from collections import OrderedDict
+from pathlib import Path
+import logging
+import os
+import threading
+import time
+from .audit import record_prediction
+from .models import AIModel
+
+logger = logging.getLogger(__name__)
+
+STEP_CATEGORIES = ['extraction', 'processing', 'manufacturing', 'transport', 'end_of_life', 'recycling']
+
+# Targets a parameter-prediction model may list in AIModel.output_targets
+ENERGY_TARGET_PREFIX = 'energy_'  # e.g. energy_electricity_grid (kWh)
+EMISSION_TARGET_PREFIX = 'emission_'  # e.g. emission_CO2 (kg)
+
+
+def resolve_model_path(path: str) -> Path:
+    candidate = Path(path)
+    if not candidate.is_absolute():
+        candidate = Path(settings.ML_MODEL_PATH) / candidate
+    return candidate
+
+
+class ModelCache:
+    """Per-process LRU cache of loaded estimators and scalers.
+
+    Artifacts are loaded with ``joblib.load(mmap_mode='r')`` so their NumPy
+    arrays stay memory-mapped from disk: every gunicorn worker (forked or not)
+    shares the same page-cache pages instead of holding private copies.
+    Entries are keyed by path and mtime, so retrained files are picked up.
+    """
+
+    def __init__(self, max_entries: int = 8):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: str) -> Any:
+        resolved = resolve_model_path(path)
+        key = (str(resolved), os.path.getmtime(resolved))
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        import joblib
+        loaded = joblib.load(resolved, mmap_mode='r')
+
+        with self._lock:
+            # Drop stale versions of the same file before inserting
+            for stale in [k for k in self._entries if k[0] == key[0] and k != key]:
+                del self._entries[stale]
+            self._entries[key] = loaded
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                logger.info(f"Evicted model {evicted[0]} from cache")
+        return loaded
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+model_cache = ModelCache(max_entries=getattr(settings, 'AI_MODEL_CACHE_SIZE', 8))
+
+
+def record_usage(model_id, count: int, total_ms: float) -> None:
+    """Fold ``count`` predictions taking ``total_ms`` into the model's usage statistics.
+
+    A single UPDATE with F() expressions, so concurrent workers never lose counts.
+    """
+    if count <= 0:
+        return
+    AIModel.objects.filter(pk=model_id).update(
+        avg_prediction_time=(
+            F('avg_prediction_time') * F('prediction_count') + total_ms
+        ) / (F('prediction_count') + count),
+        prediction_count=F('prediction_count') + count,
+    )
+
+
+def step_features(step) -> Dict[str, float]:
+    """Numeric features describing a process step"""
+    input_mass = sum(m.get('quantity', 0) for m in step.input_materials)
+    recycled_mass = sum(
+        m.get('quantity', 0) * m.get('recycled_content', 0) / 100 for m in step.input_materials
+    )
+    features = {
+        'input_mass': input_mass,
+        'output_mass': sum(m.get('quantity', 0) for m in step.output_materials),
+        'waste_mass': sum(w.get('quantity', 0) for w in step.waste_outputs),
+        'recycled_share': recycled_mass / input_mass if input_mass > 0 else 0.0,
+        'material_count': len(step.input_materials),
+    }
+    for category in STEP_CATEGORIES:
+        features[f"category_{category}"] = 1.0 if step.category == category else 0.0
+    return features
+
+
+class ParameterPredictionService:
+    """Fills missing process step parameters (energy inputs, emissions) using trained models"""
+
+    def __init__(self, cache: Optional[ModelCache] = None):
+        self.cache = cache or model_cache
+
+    def deployed_models(self) -> List[AIModel]:
+        return list(AIModel.objects.filter(model_type='prediction', status='deployed').exclude(model_path=''))
+
+    def warm(self) -> int:
+        """Load all deployed models, e.g. in the gunicorn master before workers fork"""
+        count = 0
+        for ai_model in self.deployed_models():
+            try:
+                self._load(ai_model)
+                count += 1
+            except Exception as e:
+                logger.warning(f"Could not preload {ai_model}: {str(e)}")
+        return count
+
+    def missing_fields(self, step) -> List[str]:
+        missing = []
+        if not step.energy_inputs:
+            missing.append('energy_inputs')
+        if not step.emissions:
+            missing.append('emissions')
+        return missing
+
+    def fill_missing_parameters(self, steps: List[Any], calculation=None) -> Dict[str, Any]:
+        """Predict every missing field of the given steps with one batched call per model.
+
+        Steps are updated in memory only; filled field names are listed in
+        ``step.estimated_fields`` so results can show which inputs were inferred.
+        """
+        pending = [(step, self.missing_fields(step)) for step in steps]
+        pending = [(step, fields) for step, fields in pending if fields]
+        if not pending:
+            return {'filled': 0}
+
+        models = self.deployed_models()
+        if not models:
+            return {'filled': 0, 'reason': 'no deployed prediction models'}
+
+        filled = 0
+        for ai_model in models:
+            covers = self._fields_covered(ai_model)
+            batch = [(step, fields) for step, fields in pending if set(fields) & covers]
+            if not batch:
+                continue
+            try:
+                predictions, uncertainty, elapsed_ms = self._predict(ai_model, [step for step, _ in batch])
+            except Exception as e:
+                logger.warning(f"Parameter prediction with {ai_model} failed: {str(e)}")
+                continue
+
+            for row, (step, fields) in enumerate(batch):
+                filled += self._apply(step, fields, ai_model.output_targets, predictions[row])
+            # Remaining gaps can still be covered by another model
+            pending = [(step, self.missing_fields(step)) for step, _ in pending]
+            pending = [(step, fields) for step, fields in pending if fields]
+
+            self._record(ai_model, batch, predictions, uncertainty, elapsed_ms, calculation)
+            if not pending:
+                break
+        return {'filled': filled}
+
+    def _fields_covered(self, ai_model: AIModel) -> set:
+        covers = set()
+        for target in ai_model.output_targets:
+            if target.startswith(ENERGY_TARGET_PREFIX):
+                covers.add('energy_inputs')
+            elif target.startswith(EMISSION_TARGET_PREFIX):
+                covers.add('emissions')
+        return covers
+
+    def _load(self, ai_model: AIModel) -> Tuple[Any, Any]:
+        estimator = self.cache.get(ai_model.model_path)
+        scaler = self.cache.get(ai_model.scaler_path) if ai_model.scaler_path else None
+        return estimator, scaler
+
+    def _predict(self, ai_model: AIModel, steps: List[Any]) -> Tuple[np.ndarray, Optional[np.ndarray], float]:
+        """Predict through the process-wide inference server, sharing batches with other callers"""
+        from .inference import get_inference_server
+
+        targets = ai_model.output_targets
+        results = get_inference_server().predict_many(ai_model, [step_features(step) for step in steps])
+        predictions = np.array([[result['predictions'][target] for target in targets] for result in results])
+        uncertainty = None
+        if all(result['uncertainty'] for result in results):
+            uncertainty = np.array([[result['uncertainty'][target] for target in targets] for result in results])
+        return predictions, uncertainty, sum(result['prediction_time'] for result in results)
+
+    def predict_rows(self, ai_model: AIModel,
+                     rows: List[Dict[str, float]]) -> Tuple[np.ndarray, Optional[np.ndarray], float]:
+        """Predict a batch of feature dicts in one estimator call.
+
+        This is the micro-batcher's entry point; other callers go through
+        ``get_inference_server()`` so concurrent requests share batches.
+        Returns predictions and (for ensembles or models with
+        ``predict_with_std``) per-target standard deviations, both shaped
+        ``(len(rows), len(output_targets))``, plus the elapsed time.
+        """
+        estimator, scaler = self._load(ai_model)
+        feature_names = ai_model.input_features
+        X = np.array([[row.get(name, 0.0) for name in feature_names] for row in rows], dtype=np.float64)
+        if scaler is not None:
+            X = scaler.transform(X)
+
+        started = time.perf_counter()
+        uncertainty = None
+        if hasattr(estimator, 'predict_with_std'):
+            predictions, uncertainty = estimator.predict_with_std(X)
+            predictions = np.asarray(predictions, dtype=np.float64).reshape(len(rows), -1)
+        else:
+            predictions = np.asarray(estimator.predict(X), dtype=np.float64).reshape(len(rows), -1)
+        if uncertainty is None and hasattr(estimator, 'estimators_') and isinstance(estimator.estimators_, list):
+            # Spread across ensemble members (e.g. random forest trees)
+            per_member = np.stack([
+                np.asarray(member.predict(X), dtype=np.float64).reshape(len(rows), -1)
+                for member in estimator.estimators_
+            ])
+            uncertainty = per_member.std(axis=0)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        return predictions, uncertainty, elapsed_ms
+
+    def _apply(self, step, fields: List[str], targets: List[str], values: np.ndarray) -> int:
+        filled = 0
+        predicted = dict(zip(targets, (float(max(value, 0.0)) for value in values)))
+        if 'energy_inputs' in fields:
+            energy = [
+                {'type': target[len(ENERGY_TARGET_PREFIX):], 'amount': value, 'estimated': True}
+                for target, value in predicted.items() if target.startswith(ENERGY_TARGET_PREFIX)
+            ]
+            if energy:
+                step.energy_inputs = energy
+                step.estimated_fields = getattr(step, 'estimated_fields', []) + ['energy_inputs']
+                filled += 1
+        if 'emissions' in fields:
+            emissions = {
+                target[len(EMISSION_TARGET_PREFIX):]: value
+                for target, value in predicted.items() if target.startswith(EMISSION_TARGET_PREFIX)
+            }
+            if emissions:
+                step.emissions = emissions
+                step.estimated_fields = getattr(step, 'estimated_fields', []) + ['emissions']
+                filled += 1
+        return filled
+
+    def _record(self, ai_model: AIModel, batch, predictions: np.ndarray,
+                uncertainty: Optional[np.ndarray], elapsed_ms: float, calculation) -> None:
+        """One buffered Prediction row per batch; the inference server records usage"""
+        targets = ai_model.output_targets
+        record_prediction(
+            model=ai_model,
+            prediction_type='parameter_estimation',
+            input_data=[
+                {'step': str(step.id), 'missing': fields, 'features': step_features(step)}
+                for step, fields in batch
+            ],
+            predictions=[dict(zip(targets, row.tolist())) for row in predictions],
+            uncertainty_estimates=(
+                {'std': [dict(zip(targets, row.tolist())) for row in uncertainty]}
+                if uncertainty is not None else {}
+            ),
+            prediction_time=elapsed_ms,
+            calculation_context=str(calculation.pk) if calculation is not None else '',
+        )
+
+
+STRATEGY_OVERLAYS = {
+    'design': {'scale': [{'target': 'material', 'factor': 0.9}]},
+    'manufacturing': {'scale': [{'target': 'energy', 'factor': 0.85}]},
+    'distribution': {'scale': [{'target': 'transport', 'factor': 0.8}]},
+    'end_of_life': {'recovery_rate': [{'value': 90}]},
+}
+
+STRATEGY_IMPROVEMENT_TYPES = {
+    'design': 'design_change',
+    'materials': 'supply_chain',
+    'manufacturing': 'process_optimization',
+    'distribution': 'supply_chain',
+    'use_phase': 'design_change',
+    'end_of_life': 'end_of_life',
+    'business_model': 'business_model',
+}
+
+
+def material_key(name: str) -> str:
+    """Material name as matched between process steps and the material catalog"""
+    return name.strip().lower().replace('aluminium', 'aluminum')
+
+
+def material_key_expression(field: str):
+    """``material_key`` of a model field, computed in the database"""
+    from django.db.models import Value
+    from django.db.models.functions import Lower, Replace, Trim
+
+    return Replace(Lower(Trim(field)), Value('aluminium'), Value('aluminum'))
+
+
+class RecommendationEngine:
+    """Ranks circularity interventions by their simulated effect on a calculation.
+
+    Candidates come from MaterialSubstitution, RecycledMaterial and
+    CircularityStrategy records applicable to the calculation's materials and
+    processes. All of them are simulated together with one ScenarioEvaluator
+    pass and ranked by benefit per unit of effort and cost, where benefit is
+    the mean of the average relative impact reduction (%) and the gain in
+    overall circularity score (points).
+    """
+
+    def __init__(self, max_recommendations: int = 10):
+        self.max_recommendations = max_recommendations
+
+    def generate_recommendations(self, calculation) -> List[Dict[str, Any]]:
+        from lca_core.scenarios import ScenarioEvaluator
+
+        evaluator = ScenarioEvaluator(calculation)
+        if not evaluator.steps:
+            raise ValueError("No process steps defined for calculation")
+        candidates = self.candidates(evaluator.steps)
+        if not candidates:
+            return []
+
+        results = evaluator.evaluate([candidate['overlay'] for candidate in candidates])
+        values = results['values']
+        baseline = values[0]
+        scenarios = values[1:]
+        # Relative reduction per impact, averaged over impacts the baseline actually has
+        nonzero = np.abs(baseline) > 1e-12
+        reductions = np.zeros_like(scenarios)
+        reductions[:, nonzero] = (baseline[nonzero] - scenarios[:, nonzero]) / np.abs(baseline[nonzero]) * 100
+        impact_reduction = reductions[:, nonzero].mean(axis=1) if nonzero.any() else np.zeros(len(candidates))
+        base_score = results['circularity'][0].get('overall_score', 0.0)
+        circularity_gain = np.array([
+            metrics.get('overall_score', 0.0) - base_score for metrics in results['circularity'][1:]
+        ])
+        benefit = (impact_reduction + circularity_gain) / 2
+        effort = np.array([candidate['effort'] for candidate in candidates])
+        cost = np.array([candidate['cost_factor'] for candidate in candidates])
+        ranking = benefit / (effort * cost)
+
+        climate_index = results['impacts'].index('climate_change')
+        recommendations = []
+        for index in np.argsort(-ranking):
+            if benefit[index] <= 0:
+                continue
+            candidate = candidates[index]
+            recommendations.append({
+                'type': candidate['improvement_type'],
+                'priority': self._priority(benefit[index]),
+                'title': candidate['title'],
+                'description': candidate['description'],
+                'potential_impact_score': round(float(benefit[index]), 2),
+                'impact_reduction': round(float(impact_reduction[index]), 2),
+                'circularity_gain': round(float(circularity_gain[index]), 2),
+                'potential_savings': f"{reductions[index, climate_index]:.1f}% CO2 reduction",
+                'implementation_effort': candidate['effort'],
+                'cost_factor': candidate['cost_factor'],
+                'ranking_score': round(float(ranking[index]), 4),
+                'implementation': candidate.get('implementation', ''),
+                'implementation_steps': candidate.get('implementation_steps', []),
+                'barriers': candidate.get('barriers', []),
+                'scenario': candidate['overlay'],
+            })
+            if len(recommendations) >= self.max_recommendations:
+                break
+
+        self.persist(calculation, recommendations)
+        return recommendations
+
+    def candidates(self, steps: List[Any]) -> List[Dict[str, Any]]:
+        from circularity.models import CircularityStrategy
+        from materials.models import MaterialSubstitution, RecycledMaterial
+
+        # Step and catalog names are both reduced with material_key before matching
+        used = {}
+        for step in steps:
+            for material in step.input_materials:
+                name = material_key(material.get('material', ''))
+                if name:
+                    used[name] = max(used.get(name, 0), material.get('recycled_content', 0))
+        step_names = {step.name.lower() for step in steps} | {step.category for step in steps}
+
+        candidates = []
+        substitutions = MaterialSubstitution.objects.annotate(
+            original_name=material_key_expression('original_material__name')
+        ).filter(original_name__in=list(used)).select_related('original_material', 'substitute_material')
+        for substitution in substitutions:
+            original = substitution.original_material.name
+            substitute = substitution.substitute_material.name
+            candidates.append({
+                'title': f"Replace {original} with {substitute}",
+                'description': substitution.implementation_requirements or (
+                    f"Substitute {original} with {substitute} "
+                    f"(performance ratio {substitution.performance_ratio:.2f})."
+                ),
+                'improvement_type': 'material_substitution',
+                'overlay': {'substitution': [{'from': original, 'to': substitute}]},
+                'effort': min(max(10 - substitution.technical_feasibility, 1.0), 10.0),
+                'cost_factor': 1 + (10 - substitution.economic_feasibility) / 10,
+                'barriers': [substitution.barriers] if substitution.barriers else [],
+            })
+
+        variants = RecycledMaterial.objects.annotate(
+            base_name=material_key_expression('base_material__name')
+        ).filter(base_name__in=list(used)).select_related('base_material')
+        for variant in variants:
+            base = variant.base_material.name
+            if variant.recycled_content <= used[variant.base_name]:
+                continue
+            candidates.append({
+                'title': f"Source {variant.name}",
+                'description': (
+                    f"Increase recycled content of {base} to {variant.recycled_content:.0f}% "
+                    f"(quality factor {variant.quality_factor:.2f})."
+                ),
+                'improvement_type': 'supply_chain',
+                'overlay': {'recycled_content': [{'material': base, 'value': variant.recycled_content}]},
+                # Scarce supply makes sourcing harder
+                'effort': min(max(11 - 2 * variant.availability_score, 1.0), 10.0),
+                'cost_factor': max(variant.cost_factor, 0.1),
+                'implementation': 'Qualify recycled supply, adjust material specifications',
+            })
+
+        for strategy in CircularityStrategy.objects.all():
+            if strategy.applicable_materials and not {
+                material_key(name) for name in strategy.applicable_materials
+            } & set(used):
+                continue
+            if strategy.applicable_processes and not {
+                name.lower() for name in strategy.applicable_processes
+            } & step_names:
+                continue
+            overlay = self._strategy_overlay(strategy, used)
+            if not overlay:
+                continue
+            candidates.append({
+                'title': strategy.name,
+                'description': strategy.description,
+                'improvement_type': STRATEGY_IMPROVEMENT_TYPES.get(strategy.category, 'process_optimization'),
+                'overlay': overlay,
+                'effort': 5.0,
+                'cost_factor': 1.0,
+                'implementation': strategy.implementation_guide,
+                'implementation_steps': strategy.key_actions,
+            })
+        return candidates
+
+    def _strategy_overlay(self, strategy, used: Dict[str, float]) -> Dict[str, Any]:
+        """Explicit overlay from environmental_benefits, else a default for the category"""
+        for benefit in strategy.environmental_benefits:
+            if isinstance(benefit, dict) and isinstance(benefit.get('overlay'), dict):
+                return benefit['overlay']
+        if strategy.category == 'materials':
+            materials = strategy.applicable_materials or list(used)
+            return {'recycled_content': [
+                {'material': material, 'value': max(used.get(material_key(material), 0), 50)} for material in materials
+            ]}
+        return STRATEGY_OVERLAYS.get(strategy.category, {})
+
+    @staticmethod
+    def _priority(benefit: float) -> str:
+        if benefit >= 30:
+            return 'critical'
+        if benefit >= 15:
+            return 'high'
+        if benefit >= 5:
+            return 'medium'
+        return 'low'
+
+    def persist(self, calculation, recommendations: List[Dict[str, Any]]) -> None:
+        """Replace the analysis' unvalidated improvements with the new ranking"""
+        from circularity.models import CircularityAnalysis, CircularityImprovement
+
+        analysis, _ = CircularityAnalysis.objects.get_or_create(calculation_id=calculation.pk)
+        analysis.improvements.filter(is_validated=False).delete()
+        CircularityImprovement.objects.bulk_create([
+            CircularityImprovement(
+                analysis=analysis,
+                title=recommendation['title'][:200],
+                description=recommendation['description'],
+                improvement_type=recommendation['type'],
+                priority=recommendation['priority'],
+                potential_impact_score=recommendation['potential_impact_score'],
+                implementation_effort=recommendation['implementation_effort'],
+                cost_estimate=recommendation['cost_factor'],
+                implementation_steps=recommendation['implementation_steps'],
+                implementation_barriers=recommendation['barriers'],
+            )
+            for recommendation in recommendations
+        ])
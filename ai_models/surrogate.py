@@ -0,0 +1,325 @@
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Sum
+from django.utils import timezone
+from .audit import record_prediction
+from .models import AIModel
+from .services import ModelCache, model_cache, resolve_model_path
+
+logger = logging.getLogger(__name__)
+
+SURROGATE_NAME = 'impact_surrogate'
+SURROGATE_ALGORITHM = 'bayesian_linear_regression'
+INTERCEPT = 'intercept'
+
+
+def flow_features(steps: Iterable[Any]) -> Dict[str, float]:
+    """Flow amounts of a set of process steps, keyed by flow.
+
+    Step impacts are linear in these amounts, which is what lets a linear
+    model stand in for the exact engine. Steps may be model instances or
+    plain dicts (unsaved edits from the frontend).
+    """
+    features: Dict[str, float] = {INTERCEPT: 1.0}
+
+    def add(name: str, amount: Any) -> None:
+        try:
+            amount = float(amount or 0)
+        except (TypeError, ValueError):
+            return
+        features[name] = features.get(name, 0.0) + amount
+
+    for step in steps:
+        get = step.get if isinstance(step, dict) else lambda field, default=None: getattr(step, field, default)
+        for material in get('input_materials') or []:
+            name = str(material.get('material', '')).lower()
+            quantity = material.get('quantity', 0) or 0
+            add(f"material:{name}", quantity)
+            add(f"recycled:{name}", quantity * (material.get('recycled_content', 0) or 0) / 100)
+        for energy in get('energy_inputs') or []:
+            add(f"energy:{energy.get('type', 'electricity_grid')}", energy.get('amount', 0))
+        for emission, amount in (get('emissions') or {}).items():
+            add(f"emission:{emission}", amount)
+    return features
+
+
+class ImpactSurrogate:
+    """Bayesian linear regression from flow amounts to total impacts.
+
+    Training keeps only sufficient statistics (``X'X``, ``X'y``, ``y'y``), so
+    new calculations are folded in without revisiting old ones, and new flows
+    simply add zero-padded columns. The posterior mean and covariance are
+    solved once per update; a prediction is then two small matrix products,
+    returning per-target means and predictive standard deviations.
+    """
+
+    def __init__(self, targets: List[str], alpha: float = 1e-3):
+        self.targets = list(targets)
+        self.alpha = alpha
+        self.features: List[str] = []
+        self.positions: Dict[str, int] = {}
+        self.n_samples = 0
+        self.xtx = np.zeros((0, 0))
+        self.xty = np.zeros((0, len(self.targets)))
+        self.yty = np.zeros(len(self.targets))
+        self.coef_ = np.zeros((0, len(self.targets)))
+        self.covariance_ = np.zeros((0, 0))
+        self.noise_variance_ = np.zeros(len(self.targets))
+        self.scale_ = np.zeros(len(self.targets))
+
+    def _expand(self, names: Iterable[str]) -> None:
+        new = list(dict.fromkeys(name for name in names if name not in self.positions))
+        if not new:
+            return
+        size = len(self.features) + len(new)
+        xtx = np.zeros((size, size))
+        xtx[:len(self.features), :len(self.features)] = self.xtx
+        xty = np.zeros((size, len(self.targets)))
+        xty[:len(self.features)] = self.xty
+        for name in new:
+            self.positions[name] = len(self.features)
+            self.features.append(name)
+        self.xtx, self.xty = xtx, xty
+
+    def matrix(self, rows: List[Dict[str, float]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Design matrix for feature dicts plus a mask of rows using unseen flows"""
+        X = np.zeros((len(rows), len(self.features)))
+        unseen = np.zeros(len(rows), dtype=bool)
+        for row_number, row in enumerate(rows):
+            for name, value in row.items():
+                column = self.positions.get(name)
+                if column is None:
+                    unseen[row_number] |= value != 0
+                else:
+                    X[row_number, column] = value
+        return X, unseen
+
+    def partial_fit(self, rows: List[Dict[str, float]], y: np.ndarray) -> 'ImpactSurrogate':
+        self._expand(name for row in rows for name in row)
+        X, _ = self.matrix(rows)
+        y = np.asarray(y, dtype=np.float64).reshape(len(rows), len(self.targets))
+        self.xtx = self.xtx + X.T @ X
+        self.xty = self.xty + X.T @ y
+        self.yty = self.yty + (y ** 2).sum(axis=0)
+        self.n_samples += len(rows)
+        self._solve()
+        return self
+
+    def _solve(self) -> None:
+        # Scale-aware ridge prior: alpha relative to each column's energy
+        penalty = self.alpha * np.maximum(np.diag(self.xtx), 1.0)
+        precision = self.xtx + np.diag(penalty)
+        self.covariance_ = np.linalg.pinv(precision)
+        self.coef_ = self.covariance_ @ self.xty
+        residual = self.yty - 2 * np.einsum('ft,ft->t', self.coef_, self.xty) + np.einsum(
+            'ft,fg,gt->t', self.coef_, self.xtx, self.coef_
+        )
+        dof = max(self.n_samples - len(self.features), 1)
+        self.noise_variance_ = np.maximum(residual, 0.0) / dof
+        # Typical magnitude of each target, so near-zero impacts are judged
+        # against their usual size rather than against zero
+        self.scale_ = 0.1 * np.sqrt(self.yty / max(self.n_samples, 1))
+
+    def predict_with_std(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        mean = X @ self.coef_
+        leverage = np.einsum('nf,fg,ng->n', X, self.covariance_, X)
+        std = np.sqrt(np.outer(1 + leverage, self.noise_variance_))
+        return mean, std
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return X @ self.coef_
+
+    def rmse(self) -> float:
+        return float(np.sqrt(self.noise_variance_.mean())) if len(self.noise_variance_) else 0.0
+
+
+class SurrogateService:
+    """Approximate impacts from the deployed surrogate, with exact-engine fallback"""
+
+    def __init__(self, cache: Optional[ModelCache] = None):
+        self.cache = cache or model_cache
+        self.config = getattr(settings, 'IMPACT_SURROGATE', {})
+
+    def deployed_model(self) -> Optional[AIModel]:
+        return AIModel.objects.filter(
+            model_type='regression', algorithm=SURROGATE_ALGORITHM, status='deployed'
+        ).exclude(model_path='').order_by('-last_trained').first()
+
+    def estimate(self, steps: Iterable[Any], ai_model: Optional[AIModel] = None) -> Optional[Dict[str, Any]]:
+        """Surrogate impacts and standard deviations, or None when no model is deployed"""
+        ai_model = ai_model or self.deployed_model()
+        if ai_model is None:
+            return None
+        from .inference import get_inference_server
+
+        # The loaded surrogate supplies training metadata; the prediction itself
+        # goes through the inference server to share batches with other callers
+        surrogate = self.cache.get(ai_model.model_path)
+        features = flow_features(steps)
+        unseen = any(value != 0 and name not in surrogate.positions for name, value in features.items())
+        result = get_inference_server().predict_many(ai_model, [features])[0]
+
+        impacts = {target: result['predictions'][target] for target in surrogate.targets}
+        uncertainty = {target: result['uncertainty'][target] for target in surrogate.targets}
+        mean = np.array(list(impacts.values()))
+        std = np.array(list(uncertainty.values()))
+        relative = std / np.maximum(np.maximum(np.abs(mean), surrogate.scale_), 1e-12)
+        confident = (
+            not unseen
+            and surrogate.n_samples >= self.config.get('MIN_TRAINING_SIZE', 20)
+            and float(relative.max(initial=0.0)) <= self.config.get('MAX_RELATIVE_UNCERTAINTY', 0.1)
+        )
+        return {
+            'model': str(ai_model.pk),
+            'environmental_impacts': impacts,
+            'uncertainty': uncertainty,
+            'confident': bool(confident),
+            'unseen_flows': unseen,
+            'prediction_time': result['prediction_time'],
+        }
+
+    def estimate_or_calculate(self, calculation, steps: Optional[List[Any]] = None, user=None) -> Dict[str, Any]:
+        """Surrogate estimate when confident, else the exact engine on the same steps"""
+        from lca_core.services import LCACalculationService, ScenarioCalculation
+
+        steps = steps if steps is not None else list(calculation.process_steps.all().order_by('order'))
+        estimate = None
+        try:
+            estimate = self.estimate(steps)
+        except Exception as e:
+            logger.warning(f"Surrogate estimate failed, using exact engine: {str(e)}")
+
+        if estimate is not None:
+            ai_model_id = estimate['model']
+            record_prediction(
+                model_id=ai_model_id,
+                prediction_type='impact_prediction',
+                input_data={'calculation': calculation.pk},
+                predictions=estimate['environmental_impacts'],
+                uncertainty_estimates={'std': estimate['uncertainty']},
+                prediction_time=estimate['prediction_time'],
+                calculation_context=str(calculation.pk),
+                user=user,
+            )
+            if estimate['confident']:
+                return dict(estimate, source='surrogate')
+
+        started = time.perf_counter()
+        results = LCACalculationService().calculate_lca(ScenarioCalculation(calculation, steps))
+        return {
+            'source': 'exact',
+            'environmental_impacts': results['environmental_impacts'],
+            'circularity_metrics': results['circularity_metrics'],
+            'surrogate': estimate,
+            'calculation_time': time.perf_counter() - started,
+        }
+
+
+class SurrogateTrainer:
+    """Folds calculations with stored results into the surrogate's sufficient statistics.
+
+    The watermark (newest ``LCACalculation.updated_at`` already folded in) is
+    kept in the AIModel's hyperparameters, so each run only reads calculations
+    that changed since the last one. A recalculated calculation is folded in
+    again, weighting recent results more heavily.
+    """
+
+    def __init__(self, batch_size: int = 500):
+        self.batch_size = batch_size
+        self.config = getattr(settings, 'IMPACT_SURROGATE', {})
+
+    def model_record(self, targets: List[str]) -> AIModel:
+        ai_model, _ = AIModel.objects.get_or_create(
+            name=SURROGATE_NAME, version='1.0',
+            defaults={
+                'description': 'Approximate total impacts from flow amounts for interactive editing',
+                'model_type': 'regression',
+                'algorithm': SURROGATE_ALGORITHM,
+                'hyperparameters': {'alpha': self.config.get('ALPHA', 1e-3)},
+                'output_targets': targets,
+                'model_path': f"surrogates/{SURROGATE_NAME}.joblib",
+            },
+        )
+        return ai_model
+
+    def update(self) -> Dict[str, Any]:
+        from lca_core.models import CalculationResult, LCACalculation
+        from lca_core.services import LCACalculationService
+
+        targets = list(LCACalculationService().impact_methods)
+        ai_model = self.model_record(targets)
+        path = resolve_model_path(ai_model.model_path)
+        surrogate = self._load(path) or ImpactSurrogate(targets, alpha=ai_model.hyperparameters.get('alpha', 1e-3))
+
+        watermark = ai_model.hyperparameters.get('watermark')
+        calculations = LCACalculation.objects.filter(results__isnull=False).distinct()
+        if watermark:
+            calculations = calculations.filter(updated_at__gt=watermark)
+        calculations = calculations.order_by('updated_at')
+
+        started = time.perf_counter()
+        folded, newest = 0, None
+        ids = list(calculations.values_list('pk', 'updated_at'))
+        for offset in range(0, len(ids), self.batch_size):
+            chunk = ids[offset:offset + self.batch_size]
+            batch = LCACalculation.objects.filter(
+                pk__in=[pk for pk, _ in chunk]
+            ).prefetch_related('process_steps')
+            totals: Dict[int, np.ndarray] = {}
+            for calculation_id, impact, value in CalculationResult.objects.filter(
+                calculation_id__in=[pk for pk, _ in chunk], impact__in=targets
+            ).values('calculation_id', 'impact').annotate(total=Sum('value')).values_list(
+                'calculation_id', 'impact', 'total'
+            ):
+                row = totals.setdefault(calculation_id, np.zeros(len(targets)))
+                row[targets.index(impact)] += value
+
+            rows, y = [], []
+            for calculation in batch:
+                if calculation.pk in totals:
+                    rows.append(flow_features(calculation.process_steps.all()))
+                    y.append(totals[calculation.pk])
+            if rows:
+                surrogate.partial_fit(rows, np.vstack(y))
+                folded += len(rows)
+            newest = chunk[-1][1]
+
+        if not folded:
+            return {'folded': 0, 'training_size': surrogate.n_samples}
+
+        self._save(surrogate, path)
+        hyperparameters = dict(ai_model.hyperparameters, watermark=newest.isoformat(), alpha=surrogate.alpha)
+        ready = surrogate.n_samples >= self.config.get('MIN_TRAINING_SIZE', 20)
+        AIModel.objects.filter(pk=ai_model.pk).update(
+            hyperparameters=hyperparameters,
+            input_features=surrogate.features,
+            output_targets=surrogate.targets,
+            rmse=surrogate.rmse(),
+            training_data_size=surrogate.n_samples,
+            training_duration=(time.perf_counter() - started) / 3600,
+            last_trained=timezone.now(),
+            status='deployed' if ready else 'trained',
+        )
+        logger.info(f"Surrogate updated with {folded} calculations ({surrogate.n_samples} total)")
+        return {'folded': folded, 'training_size': surrogate.n_samples}
+
+    def _load(self, path: Path) -> Optional[ImpactSurrogate]:
+        if not path.exists():
+            return None
+        import joblib
+        # Loaded without mmap: the statistics are updated in place
+        return joblib.load(path)
+
+    def _save(self, surrogate: ImpactSurrogate, path: Path) -> None:
+        import joblib
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_suffix('.tmp')
+        joblib.dump(surrogate, temporary)
+        # Atomic swap; ModelCache picks the new file up by its mtime
+        os.replace(temporary, path)
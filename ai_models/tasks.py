@@ -0,0 +1,40 @@
+import logging
+
+from celery import shared_task
+from .audit import prune_audit_logs
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def prune_ai_audit_logs() -> None:
+    """Apply the AI_AUDIT retention window to Prediction and NLQueryLog"""
+    deleted = prune_audit_logs()
+    logger.info(f"AI audit retention: {deleted}")
+
+
+@shared_task(ignore_result=True)
+def compute_model_drift() -> None:
+    """Write ModelPerformanceLog rows for every complete day not yet logged of every deployed model"""
+    from .monitoring import DriftMonitor
+
+    logs = DriftMonitor().run()
+    logger.info(f"Wrote {len(logs)} model performance logs")
+
+
+@shared_task(ignore_result=True)
+def update_impact_surrogate() -> None:
+    """Fold newly stored calculations into the surrogate impact model"""
+    from .surrogate import SurrogateTrainer
+
+    summary = SurrogateTrainer().update()
+    logger.info(f"Impact surrogate update: {summary}")
+
+
+@shared_task(ignore_result=True)
+def refresh_feature_store() -> None:
+    """Append rows changed since the last run of every feature source to the Parquet store"""
+    from .features import FeatureStore
+
+    written = FeatureStore().refresh_all()
+    logger.info(f"Feature store refresh: {written}")
@@ -0,0 +1,51 @@
+from unittest import mock
+
+from django.db import OperationalError
+from django.test import TestCase
+
+from ai_models.audit import AuditWriter
+from ai_models.models import NLQueryLog
+
+
+def query_log(text):
+    return NLQueryLog(query_text=text, query_type='general', processed_query={},
+                      response_text='ok', processing_time=0.1)
+
+
+@mock.patch.object(AuditWriter, '_ensure_thread')
+class AuditWriterTests(TestCase):
+    def test_flush_writes_buffered_rows(self, ensure_thread):
+        writer = AuditWriter()
+        for index in range(3):
+            writer.record(query_log(f'query {index}'))
+
+        self.assertEqual(writer.flush(), 3)
+        self.assertEqual(writer.pending(), 0)
+        self.assertEqual(NLQueryLog.objects.count(), 3)
+
+    def test_poison_row_is_dropped_and_the_rest_written(self, ensure_thread):
+        writer = AuditWriter()
+        writer.record(query_log('first'))
+        writer.record(query_log(None))
+        writer.record(query_log('last'))
+
+        with self.assertLogs('ai_models.audit', level='ERROR'):
+            self.assertEqual(writer.flush(), 2)
+        self.assertEqual(writer.pending(), 0)
+        self.assertEqual(set(NLQueryLog.objects.values_list('query_text', flat=True)), {'first', 'last'})
+
+        writer.record(query_log('next'))
+        self.assertEqual(writer.flush(), 1)
+
+    def test_rows_are_kept_while_the_database_is_unavailable(self, ensure_thread):
+        writer = AuditWriter()
+        writer.record(query_log('first'))
+        writer.record(query_log('second'))
+
+        with mock.patch.object(NLQueryLog.objects, 'bulk_create', side_effect=OperationalError('gone away')):
+            with self.assertLogs('ai_models.audit', level='ERROR'):
+                self.assertEqual(writer.flush(), 0)
+        self.assertEqual(writer.pending(), 2)
+
+        self.assertEqual(writer.flush(), 2)
+        self.assertEqual(NLQueryLog.objects.count(), 2)
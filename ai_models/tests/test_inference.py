@@ -0,0 +1,181 @@
+import tempfile
+import time
+from concurrent.futures import TimeoutError
+from unittest import mock
+
+import joblib
+import numpy as np
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from sklearn.ensemble import RandomForestRegressor
+
+from ai_models.inference import InferenceServer, MicroBatcher
+from ai_models.models import AIModel, Prediction
+
+
+class FakeService:
+    """Doubles each feature 'x'; records the size of every batch it is given"""
+
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.batches = []
+
+    def predict_rows(self, ai_model, rows):
+        self.batches.append(len(rows))
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError('estimator exploded')
+        predictions = np.array([[row['x'] * 2] for row in rows], dtype=np.float64)
+        return predictions, None, 1.0 * len(rows)
+
+
+def fake_model(**fields):
+    return AIModel(**dict({'name': 'Doubler', 'model_type': 'prediction', 'output_targets': ['y']}, **fields))
+
+
+@mock.patch('ai_models.inference.record_usage')
+class MicroBatcherTests(SimpleTestCase):
+    def batcher(self, service, **options):
+        batcher = MicroBatcher(fake_model(), service=service, stats_flush_interval=60, **options)
+        self.addCleanup(batcher.stop)
+        return batcher
+
+    def test_concurrent_rows_share_one_batch(self, record_usage):
+        service = FakeService()
+        batcher = self.batcher(service, max_wait_ms=200)
+        futures = [batcher.submit({'x': value}) for value in range(5)]
+        results = [future.result(timeout=5) for future in futures]
+        self.assertEqual(service.batches, [5])
+        self.assertEqual([result['predictions'] for result in results], [{'y': 2.0 * value} for value in range(5)])
+        self.assertEqual({result['batch_size'] for result in results}, {5})
+
+    def test_batches_are_capped_in_size(self, record_usage):
+        service = FakeService()
+        batcher = self.batcher(service, max_batch_size=2, max_wait_ms=200)
+        futures = [batcher.submit({'x': value}) for value in range(5)]
+        for future in futures:
+            future.result(timeout=5)
+        self.assertEqual(service.batches, [2, 2, 1])
+
+    def test_failed_batch_fails_its_callers_only(self, record_usage):
+        service = FakeService(fail=True)
+        batcher = self.batcher(service, max_wait_ms=1)
+        with self.assertLogs('ai_models.inference', level='ERROR'):
+            with self.assertRaisesRegex(RuntimeError, 'estimator exploded'):
+                batcher.submit({'x': 1}).result(timeout=5)
+        service.fail = False
+        self.assertEqual(batcher.submit({'x': 3}).result(timeout=5)['predictions'], {'y': 6.0})
+
+    def test_usage_is_written_in_aggregate(self, record_usage):
+        batcher = self.batcher(FakeService(), max_wait_ms=100)
+        futures = [batcher.submit({'x': value}) for value in range(3)]
+        for future in futures:
+            future.result(timeout=5)
+        record_usage.assert_not_called()
+        batcher.stop()
+        record_usage.assert_called_once_with(batcher.ai_model.pk, 3, 3.0)
+        with self.assertRaises(RuntimeError):
+            batcher.submit({'x': 1})
+
+
+@mock.patch('ai_models.inference.record_usage')
+class InferenceServerTests(SimpleTestCase):
+    def server(self, **config):
+        server = InferenceServer(dict({'MAX_WAIT_MS': 1, 'STATS_FLUSH_INTERVAL': 60}, **config))
+        self.addCleanup(server.shutdown)
+        return server
+
+    def test_timeout_is_raised_to_the_caller(self, record_usage):
+        server = self.server(TIMEOUT=0.05)
+        ai_model = fake_model()
+        service = FakeService(delay=0.5)
+        with mock.patch('ai_models.inference.ParameterPredictionService', return_value=service):
+            with self.assertRaises(TimeoutError):
+                server.predict_many(ai_model, [{'x': 1}])
+
+    def test_retrained_model_gets_a_new_batcher(self, record_usage):
+        server = self.server()
+        ai_model = fake_model(last_trained=timezone.now())
+        first = server.batcher(ai_model)
+        self.assertIs(server.batcher(ai_model), first)
+        ai_model.last_trained = timezone.now()
+        second = server.batcher(ai_model)
+        self.assertIsNot(second, first)
+        with self.assertRaises(RuntimeError):
+            first.submit({'x': 1})
+
+    def test_unsupported_model_type(self, record_usage):
+        with self.assertRaises(ValueError):
+            self.server().batcher(fake_model(model_type='nlp'))
+
+
+@mock.patch('ai_models.audit.record_prediction')
+class PredictEndpointTests(APITestCase):
+    def setUp(self):
+        model_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(model_dir.cleanup)
+        override = override_settings(ML_MODEL_PATH=model_dir.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.server = InferenceServer({'MAX_WAIT_MS': 50, 'STATS_FLUSH_INTERVAL': 60})
+        self.addCleanup(self.server.shutdown)
+        patcher = mock.patch('ai_models.inference.get_inference_server', return_value=self.server)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        X = np.arange(40, dtype=np.float64).reshape(-1, 1)
+        estimator = RandomForestRegressor(n_estimators=5, random_state=0).fit(X, X[:, 0] * 3)
+        joblib.dump(estimator, f"{model_dir.name}/triple.joblib")
+        self.ai_model = AIModel.objects.create(
+            name='Tripler', description='Three times x', model_type='regression', status='deployed',
+            algorithm='random_forest', model_path='triple.joblib', input_features=['x'], output_targets=['y'],
+        )
+        self.user = User.objects.create_user('analyst', password='secret')
+        self.client.force_authenticate(self.user)
+        self.url = f"/api/ai/models/{self.ai_model.pk}/predict/"
+
+    def test_instances_are_predicted_in_one_batch(self, record_prediction):
+        response = self.client.post(self.url, {'instances': [{'x': 10}, {'x': 20}]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results']
+        self.assertEqual([result['batch_size'] for result in results], [2, 2])
+        self.assertAlmostEqual(results[1]['predictions']['y'], 60, delta=6)
+        self.assertIn('y', results[0]['uncertainty'])
+        record_prediction.assert_called_once()
+
+    def test_single_row_and_validation(self, record_prediction):
+        response = self.client.post(self.url, {'features': {'x': 12}}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertAlmostEqual(response.data['results'][0]['predictions']['y'], 36, delta=6)
+        response = self.client.post(self.url, {'instances': 'x=12'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_model_not_deployed(self, record_prediction):
+        self.ai_model.status = 'trained'
+        self.ai_model.save()
+        response = self.client.post(self.url, {'features': {'x': 12}}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_timeout_returns_503(self, record_prediction):
+        with mock.patch.object(self.server, 'predict_many', side_effect=TimeoutError()):
+            response = self.client.post(self.url, {'features': {'x': 12}}, format='json')
+        self.assertEqual(response.status_code, 503)
+        record_prediction.assert_not_called()
+
+    def test_registry_is_read_only_for_users(self, record_prediction):
+        self.assertEqual(self.client.get('/api/ai/models/').status_code, 200)
+        response = self.client.patch(f"/api/ai/models/{self.ai_model.pk}/", {'status': 'deprecated'}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_predictions_are_scoped_to_their_user(self, record_prediction):
+        other = User.objects.create_user('other', password='secret')
+        for user in (self.user, other):
+            Prediction.objects.create(model=self.ai_model, prediction_type='impact_prediction',
+                                      input_data={'x': 1}, predictions={'y': 3}, prediction_time=1.0, user=user)
+        response = self.client.get('/api/ai/predictions/')
+        self.assertEqual(response.status_code, 200)
+        rows = response.data['results'] if isinstance(response.data, dict) else response.data
+        self.assertEqual([row['user'] for row in rows], [self.user.pk])
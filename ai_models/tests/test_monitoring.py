@@ -0,0 +1,151 @@
+import math
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+
+from ai_models.models import AIModel, ModelPerformanceLog, Prediction
+from ai_models.monitoring import (
+    DriftMonitor, StreamingHistogram, ks_statistic, population_stability_index, reference_bins,
+)
+
+DAY = timedelta(days=1)
+
+
+class DriftMonitorTests(TestCase):
+    def setUp(self):
+        self.ai_model = AIModel.objects.create(
+            name='Step parameters', description='Energy per step', model_type='prediction',
+            status='deployed', algorithm='random_forest', input_features=['input_mass'],
+            output_targets=['energy'], rmse=1.0,
+            last_trained=datetime(2026, 1, 7, 6, tzinfo=timezone.utc),
+        )
+        # Two predictions on 8 January, one of them off by 2
+        for actual in (10.0, 12.0):
+            prediction = Prediction.objects.create(
+                model=self.ai_model, prediction_type='parameter_estimation',
+                input_data={'input_mass': 5}, predictions={'energy': 10.0},
+                actual_values={'energy': actual}, prediction_time=1.0,
+            )
+            Prediction.objects.filter(pk=prediction.pk).update(
+                created_at=datetime(2026, 1, 8, 12, tzinfo=timezone.utc)
+            )
+
+    def periods(self):
+        return list(ModelPerformanceLog.objects.order_by('period_start').values_list(
+            'period_start', 'prediction_count'
+        ))
+
+    def test_backfills_every_day_since_the_model_was_trained(self):
+        logs = DriftMonitor().run(end=datetime(2026, 1, 10, 12, tzinfo=timezone.utc))
+        self.assertEqual(len(logs), 3)
+        self.assertEqual(self.periods(), [
+            (datetime(2026, 1, 7, tzinfo=timezone.utc), 0),
+            (datetime(2026, 1, 8, tzinfo=timezone.utc), 2),
+            (datetime(2026, 1, 9, tzinfo=timezone.utc), 0),
+        ])
+        busy = ModelPerformanceLog.objects.get(prediction_count=2)
+        self.assertAlmostEqual(busy.mae, 1.0)
+
+    def test_batch_predictions_count_every_row(self):
+        prediction = Prediction.objects.create(
+            model=self.ai_model, prediction_type='parameter_estimation',
+            input_data=[{'features': {'input_mass': 4}}, {'features': {'input_mass': 6}}, {'input_mass': 8}],
+            predictions=[{'energy': 8.0}, {'energy': 12.0}, {'energy': 16.0}], prediction_time=3.0,
+        )
+        Prediction.objects.filter(pk=prediction.pk).update(
+            created_at=datetime(2026, 1, 8, 18, tzinfo=timezone.utc)
+        )
+
+        log = DriftMonitor(chunk_size=2).evaluate(
+            self.ai_model, datetime(2026, 1, 8, tzinfo=timezone.utc), datetime(2026, 1, 9, tzinfo=timezone.utc)
+        )
+        self.assertEqual(log.prediction_count, 5)
+
+    def test_resumes_from_the_latest_log(self):
+        monitor = DriftMonitor()
+        monitor.run(end=datetime(2026, 1, 10, 12, tzinfo=timezone.utc))
+        self.assertEqual(monitor.run(end=datetime(2026, 1, 10, 18, tzinfo=timezone.utc)), [])
+
+        logs = monitor.run(end=datetime(2026, 1, 12, 12, tzinfo=timezone.utc))
+        self.assertEqual([log.period_start for log in logs], [
+            datetime(2026, 1, 10, tzinfo=timezone.utc), datetime(2026, 1, 11, tzinfo=timezone.utc),
+        ])
+
+    def test_backfill_is_capped_to_the_most_recent_periods(self):
+        logs = DriftMonitor().run(end=datetime(2026, 1, 20, 12, tzinfo=timezone.utc), max_periods=2)
+        self.assertEqual([log.period_start for log in logs], [
+            datetime(2026, 1, 18, tzinfo=timezone.utc), datetime(2026, 1, 19, tzinfo=timezone.utc),
+        ])
+
+    def test_failed_period_is_retried_first(self):
+        monitor = DriftMonitor()
+        evaluate = monitor.evaluate
+        calls = []
+
+        def failing_on_the_8th(ai_model, start, end):
+            calls.append(start)
+            if start == datetime(2026, 1, 8, tzinfo=timezone.utc) and len(calls) < 3:
+                raise RuntimeError('replica unavailable')
+            return evaluate(ai_model, start, end)
+
+        monitor.evaluate = failing_on_the_8th
+        with self.assertLogs('ai_models.monitoring', level='ERROR'):
+            self.assertEqual(len(monitor.run(end=datetime(2026, 1, 10, 12, tzinfo=timezone.utc))), 1)
+        self.assertEqual(len(monitor.run(end=datetime(2026, 1, 10, 12, tzinfo=timezone.utc))), 2)
+        self.assertEqual(ModelPerformanceLog.objects.count(), 3)
+
+
+class DriftMetricTests(SimpleTestCase):
+    def setUp(self):
+        self.edges, self.expected = reference_bins({'mean': 0.0, 'std': 1.0})
+        self.rng = np.random.default_rng(7)
+
+    def observed(self, shift, size=20000):
+        histogram = StreamingHistogram(self.edges)
+        histogram.update(self.rng.normal(shift, 1.0, size))
+        return histogram.probabilities()
+
+    def test_normal_reference_bins(self):
+        np.testing.assert_allclose(self.edges, np.linspace(-3, 3, 11))
+        self.assertAlmostEqual(self.expected.sum(), 1.0)
+        np.testing.assert_allclose(self.expected, self.expected[::-1])
+        # The tails beyond 3 sigma fold into the outer bins
+        self.assertAlmostEqual(self.expected[0], 0.5 * (1 + math.erf(-2.4 / math.sqrt(2))))
+
+    def test_stored_histogram_reference_bins(self):
+        edges, expected = reference_bins({'bin_edges': [0, 1, 2, 4], 'bin_counts': [1, 3, 4], 'mean': 9, 'std': 1})
+        np.testing.assert_allclose(edges, [0, 1, 2, 4])
+        np.testing.assert_allclose(expected, [0.125, 0.375, 0.5])
+        # Mismatched histograms fall back to the normal approximation
+        edges, _ = reference_bins({'bin_edges': [0, 1], 'bin_counts': [1, 3], 'mean': 9, 'std': 1})
+        self.assertAlmostEqual(edges[0], 6.0)
+        self.assertIsNone(reference_bins({'mean': 1.0, 'std': 0}))
+
+    def test_psi_grows_with_the_mean_shift(self):
+        # PSI of N(d, 1) against N(0, 1) approaches d ** 2
+        self.assertLess(population_stability_index(self.expected, self.observed(0.0)), 0.01)
+        self.assertAlmostEqual(population_stability_index(self.expected, self.observed(0.5)), 0.25, delta=0.04)
+        self.assertAlmostEqual(population_stability_index(self.expected, self.observed(1.0)), 1.0, delta=0.1)
+        self.assertEqual(population_stability_index(self.expected, self.expected), 0.0)
+
+    def test_ks_matches_the_shifted_cdf(self):
+        self.assertLess(ks_statistic(self.expected, self.observed(0.0)), 0.02)
+        # sup |Phi(x) - Phi(x - d)| = 2 * Phi(d / 2) - 1, read off at the nearest bin edge
+        self.assertAlmostEqual(ks_statistic(self.expected, self.observed(1.0)), 0.383, delta=0.015)
+        self.assertAlmostEqual(ks_statistic(self.expected, self.observed(0.5)), 0.19, delta=0.015)
+
+    def test_histogram_clips_out_of_range_values_and_counts_missing(self):
+        histogram = StreamingHistogram(np.array([0.0, 1.0, 2.0]))
+        histogram.update(np.array([-5.0, 0.5, 1.5, 2.0, 9.0]))
+        histogram.update(np.array([np.nan, np.inf, 1.0]))
+        np.testing.assert_array_equal(histogram.counts, [2, 4])
+        self.assertEqual(histogram.missing, 2)
+        self.assertEqual(histogram.total, 6)
+        np.testing.assert_allclose(histogram.probabilities(), [1 / 3, 2 / 3])
+
+    def test_empty_histogram_has_zero_probabilities(self):
+        histogram = StreamingHistogram(np.array([0.0, 1.0, 2.0]))
+        histogram.update(np.array([np.nan]))
+        np.testing.assert_array_equal(histogram.probabilities(), [0.0, 0.0])
+        self.assertEqual(histogram.missing, 1)
@@ -0,0 +1,76 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from ai_models.nlp import WhatIfParser, normalize_query
+from lca_core.models import LCACalculation, LCAProject, ProcessStep
+
+
+class WhatIfParserTests(APITestCase):
+    def test_normalizes_synonyms_and_filler(self):
+        self.assertEqual(normalize_query('What if we use 50 percent recycled aluminium?'),
+                         'use 50% recycled aluminum')
+
+    def test_parses_combined_clauses(self):
+        parsed = WhatIfParser().parse('What if we switch to renewable electricity and reduce transport by 20%?')
+        self.assertEqual(parsed.query_type, 'what_if')
+        self.assertEqual(parsed.overlay['energy_switch'][0]['to'], 'electricity_renewable')
+        self.assertEqual(parsed.overlay['scale'][0], {'target': 'transport', 'factor': 0.8})
+        self.assertEqual(parsed.unparsed, [])
+
+
+@mock.patch('ai_models.audit.record_query')
+class AskEndpointTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('analyst', password='secret')
+        project = LCAProject.objects.create(name='Frames', owner=self.user)
+        self.calculation = LCACalculation.objects.create(project=project, name='Baseline')
+        ProcessStep.objects.create(
+            calculation=self.calculation, name='Extrusion', order=1, category='manufacturing',
+            input_materials=[{'material': 'Steel', 'quantity': 2}],
+            energy_inputs=[{'type': 'electricity_grid', 'amount': 10}],
+        )
+        self.client.force_authenticate(self.user)
+        self.url = f"/api/calculations/{self.calculation.pk}/ask/"
+
+    def test_what_if_question_is_simulated_and_cached(self, record_query):
+        response = self.client.post(self.url, {'query': 'What if we switch to renewable electricity?'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data['cached'])
+        climate = response.data['comparison']['environmental_impacts']['climate_change']
+        self.assertAlmostEqual(climate['baseline'], 2 * 2.1 + 10 * 0.5)
+        self.assertAlmostEqual(climate['scenario'], 2 * 2.1 + 10 * 0.05)
+        self.assertIn('Climate change would go from', response.data['response'])
+        record_query.assert_called_once()
+        self.assertEqual(record_query.call_args.kwargs['query_type'], 'what_if')
+
+        again = self.client.post(self.url, {'query': 'what if I switch to renewable power'})
+        self.assertTrue(again.data['cached'])
+
+    def test_step_edits_invalidate_cached_answers(self, record_query):
+        query = {'query': 'What if we switch to renewable electricity?'}
+        self.assertFalse(self.client.post(self.url, query).data['cached'])
+
+        step = self.calculation.process_steps.get()
+        step.input_materials = [{'material': 'Steel', 'quantity': 4}]
+        step.save()
+
+        response = self.client.post(self.url, query)
+        self.assertFalse(response.data['cached'])
+        climate = response.data['comparison']['environmental_impacts']['climate_change']
+        self.assertAlmostEqual(climate['baseline'], 4 * 2.1 + 10 * 0.5)
+
+    def test_other_questions_get_guidance(self, record_query):
+        response = self.client.post(self.url, {'query': 'Why is the footprint so high?'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['parsed']['query_type'], 'explanation')
+        self.assertNotIn('comparison', response.data)
+
+    def test_query_is_required(self, record_query):
+        response = self.client.post(self.url, {'query': '  '})
+        self.assertEqual(response.status_code, 400)
+        record_query.assert_not_called()
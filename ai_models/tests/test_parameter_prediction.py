@@ -0,0 +1,78 @@
+import tempfile
+from unittest import mock
+
+import joblib
+import numpy as np
+from django.test import TestCase, override_settings
+from sklearn.ensemble import RandomForestRegressor
+
+from ai_models.inference import InferenceServer
+from ai_models.models import AIModel
+from ai_models.services import ModelCache, ParameterPredictionService, step_features
+from lca_core.models import ProcessStep
+
+TARGETS = ['energy_electricity_grid', 'emission_CO2']
+
+
+class ParameterPredictionTests(TestCase):
+    def setUp(self):
+        self.model_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.model_dir.cleanup)
+        override = override_settings(ML_MODEL_PATH=self.model_dir.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        step = ProcessStep(name='Molding', category='manufacturing',
+                           input_materials=[{'material': 'PET', 'quantity': 10}])
+        features = list(step_features(step))
+        # Energy is 0.5 kWh and CO2 0.2 kg per kg of input
+        rng = np.random.default_rng(0)
+        X = np.zeros((50, len(features)))
+        X[:, features.index('input_mass')] = rng.uniform(1, 100, 50)
+        y = np.column_stack([X[:, features.index('input_mass')] * 0.5, X[:, features.index('input_mass')] * 0.2])
+        estimator = RandomForestRegressor(n_estimators=5, random_state=0).fit(X, y)
+        joblib.dump(estimator, f"{self.model_dir.name}/energy.joblib")
+
+        # A private inference server, so batcher threads never outlive the test
+        self.server = InferenceServer({'MAX_WAIT_MS': 1, 'STATS_FLUSH_INTERVAL': 60})
+        self.addCleanup(self.server.shutdown)
+        patcher = mock.patch('ai_models.inference.get_inference_server', return_value=self.server)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.ai_model = AIModel.objects.create(
+            name='Step parameters', description='Energy and CO2 per step', model_type='prediction',
+            status='deployed', algorithm='random_forest', model_path='energy.joblib',
+            input_features=features, output_targets=TARGETS,
+        )
+
+    @mock.patch('ai_models.services.record_prediction')
+    def test_fills_missing_energy_and_emissions(self, record_prediction):
+        step = ProcessStep(name='Molding', category='manufacturing',
+                           input_materials=[{'material': 'PET', 'quantity': 40}])
+        complete = ProcessStep(name='Trim', category='manufacturing',
+                               energy_inputs=[{'type': 'electricity_grid', 'amount': 1}],
+                               emissions={'CO2': 0.1})
+
+        result = ParameterPredictionService(cache=ModelCache()).fill_missing_parameters([step, complete])
+
+        self.assertEqual(result['filled'], 2)
+        self.assertEqual(step.estimated_fields, ['energy_inputs', 'emissions'])
+        self.assertEqual(step.energy_inputs[0]['type'], 'electricity_grid')
+        self.assertTrue(step.energy_inputs[0]['estimated'])
+        self.assertAlmostEqual(step.energy_inputs[0]['amount'], 20, delta=5)
+        self.assertAlmostEqual(step.emissions['CO2'], 8, delta=2)
+        self.assertEqual(complete.emissions, {'CO2': 0.1})
+        record_prediction.assert_called_once()
+        # Usage is accumulated by the batcher and written when it flushes
+        self.server.shutdown()
+        self.ai_model.refresh_from_db()
+        self.assertEqual(self.ai_model.prediction_count, 1)
+
+    def test_without_deployed_models_nothing_is_filled(self):
+        self.ai_model.status = 'deprecated'
+        self.ai_model.save()
+        step = ProcessStep(name='Molding', category='manufacturing')
+        result = ParameterPredictionService(cache=ModelCache()).fill_missing_parameters([step])
+        self.assertEqual(result, {'filled': 0, 'reason': 'no deployed prediction models'})
+        self.assertEqual(step.energy_inputs, [])
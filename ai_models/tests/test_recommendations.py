@@ -0,0 +1,76 @@
+from django.contrib.auth.models import User
+from rest_framework.test import APITestCase
+
+from ai_models.services import RecommendationEngine, material_key
+from circularity.models import CircularityAnalysis, CircularityStrategy
+from lca_core.models import LCACalculation, LCAProject, ProcessStep
+from materials.models import Material, MaterialSubstitution, RecycledMaterial
+
+
+class RecommendationEngineTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('analyst', password='secret')
+        project = LCAProject.objects.create(name='Frames', owner=self.user)
+        self.calculation = LCACalculation.objects.create(project=project, name='Baseline')
+        ProcessStep.objects.create(
+            calculation=self.calculation, name='Extrusion', order=1, category='manufacturing',
+            input_materials=[{'material': 'Aluminum', 'quantity': 10}],
+            energy_inputs=[{'type': 'electricity_grid', 'amount': 20}],
+        )
+        # The catalog spells it the British way
+        aluminium = Material.objects.create(name='Aluminium', material_type='metal', density=2700)
+        plastic = Material.objects.create(name='Recycled plastic', material_type='polymer', density=950)
+        MaterialSubstitution.objects.create(
+            original_material=aluminium, substitute_material=plastic,
+            technical_feasibility=8, economic_feasibility=8,
+        )
+        RecycledMaterial.objects.create(base_material=aluminium, name='Aluminium (75% recycled)',
+                                        recycled_content=75, availability_score=4)
+        CircularityStrategy.objects.create(
+            name='Efficient extrusion', description='Cut extrusion energy', category='manufacturing',
+            applicable_materials=['aluminium'],
+        )
+        CircularityStrategy.objects.create(
+            name='Recycle glass', description='Not applicable here', category='manufacturing',
+            applicable_materials=['glass'],
+        )
+
+    def test_material_key_unifies_spellings(self):
+        self.assertEqual(material_key(' Aluminium '), material_key('aluminum'))
+
+    def test_catalog_spelling_matches_step_materials(self):
+        steps = list(self.calculation.process_steps.all())
+        titles = {candidate['title'] for candidate in RecommendationEngine().candidates(steps)}
+        self.assertEqual(titles, {
+            'Replace Aluminium with Recycled plastic',
+            'Source Aluminium (75% recycled)',
+            'Efficient extrusion',
+        })
+
+    def test_recommendations_are_ranked_and_persisted(self):
+        recommendations = RecommendationEngine().generate_recommendations(self.calculation)
+
+        scores = [recommendation['ranking_score'] for recommendation in recommendations]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        # Swapping 10 kg of aluminum outweighs a 15% energy cut
+        self.assertEqual(recommendations[0]['title'], 'Replace Aluminium with Recycled plastic')
+        self.assertIn('Efficient extrusion', [recommendation['title'] for recommendation in recommendations])
+        self.assertTrue(all(recommendation['potential_impact_score'] > 0 for recommendation in recommendations))
+
+        analysis = CircularityAnalysis.objects.get(calculation=self.calculation)
+        self.assertEqual(analysis.improvements.count(), len(recommendations))
+
+    def test_endpoint_replaces_unvalidated_improvements(self):
+        self.client.force_authenticate(self.user)
+        url = f"/api/calculations/{self.calculation.pk}/recommendations/"
+        first = self.client.post(url)
+        self.assertEqual(first.status_code, 200)
+        second = self.client.post(url)
+        self.assertEqual(second.data['recommendations'], first.data['recommendations'])
+        analysis = CircularityAnalysis.objects.get(calculation=self.calculation)
+        self.assertEqual(analysis.improvements.count(), len(second.data['recommendations']))
+
+    def test_endpoint_requires_ownership(self):
+        self.client.force_authenticate(User.objects.create_user('other', password='secret'))
+        response = self.client.post(f"/api/calculations/{self.calculation.pk}/recommendations/")
+        self.assertEqual(response.status_code, 404)
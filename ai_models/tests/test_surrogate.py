@@ -0,0 +1,90 @@
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from ai_models.inference import InferenceServer
+from ai_models.models import AIModel
+from ai_models.surrogate import SURROGATE_NAME, SurrogateTrainer
+from lca_core.models import CalculationResult, LCACalculation, LCAProject, ProcessStep
+from lca_core.services import LCACalculationService
+
+
+@mock.patch('ai_models.surrogate.record_prediction')
+class SurrogateEstimateTests(APITestCase):
+    def setUp(self):
+        model_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(model_dir.cleanup)
+        override = override_settings(ML_MODEL_PATH=model_dir.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        # A private inference server, so batcher threads never outlive the test
+        self.server = InferenceServer({'MAX_WAIT_MS': 1, 'STATS_FLUSH_INTERVAL': 60})
+        self.addCleanup(self.server.shutdown)
+        patcher = mock.patch('ai_models.inference.get_inference_server', return_value=self.server)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = User.objects.create_user('analyst', password='secret')
+        self.project = LCAProject.objects.create(name='Housings', owner=self.user)
+        service = LCACalculationService()
+        for index in range(24):
+            calculation = self.make_calculation(f"Variant {index}", 5 + index, 3 + (index * 7) % 11)
+            service.calculate_and_store(calculation)
+        self.calculation = calculation
+        self.client.force_authenticate(self.user)
+
+    def make_calculation(self, name, steel, electricity):
+        calculation = LCACalculation.objects.create(project=self.project, name=name)
+        ProcessStep.objects.create(
+            calculation=calculation, name='Stamping', order=1, category='manufacturing',
+            input_materials=[{'material': 'Steel', 'quantity': steel}],
+            output_materials=[{'material': 'Housing', 'quantity': steel}],
+            energy_inputs=[{'type': 'electricity_grid', 'amount': electricity}],
+            emissions={'CO2': 0.5},
+        )
+        return calculation
+
+    def test_trained_surrogate_estimates_edited_steps(self, record_prediction):
+        self.assertTrue(CalculationResult.objects.filter(calculation=self.calculation).exists())
+        summary = SurrogateTrainer().update()
+        self.assertEqual(summary, {'folded': 24, 'training_size': 24})
+        ai_model = AIModel.objects.get(name=SURROGATE_NAME)
+        self.assertEqual(ai_model.status, 'deployed')
+
+        edited = [{
+            'name': 'Stamping', 'category': 'manufacturing',
+            'input_materials': [{'material': 'Steel', 'quantity': 12}],
+            'energy_inputs': [{'type': 'electricity_grid', 'amount': 6}],
+            'emissions': {'CO2': 0.5},
+        }]
+        response = self.client.post(f"/api/calculations/{self.calculation.pk}/estimate/",
+                                    {'process_steps': edited}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['source'], 'surrogate')
+        # Steel defaults to 2.1 kg CO2-eq/kg, grid electricity to 0.5 kg CO2-eq/kWh
+        self.assertAlmostEqual(response.data['environmental_impacts']['climate_change'],
+                               12 * 2.1 + 6 * 0.5 + 0.5, delta=0.5)
+        record_prediction.assert_called_once()
+
+    def test_unseen_flows_fall_back_to_the_exact_engine(self, record_prediction):
+        SurrogateTrainer().update()
+        edited = [{'name': 'Casting', 'input_materials': [{'material': 'Copper', 'quantity': 2}]}]
+        response = self.client.post(f"/api/calculations/{self.calculation.pk}/estimate/",
+                                    {'process_steps': edited}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['source'], 'exact')
+        self.assertTrue(response.data['surrogate']['unseen_flows'])
+        self.assertAlmostEqual(response.data['environmental_impacts']['climate_change'], 2 * 3.2)
+
+    def test_without_a_trained_model_the_exact_engine_runs(self, record_prediction):
+        response = self.client.post(f"/api/calculations/{self.calculation.pk}/estimate/", {}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['source'], 'exact')
+        self.assertIsNone(response.data['surrogate'])
+        record_prediction.assert_not_called()
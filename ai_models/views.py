@@ -1,21 +1,79 @@
-from rest_framework import viewsets
+from concurrent.futures import TimeoutError
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
 from .models import AIModel, Prediction
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 
 
 class AIModelViewSet(viewsets.ModelViewSet):
+    """Model registry; any user may list models and predict, only staff may change them"""
     queryset = AIModel.objects.all()
     permission_classes = [IsAuthenticated]
 
+    def get_permissions(self):
+        if self.action in ('create', 'update', 'partial_update', 'destroy'):
+            return [IsAuthenticated(), IsAdminUser()]
+        return super().get_permissions()
+
+    def perform_create(self, serializer):
+        serializer.save(created_by=self.request.user)
+
     def get_serializer_class(self):
         from .serializers import AIModelSerializer
         return AIModelSerializer
 
+    @action(detail=True, methods=['post'])
+    def predict(self, request, pk=None):
+        """Predict one row (``features``) or several (``instances``) through the batching server"""
+        from .audit import record_prediction
+        from .inference import BATCHED_MODEL_TYPES, get_inference_server
+
+        ai_model = self.get_object()
+        if ai_model.status != 'deployed' or ai_model.model_type not in BATCHED_MODEL_TYPES:
+            return Response({'error': 'Model is not deployed for prediction'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        instances = request.data.get('instances')
+        if instances is None and 'features' in request.data:
+            instances = [request.data['features']]
+        if not isinstance(instances, list) or not all(isinstance(row, dict) for row in instances):
+            return Response({'error': 'Provide "features" or a list of "instances"'},
+                            status=status.HTTP_400_BAD_REQUEST)
 
-class PredictionViewSet(viewsets.ModelViewSet):
+        try:
+            results = get_inference_server().predict_many(ai_model, instances)
+        except TimeoutError:
+            return Response({'error': 'Prediction timed out'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        record_prediction(
+            model=ai_model,
+            prediction_type='parameter_estimation' if ai_model.model_type == 'prediction' else 'impact_prediction',
+            input_data=instances,
+            predictions=[result['predictions'] for result in results],
+            uncertainty_estimates={'std': [result['uncertainty'] for result in results]},
+            prediction_time=sum(result['prediction_time'] for result in results),
+            user=request.user,
+        )
+        return Response({'model': str(ai_model.pk), 'results': results})
+
+
+class PredictionViewSet(viewsets.ReadOnlyModelViewSet):
+    """Audit trail of predictions; users see their own, staff see all"""
     queryset = Prediction.objects.all()
     permission_classes = [IsAuthenticated]
 
+    def get_queryset(self):
+        queryset = Prediction.objects.select_related('model')
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(user=self.request.user)
+        model_id = self.request.query_params.get('model')
+        if model_id:
+            # Served by the (model, -created_at) index
+            queryset = queryset.filter(model_id=model_id)
+        return queryset.order_by('-created_at')
+
     def get_serializer_class(self):
         from .serializers import PredictionSerializer
         return PredictionSerializer
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class CircularityConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'circularity'
+    verbose_name = 'Circularity Analysis'
+
+    def ready(self):
+        # Connects the signals that invalidate cached indicator sets and benchmark curves
+        from . import benchmarks  # noqa: F401
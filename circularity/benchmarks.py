@@ -0,0 +1,217 @@
+import logging
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Dict, List, Any, Mapping, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.utils import timezone
+from .formulas import CompiledFormula, FormulaError, compile_formula
+from .models import CircularityAnalysis, CircularityBenchmark
+
+logger = logging.getLogger(__name__)
+
+BENCHMARK_VERSION_KEY = 'circularity:benchmarks:version'
+VERSION_CHECK_INTERVAL = 5.0
+
+
+@dataclass(frozen=True)
+class BenchmarkCurve:
+    """Piecewise-linear value -> percentile curve of one benchmark row.
+
+    Knots are ``minimum_acceptable`` (0th), the stored 25/50/75/90th
+    percentiles and ``best_practice_value`` (100th), kept in increasing value
+    order for ``np.interp``. Indicators where lower is better (best practice
+    below the minimum) are indexed on negated values.
+    """
+    indicator: str
+    formula: Optional[CompiledFormula]
+    weight: float
+    sector: str
+    year: int
+    values: np.ndarray
+    percentiles: np.ndarray
+    lower_is_better: bool
+    industry_average: float
+    best_practice: float
+
+    @classmethod
+    def from_benchmark(cls, benchmark: CircularityBenchmark) -> 'BenchmarkCurve':
+        indicator = benchmark.indicator
+        lower_is_better = benchmark.best_practice_value < benchmark.minimum_acceptable
+        knots = [
+            (benchmark.minimum_acceptable, 0.0),
+            (benchmark.percentile_25, 25.0),
+            (benchmark.percentile_50, 50.0),
+            (benchmark.percentile_75, 75.0),
+            (benchmark.percentile_90, 90.0),
+            (benchmark.best_practice_value, 100.0),
+        ]
+        knots = [(-value if lower_is_better else value, percentile) for value, percentile in knots if value is not None]
+        values = np.array([value for value, _ in knots], dtype=np.float64)
+        percentiles = np.array([percentile for _, percentile in knots], dtype=np.float64)
+        # Inconsistent source data must not make np.interp's x decrease
+        values = np.maximum.accumulate(values)
+
+        formula = None
+        if indicator.formula:
+            try:
+                formula = compile_formula(indicator.formula)
+            except FormulaError as e:
+                logger.warning(f"Benchmark for {indicator.name} uses an invalid formula: {str(e)}")
+        return cls(
+            indicator=indicator.name, formula=formula, weight=indicator.weight, sector=benchmark.sector,
+            year=benchmark.year, values=values, percentiles=percentiles, lower_is_better=lower_is_better,
+            industry_average=benchmark.industry_average, best_practice=benchmark.best_practice_value,
+        )
+
+    def indicator_values(self, values: Mapping[str, Any], results: Optional[List[Dict[str, Any]]] = None) -> Optional[np.ndarray]:
+        """The indicator's value for each analysis: its formula, else a same-named variable"""
+        if self.formula is not None:
+            try:
+                return self.formula.evaluate(values)
+            except FormulaError:
+                pass
+        if self.indicator in values:
+            return np.asarray(values[self.indicator], dtype=np.float64)
+        if results is not None and all(self.indicator in result.get('indicators', {}) for result in results):
+            return np.array([result['indicators'][self.indicator]['value'] for result in results], dtype=np.float64)
+        return None
+
+    def percentile(self, indicator_values: np.ndarray) -> np.ndarray:
+        x = -indicator_values if self.lower_is_better else indicator_values
+        return np.interp(x, self.values, self.percentiles)
+
+
+class BenchmarkIndex:
+    """In-memory index of the newest benchmark curve per (sector, indicator)"""
+
+    def __init__(self, benchmarks: List[CircularityBenchmark]):
+        self.curves: Dict[str, List[BenchmarkCurve]] = {}
+        newest: Dict[Tuple[str, str], CircularityBenchmark] = {}
+        for benchmark in benchmarks:
+            key = (benchmark.sector, benchmark.indicator_id)
+            if key not in newest or benchmark.year > newest[key].year:
+                newest[key] = benchmark
+        for (sector, _), benchmark in newest.items():
+            self.curves.setdefault(sector, []).append(BenchmarkCurve.from_benchmark(benchmark))
+
+    @classmethod
+    def load(cls) -> 'BenchmarkIndex':
+        return cls(list(CircularityBenchmark.objects.select_related('indicator')))
+
+    def compare(self, values: Mapping[str, Any], sector: str,
+                results: Optional[List[Dict[str, Any]]] = None, size: int = 1) -> Dict[str, Any]:
+        """Percentile per benchmarked indicator and their weighted mean, element-wise over arrays"""
+        comparison = {}
+        weighted, weights = np.zeros(size), 0.0
+        for curve in self.curves.get(sector, []):
+            indicator_values = curve.indicator_values(values, results)
+            if indicator_values is None:
+                continue
+            indicator_values = np.broadcast_to(indicator_values, (size,))
+            percentile = curve.percentile(indicator_values)
+            comparison[curve.indicator] = (curve, indicator_values, percentile)
+            # Indicators left out of the overall score still count as benchmarks
+            weight = curve.weight if curve.weight > 0 else 1.0
+            weighted = weighted + percentile * weight
+            weights += weight
+        return {
+            'indicators': comparison,
+            'percentile': weighted / weights if weights else None,
+        }
+
+    @staticmethod
+    def row(comparison: Dict[str, Any], index: int, sector: str) -> Tuple[Optional[float], Dict[str, Any]]:
+        """industry_percentile and benchmark_comparison field values for one analysis"""
+        detail = {}
+        for name, (curve, indicator_values, percentile) in comparison['indicators'].items():
+            value = float(indicator_values[index])
+            detail[name] = {
+                'value': value,
+                'percentile': float(percentile[index]),
+                'industry_average': curve.industry_average,
+                'best_practice': curve.best_practice,
+                'gap_to_best_practice': (value - curve.best_practice) if curve.lower_is_better
+                else (curve.best_practice - value),
+                'year': curve.year,
+            }
+        overall = comparison['percentile']
+        return (
+            float(overall[index]) if overall is not None else None,
+            {'sector': sector, 'indicators': detail} if detail else {},
+        )
+
+
+_index: Optional[BenchmarkIndex] = None
+_index_version = None
+_version_checked = 0.0
+_index_lock = threading.Lock()
+
+
+def get_benchmark_index() -> BenchmarkIndex:
+    """Process-wide index, rebuilt when any worker changes a benchmark"""
+    global _index, _index_version, _version_checked
+    with _index_lock:
+        now = time.monotonic()
+        if _index is not None and now - _version_checked >= VERSION_CHECK_INTERVAL:
+            _version_checked = now
+            if cache.get(BENCHMARK_VERSION_KEY) != _index_version:
+                _index = None
+        if _index is None:
+            _index_version = cache.get(BENCHMARK_VERSION_KEY)
+            _version_checked = now
+            _index = BenchmarkIndex.load()
+        return _index
+
+
+def invalidate_benchmark_index(**kwargs) -> None:
+    global _index
+    cache.set(BENCHMARK_VERSION_KEY, uuid.uuid4().hex, None)
+    with _index_lock:
+        _index = None
+
+
+post_save.connect(invalidate_benchmark_index, sender='circularity.CircularityBenchmark')
+post_delete.connect(invalidate_benchmark_index, sender='circularity.CircularityBenchmark')
+# Indicator formulas and weights feed the curves too
+post_save.connect(invalidate_benchmark_index, sender='circularity.CircularityIndicator')
+post_delete.connect(invalidate_benchmark_index, sender='circularity.CircularityIndicator')
+
+
+def default_sector() -> str:
+    return getattr(settings, 'CIRCULARITY_BENCHMARK_SECTOR', 'general')
+
+
+def benchmark_portfolio(analyses=None, sector: Optional[str] = None, chunk_size: int = 20000) -> Dict[str, Any]:
+    """Benchmark many analyses in one call and store their percentiles.
+
+    Variables are read column-wise in primary-key chunks, every curve is
+    interpolated over the whole chunk, and rows are written with bulk_update.
+    """
+    from .services import analysis_chunks
+
+    sector = sector or default_sector()
+    index = get_benchmark_index()
+    percentiles = {}
+    now = timezone.now()
+    for pks, values, results in analysis_chunks(analyses, chunk_size):
+        comparison = index.compare(values, sector, results, size=len(pks))
+        objects = []
+        for position, pk in enumerate(pks):
+            percentile, detail = index.row(comparison, position, sector)
+            percentiles[str(pk)] = percentile
+            objects.append(CircularityAnalysis(
+                pk=pk, industry_percentile=percentile, benchmark_comparison=detail, updated_at=now,
+            ))
+        with transaction.atomic():
+            CircularityAnalysis.objects.bulk_update(
+                objects, ['industry_percentile', 'benchmark_comparison', 'updated_at'], batch_size=2000
+            )
+    logger.info(f"Benchmarked {len(percentiles)} analyses against {sector}")
+    return {'sector': sector, 'percentiles': percentiles}
@@ -0,0 +1,268 @@
+import ast
+import logging
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from functools import lru_cache, reduce
+from typing import Dict, List, Any, Mapping, Optional, Tuple
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
+
+logger = logging.getLogger(__name__)
+
+
+class FormulaError(ValueError):
+    """An indicator formula that cannot be parsed or is not allowed"""
+
+
+def _minimum(*args):
+    return reduce(np.minimum, args)
+
+
+def _maximum(*args):
+    return reduce(np.maximum, args)
+
+
+def _power(base, exponent):
+    # Float64 powers overflow to inf instead of building huge Python integers
+    return np.power(np.asarray(base, dtype=np.float64), np.asarray(exponent, dtype=np.float64))
+
+
+FUNCTIONS = {
+    'min': _minimum,
+    'max': _maximum,
+    'abs': np.abs,
+    'sqrt': np.sqrt,
+    'log': np.log,
+    'exp': np.exp,
+    'clip': np.clip,
+    'where': np.where,
+}
+
+BINARY_OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow, ast.Mod)
+UNARY_OPERATORS = (ast.UAdd, ast.USub, ast.Not)
+COMPARE_OPERATORS = (ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE)
+
+
+class _Vectorise(ast.NodeTransformer):
+    """Rewrites scalar-only constructs into their element-wise NumPy forms"""
+
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Pow):
+            return ast.Call(ast.Name('power', ast.Load()), [node.left, node.right], [])
+        return node
+
+    def visit_IfExp(self, node):
+        self.generic_visit(node)
+        return ast.Call(ast.Name('where', ast.Load()), [node.test, node.body, node.orelse], [])
+
+    def visit_BoolOp(self, node):
+        self.generic_visit(node)
+        function = 'logical_and' if isinstance(node.op, ast.And) else 'logical_or'
+        return reduce(
+            lambda left, right: ast.Call(ast.Name(function, ast.Load()), [left, right], []), node.values
+        )
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Not):
+            return ast.Call(ast.Name('logical_not', ast.Load()), [node.operand], [])
+        return node
+
+    def visit_Compare(self, node):
+        self.generic_visit(node)
+        # a < b < c becomes logical_and(a < b, b < c) so arrays compare element-wise
+        parts = [
+            ast.Compare(left, [op], [right])
+            for left, op, right in zip([node.left] + node.comparators[:-1], node.ops, node.comparators)
+        ]
+        return reduce(
+            lambda left, right: ast.Call(ast.Name('logical_and', ast.Load()), [left, right], []), parts
+        )
+
+
+@dataclass(frozen=True)
+class CompiledFormula:
+    source: str
+    variables: Tuple[str, ...]
+    code: Any
+
+    def evaluate(self, values: Mapping[str, Any]) -> np.ndarray:
+        """Evaluate over scalars or equally shaped arrays; undefined results become 0"""
+        missing = [name for name in self.variables if name not in values]
+        if missing:
+            raise FormulaError(f"Formula {self.source!r} needs {', '.join(missing)}")
+        namespace = dict(FUNCTIONS, logical_and=np.logical_and, logical_or=np.logical_or,
+                         logical_not=np.logical_not, power=_power)
+        namespace.update((name, np.asarray(values[name], dtype=np.float64)) for name in self.variables)
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            result = eval(self.code, {'__builtins__': {}}, namespace)
+        return np.nan_to_num(np.asarray(result, dtype=np.float64), nan=0.0, posinf=0.0, neginf=0.0)
+
+    def __reduce__(self):
+        # Code objects do not pickle; worker processes recompile from source
+        return compile_formula, (self.source,)
+
+
+@lru_cache(maxsize=512)
+def compile_formula(source: str) -> CompiledFormula:
+    """Parse, validate and compile an indicator formula once.
+
+    Only arithmetic, comparisons, conditional expressions, numeric constants,
+    variable names and the functions in ``FUNCTIONS`` are accepted: there is
+    no attribute access, subscripting or access to builtins. Functions may
+    only be called, and powers are evaluated in float64 so they cannot grow
+    unbounded integers.
+    """
+    try:
+        tree = ast.parse(source.strip(), mode='eval')
+    except SyntaxError as e:
+        raise FormulaError(f"Invalid formula {source!r}: {e.msg}") from e
+
+    call_targets = {id(node.func) for node in ast.walk(tree) if isinstance(node, ast.Call)}
+    variables = []
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Expression, ast.Load, ast.IfExp, ast.BoolOp, ast.And, ast.Or)):
+            continue
+        if isinstance(node, ast.BinOp) and isinstance(node.op, BINARY_OPERATORS):
+            continue
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, UNARY_OPERATORS):
+            continue
+        if isinstance(node, ast.Compare) and all(isinstance(op, COMPARE_OPERATORS) for op in node.ops):
+            continue
+        if isinstance(node, BINARY_OPERATORS + UNARY_OPERATORS + COMPARE_OPERATORS):
+            continue
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) \
+                and not isinstance(node.value, bool):
+            try:
+                float(node.value)
+            except OverflowError:
+                raise FormulaError(f"Constant too large in formula {source!r}")
+            continue
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in FUNCTIONS \
+                and not node.keywords:
+            continue
+        if isinstance(node, ast.Name):
+            if node.id in FUNCTIONS:
+                if id(node) not in call_targets:
+                    raise FormulaError(f"Function {node.id} must be called in formula {source!r}")
+            elif node.id not in variables:
+                variables.append(node.id)
+            continue
+        raise FormulaError(f"Unsupported element {type(node).__name__} in formula {source!r}")
+
+    tree = ast.fix_missing_locations(_Vectorise().visit(tree))
+    return CompiledFormula(source=source, variables=tuple(variables), code=compile(tree, '<formula>', 'eval'))
+
+
+@dataclass(frozen=True)
+class IndicatorFormula:
+    name: str
+    formula: CompiledFormula
+    weight: float
+    min_value: float
+    max_value: float
+
+    def score(self, values: Mapping[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+        """Raw indicator values and their 0-100 scores on the indicator's range"""
+        raw = self.formula.evaluate(values)
+        span = self.max_value - self.min_value
+        scaled = (raw - self.min_value) / span * 100 if span else np.zeros_like(raw)
+        return raw, np.clip(scaled, 0, 100)
+
+
+class IndicatorSet:
+    """Weighted overall circularity score from a set of compiled indicator formulas"""
+
+    def __init__(self, indicators: List[IndicatorFormula]):
+        self.indicators = [indicator for indicator in indicators if indicator.weight > 0]
+        self.total_weight = sum(indicator.weight for indicator in self.indicators)
+
+    @property
+    def variables(self) -> set:
+        return {name for indicator in self.indicators for name in indicator.formula.variables}
+
+    def evaluate(self, values: Mapping[str, Any]) -> Dict[str, Any]:
+        """Per-indicator values/scores and the weighted overall score, element-wise over arrays"""
+        indicators = {}
+        overall = 0.0
+        for indicator in self.indicators:
+            raw, score = indicator.score(values)
+            indicators[indicator.name] = {'value': raw, 'score': score}
+            overall = overall + score * indicator.weight
+        if self.total_weight:
+            overall = overall / self.total_weight
+        return {'indicators': indicators, 'overall': np.asarray(overall, dtype=np.float64)}
+
+
+def indicator_formula(indicator) -> IndicatorFormula:
+    """Compile a CircularityIndicator, checking its variables are ones analyses provide"""
+    from .services import ANALYSIS_VARIABLES
+
+    formula = compile_formula(indicator.formula)
+    unknown = [name for name in formula.variables if name not in ANALYSIS_VARIABLES]
+    if unknown:
+        raise FormulaError(f"Unknown variables {', '.join(unknown)} in formula {indicator.formula!r}")
+    return IndicatorFormula(indicator.name, formula, indicator.weight, indicator.min_value, indicator.max_value)
+
+
+def default_indicator_set() -> IndicatorSet:
+    from .services import CIRCULARITY_WEIGHTS
+
+    return IndicatorSet([
+        IndicatorFormula(metric, compile_formula(metric), weight, 0.0, 100.0)
+        for metric, weight in CIRCULARITY_WEIGHTS.items()
+    ])
+
+
+INDICATOR_VERSION_KEY = 'circularity:indicators:version'
+VERSION_CHECK_INTERVAL = 5.0  # Seconds between checks of the shared version
+
+_indicator_set: Optional[IndicatorSet] = None
+_indicator_version = None
+_version_checked = 0.0
+_indicator_lock = threading.Lock()
+
+
+def get_indicator_set() -> IndicatorSet:
+    """Indicators with a formula, compiled once per process until an indicator changes.
+
+    Changes bump a version in the shared cache, so every worker recompiles
+    within ``VERSION_CHECK_INTERVAL`` seconds. Without any formula
+    indicators the default ``CIRCULARITY_WEIGHTS`` set is used.
+    """
+    global _indicator_set, _indicator_version, _version_checked
+    with _indicator_lock:
+        now = time.monotonic()
+        if _indicator_set is not None and now - _version_checked >= VERSION_CHECK_INTERVAL:
+            _version_checked = now
+            if cache.get(INDICATOR_VERSION_KEY) != _indicator_version:
+                _indicator_set = None
+        if _indicator_set is None:
+            from .models import CircularityIndicator
+
+            _indicator_version = cache.get(INDICATOR_VERSION_KEY)
+            _version_checked = now
+            indicators = []
+            for indicator in CircularityIndicator.objects.exclude(formula=''):
+                try:
+                    indicators.append(indicator_formula(indicator))
+                except FormulaError as e:
+                    logger.error(f"Skipping indicator {indicator.name}: {str(e)}")
+            _indicator_set = IndicatorSet(indicators) if indicators else default_indicator_set()
+        return _indicator_set
+
+
+def invalidate_indicator_set(**kwargs) -> None:
+    global _indicator_set
+    cache.set(INDICATOR_VERSION_KEY, uuid.uuid4().hex, None)
+    with _indicator_lock:
+        _indicator_set = None
+
+
+post_save.connect(invalidate_indicator_set, sender='circularity.CircularityIndicator')
+post_delete.connect(invalidate_indicator_set, sender='circularity.CircularityIndicator')
@@ -0,0 +1,143 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:59
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('lca_core', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CircularityAnalysis',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('overall_circularity_score', models.FloatField(default=0.0)),
+                ('material_circularity_score', models.FloatField(default=0.0)),
+                ('component_circularity_score', models.FloatField(default=0.0)),
+                ('recycled_content_rate', models.FloatField(default=0.0, help_text='Percentage of recycled content')),
+                ('recyclability_rate', models.FloatField(default=0.0, help_text='Percentage of recyclable materials')),
+                ('reuse_potential', models.FloatField(default=0.0, help_text='Reuse potential score')),
+                ('lifetime_extension_factor', models.FloatField(default=1.0)),
+                ('material_efficiency', models.FloatField(default=0.0)),
+                ('virgin_material_input', models.FloatField(default=0.0)),
+                ('recycled_material_input', models.FloatField(default=0.0)),
+                ('material_losses', models.FloatField(default=0.0)),
+                ('waste_output', models.FloatField(default=0.0)),
+                ('recovered_materials', models.FloatField(default=0.0)),
+                ('indicator_results', models.JSONField(default=dict, help_text='Results for each circularity indicator')),
+                ('improvement_opportunities', models.JSONField(default=list)),
+                ('circularity_strategies', models.JSONField(default=list)),
+                ('benchmark_comparison', models.JSONField(blank=True, default=dict)),
+                ('industry_percentile', models.FloatField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('calculation', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='circularity_analysis', to='lca_core.lcacalculation')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CircularityIndicator',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=200, unique=True)),
+                ('description', models.TextField()),
+                ('indicator_type', models.CharField(choices=[('material_flow', 'Material Flow'), ('recycling', 'Recycling'), ('reuse', 'Reuse'), ('lifetime_extension', 'Lifetime Extension'), ('resource_efficiency', 'Resource Efficiency'), ('waste_reduction', 'Waste Reduction')], max_length=20)),
+                ('calculation_method', models.TextField(help_text='Description of calculation method')),
+                ('formula', models.TextField(blank=True, help_text='Mathematical formula')),
+                ('unit', models.CharField(max_length=50)),
+                ('min_value', models.FloatField(default=0)),
+                ('max_value', models.FloatField(default=100)),
+                ('target_value', models.FloatField(blank=True, help_text='Target or benchmark value', null=True)),
+                ('weight', models.FloatField(default=1.0, help_text='Weight for overall circularity calculation')),
+                ('required_data', models.JSONField(default=list, help_text='List of required data inputs')),
+                ('reference_standard', models.CharField(blank=True, max_length=200)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CircularityStrategy',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=200)),
+                ('description', models.TextField()),
+                ('category', models.CharField(choices=[('design', 'Design for Circularity'), ('materials', 'Material Selection'), ('manufacturing', 'Manufacturing'), ('distribution', 'Distribution'), ('use_phase', 'Use Phase'), ('end_of_life', 'End of Life'), ('business_model', 'Business Model')], max_length=20)),
+                ('objectives', models.JSONField(default=list, help_text='Strategy objectives')),
+                ('key_actions', models.JSONField(default=list, help_text='Key actions to implement')),
+                ('success_metrics', models.JSONField(default=list, help_text='Metrics to measure success')),
+                ('applicable_sectors', models.JSONField(default=list)),
+                ('applicable_materials', models.JSONField(default=list)),
+                ('applicable_processes', models.JSONField(default=list)),
+                ('environmental_benefits', models.JSONField(default=list)),
+                ('economic_benefits', models.JSONField(default=list)),
+                ('social_benefits', models.JSONField(default=list)),
+                ('implementation_guide', models.TextField(blank=True)),
+                ('case_studies', models.JSONField(default=list)),
+                ('references', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['category', 'name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CircularityImprovement',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField()),
+                ('improvement_type', models.CharField(choices=[('material_substitution', 'Material Substitution'), ('design_change', 'Design Change'), ('process_optimization', 'Process Optimization'), ('supply_chain', 'Supply Chain'), ('end_of_life', 'End-of-Life Management'), ('business_model', 'Business Model')], max_length=25)),
+                ('priority', models.CharField(choices=[('low', 'Low'), ('medium', 'Medium'), ('high', 'High'), ('critical', 'Critical')], max_length=10)),
+                ('potential_impact_score', models.FloatField(help_text='Potential improvement in circularity score')),
+                ('implementation_effort', models.FloatField(default=5.0, help_text='Implementation effort score (1-10)')),
+                ('cost_estimate', models.FloatField(blank=True, help_text='Implementation cost estimate', null=True)),
+                ('implementation_steps', models.JSONField(default=list)),
+                ('required_resources', models.JSONField(default=list)),
+                ('timeline_estimate', models.CharField(blank=True, max_length=100)),
+                ('implementation_barriers', models.JSONField(default=list)),
+                ('risks', models.JSONField(default=list)),
+                ('success_factors', models.JSONField(default=list)),
+                ('is_validated', models.BooleanField(default=False)),
+                ('validation_notes', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('analysis', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='improvements', to='circularity.circularityanalysis')),
+            ],
+            options={
+                'ordering': ['-priority', '-potential_impact_score'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CircularityBenchmark',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('sector', models.CharField(choices=[('metallurgy', 'Metallurgy'), ('mining', 'Mining'), ('construction', 'Construction'), ('electronics', 'Electronics'), ('automotive', 'Automotive'), ('packaging', 'Packaging'), ('textiles', 'Textiles'), ('general', 'General Manufacturing')], max_length=20)),
+                ('best_practice_value', models.FloatField(help_text='Best practice benchmark')),
+                ('industry_average', models.FloatField(help_text='Industry average')),
+                ('minimum_acceptable', models.FloatField(help_text='Minimum acceptable level')),
+                ('percentile_25', models.FloatField(blank=True, null=True)),
+                ('percentile_50', models.FloatField(blank=True, null=True)),
+                ('percentile_75', models.FloatField(blank=True, null=True)),
+                ('percentile_90', models.FloatField(blank=True, null=True)),
+                ('data_source', models.CharField(max_length=200)),
+                ('sample_size', models.PositiveIntegerField(blank=True, null=True)),
+                ('year', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('indicator', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='circularity.circularityindicator')),
+            ],
+            options={
+                'unique_together': {('indicator', 'sector', 'year')},
+            },
+        ),
+    ]
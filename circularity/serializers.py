@@ -0,0 +1,28 @@
+from rest_framework import serializers
+from .models import CircularityIndicator, CircularityAnalysis
+
+
+class CircularityIndicatorSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CircularityIndicator
+        fields = [
+            'id', 'name', 'description', 'indicator_type', 'calculation_method', 'formula', 'unit',
+            'min_value', 'max_value', 'target_value', 'weight', 'required_data', 'reference_standard',
+            'created_at',
+        ]
+        read_only_fields = ['id', 'created_at']
+
+
+class CircularityAnalysisSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CircularityAnalysis
+        fields = [
+            'id', 'calculation', 'overall_circularity_score', 'material_circularity_score',
+            'component_circularity_score', 'recycled_content_rate', 'recyclability_rate', 'reuse_potential',
+            'lifetime_extension_factor', 'material_efficiency', 'virgin_material_input',
+            'recycled_material_input', 'material_losses', 'waste_output', 'recovered_materials',
+            'indicator_results', 'improvement_opportunities', 'circularity_strategies',
+            'benchmark_comparison', 'industry_percentile', 'created_at', 'updated_at',
+        ]
+        # Analyses are computed from the calculation's process steps, never written directly
+        read_only_fields = fields
@@ -0,0 +1,354 @@
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+from .benchmarks import BenchmarkIndex, default_sector, get_benchmark_index
+from .formulas import IndicatorSet, get_indicator_set
+from .models import CircularityAnalysis
+
+logger = logging.getLogger(__name__)
+
+# Overall score weights while no CircularityIndicator defines a formula
+CIRCULARITY_WEIGHTS = {'recycled_content_percentage': 0.3, 'recovery_rate': 0.4, 'material_efficiency': 0.3}
+
+# Ellen MacArthur Foundation MCI constants
+UTILITY_FACTOR = 0.9  # F(X) = 0.9 / X
+AVERAGE_DURABILITY = 5.0  # Midpoint of Material.durability_score, i.e. industry-average lifetime
+DEFAULT_RECYCLING_EFFICIENCY = 0.0
+
+# Names an indicator formula may use: CircularityAnalysis columns, plus
+# metrics and MCI terms kept in indicator_results
+FIELD_VARIABLES = (
+    'material_circularity_score', 'component_circularity_score', 'recycled_content_rate',
+    'recyclability_rate', 'reuse_potential', 'lifetime_extension_factor', 'material_efficiency',
+    'virgin_material_input', 'recycled_material_input', 'material_losses', 'waste_output',
+    'recovered_materials',
+)
+RESULT_VARIABLES = (
+    'recycled_content_percentage', 'recovery_rate', 'material_circularity_indicator',
+    'linear_flow_index', 'utility', 'unrecoverable_waste', 'recycling_efficiency',
+)
+ANALYSIS_VARIABLES = FIELD_VARIABLES + RESULT_VARIABLES
+
+
+@dataclass
+class MaterialAttributes:
+    recycling_efficiency: float = DEFAULT_RECYCLING_EFFICIENCY  # 0-1
+    durability_score: float = AVERAGE_DURABILITY  # 0-10
+    reusability_potential: float = 0.0  # 0-100
+    recyclable: bool = False
+
+
+@dataclass
+class FlowTotals:
+    """Mass flows accumulated over one set of process steps"""
+    material_input: float = 0.0
+    recycled_input: float = 0.0
+    recyclable_input: float = 0.0
+    output: float = 0.0
+    waste: float = 0.0
+    eol_waste: float = 0.0
+    eol_recovered: float = 0.0
+    # Mass-weighted sums, divided by material_input for averages
+    recycling_efficiency: float = 0.0
+    durability: float = 0.0
+    reusability: float = 0.0
+    component_scores: List[tuple] = field(default_factory=list)
+
+    def add_input(self, quantity: float, recycled_content: float, material: MaterialAttributes) -> None:
+        self.material_input += quantity
+        self.recycled_input += quantity * recycled_content / 100
+        self.recyclable_input += quantity if material.recyclable else 0.0
+        self.recycling_efficiency += quantity * material.recycling_efficiency
+        self.durability += quantity * material.durability_score
+        self.reusability += quantity * material.reusability_potential
+
+    def average(self, total: float) -> float:
+        return total / self.material_input if self.material_input > 0 else 0.0
+
+
+def material_circularity(totals: FlowTotals) -> Dict[str, float]:
+    """Material Circularity Indicator of a flow total.
+
+    MCI = 1 - LFI * F(X), with LFI = (V + W) / (2M + (W_F - W_C) / 2),
+    W = W_0 + (W_F + W_C) / 2 and F(X) = 0.9 / X. There are no reused
+    inputs here (F_U = 0). Collection for recycling (C_R) is the end-of-life
+    recovery rate. Both recycling efficiencies (E_C, E_F) use the
+    mass-weighted ``Material.recycling_efficiency``. Utility X is the
+    mass-weighted durability relative to the scale midpoint.
+    """
+    mass = totals.material_input
+    if mass <= 0:
+        return {'mci': 0.0, 'lfi': 0.0, 'utility': 1.0, 'virgin': 0.0, 'unrecoverable_waste': 0.0}
+
+    recycled_fraction = min(totals.recycled_input / mass, 1.0)
+    collected_fraction = totals.eol_recovered / totals.eol_waste if totals.eol_waste > 0 else 0.0
+    efficiency = totals.average(totals.recycling_efficiency)
+    utility = max(totals.average(totals.durability) / AVERAGE_DURABILITY, 1e-6)
+
+    virgin = mass * (1 - recycled_fraction)
+    waste_unrecovered = mass * (1 - collected_fraction)
+    waste_collection = mass * (1 - efficiency) * collected_fraction
+    waste_feedstock = mass * recycled_fraction * (1 - efficiency) / efficiency if efficiency > 0 else (
+        mass * recycled_fraction
+    )
+    waste = waste_unrecovered + (waste_feedstock + waste_collection) / 2
+    lfi = (virgin + waste) / (2 * mass + (waste_feedstock - waste_collection) / 2)
+    mci = max(0.0, 1 - lfi * UTILITY_FACTOR / utility)
+    return {
+        'mci': min(mci, 1.0),
+        'lfi': lfi,
+        'utility': utility,
+        'virgin': virgin,
+        'unrecoverable_waste': waste,
+    }
+
+
+def analysis_chunks(analyses=None, chunk_size: int = 20000) -> Iterator[Tuple[list, Dict[str, np.ndarray], list]]:
+    """Stored analyses as (pks, variable arrays, indicator_results) chunks, paged by primary key"""
+    analyses = analyses if analyses is not None else CircularityAnalysis.objects.all()
+    rows = analyses.order_by('pk').values_list('pk', *FIELD_VARIABLES, 'indicator_results')
+    last = None
+    while True:
+        chunk = list((rows.filter(pk__gt=last) if last is not None else rows)[:chunk_size])
+        if not chunk:
+            return
+        columns = list(zip(*chunk))
+        values = {name: np.array(column, dtype=np.float64) for name, column in zip(FIELD_VARIABLES, columns[1:-1])}
+        results = [result or {} for result in columns[-1]]
+        for name in RESULT_VARIABLES:
+            values[name] = np.array([result.get(name, 0.0) for result in results], dtype=np.float64)
+        yield list(columns[0]), values, results
+        last = chunk[-1][0]
+
+
+class CircularityEngine:
+    """Computes every CircularityAnalysis field from preloaded process steps.
+
+    Steps are walked once. Material attributes (recycling efficiency,
+    durability, reusability) are loaded in a single query on first use and
+    kept on the engine, so repeated and bulk runs add no per-step queries.
+    """
+
+    def __init__(self, indicators: Optional[IndicatorSet] = None, sector: Optional[str] = None):
+        self._materials: Optional[Dict[str, MaterialAttributes]] = None
+        self.indicators = indicators
+        self.sector = sector or default_sector()
+
+    def preload_materials(self) -> None:
+        """Load attributes of every material (and its common names) in one query"""
+        from materials.models import Material
+
+        materials = {}
+        for name, common_names, efficiency, durability, reusability, recyclable in Material.objects.values_list(
+            'name', 'common_names', 'recycling_efficiency', 'durability_score', 'reusability_potential', 'recyclable'
+        ):
+            attributes = MaterialAttributes(efficiency / 100, durability, reusability, recyclable)
+            for alias in list(common_names or []) + [name]:
+                materials[str(alias).lower()] = attributes
+        self._materials = materials
+
+    def material(self, name: str) -> MaterialAttributes:
+        if self._materials is None:
+            self.preload_materials()
+        # Unknown materials get neutral defaults
+        return self._materials.get((name or '').lower()) or MaterialAttributes()
+
+    def totals(self, steps: Iterable[Any]) -> FlowTotals:
+        totals = FlowTotals()
+        for step in steps:
+            step_start = (totals.material_input, totals.recycled_input, totals.recycling_efficiency, totals.durability)
+            for material in step.input_materials:
+                totals.add_input(
+                    material.get('quantity', 0),
+                    material.get('recycled_content', 0),
+                    self.material(material.get('material', '')),
+                )
+            totals.output += sum(material.get('quantity', 0) for material in step.output_materials)
+            for waste in step.waste_outputs:
+                quantity = waste.get('quantity', 0)
+                totals.waste += quantity
+                if step.category == 'end_of_life':
+                    totals.eol_waste += quantity
+                    totals.eol_recovered += quantity * waste.get('recovery_rate', 0) / 100
+            step_mass = totals.material_input - step_start[0]
+            if step_mass > 0:
+                totals.component_scores.append((str(step.id), step_mass, tuple(
+                    current - start for current, start in zip(
+                        (totals.material_input, totals.recycled_input, totals.recycling_efficiency, totals.durability),
+                        step_start,
+                    )
+                )))
+        return totals
+
+    def metrics(self, steps: Iterable[Any]) -> Dict[str, float]:
+        """The calculation's circularity metrics (results ``circularity_metrics``)"""
+        return self.analyse(steps)['metrics']
+
+    def analyse(self, steps: Iterable[Any]) -> Dict[str, Any]:
+        """Metrics plus the CircularityAnalysis field values for a set of steps"""
+        totals = self.totals(steps)
+        mass = totals.material_input
+        mci = material_circularity(totals)
+
+        metrics = {
+            'recycled_content_percentage': totals.recycled_input / mass * 100 if mass > 0 else 0,
+            'recovery_rate': totals.eol_recovered / totals.eol_waste * 100 if totals.eol_waste > 0 else 0,
+            'material_efficiency': totals.output / mass * 100 if mass > 0 else 0,
+        }
+        metrics['material_circularity_indicator'] = mci['mci'] * 100
+
+        components = {}
+        for step_id, step_mass, (_, recycled, efficiency, durability) in totals.component_scores:
+            # A component keeps the product-level collection rate
+            component = FlowTotals(
+                material_input=step_mass, recycled_input=recycled, recycling_efficiency=efficiency,
+                durability=durability, eol_waste=totals.eol_waste, eol_recovered=totals.eol_recovered,
+            )
+            components[step_id] = material_circularity(component)['mci'] * 100
+        component_score = (
+            sum(components[step_id] * step_mass for step_id, step_mass, _ in totals.component_scores) / mass
+            if mass > 0 else 0.0
+        )
+
+        fields = {
+            'material_circularity_score': metrics['material_circularity_indicator'],
+            'component_circularity_score': component_score,
+            'recycled_content_rate': metrics['recycled_content_percentage'],
+            'recyclability_rate': totals.recyclable_input / mass * 100 if mass > 0 else 0.0,
+            'reuse_potential': totals.average(totals.reusability),
+            'lifetime_extension_factor': mci['utility'],
+            'material_efficiency': metrics['material_efficiency'],
+            'virgin_material_input': mass - totals.recycled_input,
+            'recycled_material_input': totals.recycled_input,
+            'material_losses': max(mass - totals.output - totals.waste, 0.0),
+            'waste_output': totals.waste,
+            'recovered_materials': totals.eol_recovered,
+            'indicator_results': dict(
+                metrics,
+                linear_flow_index=mci['lfi'],
+                utility=mci['utility'],
+                unrecoverable_waste=mci['unrecoverable_waste'],
+                recycling_efficiency=totals.average(totals.recycling_efficiency) * 100,
+                components=components,
+            ),
+        }
+        values = dict(fields['indicator_results'], **{name: fields[name] for name in FIELD_VARIABLES})
+        scores = self.indicator_set().evaluate(values)
+        metrics['overall_score'] = float(scores['overall'])
+        fields['overall_circularity_score'] = metrics['overall_score']
+        fields['indicator_results']['overall_score'] = metrics['overall_score']
+        fields['indicator_results']['indicators'] = {
+            name: {'value': float(result['value']), 'score': float(result['score'])}
+            for name, result in scores['indicators'].items()
+        }
+        comparison = get_benchmark_index().compare(values, self.sector, [fields['indicator_results']])
+        fields['industry_percentile'], fields['benchmark_comparison'] = BenchmarkIndex.row(comparison, 0, self.sector)
+        fields['improvement_opportunities'] = self._opportunities(fields, mci)
+        return {'metrics': metrics, 'fields': fields}
+
+    def indicator_set(self) -> IndicatorSet:
+        return self.indicators or get_indicator_set()
+
+    def rescore(self, analyses=None, chunk_size: int = 20000) -> int:
+        """Re-evaluate every indicator over stored analyses, one vectorised pass per chunk.
+
+        Used after indicators change: reads only the variable columns, evaluates
+        each compiled formula over whole arrays and bulk-updates the scores.
+        """
+        indicators = self.indicator_set()
+        updated = 0
+        for pks, values, results in analysis_chunks(analyses, chunk_size):
+            size = len(pks)
+            scores = indicators.evaluate(values)
+            overall = np.broadcast_to(scores['overall'], (size,))
+
+            now = timezone.now()
+            objects = []
+            for index, (pk, result) in enumerate(zip(pks, results)):
+                result = dict(result or {})
+                result['overall_score'] = float(overall[index])
+                result['indicators'] = {
+                    name: {
+                        'value': float(np.broadcast_to(item['value'], (size,))[index]),
+                        'score': float(np.broadcast_to(item['score'], (size,))[index]),
+                    }
+                    for name, item in scores['indicators'].items()
+                }
+                objects.append(CircularityAnalysis(
+                    pk=pk, overall_circularity_score=result['overall_score'], indicator_results=result,
+                    updated_at=now,
+                ))
+            with transaction.atomic():
+                CircularityAnalysis.objects.bulk_update(
+                    objects, ['overall_circularity_score', 'indicator_results', 'updated_at'], batch_size=2000
+                )
+            updated += len(objects)
+        logger.info(f"Rescored {updated} circularity analyses with {len(indicators.indicators)} indicators")
+        return updated
+
+    def _opportunities(self, fields: Dict[str, Any], mci: Dict[str, float]) -> List[Dict[str, Any]]:
+        """MCI levers ordered by how far each is from its ideal"""
+        gaps = [
+            ('recycled_content_rate', 100 - fields['recycled_content_rate'], 'Increase recycled feedstock'),
+            ('recovery_rate', 100 - fields['indicator_results']['recovery_rate'], 'Collect more material at end of life'),
+            ('recycling_efficiency', 100 - fields['indicator_results']['recycling_efficiency'],
+             'Use materials with more efficient recycling routes'),
+            ('lifetime_extension_factor', max(0.0, 1 - mci['utility']) * 100, 'Extend product lifetime'),
+        ]
+        return [
+            {'indicator': indicator, 'gap': round(gap, 2), 'action': action}
+            for indicator, gap, action in sorted(gaps, key=lambda item: -item[1]) if gap > 1
+        ]
+
+    def store(self, calculation, steps: Optional[List[Any]] = None) -> CircularityAnalysis:
+        steps = steps if steps is not None else list(calculation.process_steps.all())
+        analysis, _ = CircularityAnalysis.objects.update_or_create(
+            calculation_id=calculation.pk, defaults=self.analyse(steps)['fields']
+        )
+        return analysis
+
+    def recompute(self, calculations=None, batch_size: int = 500) -> int:
+        """Recompute and upsert CircularityAnalysis rows for many calculations.
+
+        Calculations are read in id batches with their steps prefetched;
+        rows are written with one bulk_create and one bulk_update per batch.
+        """
+        from lca_core.models import LCACalculation
+
+        calculations = calculations if calculations is not None else LCACalculation.objects.all()
+        ids = list(calculations.order_by('pk').values_list('pk', flat=True))
+        field_names = None
+        written = 0
+        for offset in range(0, len(ids), batch_size):
+            chunk = ids[offset:offset + batch_size]
+            batch = list(LCACalculation.objects.filter(pk__in=chunk).prefetch_related('process_steps'))
+            steps = {calculation.pk: list(calculation.process_steps.all()) for calculation in batch}
+            existing = {
+                analysis.calculation_id: analysis
+                for analysis in CircularityAnalysis.objects.filter(calculation_id__in=chunk)
+            }
+            now = timezone.now()
+            created, updated = [], []
+            for calculation in batch:
+                fields = self.analyse(steps[calculation.pk])['fields']
+                field_names = field_names or list(fields)
+                analysis = existing.get(calculation.pk)
+                if analysis is None:
+                    created.append(CircularityAnalysis(calculation_id=calculation.pk, **fields))
+                else:
+                    for name, value in fields.items():
+                        setattr(analysis, name, value)
+                    # bulk_update bypasses auto_now
+                    analysis.updated_at = now
+                    updated.append(analysis)
+            with transaction.atomic():
+                CircularityAnalysis.objects.bulk_create(created, batch_size=batch_size)
+                if updated:
+                    CircularityAnalysis.objects.bulk_update(updated, field_names + ['updated_at'], batch_size=batch_size)
+            written += len(created) + len(updated)
+        logger.info(f"Recomputed circularity for {written} calculations")
+        return written
@@ -0,0 +1,245 @@
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from .services import AVERAGE_DURABILITY, CircularityEngine
+
+logger = logging.getLogger(__name__)
+
+_config = getattr(settings, 'CIRCULARITY_SIMULATION', {})
+
+# Scenario keys overriding cohort parameters (fractions 0-1), and multipliers
+SCENARIO_OVERRIDES = ('collection_rate', 'recycling_efficiency', 'reuse_rate', 'quality_factor')
+SCENARIO_DEFAULTS = {'demand_growth': 0.0, 'lifetime_factor': 1.0}
+
+
+@dataclass
+class Cohort:
+    """Yearly demand for one material at one end-of-life collection rate"""
+    material: str
+    demand: float  # kg placed on the market per year
+    collection_rate: float  # 0-1
+    recycling_efficiency: float  # 0-1
+    reuse_rate: float  # 0-1
+    quality_factor: float  # 0-1, quality kept per recycling cycle
+    lifetime: float  # years
+
+
+class CircularitySimulation:
+    """Time-stepped material stock and flow model over repeated use/recycle cycles.
+
+    Each cohort puts its demand on the market every year; products leave use
+    after their lifetime. Collected end-of-life mass is reused (no quality
+    loss) or recycled, losing ``1 - quality_factor`` of its quality per
+    cycle. Secondary material of quality ``q`` can make up at most ``q`` of a
+    new product's mass, so degraded material is cascaded out and virgin
+    demand rises again. State is a (scenario, cohort) array advanced one year
+    at a time, so a portfolio run costs ``years`` array operations.
+    """
+
+    def __init__(self, years: Optional[int] = None, product_lifetime: Optional[float] = None):
+        self.years = int(years or _config.get('HORIZON', 50))
+        if not 1 <= self.years <= _config.get('MAX_HORIZON', 200):
+            raise ValueError(f"years must be between 1 and {_config.get('MAX_HORIZON', 200)}")
+        self.product_lifetime = float(product_lifetime or _config.get('PRODUCT_LIFETIME', 10))
+        self._materials = None
+
+    def _material_parameters(self) -> Dict[str, Tuple[Any, float]]:
+        """(attributes, mean RecycledMaterial.quality_factor) per lower-cased material name or alias"""
+        from materials.models import Material, RecycledMaterial
+
+        if self._materials is None:
+            quality = defaultdict(list)
+            for material_id, factor in RecycledMaterial.objects.values_list('base_material_id', 'quality_factor'):
+                quality[material_id].append(factor)
+            engine = CircularityEngine()
+            engine.preload_materials()
+            materials = {}
+            for material_id, name, common_names in Material.objects.values_list('id', 'name', 'common_names'):
+                factors = quality.get(material_id)
+                # Without recycled variants recycling is assumed not to degrade quality
+                factor = float(np.mean(factors)) if factors else 1.0
+                for alias in list(common_names or []) + [name]:
+                    materials[str(alias).lower()] = (engine.material(name), factor)
+            self._materials = materials
+        return self._materials
+
+    def cohorts(self, calculations: Iterable[Any], batch_size: int = 500) -> List[Cohort]:
+        """Cohorts of the calculations' input materials, one functional unit per year each.
+
+        Cohorts of the same material and collection rate behave identically
+        per kg, so they are merged.
+        """
+        from lca_core.models import LCACalculation
+
+        materials = self._material_parameters()
+        engine = CircularityEngine()
+        ids = [calculation.pk if hasattr(calculation, 'pk') else calculation for calculation in calculations]
+        demand: Dict[Tuple[str, float], float] = defaultdict(float)
+        for offset in range(0, len(ids), batch_size):
+            batch = LCACalculation.objects.filter(pk__in=ids[offset:offset + batch_size]).prefetch_related('process_steps')
+            for calculation in batch:
+                steps = list(calculation.process_steps.all())
+                totals = engine.totals(steps)
+                collection = round(totals.eol_recovered / totals.eol_waste, 4) if totals.eol_waste > 0 else 0.0
+                for step in steps:
+                    for material in step.input_materials:
+                        quantity = material.get('quantity', 0)
+                        if quantity > 0:
+                            demand[((material.get('material', '') or 'unknown').lower(), collection)] += quantity
+
+        cohorts = []
+        for (name, collection), quantity in demand.items():
+            attributes, quality = materials.get(name, (engine.material(name), 1.0))
+            cohorts.append(Cohort(
+                material=name,
+                demand=quantity,
+                collection_rate=collection,
+                recycling_efficiency=attributes.recycling_efficiency,
+                reuse_rate=attributes.reusability_potential / 100,
+                quality_factor=quality,
+                lifetime=max(1.0, self.product_lifetime * max(attributes.durability_score, 1.0) / AVERAGE_DURABILITY),
+            ))
+        return cohorts
+
+    @staticmethod
+    def impact_factors(cohorts: List[Cohort], service=None) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """Per-kg impacts of virgin and fully recycled material for each cohort, from the LCA engine"""
+        from lca_core.services import LCACalculationService
+
+        service = service or LCACalculationService()
+        impacts = list(service.impact_methods)
+        cache: Dict[Tuple[str, float], np.ndarray] = {}
+
+        def per_kg(name: str, recycled_content: float) -> np.ndarray:
+            key = (name, recycled_content)
+            if key not in cache:
+                values = service._calculate_material_impacts(
+                    {'material': name, 'quantity': 1.0, 'recycled_content': recycled_content}
+                )
+                cache[key] = np.array([values.get(impact, 0.0) for impact in impacts], dtype=np.float64)
+            return cache[key]
+
+        virgin = np.array([per_kg(cohort.material, 0.0) for cohort in cohorts]).reshape(len(cohorts), len(impacts))
+        recycled = np.array([per_kg(cohort.material, 100.0) for cohort in cohorts]).reshape(len(cohorts), len(impacts))
+        return impacts, virgin, recycled
+
+    @staticmethod
+    def _scenario_parameters(cohorts: List[Cohort], scenarios: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+        """(scenario, cohort) arrays of every parameter, with scenario overrides applied"""
+        shape = (len(scenarios), len(cohorts))
+        parameters = {}
+        for name in SCENARIO_OVERRIDES + ('lifetime', 'demand'):
+            base = np.array([getattr(cohort, name) for cohort in cohorts], dtype=np.float64)
+            parameters[name] = np.broadcast_to(base, shape).copy()
+        for position, scenario in enumerate(scenarios):
+            unknown = set(scenario) - set(SCENARIO_OVERRIDES) - set(SCENARIO_DEFAULTS) - {'name'}
+            if unknown:
+                raise ValueError(f"Unknown scenario parameters: {', '.join(sorted(unknown))}")
+            for name in SCENARIO_OVERRIDES:
+                if scenario.get(name) is not None:
+                    value = float(scenario[name])
+                    if not 0 <= value <= 1:
+                        raise ValueError(f"{name} must be between 0 and 1")
+                    parameters[name][position] = value
+            parameters['lifetime'][position] *= float(scenario.get('lifetime_factor', 1.0))
+        growth = np.array([float(scenario.get('demand_growth', 0.0)) for scenario in scenarios])
+        if np.any(growth <= -1) or np.any(parameters['lifetime'] <= 0):
+            raise ValueError('demand_growth must be above -1 and lifetime_factor positive')
+        parameters['growth'] = growth[:, None]
+        parameters['lifetime'] = np.maximum(np.rint(parameters['lifetime']), 1).astype(np.int64)
+        return parameters
+
+    def run(self, cohorts: List[Cohort], scenarios: Optional[List[Dict[str, Any]]] = None,
+            factors: Optional[Tuple[List[str], np.ndarray, np.ndarray]] = None) -> Dict[str, Any]:
+        """Simulate every scenario over ``years`` and summarise each one"""
+        scenarios = scenarios or [{'name': 'baseline'}]
+        parameters = self._scenario_parameters(cohorts, scenarios)
+        impacts, virgin_factors, recycled_factors = factors or ([], np.zeros((len(cohorts), 0)), np.zeros((len(cohorts), 0)))
+        S, C, T = len(scenarios), len(cohorts), self.years
+
+        # Mass and quality-weighted mass placed on the market each year
+        placed = np.zeros((T, S, C))
+        placed_quality = np.zeros((T, S, C))
+        annual = {name: np.zeros((T, S)) for name in ('demand', 'virgin', 'reused', 'recycled', 'cascaded', 'lost')}
+        annual_impacts = np.zeros((T, S, len(impacts)))
+        # Flat offsets into ``placed`` let one take() gather each pair's retiring year
+        offsets = np.arange(S * C).reshape(S, C)
+        lifetime = parameters['lifetime']
+        collected_share = parameters['collection_rate']
+        reuse = collected_share * parameters['reuse_rate']
+        recycle = collected_share * (1 - parameters['reuse_rate']) * parameters['recycling_efficiency']
+
+        for year in range(T):
+            demand = parameters['demand'] * (1 + parameters['growth']) ** year
+            retiring = year - lifetime
+            active = retiring >= 0
+            source = np.where(active, retiring, 0) * (S * C) + offsets
+            outflow = np.where(active, placed.take(source), 0.0)
+            quality = np.divide(
+                np.where(active, placed_quality.take(source), 0.0), outflow,
+                out=np.zeros_like(outflow), where=outflow > 0,
+            )
+
+            reused_supply = outflow * reuse
+            recycled_supply = outflow * recycle
+            recycled_quality = quality * parameters['quality_factor']
+            reused = np.minimum(reused_supply, demand)
+            # Secondary material of quality q can form at most q of the new product
+            recycled = np.minimum(recycled_supply, (demand - reused) * recycled_quality)
+            virgin = demand - reused - recycled
+
+            placed[year] = demand
+            placed_quality[year] = virgin + reused * quality + recycled * recycled_quality
+            annual['demand'][year] = demand.sum(axis=1)
+            annual['virgin'][year] = virgin.sum(axis=1)
+            annual['reused'][year] = reused.sum(axis=1)
+            annual['recycled'][year] = recycled.sum(axis=1)
+            annual['cascaded'][year] = (reused_supply - reused + recycled_supply - recycled).sum(axis=1)
+            annual['lost'][year] = (outflow - reused_supply - recycled_supply).sum(axis=1)
+            annual_impacts[year] = virgin @ virgin_factors + recycled @ recycled_factors
+
+        # Products placed within their lifetime of the horizon are still in use
+        in_use = (np.arange(T)[:, None, None] > (T - 1 - lifetime)[None])
+        stock = (placed * in_use).sum(axis=(0, 2))
+        stock_quality = (placed_quality * in_use).sum(axis=(0, 2))
+        # Impacts of meeting the same demand from virgin material only
+        linear_impacts = np.einsum('ts,sc,ci->si', (1 + parameters['growth'].T) ** np.arange(T)[:, None],
+                                   parameters['demand'], virgin_factors) if len(impacts) else np.zeros((S, 0))
+
+        results = []
+        for position, scenario in enumerate(scenarios):
+            cumulative_virgin = float(annual['virgin'][:, position].sum())
+            cumulative_demand = float(annual['demand'][:, position].sum())
+            results.append({
+                'name': scenario.get('name') or f"scenario_{position + 1}",
+                'parameters': {key: value for key, value in scenario.items() if key != 'name'},
+                'cumulative_demand': cumulative_demand,
+                'cumulative_virgin_demand': cumulative_virgin,
+                'virgin_demand_avoided': cumulative_demand - cumulative_virgin,
+                'secondary_share': 1 - cumulative_virgin / cumulative_demand if cumulative_demand > 0 else 0.0,
+                'in_use_stock': float(stock[position]),
+                'in_use_stock_quality': float(stock_quality[position] / stock[position]) if stock[position] > 0 else 0.0,
+                'cumulative_impacts': {
+                    impact: float(annual_impacts[:, position, index].sum()) for index, impact in enumerate(impacts)
+                },
+                'impacts_avoided': {
+                    impact: float(linear_impacts[position, index] - annual_impacts[:, position, index].sum())
+                    for index, impact in enumerate(impacts)
+                },
+                'annual': dict(
+                    {name: values[:, position].tolist() for name, values in annual.items()},
+                    impacts={impact: annual_impacts[:, position, index].tolist() for index, impact in enumerate(impacts)},
+                ),
+            })
+        logger.info(f"Simulated {S} scenarios x {C} cohorts over {T} years")
+        return {'years': T, 'cohorts': C, 'scenarios': results}
+
+    def simulate(self, calculations: Iterable[Any], scenarios: Optional[List[Dict[str, Any]]] = None,
+                 include_impacts: bool = True) -> Dict[str, Any]:
+        cohorts = self.cohorts(calculations)
+        factors = self.impact_factors(cohorts) if include_impacts and cohorts else None
+        return self.run(cohorts, scenarios, factors)
@@ -0,0 +1,28 @@
+import logging
+from typing import List, Optional
+
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def recompute_circularity(calculation_ids: Optional[List[int]] = None) -> None:
+    """Recompute CircularityAnalysis rows for the given calculations, or all of them"""
+    from lca_core.models import LCACalculation
+    from .services import CircularityEngine
+
+    calculations = LCACalculation.objects.all()
+    if calculation_ids is not None:
+        calculations = calculations.filter(pk__in=calculation_ids)
+    written = CircularityEngine().recompute(calculations)
+    logger.info(f"Recomputed {written} circularity analyses")
+
+
+@shared_task(ignore_result=True)
+def rescore_circularity() -> None:
+    """Re-evaluate indicator formulas over every stored analysis after indicators change"""
+    from .services import CircularityEngine
+
+    updated = CircularityEngine().rescore()
+    logger.info(f"Rescored {updated} circularity analyses")
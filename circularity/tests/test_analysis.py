@@ -0,0 +1,67 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from rest_framework.test import APITestCase
+
+from circularity.models import CircularityAnalysis
+from circularity.tasks import recompute_circularity
+from lca_core.models import LCACalculation, LCAProject, ProcessStep
+from materials.models import Material
+
+
+def make_calculation(owner, name='Baseline'):
+    project = LCAProject.objects.create(name=f"{name} project", owner=owner)
+    calculation = LCACalculation.objects.create(project=project, name=name)
+    ProcessStep.objects.create(
+        calculation=calculation, name='Casting', order=1, category='manufacturing',
+        input_materials=[{'material': 'Aluminium', 'quantity': 10, 'recycled_content': 40}],
+        output_materials=[{'material': 'Housing', 'quantity': 8}],
+        waste_outputs=[{'quantity': 2, 'recovery_rate': 0}],
+    )
+    ProcessStep.objects.create(
+        calculation=calculation, name='Disposal', order=2, category='end_of_life',
+        waste_outputs=[{'quantity': 8, 'recovery_rate': 75}],
+    )
+    return calculation
+
+
+class CircularityAnalysisTests(APITestCase):
+    def setUp(self):
+        Material.objects.create(
+            name='Aluminium', material_type='metal', density=2700, recyclable=True,
+            recycling_efficiency=90, durability_score=5,
+        )
+        self.user = User.objects.create_user('analyst', password='secret')
+        self.other = User.objects.create_user('other', password='secret')
+        self.calculation = make_calculation(self.user)
+        self.foreign = make_calculation(self.other, 'Foreign')
+        self.client.force_authenticate(self.user)
+
+    def test_recompute_stores_analysis_from_process_steps(self):
+        recompute_circularity([self.calculation.pk])
+        analysis = CircularityAnalysis.objects.get(calculation=self.calculation)
+        self.assertAlmostEqual(analysis.recycled_content_rate, 40.0)
+        self.assertAlmostEqual(analysis.recyclability_rate, 100.0)
+        self.assertAlmostEqual(analysis.indicator_results['recovery_rate'], 75.0)
+        self.assertAlmostEqual(analysis.waste_output, 10.0)
+        self.assertFalse(CircularityAnalysis.objects.filter(calculation=self.foreign).exists())
+
+    def test_recompute_endpoint_queues_only_own_calculations(self):
+        with mock.patch('circularity.tasks.recompute_circularity.delay') as delay:
+            response = self.client.post(
+                '/api/circularity/analyses/recompute/',
+                {'calculations': [self.calculation.pk, self.foreign.pk]}, format='json',
+            )
+        self.assertEqual(response.status_code, 202)
+        delay.assert_called_once_with([self.calculation.pk])
+
+    def test_analyses_are_scoped_to_owner(self):
+        recompute_circularity()
+        response = self.client.get('/api/circularity/analyses/')
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results'] if isinstance(response.data, dict) else response.data
+        self.assertEqual([row['calculation'] for row in results], [self.calculation.pk])
+
+    def test_analyses_cannot_be_written_directly(self):
+        response = self.client.post('/api/circularity/analyses/', {'calculation': self.calculation.pk})
+        self.assertEqual(response.status_code, 405)
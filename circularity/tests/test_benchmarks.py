@@ -0,0 +1,48 @@
+from django.contrib.auth.models import User
+from rest_framework.test import APITestCase
+
+from circularity.models import CircularityAnalysis, CircularityBenchmark, CircularityIndicator
+from circularity.tasks import recompute_circularity
+from materials.models import Material
+
+from .test_analysis import make_calculation
+
+
+class BenchmarkTests(APITestCase):
+    def setUp(self):
+        Material.objects.create(name='Aluminium', material_type='metal', density=2700, recycling_efficiency=90)
+        indicator = CircularityIndicator.objects.create(
+            name='recycled_content_rate', description='Recycled share of inputs', indicator_type='recycling',
+            calculation_method='Recycled over total input mass', unit='%',
+        )
+        CircularityBenchmark.objects.create(
+            indicator=indicator, sector='packaging', best_practice_value=100, industry_average=50,
+            minimum_acceptable=0, percentile_50=50, data_source='Test', year=2024,
+        )
+        self.user = User.objects.create_user('analyst', password='secret')
+        self.calculation = make_calculation(self.user)
+        recompute_circularity([self.calculation.pk])
+        self.client.force_authenticate(self.user)
+
+    def test_benchmark_stores_percentiles(self):
+        response = self.client.post(
+            '/api/circularity/analyses/benchmark/', {'sector': 'packaging'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        analysis = CircularityAnalysis.objects.get(calculation=self.calculation)
+        self.assertAlmostEqual(response.data['percentiles'][str(analysis.pk)], 40.0)
+        self.assertAlmostEqual(analysis.industry_percentile, 40.0)
+        detail = analysis.benchmark_comparison['indicators']['recycled_content_rate']
+        self.assertAlmostEqual(detail['gap_to_best_practice'], 60.0)
+
+    def test_new_benchmark_replaces_cached_curve(self):
+        CircularityBenchmark.objects.create(
+            indicator=CircularityIndicator.objects.get(), sector='packaging', best_practice_value=80,
+            industry_average=40, minimum_acceptable=0, percentile_50=20, data_source='Test', year=2025,
+        )
+        response = self.client.post(
+            '/api/circularity/analyses/benchmark/', {'sector': 'packaging'}, format='json'
+        )
+        percentile = next(iter(response.data['percentiles'].values()))
+        # 40 lies a third of the way from the 50th (20) to the 100th (80) knot of the newer curve
+        self.assertAlmostEqual(percentile, 50 + 50 / 3)
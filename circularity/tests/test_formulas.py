@@ -0,0 +1,29 @@
+import numpy as np
+from django.test import SimpleTestCase
+
+from circularity.formulas import FormulaError, compile_formula
+
+
+class CompileFormulaTests(SimpleTestCase):
+    def test_evaluates_element_wise(self):
+        formula = compile_formula('max(a, b) ** 2 if a > 0 else 0')
+        result = formula.evaluate({'a': [1.0, -1.0, 3.0], 'b': [2.0, 5.0, 1.0]})
+        np.testing.assert_allclose(result, [4.0, 0.0, 9.0])
+        self.assertEqual(formula.variables, ('a', 'b'))
+
+    def test_nested_power_overflows_instead_of_hanging(self):
+        self.assertEqual(float(compile_formula('9 ** 9 ** 9').evaluate({})), 0.0)
+        self.assertEqual(float(compile_formula('2 ** 10').evaluate({})), 1024.0)
+
+    def test_rejects_oversized_constants(self):
+        with self.assertRaises(FormulaError):
+            compile_formula('1' + '0' * 400)
+
+    def test_functions_must_be_called(self):
+        for source in ('max', 'where(max, 1, 2)', 'sqrt + 1'):
+            with self.subTest(source=source), self.assertRaises(FormulaError):
+                compile_formula(source)
+
+    def test_rejects_attribute_access(self):
+        with self.assertRaises(FormulaError):
+            compile_formula('a.__class__')
@@ -0,0 +1,55 @@
+from django.contrib.auth.models import User
+from rest_framework.test import APITestCase
+
+from circularity.tests.test_analysis import make_calculation
+from materials.models import Material, MaterialProperty, RecycledMaterial
+
+
+class CircularitySimulationTests(APITestCase):
+    def setUp(self):
+        aluminium = Material.objects.create(
+            name='Aluminium', material_type='metal', density=2700, recyclable=True,
+            recycling_efficiency=90, durability_score=5,
+        )
+        MaterialProperty.objects.create(material=aluminium, property_name='climate_change_factor',
+                                        property_type='environmental', value=8.2, unit='kg_co2_eq')
+        # Secondary aluminium saves 90% of the primary footprint
+        RecycledMaterial.objects.create(base_material=aluminium, name='Secondary aluminium',
+                                        recycled_content=100, quality_factor=0.9,
+                                        impact_reduction_factors={'climate_change': 90})
+        self.user = User.objects.create_user('analyst', password='secret')
+        self.calculation = make_calculation(self.user)
+        self.foreign = make_calculation(User.objects.create_user('other', password='secret'), 'Foreign')
+        self.client.force_authenticate(self.user)
+        self.url = '/api/circularity/analyses/simulate/'
+
+    def simulate(self, **data):
+        response = self.client.post(self.url, dict({'years': 30}, **data), format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_collection_lowers_virgin_demand(self):
+        data = self.simulate(scenarios=[{'name': 'baseline'}, {'name': 'landfill', 'collection_rate': 0}])
+
+        self.assertEqual((data['years'], data['cohorts']), (30, 1))
+        baseline, landfill = data['scenarios']
+        # Ten kg of aluminium per functional unit and year
+        self.assertAlmostEqual(baseline['cumulative_demand'], 300)
+        self.assertAlmostEqual(landfill['cumulative_virgin_demand'], 300)
+        self.assertEqual(landfill['secondary_share'], 0)
+        self.assertGreater(baseline['virgin_demand_avoided'], 0)
+        self.assertGreater(baseline['impacts_avoided']['climate_change'], 0)
+        self.assertAlmostEqual(landfill['impacts_avoided']['climate_change'], 0)
+
+    def test_only_owned_calculations_are_simulated(self):
+        data = self.simulate(calculations=[self.foreign.pk], include_impacts=False)
+        self.assertEqual(data['cohorts'], 0)
+        self.assertEqual(data['scenarios'][0]['cumulative_demand'], 0)
+
+    def test_invalid_scenarios_are_rejected(self):
+        response = self.client.post(self.url, {'scenarios': [{'collection_rate': 2}]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(self.url, {'scenarios': [{'name': 'x'}] * 21}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(self.url, {'years': 500}, format='json')
+        self.assertEqual(response.status_code, 400)
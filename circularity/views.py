@@ -1,4 +1,7 @@
-from rest_framework import viewsets
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
 from .models import CircularityIndicator, CircularityAnalysis
 from rest_framework.permissions import IsAuthenticated
 
@@ -11,11 +14,98 @@ class CircularityIndicatorViewSet(viewsets.ModelViewSet):
         from .serializers import CircularityIndicatorSerializer
         return CircularityIndicatorSerializer
 
+    def perform_create(self, serializer):
+        self._save_and_rescore(serializer)
 
-class CircularityAnalysisViewSet(viewsets.ModelViewSet):
-    queryset = CircularityAnalysis.objects.all()
+    def perform_update(self, serializer):
+        self._save_and_rescore(serializer)
+
+    def perform_destroy(self, instance):
+        from .tasks import rescore_circularity
+
+        instance.delete()
+        rescore_circularity.delay()
+
+    def _save_and_rescore(self, serializer):
+        from .formulas import FormulaError, compile_formula
+        from .services import ANALYSIS_VARIABLES
+        from .tasks import rescore_circularity
+
+        formula = serializer.validated_data.get('formula', '')
+        if formula:
+            try:
+                unknown = set(compile_formula(formula).variables) - set(ANALYSIS_VARIABLES)
+            except FormulaError as e:
+                raise ValidationError({'formula': str(e)})
+            if unknown:
+                raise ValidationError({'formula': f"Unknown variables: {', '.join(sorted(unknown))}"})
+        serializer.save()
+        rescore_circularity.delay()
+
+
+class CircularityAnalysisViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [IsAuthenticated]
 
+    def get_queryset(self):
+        return CircularityAnalysis.objects.filter(calculation__project__owner=self.request.user).order_by('calculation_id')
+
     def get_serializer_class(self):
         from .serializers import CircularityAnalysisSerializer
         return CircularityAnalysisSerializer
+
+    def _owned_calculations(self, calculation_ids=None):
+        from lca_core.models import LCACalculation
+
+        calculations = LCACalculation.objects.filter(project__owner=self.request.user)
+        if calculation_ids is not None:
+            calculations = calculations.filter(pk__in=calculation_ids)
+        return list(calculations.values_list('pk', flat=True))
+
+    @action(detail=False, methods=['post'])
+    def recompute(self, request):
+        """Queue a bulk recomputation for ``calculations`` (ids), or every calculation of the caller"""
+        from .tasks import recompute_circularity
+
+        calculation_ids = request.data.get('calculations')
+        if calculation_ids is not None and not isinstance(calculation_ids, list):
+            return Response({'error': '"calculations" must be a list of ids'}, status=status.HTTP_400_BAD_REQUEST)
+        recompute_circularity.delay(self._owned_calculations(calculation_ids))
+        return Response({'status': 'queued'}, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=['post'])
+    def benchmark(self, request):
+        """Percentiles for ``calculations`` (ids, default all) against a ``sector``'s benchmarks"""
+        from .benchmarks import benchmark_portfolio
+
+        calculation_ids = request.data.get('calculations')
+        if calculation_ids is not None and not isinstance(calculation_ids, list):
+            return Response({'error': '"calculations" must be a list of ids'}, status=status.HTTP_400_BAD_REQUEST)
+        analyses = self.get_queryset()
+        if calculation_ids is not None:
+            analyses = analyses.filter(calculation_id__in=calculation_ids)
+        return Response(benchmark_portfolio(analyses, sector=request.data.get('sector')))
+
+    @action(detail=False, methods=['post'])
+    def simulate(self, request):
+        """Project virgin demand and impacts of ``calculations`` over ``years`` for each of ``scenarios``"""
+        from django.conf import settings
+        from .simulation import CircularitySimulation
+
+        calculation_ids = request.data.get('calculations')
+        if calculation_ids is not None and not isinstance(calculation_ids, list):
+            return Response({'error': '"calculations" must be a list of ids'}, status=status.HTTP_400_BAD_REQUEST)
+        scenarios = request.data.get('scenarios') or [{'name': 'baseline'}]
+        max_scenarios = getattr(settings, 'CIRCULARITY_SIMULATION', {}).get('MAX_SCENARIOS', 20)
+        if not isinstance(scenarios, list) or not all(isinstance(scenario, dict) for scenario in scenarios):
+            return Response({'error': '"scenarios" must be a list of objects'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(scenarios) > max_scenarios:
+            return Response({'error': f"At most {max_scenarios} scenarios are allowed"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        calculation_ids = self._owned_calculations(calculation_ids)
+        try:
+            simulation = CircularitySimulation(years=request.data.get('years'))
+            return Response(simulation.simulate(
+                calculation_ids, scenarios, include_impacts=bool(request.data.get('include_impacts', True))
+            ))
+        except (TypeError, ValueError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
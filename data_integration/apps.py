@@ -0,0 +1,7 @@
+from django.apps import AppConfig
+
+
+class DataIntegrationConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'data_integration'
+    verbose_name = 'Data Integration'
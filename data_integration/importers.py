@@ -0,0 +1,512 @@
+import hashlib
+import json
+import logging
+import re
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import PurePosixPath
+from typing import Dict, List, Any, IO, Iterator, Optional, Tuple, Union
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from lxml import etree
+from .models import BackgroundExchange, BackgroundProcess, CharacterizationFactor, ImportJob
+
+logger = logging.getLogger(__name__)
+
+_config = getattr(settings, 'BACKGROUND_IMPORT', {})
+
+
+@dataclass
+class ParsedProcess:
+    external_id: str
+    name: str = ''
+    location: str = ''
+    reference_product: str = ''
+    reference_amount: float = 1.0
+    reference_unit: str = ''
+    exchanges: List[Dict[str, Any]] = field(default_factory=list)
+
+
+@dataclass
+class ParsedFactors:
+    """Characterization factors of one LCIA category"""
+    method: str
+    category: str
+    unit: str = ''
+    factors: List[Dict[str, Any]] = field(default_factory=list)
+
+
+Parsed = Union[ParsedProcess, ParsedFactors]
+
+
+def _localname(element) -> str:
+    return etree.QName(element).localname
+
+
+def _release(element) -> None:
+    """Free a parsed element and the already-processed siblings before it"""
+    element.clear()
+    parent = element.getparent()
+    if parent is not None:
+        while element.getprevious() is not None:
+            del parent[0]
+
+
+def _float(value, default: float = 0.0) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _child_text(element, name: str) -> str:
+    for child in element:
+        if _localname(child) == name:
+            return (child.text or '').strip()
+    return ''
+
+
+class ArchiveReader:
+    """Lists the importable entries of one archive format and parses them one at a time"""
+    entry_pattern: re.Pattern
+
+    def prepare(self, archive: zipfile.ZipFile) -> None:
+        """Load lookup data every entry needs; runs again when an import resumes"""
+
+    def entries(self, archive: zipfile.ZipFile) -> List[str]:
+        return sorted(name for name in archive.namelist() if self.entry_pattern.search(name))
+
+    def parse(self, name: str, stream: IO[bytes]) -> Iterator[Parsed]:
+        raise NotImplementedError
+
+
+class EcoSpold2Reader(ArchiveReader):
+    """ecoinvent EcoSpold 2 datasets (one ``.spold`` file per activity)"""
+    entry_pattern = re.compile(r'\.spold$', re.IGNORECASE)
+    exchange_tags = ('intermediateExchange', 'elementaryExchange')
+
+    def parse(self, name: str, stream: IO[bytes]) -> Iterator[Parsed]:
+        process = ParsedProcess(external_id=PurePosixPath(name).stem)
+        for _, element in etree.iterparse(stream, events=('end',), remove_comments=True, huge_tree=True):
+            tag = _localname(element)
+            if tag == 'activityName' and not process.name:
+                process.name = (element.text or '').strip()
+            elif tag == 'shortname' and element.getparent() is not None \
+                    and _localname(element.getparent()) == 'geography':
+                process.location = (element.text or '').strip()
+            elif tag in self.exchange_tags:
+                process.exchanges.append(self._exchange(element, tag))
+                _release(element)
+        for exchange in process.exchanges:
+            if exchange['is_reference']:
+                process.reference_product = exchange['flow_name']
+                process.reference_amount = exchange['amount']
+                process.reference_unit = exchange['unit']
+                break
+        yield process
+
+    @staticmethod
+    def _exchange(element, tag: str) -> Dict[str, Any]:
+        output_group = ''
+        name = unit = ''
+        compartment = []
+        for child in element:
+            child_tag = _localname(child)
+            if child_tag == 'name':
+                name = (child.text or '').strip()
+            elif child_tag == 'unitName':
+                unit = (child.text or '').strip()
+            elif child_tag == 'outputGroup':
+                output_group = (child.text or '').strip()
+            elif child_tag == 'compartment':
+                compartment = [_child_text(child, 'compartment'), _child_text(child, 'subcompartment')]
+        intermediate = tag == 'intermediateExchange'
+        return {
+            'flow_id': element.get('intermediateExchangeId' if intermediate else 'elementaryExchangeId', ''),
+            'flow_name': name,
+            'flow_type': 'product' if intermediate else 'elementary',
+            'direction': 'output' if output_group else 'input',
+            'compartment': '/'.join(part for part in compartment if part),
+            'amount': _float(element.get('amount')),
+            'unit': unit,
+            # Output group 0 is the reference product
+            'is_reference': intermediate and output_group == '0',
+        }
+
+
+class ILCDReader(ArchiveReader):
+    """ILCD archives: processes and LCIA methods, with flow types read from the flow datasets"""
+    entry_pattern = re.compile(r'(^|/)(processes|lciamethods)/[^/]+\.xml$', re.IGNORECASE)
+    flow_pattern = re.compile(r'(^|/)flows/[^/]+\.xml$', re.IGNORECASE)
+    flow_types = {'elementary flow': 'elementary', 'product flow': 'product', 'waste flow': 'waste'}
+
+    def __init__(self):
+        self.flows: Dict[str, Tuple[str, str]] = {}
+
+    def prepare(self, archive: zipfile.ZipFile) -> None:
+        flows = {}
+        for name in archive.namelist():
+            if not self.flow_pattern.search(name):
+                continue
+            uuid, flow_type, categories = '', '', []
+            with archive.open(name) as stream:
+                for _, element in etree.iterparse(stream, events=('end',), remove_comments=True):
+                    tag = _localname(element)
+                    if tag == 'UUID' and not uuid:
+                        uuid = (element.text or '').strip()
+                    elif tag == 'typeOfDataSet':
+                        flow_type = self.flow_types.get((element.text or '').strip().lower(), 'product')
+                    elif tag == 'category' and _localname(element.getparent()) == 'elementaryFlowCategorization':
+                        categories.append((element.text or '').strip())
+            if uuid:
+                flows[uuid] = (flow_type or 'product', '/'.join(categories))
+        self.flows = flows
+        logger.info(f"Loaded {len(flows)} ILCD flow datasets")
+
+    def parse(self, name: str, stream: IO[bytes]) -> Iterator[Parsed]:
+        if re.search(r'(^|/)lciamethods/', name, re.IGNORECASE):
+            yield from self._parse_method(stream)
+        else:
+            yield from self._parse_process(name, stream)
+
+    def _flow_reference(self, element) -> Tuple[str, str]:
+        for child in element:
+            if _localname(child) == 'referenceToFlowDataSet':
+                return child.get('refObjectId', ''), _child_text(child, 'shortDescription')
+        return '', ''
+
+    def _parse_process(self, name: str, stream: IO[bytes]) -> Iterator[Parsed]:
+        process = ParsedProcess(external_id=PurePosixPath(name).stem)
+        reference_ids = set()
+        exchange_ids = []
+        for _, element in etree.iterparse(stream, events=('end',), remove_comments=True, huge_tree=True):
+            tag = _localname(element)
+            parent = element.getparent()
+            parent_tag = _localname(parent) if parent is not None else ''
+            if tag == 'UUID' and parent_tag == 'dataSetInformation':
+                process.external_id = (element.text or '').strip() or process.external_id
+            elif tag == 'baseName' and parent_tag == 'name' and not process.name:
+                process.name = (element.text or '').strip()
+            elif tag == 'referenceToReferenceFlow':
+                reference_ids.add((element.text or '').strip())
+            elif tag == 'locationOfOperationSupplyOrProduction':
+                process.location = element.get('location', '')
+            elif tag == 'exchange':
+                flow_id, flow_name = self._flow_reference(element)
+                flow_type, compartment = self.flows.get(flow_id, ('product', ''))
+                amount = _child_text(element, 'resultingAmount') or _child_text(element, 'meanAmount')
+                exchange_ids.append(element.get('dataSetInternalID', ''))
+                process.exchanges.append({
+                    'flow_id': flow_id,
+                    'flow_name': flow_name,
+                    'flow_type': flow_type,
+                    'direction': 'input' if _child_text(element, 'exchangeDirection').lower() == 'input' else 'output',
+                    'compartment': compartment,
+                    'amount': _float(amount),
+                    'unit': '',
+                    'is_reference': False,
+                })
+                _release(element)
+        # The quantitative reference is declared before the exchanges it names
+        for internal_id, exchange in zip(exchange_ids, process.exchanges):
+            if internal_id in reference_ids:
+                exchange['is_reference'] = True
+                if not process.reference_product:
+                    process.reference_product = exchange['flow_name']
+                    process.reference_amount = exchange['amount']
+        yield process
+
+    def _parse_method(self, stream: IO[bytes]) -> Iterator[Parsed]:
+        method = ParsedFactors(method='', category='')
+        for _, element in etree.iterparse(stream, events=('end',), remove_comments=True, huge_tree=True):
+            tag = _localname(element)
+            parent = element.getparent()
+            parent_tag = _localname(parent) if parent is not None else ''
+            if tag == 'name' and parent_tag == 'dataSetInformation' and not method.method:
+                method.method = (element.text or '').strip()
+            elif tag == 'impactCategory' and not method.category:
+                method.category = (element.text or '').strip()
+            elif tag == 'shortDescription' and parent_tag == 'referenceQuantity':
+                method.unit = (element.text or '').strip()
+            elif tag == 'factor':
+                flow_id, flow_name = self._flow_reference(element)
+                method.factors.append({
+                    'flow_id': flow_id,
+                    'flow_name': flow_name,
+                    'compartment': self.flows.get(flow_id, ('', ''))[1],
+                    'factor': _float(_child_text(element, 'meanValue')),
+                })
+                _release(element)
+        method.category = method.category or method.method
+        yield method
+
+
+class JSONLDReader(ArchiveReader):
+    """openLCA JSON-LD archives (one JSON document per entity)"""
+    entry_pattern = re.compile(r'(^|/)(processes|lcia_categories)/[^/]+\.json$', re.IGNORECASE)
+    method_pattern = re.compile(r'(^|/)lcia_methods/[^/]+\.json$', re.IGNORECASE)
+    flow_types = {'ELEMENTARY_FLOW': 'elementary', 'PRODUCT_FLOW': 'product', 'WASTE_FLOW': 'waste'}
+
+    def __init__(self):
+        self.methods: Dict[str, str] = {}
+
+    def prepare(self, archive: zipfile.ZipFile) -> None:
+        # Categories do not name their method; methods list their categories
+        methods = {}
+        for name in archive.namelist():
+            if self.method_pattern.search(name):
+                with archive.open(name) as stream:
+                    method = json.load(stream)
+                for category in method.get('impactCategories') or []:
+                    methods[category.get('@id', '')] = method.get('name', '')
+        self.methods = methods
+
+    @staticmethod
+    def _compartment(flow: Dict[str, Any]) -> str:
+        category = flow.get('category')
+        if isinstance(category, str):
+            return category
+        return '/'.join(flow.get('categoryPath') or [])
+
+    def parse(self, name: str, stream: IO[bytes]) -> Iterator[Parsed]:
+        document = json.load(stream)
+        if re.search(r'(^|/)lcia_categories/', name, re.IGNORECASE):
+            category_id = document.get('@id', '')
+            category = document.get('name', '')
+            yield ParsedFactors(
+                method=self.methods.get(category_id) or category,
+                category=category,
+                unit=document.get('referenceUnitName', '') or '',
+                factors=[
+                    {
+                        'flow_id': (factor.get('flow') or {}).get('@id', ''),
+                        'flow_name': (factor.get('flow') or {}).get('name', ''),
+                        'compartment': self._compartment(factor.get('flow') or {}),
+                        'factor': _float(factor.get('value')),
+                    }
+                    for factor in document.get('impactFactors') or []
+                ],
+            )
+            return
+
+        location = document.get('location') or {}
+        process = ParsedProcess(
+            external_id=document.get('@id') or PurePosixPath(name).stem,
+            name=document.get('name', ''),
+            location=location.get('code') or location.get('name', '') if isinstance(location, dict) else '',
+        )
+        for exchange in document.get('exchanges') or []:
+            flow = exchange.get('flow') or {}
+            parsed = {
+                'flow_id': flow.get('@id', ''),
+                'flow_name': flow.get('name', ''),
+                'flow_type': self.flow_types.get(flow.get('flowType'), 'product'),
+                'direction': 'input' if exchange.get('isInput') else 'output',
+                'compartment': self._compartment(flow),
+                'amount': _float(exchange.get('amount')),
+                'unit': (exchange.get('unit') or {}).get('name', ''),
+                'is_reference': bool(exchange.get('isQuantitativeReference')),
+            }
+            process.exchanges.append(parsed)
+            if parsed['is_reference'] and not process.reference_product:
+                process.reference_product = parsed['flow_name']
+                process.reference_amount = parsed['amount']
+                process.reference_unit = parsed['unit']
+        yield process
+
+
+ARCHIVE_READERS = {
+    'ecospold2': EcoSpold2Reader,
+    'ilcd': ILCDReader,
+    'json_ld': JSONLDReader,
+}
+
+
+def detect_format(archive: zipfile.ZipFile) -> Optional[str]:
+    names = archive.namelist()
+    if any(EcoSpold2Reader.entry_pattern.search(name) for name in names):
+        return 'ecospold2'
+    if any(ILCDReader.entry_pattern.search(name) for name in names):
+        return 'ilcd'
+    if any(JSONLDReader.entry_pattern.search(name) for name in names):
+        return 'json_ld'
+    return None
+
+
+def file_checksum(path: str, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _clip(value: str, model, field_name: str) -> str:
+    return (value or '')[:model._meta.get_field(field_name).max_length]
+
+
+class BackgroundImporter:
+    """Streams an archive into the background database tables, resumably.
+
+    Entries are parsed one at a time with ``iterparse`` and buffered until
+    ``batch_size`` exchange/factor rows are pending. Each buffer is written
+    with bulk upserts in one transaction that also advances the job's
+    ``completed_entries``, so an interrupted import resumes after the last
+    committed entry and memory stays bounded by the batch size.
+    """
+
+    def __init__(self, job: ImportJob, batch_size: Optional[int] = None):
+        self.job = job
+        self.batch_size = batch_size or _config.get('BATCH_SIZE', 20000)
+        self._processes: List[ParsedProcess] = []
+        self._factors: List[ParsedFactors] = []
+        self._pending_rows = 0
+
+    def run(self) -> ImportJob:
+        job = self.job
+        checksum = file_checksum(job.archive_path)
+        if job.completed_entries and job.archive_checksum != checksum:
+            logger.warning(f"Archive for import {job.pk} changed since it was interrupted; starting over")
+            job.completed_entries = job.process_count = job.exchange_count = job.factor_count = 0
+        job.archive_checksum = checksum
+        job.status = 'running'
+        job.error_message = ''
+        job.started_at = job.started_at or timezone.now()
+        job.save(update_fields=[
+            'archive_checksum', 'status', 'error_message', 'started_at',
+            'completed_entries', 'process_count', 'exchange_count', 'factor_count',
+        ])
+
+        try:
+            with zipfile.ZipFile(job.archive_path) as archive:
+                file_format = job.file_format or detect_format(archive)
+                if file_format not in ARCHIVE_READERS:
+                    raise ValueError('Archive is not an EcoSpold 2, ILCD or JSON-LD export')
+                reader = ARCHIVE_READERS[file_format]()
+                reader.prepare(archive)
+                entries = reader.entries(archive)
+                job.file_format = file_format
+                job.total_entries = len(entries)
+                job.save(update_fields=['file_format', 'total_entries'])
+                if job.completed_entries:
+                    logger.info(f"Resuming import {job.pk} at entry {job.completed_entries} of {len(entries)}")
+
+                for position in range(job.completed_entries, len(entries)):
+                    with archive.open(entries[position]) as stream:
+                        for parsed in reader.parse(entries[position], stream):
+                            self._add(parsed)
+                    if self._pending_rows >= self.batch_size:
+                        self._flush(position + 1)
+                self._flush(len(entries))
+        except Exception as e:
+            job.status = 'failed'
+            job.error_message = str(e)
+            job.save(update_fields=['status', 'error_message'])
+            logger.error(f"Import {job.pk} failed after {job.completed_entries} entries: {str(e)}")
+            raise
+
+        job.status = 'completed'
+        job.completed_at = timezone.now()
+        job.save(update_fields=['status', 'completed_at'])
+        logger.info(
+            f"Imported {job.process_count} processes, {job.exchange_count} exchanges and "
+            f"{job.factor_count} characterization factors into {job.source.name}"
+        )
+        return job
+
+    def _add(self, parsed: Parsed) -> None:
+        if isinstance(parsed, ParsedProcess):
+            self._processes.append(parsed)
+            self._pending_rows += len(parsed.exchanges) + 1
+        else:
+            self._factors.append(parsed)
+            self._pending_rows += len(parsed.factors)
+
+    def _flush(self, completed_entries: int) -> None:
+        job = self.job
+        with transaction.atomic():
+            process_count, exchange_count = self._write_processes()
+            factor_count = self._write_factors()
+            job.completed_entries = completed_entries
+            job.process_count += process_count
+            job.exchange_count += exchange_count
+            job.factor_count += factor_count
+            job.save(update_fields=['completed_entries', 'process_count', 'exchange_count', 'factor_count'])
+        self._processes, self._factors, self._pending_rows = [], [], 0
+
+    def _write_processes(self) -> Tuple[int, int]:
+        if not self._processes:
+            return 0, 0
+        source_id = self.job.source_id
+        # The last occurrence wins when an archive repeats a dataset
+        processes = {process.external_id: process for process in self._processes}
+        BackgroundProcess.objects.bulk_create(
+            [
+                BackgroundProcess(
+                    source_id=source_id,
+                    external_id=_clip(process.external_id, BackgroundProcess, 'external_id'),
+                    name=_clip(process.name, BackgroundProcess, 'name'),
+                    location=_clip(process.location, BackgroundProcess, 'location'),
+                    reference_product=_clip(process.reference_product, BackgroundProcess, 'reference_product'),
+                    reference_amount=process.reference_amount,
+                    reference_unit=_clip(process.reference_unit, BackgroundProcess, 'reference_unit'),
+                )
+                for process in processes.values()
+            ],
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['source', 'external_id'],
+            update_fields=['name', 'location', 'reference_product', 'reference_amount', 'reference_unit', 'updated_at'],
+        )
+        ids = dict(BackgroundProcess.objects.filter(
+            source_id=source_id, external_id__in=[_clip(key, BackgroundProcess, 'external_id') for key in processes]
+        ).values_list('external_id', 'id'))
+        # Re-imported processes replace their exchanges
+        BackgroundExchange.objects.filter(process_id__in=list(ids.values())).delete()
+        exchanges = [
+            BackgroundExchange(
+                process_id=ids[_clip(process.external_id, BackgroundProcess, 'external_id')],
+                flow_id=_clip(exchange['flow_id'], BackgroundExchange, 'flow_id'),
+                flow_name=_clip(exchange['flow_name'], BackgroundExchange, 'flow_name'),
+                flow_type=exchange['flow_type'],
+                direction=exchange['direction'],
+                compartment=_clip(exchange['compartment'], BackgroundExchange, 'compartment'),
+                amount=exchange['amount'],
+                unit=_clip(exchange['unit'], BackgroundExchange, 'unit'),
+                is_reference=exchange['is_reference'],
+            )
+            for process in processes.values()
+            for exchange in process.exchanges
+        ]
+        BackgroundExchange.objects.bulk_create(exchanges, batch_size=5000)
+        return len(processes), len(exchanges)
+
+    def _write_factors(self) -> int:
+        if not self._factors:
+            return 0
+        rows = {}
+        for category in self._factors:
+            method = _clip(category.method, CharacterizationFactor, 'method')
+            name = _clip(category.category, CharacterizationFactor, 'category')
+            for factor in category.factors:
+                flow_id = _clip(factor['flow_id'], CharacterizationFactor, 'flow_id')
+                rows[(method, name, flow_id)] = CharacterizationFactor(
+                    source_id=self.job.source_id,
+                    method=method,
+                    category=name,
+                    category_unit=_clip(category.unit, CharacterizationFactor, 'category_unit'),
+                    flow_id=flow_id,
+                    flow_name=_clip(factor['flow_name'], CharacterizationFactor, 'flow_name'),
+                    compartment=_clip(factor['compartment'], CharacterizationFactor, 'compartment'),
+                    factor=factor['factor'],
+                )
+        CharacterizationFactor.objects.bulk_create(
+            list(rows.values()),
+            batch_size=5000,
+            update_conflicts=True,
+            unique_fields=['source', 'method', 'category', 'flow_id'],
+            update_fields=['category_unit', 'flow_name', 'compartment', 'factor'],
+        )
+        return len(rows)
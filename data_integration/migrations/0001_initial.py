@@ -0,0 +1,125 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:06
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataSource',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=200, unique=True)),
+                ('source_type', models.CharField(choices=[('ecospold2', 'EcoSpold 2 archive'), ('ilcd', 'ILCD archive'), ('json_ld', 'openLCA JSON-LD archive')], max_length=20)),
+                ('version', models.CharField(blank=True, max_length=50)),
+                ('description', models.TextField(blank=True)),
+                ('config', models.JSONField(blank=True, default=dict, help_text='Source-specific options')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('archive_path', models.CharField(max_length=500)),
+                ('archive_checksum', models.CharField(blank=True, help_text='SHA-256 of the archive', max_length=64)),
+                ('file_format', models.CharField(blank=True, choices=[('ecospold2', 'EcoSpold 2 archive'), ('ilcd', 'ILCD archive'), ('json_ld', 'openLCA JSON-LD archive')], max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('total_entries', models.PositiveIntegerField(default=0)),
+                ('completed_entries', models.PositiveIntegerField(default=0)),
+                ('process_count', models.PositiveIntegerField(default=0)),
+                ('exchange_count', models.PositiveIntegerField(default=0)),
+                ('factor_count', models.PositiveIntegerField(default=0)),
+                ('error_message', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='imports', to='data_integration.datasource')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BackgroundProcess',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('external_id', models.CharField(help_text='Dataset UUID in the source', max_length=100)),
+                ('name', models.CharField(max_length=500)),
+                ('location', models.CharField(blank=True, max_length=100)),
+                ('reference_product', models.CharField(blank=True, max_length=500)),
+                ('reference_amount', models.FloatField(default=1.0)),
+                ('reference_unit', models.CharField(blank=True, max_length=50)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='processes', to='data_integration.datasource')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BackgroundExchange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('flow_id', models.CharField(max_length=100)),
+                ('flow_name', models.CharField(max_length=500)),
+                ('flow_type', models.CharField(choices=[('product', 'Product'), ('elementary', 'Elementary'), ('waste', 'Waste')], max_length=20)),
+                ('direction', models.CharField(choices=[('input', 'Input'), ('output', 'Output')], max_length=10)),
+                ('compartment', models.CharField(blank=True, max_length=200)),
+                ('amount', models.FloatField()),
+                ('unit', models.CharField(blank=True, max_length=50)),
+                ('is_reference', models.BooleanField(default=False)),
+                ('process', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exchanges', to='data_integration.backgroundprocess')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CharacterizationFactor',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('method', models.CharField(max_length=200)),
+                ('category', models.CharField(max_length=200)),
+                ('category_unit', models.CharField(blank=True, max_length=50)),
+                ('flow_id', models.CharField(max_length=100)),
+                ('flow_name', models.CharField(blank=True, max_length=500)),
+                ('compartment', models.CharField(blank=True, max_length=200)),
+                ('factor', models.FloatField()),
+                ('source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='characterization_factors', to='data_integration.datasource')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['flow_id'], name='di_factor_flow'), models.Index(fields=['source', 'method', 'category'], name='di_factor_category')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='characterizationfactor',
+            constraint=models.UniqueConstraint(fields=('source', 'method', 'category', 'flow_id'), name='di_factor_unique_flow'),
+        ),
+        migrations.AddIndex(
+            model_name='backgroundprocess',
+            index=models.Index(fields=['source', 'name'], name='di_process_source_name'),
+        ),
+        migrations.AddIndex(
+            model_name='backgroundprocess',
+            index=models.Index(fields=['reference_product'], name='di_process_product'),
+        ),
+        migrations.AddConstraint(
+            model_name='backgroundprocess',
+            constraint=models.UniqueConstraint(fields=('source', 'external_id'), name='di_process_unique_external_id'),
+        ),
+        migrations.AddIndex(
+            model_name='backgroundexchange',
+            index=models.Index(fields=['flow_id'], name='di_exchange_flow'),
+        ),
+    ]
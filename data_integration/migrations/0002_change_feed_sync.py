@@ -0,0 +1,56 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_integration', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datasource',
+            name='last_synced_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='datasource',
+            name='pending_invalidation',
+            field=models.JSONField(blank=True, default=dict, help_text='Changed material and process names whose users are not yet invalidated'),
+        ),
+        migrations.AddField(
+            model_name='datasource',
+            name='sync_checkpoint',
+            field=models.CharField(blank=True, max_length=200),
+        ),
+        migrations.AlterField(
+            model_name='datasource',
+            name='source_type',
+            field=models.CharField(choices=[('ecospold2', 'EcoSpold 2 archive'), ('ilcd', 'ILCD archive'), ('json_ld', 'openLCA JSON-LD archive'), ('file_drop', 'Change feed directory'), ('http', 'Change feed URL')], max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='importjob',
+            name='file_format',
+            field=models.CharField(blank=True, choices=[('ecospold2', 'EcoSpold 2 archive'), ('ilcd', 'ILCD archive'), ('json_ld', 'openLCA JSON-LD archive'), ('file_drop', 'Change feed directory'), ('http', 'Change feed URL')], max_length=20),
+        ),
+        migrations.CreateModel(
+            name='SyncRecord',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('model_type', models.CharField(choices=[('material', 'Material'), ('material_property', 'Material Property'), ('process', 'Process')], max_length=20)),
+                ('key', models.CharField(help_text='Natural key, e.g. material name', max_length=500)),
+                ('version', models.BigIntegerField(blank=True, null=True)),
+                ('content_hash', models.CharField(max_length=64)),
+                ('deleted', models.BooleanField(default=False)),
+                ('synced_at', models.DateTimeField(auto_now=True)),
+                ('source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sync_records', to='data_integration.datasource')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='syncrecord',
+            constraint=models.UniqueConstraint(fields=('source', 'model_type', 'key'), name='di_sync_unique_record'),
+        ),
+    ]
@@ -0,0 +1,186 @@
+from django.db import models
+from django.contrib.auth.models import User
+import uuid
+
+
+class DataSource(models.Model):
+    """External LCA database or service that data is imported from"""
+    SOURCE_TYPES = [
+        ('ecospold2', 'EcoSpold 2 archive'),
+        ('ilcd', 'ILCD archive'),
+        ('json_ld', 'openLCA JSON-LD archive'),
+        ('file_drop', 'Change feed directory'),
+        ('http', 'Change feed URL'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    name = models.CharField(max_length=200, unique=True)
+    source_type = models.CharField(max_length=20, choices=SOURCE_TYPES)
+    version = models.CharField(max_length=50, blank=True)
+    description = models.TextField(blank=True)
+    config = models.JSONField(default=dict, blank=True, help_text="Source-specific options")
+
+    # Change feeds: position of the last applied change
+    sync_checkpoint = models.CharField(max_length=200, blank=True)
+    last_synced_at = models.DateTimeField(null=True, blank=True)
+    pending_invalidation = models.JSONField(
+        default=dict, blank=True, help_text="Changed material and process names whose users are not yet invalidated"
+    )
+
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return f"{self.name} ({self.source_type})"
+
+
+class ImportJob(models.Model):
+    """Import of one archive into the background database, resumable by entry position"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    source = models.ForeignKey(DataSource, on_delete=models.CASCADE, related_name='imports')
+    archive_path = models.CharField(max_length=500)
+    archive_checksum = models.CharField(max_length=64, blank=True, help_text="SHA-256 of the archive")
+    file_format = models.CharField(max_length=20, choices=DataSource.SOURCE_TYPES, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+
+    # Progress: archive entries are imported in name order, so the number of
+    # committed entries is enough to resume
+    total_entries = models.PositiveIntegerField(default=0)
+    completed_entries = models.PositiveIntegerField(default=0)
+    process_count = models.PositiveIntegerField(default=0)
+    exchange_count = models.PositiveIntegerField(default=0)
+    factor_count = models.PositiveIntegerField(default=0)
+    error_message = models.TextField(blank=True)
+
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.source.name} import ({self.status})"
+
+
+class BackgroundProcess(models.Model):
+    """Unit process of an imported background database"""
+    id = models.BigAutoField(primary_key=True)
+    source = models.ForeignKey(DataSource, on_delete=models.CASCADE, related_name='processes')
+    external_id = models.CharField(max_length=100, help_text="Dataset UUID in the source")
+    name = models.CharField(max_length=500)
+    location = models.CharField(max_length=100, blank=True)
+    reference_product = models.CharField(max_length=500, blank=True)
+    reference_amount = models.FloatField(default=1.0)
+    reference_unit = models.CharField(max_length=50, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['source', 'name'], name='di_process_source_name'),
+            models.Index(fields=['reference_product'], name='di_process_product'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'external_id'], name='di_process_unique_external_id'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} [{self.location}]" if self.location else self.name
+
+
+class BackgroundExchange(models.Model):
+    """Input or output flow of a background process"""
+    DIRECTIONS = [
+        ('input', 'Input'),
+        ('output', 'Output'),
+    ]
+
+    FLOW_TYPES = [
+        ('product', 'Product'),
+        ('elementary', 'Elementary'),
+        ('waste', 'Waste'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    process = models.ForeignKey(BackgroundProcess, on_delete=models.CASCADE, related_name='exchanges')
+    flow_id = models.CharField(max_length=100)
+    flow_name = models.CharField(max_length=500)
+    flow_type = models.CharField(max_length=20, choices=FLOW_TYPES)
+    direction = models.CharField(max_length=10, choices=DIRECTIONS)
+    compartment = models.CharField(max_length=200, blank=True)
+    amount = models.FloatField()
+    unit = models.CharField(max_length=50, blank=True)
+    is_reference = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['flow_id'], name='di_exchange_flow'),
+        ]
+
+    def __str__(self):
+        return f"{self.direction} {self.amount} {self.unit} {self.flow_name}"
+
+
+class CharacterizationFactor(models.Model):
+    """Impact per unit of an elementary flow in one LCIA category"""
+    id = models.BigAutoField(primary_key=True)
+    source = models.ForeignKey(DataSource, on_delete=models.CASCADE, related_name='characterization_factors')
+    method = models.CharField(max_length=200)
+    category = models.CharField(max_length=200)
+    category_unit = models.CharField(max_length=50, blank=True)
+    flow_id = models.CharField(max_length=100)
+    flow_name = models.CharField(max_length=500, blank=True)
+    compartment = models.CharField(max_length=200, blank=True)
+    factor = models.FloatField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['flow_id'], name='di_factor_flow'),
+            models.Index(fields=['source', 'method', 'category'], name='di_factor_category'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['source', 'method', 'category', 'flow_id'], name='di_factor_unique_flow'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.category}: {self.flow_name} = {self.factor}"
+
+
+class SyncRecord(models.Model):
+    """Upstream version and content hash of a library record synced from a change feed"""
+    MODEL_TYPES = [
+        ('material', 'Material'),
+        ('material_property', 'Material Property'),
+        ('process', 'Process'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    source = models.ForeignKey(DataSource, on_delete=models.CASCADE, related_name='sync_records')
+    model_type = models.CharField(max_length=20, choices=MODEL_TYPES)
+    key = models.CharField(max_length=500, help_text="Natural key, e.g. material name")
+    version = models.BigIntegerField(null=True, blank=True)
+    content_hash = models.CharField(max_length=64)
+    deleted = models.BooleanField(default=False)
+    synced_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'model_type', 'key'], name='di_sync_unique_record'),
+        ]
+
+    def __str__(self):
+        return f"{self.model_type} {self.key} v{self.version}"
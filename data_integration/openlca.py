@@ -0,0 +1,283 @@
+import hashlib
+import http.client
+import itertools
+import json
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+_config = getattr(settings, 'OPENLCA', {})
+
+# Connection failures that mean the pooled socket went stale, not that the server is down
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError)
+
+
+class OpenLCAError(Exception):
+    """The openLCA server rejected a request or a calculation failed"""
+
+
+class OpenLCAUnavailable(OpenLCAError):
+    """The openLCA server cannot be reached"""
+
+
+class ConnectionPool:
+    """Keep-alive HTTP connections to one server, shared between threads"""
+
+    def __init__(self, host: str, port: int, size: int = 4, timeout: float = 30.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._idle: queue.LifoQueue = queue.LifoQueue(maxsize=size)
+
+    def _connection(self) -> http.client.HTTPConnection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _release(self, connection: http.client.HTTPConnection) -> None:
+        try:
+            self._idle.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def post(self, body: bytes) -> bytes:
+        for attempt in range(2):
+            connection = self._connection()
+            try:
+                connection.request('POST', '/', body=body, headers={
+                    'Content-Type': 'application/json', 'Connection': 'keep-alive',
+                })
+                response = connection.getresponse()
+                data = response.read()
+            except STALE_CONNECTION_ERRORS:
+                connection.close()
+                if attempt:
+                    raise
+                continue
+            except Exception:
+                connection.close()
+                raise
+            if response.status >= 500:
+                connection.close()
+                raise OpenLCAError(f"openLCA server returned HTTP {response.status}")
+            self._release(connection)
+            return data
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class OpenLCAClient:
+    """JSON-RPC client for an openLCA 2 IPC server.
+
+    Connections are pooled and reused. After a connection failure the
+    client reports the server unavailable for ``retry_interval`` seconds
+    instead of waiting on a timeout for every call.
+    """
+
+    def __init__(self, host: Optional[str] = None, port: Optional[int] = None, pool_size: Optional[int] = None,
+                 timeout: Optional[float] = None, retry_interval: Optional[float] = None):
+        self.host = host or getattr(settings, 'OPENLCA_HOST', 'localhost')
+        self.port = int(port or getattr(settings, 'OPENLCA_PORT', 8080))
+        self.pool_size = pool_size or _config.get('POOL_SIZE', 4)
+        self.pool = ConnectionPool(self.host, self.port, self.pool_size, timeout or _config.get('TIMEOUT', 30.0))
+        self.retry_interval = retry_interval if retry_interval is not None else _config.get('RETRY_INTERVAL', 30.0)
+        self._ids = itertools.count(1)
+        self._unavailable_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self._unavailable_until
+
+    def call(self, method: str, params: Any = None) -> Any:
+        if not self.available:
+            raise OpenLCAUnavailable(f"openLCA at {self.host}:{self.port} is unavailable")
+        with self._lock:
+            request_id = next(self._ids)
+        body = json.dumps({'jsonrpc': '2.0', 'id': request_id, 'method': method, 'params': params}).encode()
+        try:
+            data = self.pool.post(body)
+        except (OSError, http.client.HTTPException) as e:
+            self._unavailable_until = time.monotonic() + self.retry_interval
+            logger.warning(f"openLCA at {self.host}:{self.port} unreachable: {str(e)}")
+            raise OpenLCAUnavailable(str(e)) from e
+        try:
+            message = json.loads(data)
+        except ValueError as e:
+            raise OpenLCAError(f"Invalid response to {method}") from e
+        if message.get('error'):
+            error = message['error']
+            raise OpenLCAError(error.get('message', str(error)) if isinstance(error, dict) else str(error))
+        return message.get('result')
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+def _result_key(product_system: str, impact_method: str, parameters: Dict[str, float], amount: Optional[float]) -> str:
+    payload = json.dumps([product_system, impact_method, sorted(parameters.items()), amount])
+    return f"openlca:result:{hashlib.sha256(payload.encode()).hexdigest()[:32]}"
+
+
+class OpenLCAService:
+    """Batched product-system calculations with cached results.
+
+    A batch submits every uncached calculation, waits for all of them, then
+    reads their total impacts and disposes them on the server, spreading
+    the calls over the pooled connections. Results are cached per product
+    system, impact method, parameter set and amount. When openLCA is
+    unreachable, cached results are still returned and the rest are marked
+    unavailable instead of failing the whole batch.
+    """
+
+    def __init__(self, client: Optional[OpenLCAClient] = None, cache_timeout: Optional[int] = None,
+                 poll_interval: Optional[float] = None, max_wait: Optional[float] = None):
+        self.client = client or get_client()
+        self.cache_timeout = cache_timeout if cache_timeout is not None else _config.get('CACHE_TIMEOUT', 24 * 60 * 60)
+        self.poll_interval = poll_interval or _config.get('POLL_INTERVAL', 0.2)
+        self.max_wait = max_wait or _config.get('MAX_WAIT', 600.0)
+
+    @staticmethod
+    def _normalise(request: Dict[str, Any]) -> Dict[str, Any]:
+        if not request.get('product_system'):
+            raise ValueError('product_system is required')
+        parameters = request.get('parameters') or {}
+        if not isinstance(parameters, dict):
+            raise ValueError('parameters must map parameter names to values')
+        amount = request.get('amount')
+        return {
+            'product_system': str(request['product_system']),
+            'impact_method': str(request.get('impact_method') or _config.get('DEFAULT_IMPACT_METHOD', '')),
+            'parameters': {str(name): float(value) for name, value in parameters.items()},
+            'amount': float(amount) if amount is not None else None,
+        }
+
+    @staticmethod
+    def _setup(request: Dict[str, Any]) -> Dict[str, Any]:
+        setup = {
+            '@type': 'CalculationSetup',
+            'target': {'@type': 'ProductSystem', '@id': request['product_system']},
+            'parameters': [
+                {'@type': 'ParameterRedef', 'name': name, 'value': value}
+                for name, value in request['parameters'].items()
+            ],
+        }
+        if request['impact_method']:
+            setup['impactMethod'] = {'@type': 'ImpactMethod', '@id': request['impact_method']}
+        if request['amount'] is not None:
+            setup['amount'] = request['amount']
+        return setup
+
+    def calculate(self, product_system: str, impact_method: str = '', parameters: Optional[Dict[str, float]] = None,
+                  amount: Optional[float] = None) -> Dict[str, Any]:
+        result = self.calculate_many([{
+            'product_system': product_system, 'impact_method': impact_method,
+            'parameters': parameters, 'amount': amount,
+        }])[0]
+        if result['status'] == 'unavailable':
+            raise OpenLCAUnavailable(result['error'])
+        if result['status'] == 'failed':
+            raise OpenLCAError(result['error'])
+        return result
+
+    def calculate_many(self, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """One result per request: status completed/failed/unavailable, impacts and whether it was cached"""
+        normalised = [self._normalise(request) for request in requests]
+        keys = [_result_key(**request) for request in normalised]
+        cached = cache.get_many(keys)
+        results: List[Optional[Dict[str, Any]]] = [None] * len(requests)
+        pending = {}
+        for position, (request, key) in enumerate(zip(normalised, keys)):
+            if key in cached:
+                results[position] = dict(cached[key], cached=True)
+            else:
+                # Identical requests in one batch are calculated once
+                pending.setdefault(key, (request, []))[1].append(position)
+
+        if pending:
+            computed = self._run(list(pending.values()))
+            cache.set_many(
+                {key: result for key, result in zip(pending, computed) if result['status'] == 'completed'},
+                self.cache_timeout,
+            )
+            for (_, positions), result in zip(pending.values(), computed):
+                for position in positions:
+                    results[position] = dict(result, cached=False)
+        logger.info(f"openLCA batch of {len(requests)} calculations: {len(pending)} calculated")
+        return results
+
+    def _run(self, batch: List[Any]) -> List[Dict[str, Any]]:
+        def unavailable(request, message):
+            return {'product_system': request['product_system'], 'status': 'unavailable', 'impacts': {}, 'error': message}
+
+        if not self.client.available:
+            return [unavailable(request, 'openLCA is unavailable') for request, _ in batch]
+
+        with ThreadPoolExecutor(max_workers=self.client.pool_size) as executor:
+            submitted = list(executor.map(self._submit, [request for request, _ in batch]))
+            return list(executor.map(self._collect, [request for request, _ in batch], submitted))
+
+    def _submit(self, request: Dict[str, Any]) -> Any:
+        try:
+            return self.client.call('result/calculate', self._setup(request))
+        except OpenLCAError as e:
+            return e
+
+    def _collect(self, request: Dict[str, Any], state: Any) -> Dict[str, Any]:
+        result = {'product_system': request['product_system'], 'status': 'completed', 'impacts': {}, 'error': ''}
+        if isinstance(state, OpenLCAError):
+            result.update(status='unavailable' if isinstance(state, OpenLCAUnavailable) else 'failed', error=str(state))
+            return result
+        state = state or {}
+        result_id = state.get('@id')
+        try:
+            deadline = time.monotonic() + self.max_wait
+            while not state.get('isReady') and not state.get('error'):
+                if time.monotonic() > deadline:
+                    raise OpenLCAError('Calculation timed out')
+                time.sleep(self.poll_interval)
+                state = self.client.call('result/state', {'@id': result_id})
+            if state.get('error'):
+                raise OpenLCAError(state['error'])
+            for value in self.client.call('result/total-impacts', {'@id': result_id}) or []:
+                category = value.get('impactCategory') or {}
+                result['impacts'][category.get('name') or category.get('@id', '')] = {
+                    'value': value.get('amount', 0.0),
+                    'unit': category.get('refUnit', ''),
+                }
+        except OpenLCAError as e:
+            result.update(status='unavailable' if isinstance(e, OpenLCAUnavailable) else 'failed', error=str(e))
+        finally:
+            if result_id and self.client.available:
+                try:
+                    self.client.call('result/dispose', {'@id': result_id})
+                except OpenLCAError as e:
+                    logger.warning(f"Could not dispose openLCA result {result_id}: {str(e)}")
+        return result
+
+
+_client: Optional[OpenLCAClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> OpenLCAClient:
+    """Process-wide client, so every caller shares one connection pool"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = OpenLCAClient()
+        return _client
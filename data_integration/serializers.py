@@ -0,0 +1,35 @@
+from rest_framework import serializers
+from .models import DataSource, ImportJob
+
+
+class DataSourceSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DataSource
+        fields = [
+            'id', 'name', 'source_type', 'version', 'description', 'config',
+            'sync_checkpoint', 'last_synced_at', 'created_at', 'updated_at',
+        ]
+        read_only_fields = ['id', 'sync_checkpoint', 'last_synced_at', 'created_at', 'updated_at']
+
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    source = serializers.PrimaryKeyRelatedField(queryset=DataSource.objects.all())
+    archive = serializers.FileField(write_only=True, required=False)
+    path = serializers.CharField(write_only=True, required=False)
+    
+    class Meta:
+        model = ImportJob
+        fields = [
+            'id', 'source', 'archive', 'path', 'file_format', 'status', 'total_entries', 'completed_entries',
+            'process_count', 'exchange_count', 'factor_count', 'error_message',
+            'created_at', 'started_at', 'completed_at',
+        ]
+        read_only_fields = [
+            'id', 'status', 'total_entries', 'completed_entries', 'process_count', 'exchange_count',
+            'factor_count', 'error_message', 'created_at', 'started_at', 'completed_at',
+        ]
+    
+    def validate(self, attrs):
+        if bool(attrs.get('archive')) == bool(attrs.get('path')):
+            raise serializers.ValidationError('Upload an "archive" or give the "path" of one on the server')
+        return attrs
@@ -0,0 +1,430 @@
+import hashlib
+import json
+import logging
+import re
+import urllib.parse
+import urllib.request
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Any, Iterator, Optional, Set, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import DataSource, SyncRecord
+
+logger = logging.getLogger(__name__)
+
+_config = getattr(settings, 'DATA_SYNC', {})
+
+# Library fields a change feed may set; a change is a full snapshot, so
+# fields it leaves out are reset to their defaults
+MATERIAL_FIELDS = [
+    'common_names', 'material_type', 'density', 'recyclable', 'recycling_efficiency', 'durability_score',
+    'reusability_potential', 'data_source', 'data_quality_score', 'geographic_scope',
+]
+PROPERTY_FIELDS = ['property_type', 'value', 'unit', 'uncertainty_type', 'uncertainty_value', 'reference', 'year']
+PROCESS_FIELDS = [
+    'description', 'process_type', 'input_materials', 'output_materials', 'energy_requirements', 'impact_factors',
+    'efficiency', 'capacity', 'capacity_unit', 'geographic_scope', 'temporal_scope', 'data_source',
+    'data_quality_score',
+]
+KEY_FIELDS = {
+    'material': ('name',),
+    'material_property': ('material', 'property_name'),
+    'process': ('name',),
+}
+REQUIRED_FIELDS = {
+    'material': ('name', 'material_type', 'density'),
+    'material_property': ('material', 'property_name', 'property_type', 'value', 'unit'),
+    'process': ('name', 'description', 'process_type'),
+}
+CHANGE_FEED_TYPES = ('file_drop', 'http')
+# Material names matched per step query; each adds two LIKE clauses
+MATERIAL_FILTER_SIZE = 100
+
+
+class SyncError(Exception):
+    """A change feed could not be read"""
+
+
+def record_key(model_type: str, data: Dict[str, Any]) -> str:
+    """Natural key of a library record: its name, or material|property|scope for properties"""
+    if model_type == 'material_property':
+        return f"{data['material']}|{data['property_name']}|{data.get('geographic_scope') or 'Global'}"
+    return str(data['name'])
+
+
+def json_pattern(name: str) -> str:
+    """Longest run of a name that appears verbatim in any JSON encoding of it.
+
+    Non-ASCII characters, quotes and backslashes may be escaped in the
+    stored JSON, so they split the name; an empty pattern matches every row.
+    """
+    return max(re.split(r'[^\x20-\x7e]|["\\]', name), key=len)
+
+
+def content_hash(data: Dict[str, Any], deleted: bool) -> str:
+    payload = json.dumps({'data': data, 'deleted': deleted}, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class FileDropFeed:
+    """Change files (``*.json`` or ``*.jsonl``) dropped into a directory, applied in file name order.
+
+    Name files so they sort in the order they were written, e.g. with a
+    timestamp or sequence prefix; the checkpoint is the last applied file.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+
+    def pages(self, checkpoint: str) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        if not self.directory.is_dir():
+            raise SyncError(f"Change directory {self.directory} does not exist")
+        files = sorted(
+            path for path in self.directory.iterdir()
+            if path.is_file() and path.suffix in ('.json', '.jsonl') and path.name > checkpoint
+        )
+        for path in files:
+            try:
+                with open(path, encoding='utf-8') as handle:
+                    if path.suffix == '.jsonl':
+                        changes = [json.loads(line) for line in handle if line.strip()]
+                    else:
+                        content = json.load(handle)
+                        changes = content.get('changes', []) if isinstance(content, dict) else content
+            except ValueError as e:
+                raise SyncError(f"Invalid change file {path.name}: {str(e)}") from e
+            yield path.name, changes
+
+
+class HTTPFeed:
+    """Paged change feed: ``GET url?since=<checkpoint>&limit=<n>`` returning
+    ``{"changes": [...], "checkpoint": "...", "has_more": bool}``"""
+
+    def __init__(self, url: str, page_size: Optional[int] = None, timeout: Optional[float] = None):
+        self.url = url
+        self.page_size = page_size or _config.get('PAGE_SIZE', 1000)
+        self.timeout = timeout or _config.get('TIMEOUT', 30.0)
+
+    def pages(self, checkpoint: str) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        while True:
+            query = urllib.parse.urlencode({'since': checkpoint, 'limit': self.page_size})
+            separator = '&' if '?' in self.url else '?'
+            try:
+                with urllib.request.urlopen(f"{self.url}{separator}{query}", timeout=self.timeout) as response:
+                    page = json.load(response)
+            except (OSError, ValueError) as e:
+                raise SyncError(f"Could not read change feed {self.url}: {str(e)}") from e
+            changes = page.get('changes') or []
+            next_checkpoint = str(page.get('checkpoint') or checkpoint)
+            if changes or next_checkpoint != checkpoint:
+                yield next_checkpoint, changes
+            if not page.get('has_more') or next_checkpoint == checkpoint:
+                return
+            checkpoint = next_checkpoint
+
+
+def feed_for(source: DataSource):
+    if source.source_type == 'file_drop':
+        root = Path(_config.get('ROOT', settings.MEDIA_ROOT / 'data_sync')).resolve()
+        directory = (root / source.config.get('path', '')).resolve()
+        if not directory.is_relative_to(root):
+            raise SyncError('Change directory must be inside the sync root')
+        return FileDropFeed(directory)
+    if source.source_type == 'http':
+        if not source.config.get('url'):
+            raise SyncError('Source has no change feed url')
+        return HTTPFeed(source.config['url'], source.config.get('page_size'))
+    raise SyncError(f"{source.source_type} sources have no change feed")
+
+
+class ChangeSync:
+    """Incremental sync of the material and process libraries from a change feed.
+
+    Each change carries a model, its record data, an optional upstream
+    ``version`` and a ``deleted`` flag. Records whose content hash matches
+    the last synced one, or whose version is older, are skipped; the rest
+    are written as bulk upserts on their natural keys. A feed page and its
+    checkpoint are committed together, so an interrupted sync resumes after
+    the last committed page.
+
+    Once all pages are applied, the sync invalidates only what the changed
+    records feed into: the calculations whose steps use a changed material
+    or process, which are queued for recalculation. The changed names are
+    saved with each page's checkpoint, so a sync that stops before
+    invalidating leaves them for the next run to invalidate.
+    """
+
+    def __init__(self, source: DataSource, feed=None, batch_size: Optional[int] = None):
+        self.source = source
+        self.feed = feed or feed_for(source)
+        self.batch_size = batch_size or _config.get('BATCH_SIZE', 1000)
+        self.stats: Counter = Counter()
+        self.changed_materials: Set[str] = set()
+        self.changed_processes: Set[str] = set()
+
+    def run(self) -> Dict[str, int]:
+        pending = self.source.pending_invalidation or {}
+        self.changed_materials.update(pending.get('materials', []))
+        self.changed_processes.update(pending.get('processes', []))
+        for checkpoint, changes in self.feed.pages(self.source.sync_checkpoint):
+            materials, processes = set(self.changed_materials), set(self.changed_processes)
+            saved = (self.source.sync_checkpoint, self.source.last_synced_at, self.source.pending_invalidation)
+            try:
+                with transaction.atomic():
+                    self.apply(changes)
+                    self.source.sync_checkpoint = checkpoint
+                    self.source.last_synced_at = timezone.now()
+                    self.source.pending_invalidation = self._pending()
+                    self.source.save(update_fields=[
+                        'sync_checkpoint', 'last_synced_at', 'pending_invalidation', 'updated_at'
+                    ])
+            except BaseException:
+                # The page rolled back, so its records need no invalidation
+                self.source.sync_checkpoint, self.source.last_synced_at, self.source.pending_invalidation = saved
+                self.changed_materials, self.changed_processes = materials, processes
+                raise
+            self.stats['pages'] += 1
+        if self.changed_materials or self.changed_processes:
+            with transaction.atomic():
+                self.invalidate()
+                self.source.pending_invalidation = {}
+                self.source.save(update_fields=['pending_invalidation', 'updated_at'])
+            self.changed_materials.clear()
+            self.changed_processes.clear()
+        logger.info(f"Synced {self.source.name} to {self.source.sync_checkpoint or 'start'}: {dict(self.stats)}")
+        return dict(self.stats)
+
+    def _pending(self) -> Dict[str, List[str]]:
+        return {'materials': sorted(self.changed_materials), 'processes': sorted(self.changed_processes)}
+
+    def _parse(self, change: Dict[str, Any]) -> Optional[Tuple[str, str, Optional[int], bool, Dict[str, Any]]]:
+        model_type = change.get('model')
+        data = change.get('data') or {}
+        deleted = bool(change.get('deleted'))
+        if model_type not in REQUIRED_FIELDS or not isinstance(data, dict):
+            return None
+        if deleted and change.get('key'):
+            key = str(change['key'])
+        elif all(data.get(name) not in (None, '') for name in (KEY_FIELDS if deleted else REQUIRED_FIELDS)[model_type]):
+            key = record_key(model_type, data)
+        else:
+            return None
+        version = change.get('version')
+        try:
+            version = int(version) if version is not None else None
+        except (TypeError, ValueError):
+            return None
+        return model_type, key, version, deleted, data
+
+    def apply(self, changes: List[Dict[str, Any]]) -> None:
+        latest: Dict[Tuple[str, str], Tuple[Optional[int], bool, Dict[str, Any]]] = {}
+        for change in changes:
+            parsed = self._parse(change) if isinstance(change, dict) else None
+            if parsed is None:
+                self.stats['invalid'] += 1
+                continue
+            model_type, key, version, deleted, data = parsed
+            previous = latest.get((model_type, key))
+            # The feed is ordered; within a page a later change wins unless its version is older
+            if previous is None or version is None or previous[0] is None or version >= previous[0]:
+                latest[(model_type, key)] = (version, deleted, data)
+        self.stats['received'] += len(changes)
+
+        records = {}
+        for model_type in REQUIRED_FIELDS:
+            keys = [key for kind, key in latest if kind == model_type]
+            for offset in range(0, len(keys), self.batch_size):
+                for record in SyncRecord.objects.filter(
+                    source=self.source, model_type=model_type, key__in=keys[offset:offset + self.batch_size]
+                ):
+                    records[(model_type, record.key)] = record
+
+        pending: Dict[str, Dict[str, Dict[str, Any]]] = {model_type: {} for model_type in REQUIRED_FIELDS}
+        deletes: Dict[str, List[str]] = {model_type: [] for model_type in REQUIRED_FIELDS}
+        tracked = []
+        for (model_type, key), (version, deleted, data) in latest.items():
+            digest = content_hash(data, deleted)
+            record = records.get((model_type, key))
+            if record is not None:
+                if version is not None and record.version is not None and version < record.version:
+                    self.stats['stale'] += 1
+                    continue
+                if record.content_hash == digest:
+                    self.stats['unchanged'] += 1
+                    continue
+            if deleted:
+                deletes[model_type].append(key)
+            else:
+                pending[model_type][key] = data
+            tracked.append(SyncRecord(
+                source=self.source, model_type=model_type, key=key, version=version,
+                content_hash=digest, deleted=deleted, synced_at=timezone.now(),
+            ))
+
+        self._upsert_materials(pending['material'])
+        skipped = self._upsert_properties(pending['material_property'])
+        self._upsert_processes(pending['process'])
+        self._delete(deletes)
+
+        # Skipped records are not tracked, so they are applied when they next appear
+        SyncRecord.objects.bulk_create(
+            [record for record in tracked if (record.model_type, record.key) not in skipped], batch_size=self.batch_size, update_conflicts=True,
+            unique_fields=['source', 'model_type', 'key'],
+            update_fields=['version', 'content_hash', 'deleted', 'synced_at'],
+        )
+
+    def _track_materials(self, names: List[str], data: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+        """Record material names and aliases, before and after the change, that steps may refer to"""
+        from materials.models import Material
+
+        for name, common_names in Material.objects.filter(name__in=names).values_list('name', 'common_names'):
+            self.changed_materials.update(alias.lower() for alias in list(common_names or []) + [name])
+        for name in names:
+            self.changed_materials.add(name.lower())
+            for alias in (data or {}).get(name, {}).get('common_names') or []:
+                self.changed_materials.add(str(alias).lower())
+
+    def _track_processes(self, names: List[str]) -> None:
+        """Record process names that steps may refer to"""
+        self.changed_processes.update(name.lower() for name in names)
+
+    def _upsert_materials(self, changes: Dict[str, Dict[str, Any]]) -> None:
+        from materials.models import Material
+
+        if not changes:
+            return
+        self._track_materials(list(changes), changes)
+        now = timezone.now()
+        Material.objects.bulk_create(
+            [
+                Material(name=name, last_updated=now, **{field: data[field] for field in MATERIAL_FIELDS if field in data})
+                for name, data in changes.items()
+            ],
+            batch_size=self.batch_size, update_conflicts=True, unique_fields=['name'],
+            update_fields=MATERIAL_FIELDS + ['last_updated'],
+        )
+        self.stats['material'] += len(changes)
+
+    def _upsert_properties(self, changes: Dict[str, Dict[str, Any]]) -> Set[Tuple[str, str]]:
+        from materials.models import Material, MaterialProperty
+
+        if not changes:
+            return set()
+        names = {data['material'] for data in changes.values()}
+        # Upserted rows keep their existing primary keys, so look them up afresh
+        material_ids = dict(Material.objects.filter(name__in=names).values_list('name', 'id'))
+        properties = []
+        skipped = set()
+        for key, data in changes.items():
+            if data['material'] not in material_ids:
+                logger.warning(f"Property {key} refers to unknown material {data['material']}, skipping")
+                self.stats['invalid'] += 1
+                skipped.add(('material_property', key))
+                continue
+            properties.append(MaterialProperty(
+                material_id=material_ids[data['material']], property_name=data['property_name'],
+                geographic_scope=data.get('geographic_scope') or 'Global',
+                **{field: data[field] for field in PROPERTY_FIELDS if field in data},
+            ))
+        self._track_materials(sorted({data['material'] for data in changes.values() if data['material'] in material_ids}))
+        MaterialProperty.objects.bulk_create(
+            properties, batch_size=self.batch_size, update_conflicts=True,
+            unique_fields=['material', 'property_name', 'geographic_scope'], update_fields=PROPERTY_FIELDS,
+        )
+        self.stats['material_property'] += len(properties)
+        return skipped
+
+    def _upsert_processes(self, changes: Dict[str, Dict[str, Any]]) -> None:
+        from processes.models import Process
+
+        if not changes:
+            return
+        self._track_processes(list(changes))
+        now = timezone.now()
+        Process.objects.bulk_create(
+            [
+                Process(name=name, updated_at=now, **{field: data[field] for field in PROCESS_FIELDS if field in data})
+                for name, data in changes.items()
+            ],
+            batch_size=self.batch_size, update_conflicts=True, unique_fields=['name'],
+            update_fields=PROCESS_FIELDS + ['updated_at'],
+        )
+        self.stats['process'] += len(changes)
+
+    def _delete(self, deletes: Dict[str, List[str]]) -> None:
+        from materials.models import Material, MaterialProperty
+        from processes.models import Process
+
+        for key in deletes['material_property']:
+            parts = key.split('|', 2)
+            if len(parts) < 2:
+                self.stats['invalid'] += 1
+                continue
+            material, property_name, scope = parts[0], parts[1], parts[2] if len(parts) > 2 else 'Global'
+            removed, _ = MaterialProperty.objects.filter(
+                material__name=material, property_name=property_name, geographic_scope=scope
+            ).delete()
+            if removed:
+                self._track_materials([material])
+            self.stats['deleted'] += removed
+        if deletes['process']:
+            self._track_processes(deletes['process'])
+            self.stats['deleted'] += Process.objects.filter(name__in=deletes['process']).delete()[1].get(
+                Process._meta.label, 0
+            )
+        if deletes['material']:
+            self._track_materials(deletes['material'])
+            self.stats['deleted'] += Material.objects.filter(name__in=deletes['material']).delete()[1].get(
+                Material._meta.label, 0
+            )
+
+    def invalidate(self) -> None:
+        """Queue recalculation of calculations that use changed records.
+
+        Steps are narrowed down in SQL: by lowercased name for processes, and
+        by a substring of each material name in the step's JSON flows, which
+        the exact match on the ``material`` keys then confirms. Calculation
+        versions are bumped in the caller's transaction and the
+        recalculation is queued for when it commits. Allocation factors need
+        no invalidation; their cache keys carry the process version and a
+        digest of the co-product catalog data.
+        """
+        if not self.changed_materials and not self.changed_processes:
+            return
+        from django.db.models import Q
+        from django.db.models.functions import Lower
+        from lca_core.models import LCACalculation, ProcessStep
+        from lca_core.tasks import recalculate_calculations
+
+        steps = ProcessStep.objects.annotate(lower_name=Lower('name'))
+        affected = set()
+        processes = sorted(self.changed_processes)
+        for offset in range(0, len(processes), self.batch_size):
+            affected.update(steps.filter(lower_name__in=processes[offset:offset + self.batch_size]).values_list(
+                'calculation_id', flat=True
+            ))
+
+        materials = sorted(self.changed_materials)
+        for offset in range(0, len(materials), MATERIAL_FILTER_SIZE):
+            names = materials[offset:offset + MATERIAL_FILTER_SIZE]
+            candidates = Q()
+            for pattern in {json_pattern(name) for name in names}:
+                candidates |= Q(input_materials__icontains=pattern) | Q(output_materials__icontains=pattern)
+            for pk, inputs, outputs in steps.filter(candidates).values_list(
+                'calculation_id', 'input_materials', 'output_materials'
+            ).iterator(chunk_size=self.batch_size):
+                if pk not in affected and any(
+                    isinstance(flow, dict) and str(flow.get('material') or '').lower() in self.changed_materials
+                    for flow in list(inputs or []) + list(outputs or [])
+                ):
+                    affected.add(pk)
+        if affected:
+            ids = sorted(affected)
+            # A new version misses the flow graph and what-if caches until the results are recomputed
+            LCACalculation.objects.filter(pk__in=ids).update(updated_at=timezone.now())
+            transaction.on_commit(lambda: recalculate_calculations.delay(ids))
+        self.stats['calculations_invalidated'] += len(affected)
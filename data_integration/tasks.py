@@ -0,0 +1,53 @@
+import logging
+
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(acks_late=True, ignore_result=True)
+def import_background_database(job_id: str) -> None:
+    """Import (or resume importing) a background database archive"""
+    from .importers import BackgroundImporter
+    from .models import ImportJob
+
+    try:
+        job = ImportJob.objects.select_related('source').get(pk=job_id)
+    except ImportJob.DoesNotExist:
+        logger.warning(f"Import {job_id} no longer exists, skipping")
+        return
+    if job.status == 'completed':
+        return
+    try:
+        BackgroundImporter(job).run()
+    except Exception:
+        # Recorded on the job; it can be resumed from its last committed entry
+        pass
+
+
+@shared_task(ignore_result=True)
+def sync_data_source(source_id: str) -> None:
+    """Apply the changes a library source published since its checkpoint"""
+    from .models import DataSource
+    from .sync import ChangeSync, SyncError
+
+    try:
+        source = DataSource.objects.get(pk=source_id)
+    except DataSource.DoesNotExist:
+        logger.warning(f"Data source {source_id} no longer exists, skipping")
+        return
+    try:
+        ChangeSync(source).run()
+    except SyncError as e:
+        # The checkpoint stays at the last committed page; the next run retries
+        logger.error(f"Sync of {source.name} failed: {str(e)}")
+
+
+@shared_task(ignore_result=True)
+def sync_data_sources() -> None:
+    """Sync every change-feed source"""
+    from .models import DataSource
+    from .sync import CHANGE_FEED_TYPES
+
+    for source_id in DataSource.objects.filter(source_type__in=CHANGE_FEED_TYPES).values_list('pk', flat=True):
+        sync_data_source.delay(str(source_id))
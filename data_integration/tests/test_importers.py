@@ -0,0 +1,164 @@
+import json
+import tempfile
+import zipfile
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from rest_framework.test import APITestCase
+
+from data_integration.importers import BackgroundImporter
+from data_integration.models import BackgroundExchange, BackgroundProcess, CharacterizationFactor, DataSource, ImportJob
+
+SPOLD = """<?xml version="1.0" encoding="UTF-8"?>
+<ecoSpold xmlns="http://www.EcoInvent.org/EcoSpold02">
+  <activityDataset>
+    <activityDescription>
+      <activity><activityName>{name}</activityName></activity>
+      <geography><shortname>{location}</shortname></geography>
+    </activityDescription>
+    <flowData>
+      <intermediateExchange intermediateExchangeId="{product_id}" amount="1">
+        <name>{product}</name><unitName>kg</unitName><outputGroup>0</outputGroup>
+      </intermediateExchange>
+      <intermediateExchange intermediateExchangeId="elec" amount="{electricity}">
+        <name>electricity, medium voltage</name><unitName>kWh</unitName><inputGroup>5</inputGroup>
+      </intermediateExchange>
+      <elementaryExchange elementaryExchangeId="co2" amount="{co2}">
+        <name>Carbon dioxide, fossil</name><unitName>kg</unitName>
+        <compartment><compartment>air</compartment><subcompartment>urban air</subcompartment></compartment>
+        <outputGroup>4</outputGroup>
+      </elementaryExchange>
+    </flowData>
+  </activityDataset>
+</ecoSpold>
+"""
+
+
+def write_archive(path, entries):
+    with zipfile.ZipFile(path, 'w') as archive:
+        for name, content in entries.items():
+            archive.writestr(name, content)
+
+
+def ecospold_entries():
+    return {
+        'datasets/a-steel.spold': SPOLD.format(name='steel production', location='RER', product_id='steel',
+                                               product='steel, low-alloyed', electricity=0.6, co2=1.9),
+        'datasets/b-aluminium.spold': SPOLD.format(name='aluminium production', location='GLO',
+                                                   product_id='alu', product='aluminium, primary',
+                                                   electricity=15, co2=8.1),
+    }
+
+
+class BackgroundImporterTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.source = DataSource.objects.create(name='ecoinvent', source_type='ecospold2')
+
+    def import_archive(self, entries, **job_fields):
+        path = Path(self.directory.name) / 'archive.zip'
+        write_archive(path, entries)
+        job = ImportJob.objects.create(source=self.source, archive_path=str(path), **job_fields)
+        return BackgroundImporter(job, batch_size=1).run()
+
+    def test_ecospold_processes_and_exchanges(self):
+        job = self.import_archive(ecospold_entries())
+
+        self.assertEqual((job.status, job.file_format), ('completed', 'ecospold2'))
+        self.assertEqual((job.total_entries, job.completed_entries), (2, 2))
+        self.assertEqual((job.process_count, job.exchange_count), (2, 6))
+        steel = BackgroundProcess.objects.get(source=self.source, external_id='a-steel')
+        self.assertEqual((steel.name, steel.location), ('steel production', 'RER'))
+        self.assertEqual(steel.reference_product, 'steel, low-alloyed')
+        exchanges = {exchange.flow_id: exchange for exchange in steel.exchanges.all()}
+        self.assertEqual(exchanges['elec'].direction, 'input')
+        self.assertAlmostEqual(exchanges['elec'].amount, 0.6)
+        self.assertEqual(exchanges['co2'].flow_type, 'elementary')
+        self.assertEqual(exchanges['co2'].direction, 'output')
+        self.assertEqual(exchanges['co2'].compartment, 'air/urban air')
+        self.assertTrue(exchanges['steel'].is_reference)
+
+    def test_interrupted_import_resumes_after_committed_entries(self):
+        first = self.import_archive(ecospold_entries())
+        BackgroundProcess.objects.filter(external_id='b-aluminium').delete()
+        BackgroundExchange.objects.filter(process__external_id='a-steel').delete()
+
+        # Same archive with its first entry already committed
+        job = ImportJob.objects.create(
+            source=self.source, archive_path=first.archive_path, archive_checksum=first.archive_checksum,
+            completed_entries=1, process_count=1, exchange_count=3,
+        )
+        job = BackgroundImporter(job, batch_size=1).run()
+
+        self.assertEqual((job.completed_entries, job.process_count, job.exchange_count), (2, 2, 6))
+        self.assertEqual(BackgroundExchange.objects.filter(process__external_id='b-aluminium').count(), 3)
+        # The committed entry is not parsed again
+        self.assertFalse(BackgroundExchange.objects.filter(process__external_id='a-steel').exists())
+
+    def test_changed_archive_restarts_the_import(self):
+        first = self.import_archive(ecospold_entries())
+        job = ImportJob.objects.create(
+            source=self.source, archive_path=first.archive_path, archive_checksum='0' * 64,
+            completed_entries=1, process_count=1, exchange_count=3,
+        )
+        job = BackgroundImporter(job, batch_size=1).run()
+        self.assertEqual((job.completed_entries, job.process_count, job.exchange_count), (2, 2, 6))
+
+    def test_reimport_replaces_exchanges(self):
+        self.import_archive(ecospold_entries())
+        self.import_archive(ecospold_entries())
+        self.assertEqual(BackgroundProcess.objects.count(), 2)
+        self.assertEqual(BackgroundExchange.objects.count(), 6)
+
+    def test_json_ld_factors_take_their_method_name(self):
+        job = self.import_archive({
+            'lcia_methods/m1.json': json.dumps({'@id': 'm1', 'name': 'EF 3.1',
+                                                'impactCategories': [{'@id': 'gwp'}]}),
+            'lcia_categories/gwp.json': json.dumps({
+                '@id': 'gwp', 'name': 'Climate change', 'referenceUnitName': 'kg CO2 eq',
+                'impactFactors': [{'flow': {'@id': 'co2', 'name': 'Carbon dioxide', 'category': 'air'},
+                                   'value': 1.0}],
+            }),
+        })
+
+        self.assertEqual((job.file_format, job.factor_count), ('json_ld', 1))
+        factor = CharacterizationFactor.objects.get()
+        self.assertEqual((factor.method, factor.category, factor.category_unit), ('EF 3.1', 'Climate change', 'kg CO2 eq'))
+
+    def test_unknown_archive_fails_the_job(self):
+        with self.assertRaises(ValueError):
+            self.import_archive({'readme.txt': 'not a database'})
+        job = ImportJob.objects.get()
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('not an EcoSpold 2', job.error_message)
+
+
+class ImportEndpointTests(APITestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        override = override_settings(BACKGROUND_IMPORT={'ROOT': Path(self.directory.name)})
+        override.enable()
+        self.addCleanup(override.disable)
+        write_archive(Path(self.directory.name) / 'ecoinvent.zip', ecospold_entries())
+        self.source = DataSource.objects.create(name='ecoinvent', source_type='ecospold2')
+        self.client.force_authenticate(User.objects.create_user('analyst', password='secret'))
+
+    @mock.patch('data_integration.tasks.import_background_database.delay')
+    def test_import_of_a_server_side_archive_is_queued_on_commit(self, delay):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/imports/', {'source': str(self.source.pk), 'path': 'ecoinvent.zip'},
+                                        format='json')
+
+        self.assertEqual(response.status_code, 202)
+        delay.assert_called_once_with(response.data['id'])
+
+    @mock.patch('data_integration.tasks.import_background_database.delay')
+    def test_paths_outside_the_import_root_are_rejected(self, delay):
+        response = self.client.post('/api/imports/', {'source': str(self.source.pk), 'path': '../../etc/passwd'},
+                                    format='json')
+        self.assertEqual(response.status_code, 400)
+        delay.assert_not_called()
@@ -0,0 +1,176 @@
+import json
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from rest_framework.test import APITestCase
+
+from data_integration.openlca import OpenLCAClient, OpenLCAService, OpenLCAUnavailable
+
+
+class MockIPCHandler(BaseHTTPRequestHandler):
+    """openLCA 2 IPC server speaking the JSON-RPC subset the client uses"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        server = self.server
+        message = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        method, params = message['method'], message.get('params') or {}
+        with server.lock:
+            server.calls.append(method)
+            server.connections.add(self.client_address)
+        if method == 'result/calculate':
+            result_id = uuid.uuid4().hex
+            system = params['target']['@id']
+            with server.lock:
+                server.results[result_id] = {'system': system, 'polls': 0, 'setup': params}
+            response = {'@id': result_id, 'isReady': False}
+        elif method == 'result/state':
+            state = server.results[params['@id']]
+            state['polls'] += 1
+            response = {'@id': params['@id'], 'isReady': state['polls'] > 1}
+            if state['system'] == 'broken':
+                response['error'] = 'Product system has no reference flow'
+        elif method == 'result/total-impacts':
+            setup = server.results[params['@id']]['setup']
+            amount = setup.get('amount', 1.0)
+            scale = {parameter['name']: parameter['value'] for parameter in setup['parameters']}.get('scale', 1.0)
+            response = [{'impactCategory': {'@id': 'gwp', 'name': 'Climate change', 'refUnit': 'kg CO2 eq'},
+                         'amount': 2.5 * amount * scale}]
+        elif method == 'result/dispose':
+            with server.lock:
+                server.disposed.append(params['@id'])
+            response = None
+        else:
+            self.reply({'jsonrpc': '2.0', 'id': message['id'], 'error': {'code': -32601, 'message': 'No such method'}})
+            return
+        self.reply({'jsonrpc': '2.0', 'id': message['id'], 'result': response})
+
+    def reply(self, message):
+        body = json.dumps(message).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockIPCServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), MockIPCHandler)
+        self.lock = threading.Lock()
+        self.calls = []
+        self.connections = set()
+        self.results = {}
+        self.disposed = []
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+
+
+class MockIPCMixin:
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.server = MockIPCServer().__enter__()
+        self.addCleanup(self.server.__exit__)
+        self.ipc = OpenLCAClient('127.0.0.1', self.server.server_address[1], pool_size=2, timeout=5,
+                                    retry_interval=60)
+        self.addCleanup(self.ipc.close)
+
+
+class OpenLCAServiceTests(MockIPCMixin, SimpleTestCase):
+    def service(self):
+        return OpenLCAService(self.ipc, poll_interval=0.01, max_wait=5)
+
+    def test_batch_is_calculated_once_per_distinct_request(self):
+        results = self.service().calculate_many([
+            {'product_system': 'bottle', 'amount': 2},
+            {'product_system': 'bottle', 'amount': 2},
+            {'product_system': 'can', 'parameters': {'scale': 3}},
+        ])
+
+        self.assertEqual([result['status'] for result in results], ['completed'] * 3)
+        self.assertEqual(results[0]['impacts']['Climate change'], {'value': 5.0, 'unit': 'kg CO2 eq'})
+        self.assertEqual(results[2]['impacts']['Climate change']['value'], 7.5)
+        self.assertEqual(self.server.calls.count('result/calculate'), 2)
+        # Every server-side result is released
+        self.assertEqual(sorted(self.server.disposed), sorted(self.server.results))
+
+    def test_connections_are_pooled(self):
+        service = self.service()
+        service.calculate_many([{'product_system': f"system-{index}"} for index in range(8)])
+        # 8 results x (calculate, 2 polls, impacts, dispose) over at most two keep-alive sockets
+        self.assertEqual(len(self.server.calls), 8 * 5)
+        self.assertLessEqual(len(self.server.connections), 2)
+
+    def test_repeated_requests_come_from_the_cache(self):
+        self.service().calculate('bottle', amount=2)
+        calls = len(self.server.calls)
+
+        result = self.service().calculate('bottle', amount=2.0)
+        self.assertTrue(result['cached'])
+        self.assertEqual(len(self.server.calls), calls)
+
+    def test_failed_calculation_does_not_fail_the_batch(self):
+        results = self.service().calculate_many([{'product_system': 'broken'}, {'product_system': 'bottle'}])
+        self.assertEqual(results[0]['status'], 'failed')
+        self.assertIn('no reference flow', results[0]['error'])
+        self.assertEqual(results[1]['status'], 'completed')
+        # Failures are not cached
+        self.service().calculate_many([{'product_system': 'broken'}])
+        self.assertEqual(self.server.calls.count('result/calculate'), 3)
+
+    def test_unreachable_server_serves_cached_results_only(self):
+        self.service().calculate('bottle')
+        self.server.__exit__()
+        self.ipc.close()
+
+        results = self.service().calculate_many([{'product_system': 'bottle'}, {'product_system': 'can'}])
+        self.assertEqual([result['status'] for result in results], ['completed', 'unavailable'])
+        self.assertTrue(results[0]['cached'])
+        self.assertFalse(self.ipc.available)
+        # Later calls fail fast until the retry interval has passed
+        with self.assertRaises(OpenLCAUnavailable):
+            self.service().calculate('can')
+
+
+class OpenLCAEndpointTests(MockIPCMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch('data_integration.openlca.get_client', return_value=self.ipc)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client.force_authenticate(User.objects.create_user('analyst', password='secret'))
+
+    def test_calculate_endpoint_returns_a_result_per_request(self):
+        response = self.client.post('/api/openlca/calculate/', {'calculations': [
+            {'product_system': 'bottle'}, {'product_system': 'broken'},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['status'] for result in response.data['results']], ['completed', 'failed'])
+
+    def test_status_reports_availability(self):
+        response = self.client.get('/api/openlca/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['available'])
+        self.assertEqual(response.data['port'], self.server.server_address[1])
+
+    def test_requests_need_a_product_system(self):
+        response = self.client.post('/api/openlca/calculate/', {'calculations': [{'amount': 1}]}, format='json')
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,162 @@
+import json
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from data_integration.models import DataSource, SyncRecord
+from data_integration.sync import ChangeSync, FileDropFeed, SyncError
+from lca_core.models import LCACalculation, LCAProject, ProcessStep
+from materials.models import Material, MaterialProperty
+from processes.allocation import AllocationEngine
+from processes.models import Process
+
+STEEL = {'name': 'Steel', 'material_type': 'metal', 'density': 7850, 'common_names': ['Stainless']}
+STEEL_FACTOR = {'material': 'Steel', 'property_name': 'climate_change_factor', 'property_type': 'environmental',
+                'value': 1.9, 'unit': 'kg_co2_eq'}
+
+
+class ChangeSyncTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        self.source = DataSource.objects.create(name='Materials library', source_type='file_drop')
+        user = User.objects.create_user('analyst', password='secret')
+        project = LCAProject.objects.create(name='Frames', owner=user)
+        self.steel_frame = self.make_calculation(project, 'Steel frame', 'Welding', 'stainless')
+        self.wood_frame = self.make_calculation(project, 'Wood frame', 'Joinery', 'Oak')
+
+    @staticmethod
+    def make_calculation(project, name, step, material):
+        calculation = LCACalculation.objects.create(project=project, name=name)
+        ProcessStep.objects.create(calculation=calculation, name=step, order=1, category='manufacturing',
+                                   input_materials=[{'material': material, 'quantity': 5}])
+        return calculation
+
+    def drop(self, name, changes):
+        (self.directory / name).write_text(json.dumps({'changes': changes}))
+
+    def sync(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return ChangeSync(self.source, feed=FileDropFeed(self.directory)).run()
+
+    @mock.patch('lca_core.tasks.recalculate_calculations.delay')
+    def test_material_change_queues_recalculation_of_users(self, delay):
+        self.drop('0001.json', [{'model': 'material', 'data': STEEL, 'version': 1},
+                                {'model': 'material_property', 'data': STEEL_FACTOR, 'version': 1}])
+        stats = self.sync()
+
+        self.assertEqual((stats['material'], stats['material_property'], stats['pages']), (1, 1, 1))
+        self.assertEqual(MaterialProperty.objects.get(material__name='Steel').value, 1.9)
+        # Matched through the material's alias
+        delay.assert_called_once_with([self.steel_frame.pk])
+        self.assertEqual(stats['calculations_invalidated'], 1)
+        self.source.refresh_from_db()
+        self.assertEqual(self.source.sync_checkpoint, '0001.json')
+
+    @mock.patch('lca_core.tasks.recalculate_calculations.delay')
+    def test_unchanged_and_stale_records_are_skipped(self, delay):
+        self.drop('0001.json', [{'model': 'material', 'data': STEEL, 'version': 2}])
+        self.sync()
+        delay.reset_mock()
+
+        self.drop('0002.json', [{'model': 'material', 'data': STEEL, 'version': 2}])
+        self.assertEqual(self.sync().get('unchanged'), 1)
+        self.drop('0003.json', [{'model': 'material', 'data': dict(STEEL, density=1), 'version': 1}])
+        self.assertEqual(self.sync().get('stale'), 1)
+
+        self.assertEqual(Material.objects.get(name='Steel').density, 7850)
+        delay.assert_not_called()
+        self.assertEqual(SyncRecord.objects.get(key='Steel').version, 2)
+
+    @mock.patch('lca_core.tasks.recalculate_calculations.delay')
+    def test_synced_changes_reach_allocation_factors(self, delay):
+        Process.objects.create(name='Joinery', description='Wood joinery', process_type='manufacturing',
+                               output_materials=[{'material': 'Oak', 'quantity': 3, 'reference': True},
+                                                 {'material': 'Sawdust', 'quantity': 1}])
+        steps = list(self.wood_frame.process_steps.all())
+        self.assertEqual(AllocationEngine(method='mass').allocate(steps).allocations[0].scale, 0.75)
+
+        self.drop('0001.json', [{'model': 'process', 'data': {
+            'name': 'Joinery', 'description': 'Glued joinery', 'process_type': 'manufacturing',
+            'output_materials': [{'material': 'Oak', 'quantity': 1, 'reference': True},
+                                 {'material': 'Sawdust', 'quantity': 1}],
+        }}])
+        self.sync()
+
+        self.assertEqual(AllocationEngine(method='mass').allocate(steps).allocations[0].scale, 0.5)
+        delay.assert_called_once_with([self.wood_frame.pk])
+        self.wood_frame.refresh_from_db()
+        self.assertGreater(self.wood_frame.updated_at, self.steel_frame.updated_at)
+
+    @mock.patch('lca_core.tasks.recalculate_calculations.delay')
+    def test_pages_are_invalidated_once_per_sync(self, delay):
+        self.drop('0001.json', [{'model': 'material', 'data': STEEL}])
+        self.drop('0002.json', [{'model': 'process', 'data': {
+            'name': 'Joinery', 'description': 'Wood joinery', 'process_type': 'manufacturing',
+        }}])
+        with mock.patch.object(ChangeSync, 'invalidate', autospec=True, side_effect=ChangeSync.invalidate) as invalidate:
+            stats = self.sync()
+
+        invalidate.assert_called_once()
+        self.assertEqual(stats['pages'], 2)
+        delay.assert_called_once_with(sorted([self.steel_frame.pk, self.wood_frame.pk]))
+        self.source.refresh_from_db()
+        self.assertEqual(self.source.pending_invalidation, {})
+
+    @mock.patch('lca_core.tasks.recalculate_calculations.delay')
+    def test_failed_invalidation_is_retried_by_the_next_sync(self, delay):
+        self.drop('0001.json', [{'model': 'material', 'data': STEEL}])
+        with mock.patch.object(ChangeSync, 'invalidate', side_effect=RuntimeError('cache down')):
+            with self.assertRaises(RuntimeError):
+                self.sync()
+
+        # The page is committed with the names it still has to invalidate
+        self.source.refresh_from_db()
+        self.assertEqual(self.source.sync_checkpoint, '0001.json')
+        self.assertTrue(Material.objects.filter(name='Steel').exists())
+        self.assertIn('stainless', self.source.pending_invalidation['materials'])
+        delay.assert_not_called()
+
+        self.assertEqual(self.sync()['calculations_invalidated'], 1)
+        delay.assert_called_once_with([self.steel_frame.pk])
+
+    @mock.patch('lca_core.tasks.recalculate_calculations.delay')
+    def test_failed_page_leaves_only_committed_pages_pending(self, delay):
+        self.drop('0001.json', [{'model': 'material', 'data': STEEL}])
+        self.drop('0002.json', [{'model': 'process', 'data': {
+            'name': 'Joinery', 'description': 'Wood joinery', 'process_type': 'manufacturing',
+        }}])
+        with mock.patch.object(Process.objects, 'bulk_create', side_effect=RuntimeError('database down')):
+            with self.assertRaises(RuntimeError):
+                self.sync()
+
+        self.source.refresh_from_db()
+        self.assertEqual(self.source.sync_checkpoint, '0001.json')
+        self.assertEqual(self.source.pending_invalidation['processes'], [])
+        delay.assert_not_called()
+
+        self.sync()
+        delay.assert_called_once_with(sorted([self.steel_frame.pk, self.wood_frame.pk]))
+
+    @mock.patch('lca_core.tasks.recalculate_calculations.delay')
+    def test_material_match_is_exact_after_the_sql_filter(self, delay):
+        # Contains the name but refers to another material
+        self.make_calculation(self.steel_frame.project, 'Steel wool frame', 'Brushing', 'Steel wool')
+        accented = self.make_calculation(self.steel_frame.project, 'Facade', 'Cladding', 'B\u00e9ton')
+        sync = ChangeSync(self.source, feed=FileDropFeed(self.directory))
+        sync.changed_materials.update({'steel', 'b\u00e9ton'})
+        with self.captureOnCommitCallbacks(execute=True):
+            sync.invalidate()
+        delay.assert_called_once_with([accented.pk])
+
+    def test_sync_root_is_enforced(self):
+        self.source.config = {'path': '../outside'}
+        with override_settings(DATA_SYNC={'ROOT': self.directory}):
+            with self.assertRaises(SyncError):
+                ChangeSync(self.source)
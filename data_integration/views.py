@@ -1,28 +1,118 @@
-from rest_framework import viewsets
+import os
+import uuid
+from pathlib import Path
+from django.conf import settings
+from django.db import transaction
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from .models import DataSource, ImportJob
 
 
 class DataSourceViewSet(viewsets.ModelViewSet):
+    queryset = DataSource.objects.all()
     permission_classes = [IsAuthenticated]
-    
-    def get_queryset(self):
-        return []
 
     def get_serializer_class(self):
-        from rest_framework import serializers
-        class DummySerializer(serializers.Serializer):
-            pass
-        return DummySerializer
+        from .serializers import DataSourceSerializer
+        return DataSourceSerializer
+
+    def perform_create(self, serializer):
+        serializer.save(created_by=self.request.user)
+
+    @action(detail=True, methods=['post'])
+    def sync(self, request, pk=None):
+        """Queue an incremental sync of a change-feed source from its checkpoint"""
+        from .sync import CHANGE_FEED_TYPES
+        from .tasks import sync_data_source
+
+        source = self.get_object()
+        if source.source_type not in CHANGE_FEED_TYPES:
+            return Response({'error': f"{source.source_type} sources are imported, not synced"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        sync_data_source.delay(str(source.pk))
+        return Response(self.get_serializer(source).data, status=status.HTTP_202_ACCEPTED)
 
 
 class ImportViewSet(viewsets.ModelViewSet):
+    """Background database imports: POST an ``archive`` upload (or a server-side ``path``) for a ``source``"""
     permission_classes = [IsAuthenticated]
-    
+    parser_classes = [MultiPartParser, FormParser, JSONParser]
+    http_method_names = ['get', 'post', 'delete', 'head', 'options']
+
     def get_queryset(self):
-        return []
+        return ImportJob.objects.select_related('source')
 
     def get_serializer_class(self):
-        from rest_framework import serializers
-        class DummySerializer(serializers.Serializer):
-            pass
-        return DummySerializer
+        from .serializers import ImportJobSerializer
+        return ImportJobSerializer
+
+    def perform_create(self, serializer):
+        from .tasks import import_background_database
+
+        root = Path(getattr(settings, 'BACKGROUND_IMPORT', {}).get('ROOT', settings.MEDIA_ROOT / 'background_imports'))
+        archive = serializer.validated_data.pop('archive', None)
+        path = serializer.validated_data.pop('path', None)
+        if archive is not None:
+            root.mkdir(parents=True, exist_ok=True)
+            target = root / f"{uuid.uuid4().hex}.zip"
+            with open(target, 'wb') as handle:
+                for chunk in archive.chunks():
+                    handle.write(chunk)
+        else:
+            # Only archives already placed under the import root can be named
+            target = (root / path).resolve()
+            if not target.is_relative_to(root.resolve()) or not target.is_file():
+                raise ValidationError({'path': 'No such archive in the import directory'})
+        job = serializer.save(archive_path=str(target), created_by=self.request.user)
+        transaction.on_commit(lambda: import_background_database.delay(str(job.pk)))
+
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        response.status_code = status.HTTP_202_ACCEPTED
+        return response
+
+    @action(detail=True, methods=['post'])
+    def resume(self, request, pk=None):
+        """Continue an interrupted or failed import after its last committed entry"""
+        from .tasks import import_background_database
+
+        job = self.get_object()
+        if job.status == 'completed':
+            return Response({'error': 'Import already completed'}, status=status.HTTP_409_CONFLICT)
+        if not os.path.exists(job.archive_path):
+            return Response({'error': 'The archive is no longer available'}, status=status.HTTP_410_GONE)
+        import_background_database.delay(str(job.pk))
+        return Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class OpenLCAViewSet(viewsets.ViewSet):
+    """Product-system calculations on the configured openLCA IPC server"""
+    permission_classes = [IsAuthenticated]
+
+    def list(self, request):
+        from .openlca import get_client
+
+        client = get_client()
+        return Response({'host': client.host, 'port': client.port, 'available': client.available})
+
+    @action(detail=False, methods=['post'])
+    def calculate(self, request):
+        """Results for ``calculations``: [{product_system, impact_method, parameters, amount}, ...]"""
+        from .openlca import OpenLCAService
+
+        calculations = request.data.get('calculations')
+        max_batch = getattr(settings, 'OPENLCA', {}).get('MAX_BATCH_SIZE', 100)
+        if not isinstance(calculations, list) or not all(isinstance(item, dict) for item in calculations):
+            return Response({'error': '"calculations" must be a list of objects'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(calculations) > max_batch:
+            return Response({'error': f"At most {max_batch} calculations per request"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            results = OpenLCAService().calculate_many(calculations)
+        except (TypeError, ValueError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'results': results})
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import LCAProject, LCACalculation
+from .models import LCAProject, LCACalculation, ProcessStep, CalculationResult
 
 
 @admin.register(LCAProject)
@@ -16,3 +16,18 @@ class LCACalculationAdmin(admin.ModelAdmin):
     list_filter = ['created_at']
     search_fields = ['name', 'project__name']
     readonly_fields = ['created_at']
+
+
+@admin.register(ProcessStep)
+class ProcessStepAdmin(admin.ModelAdmin):
+    list_display = ['name', 'calculation', 'order', 'category']
+    list_filter = ['category']
+    search_fields = ['name', 'calculation__name']
+    readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(CalculationResult)
+class CalculationResultAdmin(admin.ModelAdmin):
+    list_display = ['calculation', 'step_id', 'impact', 'value']
+    list_filter = ['impact']
+    search_fields = ['calculation__name', 'step_id']
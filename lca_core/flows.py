@@ -0,0 +1,234 @@
+import hashlib
+import json
+import logging
+from collections import defaultdict, deque
+from typing import Dict, Any, Iterable, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+_config = getattr(settings, 'FLOW_GRAPH', {})
+
+STEP_FIELDS = ('id', 'name', 'order', 'category', 'input_materials', 'output_materials',
+               'waste_outputs', 'energy_inputs')
+
+# Node types by Sankey column: sources, process stages, sinks
+SOURCE_TYPES = ('material', 'energy')
+SINK_TYPES = ('product', 'recovered', 'disposed', 'losses')
+OTHER_LABELS = {
+    'material': 'Other materials',
+    'energy': 'Other energy',
+    'product': 'Other products',
+}
+
+
+class FlowGraphBuilder:
+    """Aggregated material/energy flow graph (Sankey nodes and links) of a calculation.
+
+    Steps are walked once in order. Inputs come from a material source node
+    unless an earlier stage produced the same material, in which case the
+    stage-to-stage flow is drawn instead; outputs left unconsumed become
+    products. Large models are grouped by step category, and source/product
+    nodes carrying less than ``threshold`` of their kind's total flow are
+    merged into one "Other" node, so the graph stays a few dozen nodes
+    regardless of the number of steps.
+    """
+
+    def __init__(self, threshold: Optional[float] = None, group_by: str = 'auto',
+                 max_stage_nodes: Optional[int] = None, max_nodes_per_type: Optional[int] = None):
+        if group_by not in ('auto', 'step', 'category'):
+            raise ValueError('group_by must be one of auto, step, category')
+        self.threshold = float(threshold if threshold is not None else _config.get('THRESHOLD', 0.01))
+        if not 0 <= self.threshold < 1:
+            raise ValueError('threshold must be between 0 and 1')
+        self.group_by = group_by
+        self.max_stage_nodes = max_stage_nodes or _config.get('MAX_STAGE_NODES', 40)
+        self.max_nodes_per_type = max_nodes_per_type or _config.get('MAX_NODES_PER_TYPE', 25)
+
+    def _stage_key(self, step, grouped: bool) -> Tuple[str, str]:
+        if grouped:
+            category = step.category or 'uncategorised'
+            return f"stage:{category}", category.replace('_', ' ').capitalize()
+        return f"step:{step.id}", step.name or f"Step {step.order}"
+
+    def build(self, steps: Iterable[Any]) -> Dict[str, Any]:
+        steps = list(steps)
+        grouped = self.group_by == 'category' or (self.group_by == 'auto' and len(steps) > self.max_stage_nodes)
+
+        labels: Dict[str, str] = {}
+        types: Dict[str, str] = {}
+        stage_columns: Dict[str, int] = {}
+        flows: Dict[Tuple[str, str, str], float] = defaultdict(float)
+        # Material produced by a stage and not yet consumed, oldest first
+        available: Dict[str, deque] = defaultdict(deque)
+        recirculated = 0.0
+
+        def node(key: str, label: str, node_type: str) -> str:
+            if key not in labels:
+                labels[key] = label
+                types[key] = node_type
+            return key
+
+        for step in steps:
+            stage, label = self._stage_key(step, grouped)
+            node(stage, label, 'stage')
+            stage_columns.setdefault(stage, len(stage_columns))
+            mass_in = mass_out = 0.0
+
+            for material in step.input_materials:
+                name = material.get('material', '') or 'unknown'
+                quantity = float(material.get('quantity', 0) or 0)
+                if quantity <= 0:
+                    continue
+                mass_in += quantity
+                remaining = quantity
+                producers = available.get(name.lower())
+                while remaining > 1e-12 and producers:
+                    producer = producers[0]
+                    used = min(remaining, producer[1])
+                    if producer[0] == stage:
+                        pass  # Internal to a grouped stage
+                    elif stage_columns[producer[0]] < stage_columns[stage]:
+                        flows[(producer[0], stage, 'mass')] += used
+                    else:
+                        recirculated += used
+                    producer[1] -= used
+                    remaining -= used
+                    if producer[1] <= 1e-12:
+                        producers.popleft()
+                if remaining > 1e-12:
+                    source = node(f"material:{name.lower()}", name, 'material')
+                    flows[(source, stage, 'mass')] += remaining
+
+            for energy in step.energy_inputs:
+                energy_type = energy.get('type', 'electricity_grid')
+                amount = float(energy.get('amount', 0) or 0)
+                if amount > 0:
+                    source = node(f"energy:{energy_type}", energy_type.replace('_', ' ').capitalize(), 'energy')
+                    flows[(source, stage, 'energy')] += amount
+
+            for material in step.output_materials:
+                name = material.get('material', '') or 'unknown'
+                quantity = float(material.get('quantity', 0) or 0)
+                if quantity > 0:
+                    mass_out += quantity
+                    available[name.lower()].append([stage, quantity, name])
+
+            for waste in step.waste_outputs:
+                quantity = float(waste.get('quantity', 0) or 0)
+                if quantity <= 0:
+                    continue
+                mass_out += quantity
+                recovered = quantity * min(max(float(waste.get('recovery_rate', 0) or 0), 0.0), 100.0) / 100
+                if recovered > 0:
+                    flows[(stage, node('sink:recovered', 'Recovered', 'recovered'), 'mass')] += recovered
+                if quantity - recovered > 0:
+                    flows[(stage, node('sink:disposed', 'Disposed', 'disposed'), 'mass')] += quantity - recovered
+
+            if mass_in - mass_out > 1e-9:
+                flows[(stage, node('sink:losses', 'Losses', 'losses'), 'mass')] += mass_in - mass_out
+
+        for producers in available.values():
+            for stage, quantity, name in producers:
+                if quantity > 1e-12:
+                    product = node(f"product:{name.lower()}", name, 'product')
+                    flows[(stage, product, 'mass')] += quantity
+
+        flows, collapsed = self._collapse(flows, labels, types)
+        return self._serialise(flows, labels, types, stage_columns, collapsed, {
+            'steps': len(steps),
+            'grouped_by': 'category' if grouped else 'step',
+            'recirculated_mass': recirculated,
+        })
+
+    def _collapse(self, flows: Dict[Tuple[str, str, str], float], labels: Dict[str, str],
+                  types: Dict[str, str]) -> Tuple[Dict[Tuple[str, str, str], float], int]:
+        """Merge minor source and product nodes into one "Other" node per type"""
+        node_totals: Dict[str, float] = defaultdict(float)
+        kind_totals: Dict[str, float] = defaultdict(float)
+        for (source, target, kind), value in flows.items():
+            if types[source] in SOURCE_TYPES:
+                node_totals[source] += value
+                kind_totals[kind] += value
+            if types[target] == 'product':
+                node_totals[target] += value
+
+        product_total = sum(value for key, value in node_totals.items() if types[key] == 'product')
+        replace: Dict[str, str] = {}
+        for node_type, other_label in OTHER_LABELS.items():
+            ranked = sorted((key for key in node_totals if types[key] == node_type),
+                            key=lambda key: node_totals[key], reverse=True)
+            total = product_total if node_type == 'product' else kind_totals['energy' if node_type == 'energy' else 'mass']
+            minor = [
+                key for position, key in enumerate(ranked)
+                if position >= self.max_nodes_per_type - 1 or node_totals[key] < self.threshold * total
+            ]
+            # A single minor node is clearer under its own name
+            if len(minor) > 1:
+                other = f"other:{node_type}"
+                labels[other] = other_label
+                types[other] = node_type
+                replace.update((key, other) for key in minor)
+
+        if not replace:
+            return flows, 0
+        merged: Dict[Tuple[str, str, str], float] = defaultdict(float)
+        for (source, target, kind), value in flows.items():
+            merged[(replace.get(source, source), replace.get(target, target), kind)] += value
+        return merged, len(replace)
+
+    @staticmethod
+    def _serialise(flows, labels, types, stage_columns, collapsed, summary) -> Dict[str, Any]:
+        used = {key for source, target, _ in flows for key in (source, target)}
+        last_stage = max(stage_columns.values(), default=-1)
+
+        def column(key: str) -> int:
+            if types[key] in SOURCE_TYPES:
+                return 0
+            if types[key] == 'stage':
+                return stage_columns[key] + 1
+            return last_stage + 2
+
+        ordered = sorted(used, key=lambda key: (column(key), key))
+        index = {key: position for position, key in enumerate(ordered)}
+        values: Dict[str, float] = defaultdict(float)
+        links = []
+        for (source, target, kind), value in sorted(flows.items(), key=lambda item: (index[item[0][0]], index[item[0][1]])):
+            links.append({'source': index[source], 'target': index[target], 'value': value, 'kind': kind})
+            values[source] += value
+            values[target] += value
+
+        totals: Dict[str, float] = defaultdict(float)
+        for (source, _, kind), value in flows.items():
+            if types[source] in SOURCE_TYPES:
+                totals[kind] += value
+        return {
+            'nodes': [
+                {'id': key, 'label': labels[key], 'type': types[key], 'column': column(key), 'value': values[key]}
+                for key in ordered
+            ],
+            'links': links,
+            'totals': {'mass_input': totals['mass'], 'energy_input': totals['energy']},
+            'collapsed_nodes': collapsed,
+            **summary,
+        }
+
+
+def calculation_flow_graph(calculation, threshold: Optional[float] = None, group_by: str = 'auto') -> Dict[str, Any]:
+    """Flow graph of a calculation, cached until the calculation or one of its steps changes"""
+    builder = FlowGraphBuilder(threshold=threshold, group_by=group_by)
+    version = hashlib.sha256(json.dumps(
+        [calculation.inputs_version(), builder.threshold, builder.group_by,
+         builder.max_stage_nodes, builder.max_nodes_per_type]
+    ).encode()).hexdigest()[:32]
+    key = f"flows:{calculation.pk}:{version}"
+    graph = cache.get(key)
+    if graph is None:
+        steps = calculation.process_steps.only(*STEP_FIELDS).order_by('order')
+        graph = builder.build(steps.iterator(chunk_size=2000))
+        cache.set(key, graph, _config.get('CACHE_TIMEOUT', 24 * 60 * 60))
+        logger.info(f"Built flow graph for calculation {calculation.pk}: "
+                    f"{len(graph['nodes'])} nodes, {len(graph['links'])} links from {graph['steps']} steps")
+    return graph
@@ -0,0 +1,69 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from lca_tool import routers
+
+
+class Command(BaseCommand):
+    help = "Simulate concurrent API requests and report database connection reuse"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Total simulated requests')
+        parser.add_argument('--concurrency', type=int, default=8, help='Worker threads')
+        parser.add_argument('--queries', type=int, default=3, help='Queries per request')
+        parser.add_argument('--read-only', action='store_true',
+                            help='Simulate GET requests so reads are routed to replicas')
+
+    def handle(self, *args, **options):
+        opened = {}
+        lock = threading.Lock()
+        latencies = []
+
+        def count_connection(sender, connection, **kwargs):
+            with lock:
+                opened[connection.alias] = opened.get(connection.alias, 0) + 1
+
+        def simulated_request(_):
+            # Fire the same signals as the request handler so CONN_MAX_AGE
+            # and CONN_HEALTH_CHECKS are applied exactly as in production
+            request_started.send(sender=self.__class__)
+            routing = routers.use_replica() if options['read_only'] else routers.use_primary()
+            started = time.perf_counter()
+            try:
+                with routing:
+                    alias = routers.PrimaryReplicaRouter().db_for_read(None)
+                    with connections[alias].cursor() as cursor:
+                        for _ in range(options['queries']):
+                            cursor.execute('SELECT 1')
+                            cursor.fetchone()
+            finally:
+                latencies.append((time.perf_counter() - started) * 1000)
+                request_finished.send(sender=self.__class__)
+
+        connection_created.connect(count_connection)
+        started = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+                list(pool.map(simulated_request, range(options['requests'])))
+        finally:
+            connection_created.disconnect(count_connection)
+        elapsed = time.perf_counter() - started
+        total_opened = sum(opened.values())
+
+        latencies.sort()
+        self.stdout.write(f"Requests:             {options['requests']} ({elapsed:.2f}s, "
+                          f"{options['requests'] / elapsed:.0f} req/s)")
+        self.stdout.write(f"Connections opened:   {total_opened}")
+        self.stdout.write(f"Requests/connection:  {options['requests'] / max(total_opened, 1):.1f}")
+        self.stdout.write(f"Latency p50/p95 (ms): {statistics.median(latencies):.2f} / "
+                          f"{latencies[int(len(latencies) * 0.95) - 1]:.2f}")
+        for alias, count in sorted(opened.items()):
+            max_age = connections[alias].settings_dict.get('CONN_MAX_AGE')
+            self.stdout.write(f"  {alias}: {count} connections (CONN_MAX_AGE={max_age})")
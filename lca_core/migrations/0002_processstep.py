@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lca_core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcessStep',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Matched to a Process by name', max_length=200)),
+                ('order', models.PositiveIntegerField(default=0)),
+                ('category', models.CharField(choices=[('extraction', 'Raw Material Extraction'), ('processing', 'Processing'), ('manufacturing', 'Manufacturing'), ('transport', 'Transport'), ('use', 'Use'), ('end_of_life', 'End of Life'), ('recycling', 'Recycling')], default='processing', max_length=20)),
+                ('input_materials', models.JSONField(blank=True, default=list, help_text='[{material, quantity (kg), recycled_content (%)}]')),
+                ('output_materials', models.JSONField(blank=True, default=list, help_text='[{material, quantity (kg), reference}]')),
+                ('energy_inputs', models.JSONField(blank=True, default=list, help_text='[{type, amount (kWh)}]')),
+                ('emissions', models.JSONField(blank=True, default=dict, help_text='Direct emissions in kg by substance')),
+                ('waste_outputs', models.JSONField(blank=True, default=list, help_text='[{quantity (kg), recovery_rate (%)}]')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('calculation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='process_steps', to='lca_core.lcacalculation')),
+            ],
+            options={
+                'ordering': ['calculation', 'order'],
+                'indexes': [models.Index(fields=['calculation', 'order'], name='lca_step_calc_order')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lca_core', '0002_processstep'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalculationResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('step_id', models.CharField(max_length=64)),
+                ('step_order', models.PositiveIntegerField(default=0)),
+                ('impact', models.CharField(max_length=50)),
+                ('value', models.FloatField()),
+                ('calculation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='results', to='lca_core.lcacalculation')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='results', to='lca_core.lcaproject')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['project', 'impact'], name='lca_result_project_impact'), models.Index(fields=['calculation', 'impact'], name='lca_result_calc_impact')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='calculationresult',
+            constraint=models.UniqueConstraint(fields=('calculation', 'step_id', 'impact'), name='lca_result_unique_step_impact'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:41
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lca_core', '0003_calculationresult'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lcacalculation',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
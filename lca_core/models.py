@@ -32,6 +32,79 @@ class LCACalculation(models.Model):
     water_use = models.FloatField(default=0.0, help_text="liters")
     
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"{self.project.name} - {self.name}"
+
+    def inputs_version(self) -> str:
+        """Changes whenever the calculation is saved or a process step is saved, added or deleted.
+
+        Step edits do not touch the calculation's ``updated_at``, so cached
+        results derived from the steps key on this instead.
+        """
+        steps = self.process_steps.aggregate(count=models.Count('id'), updated=models.Max('updated_at'))
+        return f"{self.updated_at}:{steps['count']}:{steps['updated']}"
+
+
+class ProcessStep(models.Model):
+    """One life-cycle stage of a calculation with its material, energy and emission flows"""
+    CATEGORIES = [
+        ('extraction', 'Raw Material Extraction'),
+        ('processing', 'Processing'),
+        ('manufacturing', 'Manufacturing'),
+        ('transport', 'Transport'),
+        ('use', 'Use'),
+        ('end_of_life', 'End of Life'),
+        ('recycling', 'Recycling'),
+    ]
+    
+    calculation = models.ForeignKey(LCACalculation, on_delete=models.CASCADE, related_name='process_steps')
+    name = models.CharField(max_length=200, help_text="Matched to a Process by name")
+    order = models.PositiveIntegerField(default=0)
+    category = models.CharField(max_length=20, choices=CATEGORIES, default='processing')
+    
+    # Flows
+    input_materials = models.JSONField(
+        default=list, blank=True, help_text="[{material, quantity (kg), recycled_content (%)}]"
+    )
+    output_materials = models.JSONField(default=list, blank=True, help_text="[{material, quantity (kg), reference}]")
+    energy_inputs = models.JSONField(default=list, blank=True, help_text="[{type, amount (kWh)}]")
+    emissions = models.JSONField(default=dict, blank=True, help_text="Direct emissions in kg by substance")
+    waste_outputs = models.JSONField(default=list, blank=True, help_text="[{quantity (kg), recovery_rate (%)}]")
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['calculation', 'order']
+        indexes = [
+            models.Index(fields=['calculation', 'order'], name='lca_step_calc_order'),
+        ]
+    
+    def __str__(self):
+        return f"{self.calculation_id} - {self.order}. {self.name}"
+
+
+class CalculationResult(models.Model):
+    """One impact value for one process step of a calculation (long/columnar layout)"""
+    project = models.ForeignKey(LCAProject, on_delete=models.CASCADE, related_name='results')
+    calculation = models.ForeignKey(LCACalculation, on_delete=models.CASCADE, related_name='results')
+    step_id = models.CharField(max_length=64)
+    step_order = models.PositiveIntegerField(default=0)
+    impact = models.CharField(max_length=50)
+    value = models.FloatField()
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['project', 'impact'], name='lca_result_project_impact'),
+            models.Index(fields=['calculation', 'impact'], name='lca_result_calc_impact'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['calculation', 'step_id', 'impact'], name='lca_result_unique_step_impact'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.calculation_id} - {self.step_id} - {self.impact}"
@@ -0,0 +1,265 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Any, Optional, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Events that end a progress stream
+TERMINAL_EVENTS = ('result', 'error')
+
+Event = Tuple[str, str, Dict[str, Any]]  # (offset, event_type, data)
+
+
+def calculation_channel(calculation_id) -> str:
+    """Channel name used for a calculation's progress events"""
+    return f"lca:progress:{calculation_id}"
+
+
+class InMemoryProgressBackend:
+    """Process-local progress log, used for development and tests"""
+
+    def __init__(self, max_events: int = 1000):
+        self.max_events = max_events
+        self._streams: Dict[str, deque] = {}
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def publish(self, channel: str, event_type: str, data: Dict[str, Any]) -> str:
+        with self._lock:
+            offset = self._counters.get(channel, 0) + 1
+            self._counters[channel] = offset
+            stream = self._streams.setdefault(channel, deque(maxlen=self.max_events))
+            stream.append((str(offset), event_type, data))
+        return str(offset)
+
+    def read(self, channel: str, after: Optional[str], limit: int) -> Tuple[List[Event], bool]:
+        """Return events after `after` and whether older events were dropped"""
+        after_id = int(after) if after and after.isdigit() else 0
+        with self._lock:
+            stream = list(self._streams.get(channel, ()))
+        if not stream:
+            return [], False
+        truncated = after_id > 0 and after_id + 1 < int(stream[0][0])
+        events = [event for event in stream if int(event[0]) > after_id]
+        return events[:limit], truncated
+
+    async def wait(self, channel: str, after: Optional[str], timeout: float) -> bool:
+        """Wait until events newer than `after` exist, returning False on timeout"""
+        deadline = time.monotonic() + timeout
+        after_id = int(after) if after and after.isdigit() else 0
+        while time.monotonic() < deadline:
+            if self._counters.get(channel, 0) > after_id:
+                return True
+            await asyncio.sleep(0.1)
+        return False
+
+    def clear(self, channel: str) -> None:
+        # Offsets keep increasing so reconnecting clients never see reused ids
+        with self._lock:
+            self._streams.pop(channel, None)
+
+
+class RedisProgressBackend:
+    """Progress log stored in Redis streams so any worker can publish or serve it"""
+
+    def __init__(self, url: str, max_events: int = 1000, ttl: int = 3600):
+        import redis
+        import redis.asyncio as aioredis
+
+        self.max_events = max_events
+        self.ttl = ttl
+        self._client = redis.Redis.from_url(url, decode_responses=True)
+        self._async_client = aioredis.Redis.from_url(url, decode_responses=True)
+
+    def publish(self, channel: str, event_type: str, data: Dict[str, Any]) -> str:
+        pipe = self._client.pipeline()
+        pipe.xadd(
+            channel,
+            {'type': event_type, 'data': json.dumps(data)},
+            maxlen=self.max_events,
+            approximate=True,
+        )
+        pipe.expire(channel, self.ttl)
+        offset, _ = pipe.execute()
+        return offset
+
+    def read(self, channel: str, after: Optional[str], limit: int) -> Tuple[List[Event], bool]:
+        start = f"({after}" if after else '-'
+        entries = self._client.xrange(channel, min=start, max='+', count=limit)
+        truncated = bool(after) and self._trimmed_after(channel, after)
+        events = [
+            (entry_id, fields['type'], json.loads(fields['data']))
+            for entry_id, fields in entries
+        ]
+        return events, truncated
+
+    async def wait(self, channel: str, after: Optional[str], timeout: float) -> bool:
+        response = await self._async_client.xread(
+            {channel: after or '0-0'}, count=1, block=int(timeout * 1000)
+        )
+        return bool(response)
+
+    def clear(self, channel: str) -> None:
+        self._client.delete(channel)
+
+    def _trimmed_after(self, channel: str, after: str) -> bool:
+        """True when entries newer than `after` were trimmed by MAXLEN"""
+        try:
+            info = self._client.xinfo_stream(channel)
+        except Exception:
+            return False
+        max_deleted = info.get('max-deleted-entry-id')
+        if not max_deleted:
+            return False
+        return self._parse_id(max_deleted) > self._parse_id(after)
+
+    @staticmethod
+    def _parse_id(entry_id: str) -> Tuple[int, int]:
+        ms, _, seq = entry_id.partition('-')
+        try:
+            return int(ms), int(seq or 0)
+        except ValueError:
+            return 0, 0
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_progress_backend():
+    """Return the configured progress backend (created once per process)"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                config = getattr(settings, 'LCA_PROGRESS', {})
+                max_events = config.get('MAX_EVENTS', 1000)
+                if config.get('BACKEND', 'memory') == 'redis':
+                    _backend = RedisProgressBackend(
+                        config.get('REDIS_URL', settings.CELERY_BROKER_URL),
+                        max_events=max_events,
+                        ttl=config.get('TTL', 3600),
+                    )
+                else:
+                    if not getattr(settings, 'CELERY_TASK_ALWAYS_EAGER', False):
+                        logger.warning("In-memory progress backend with Celery workers: "
+                                       "streams will not see events published by the workers")
+                    _backend = InMemoryProgressBackend(max_events=max_events)
+    return _backend
+
+
+class ProgressReporter:
+    """Publishes throttled progress events for a running calculation"""
+
+    def __init__(self, calculation_id, backend=None, min_interval: Optional[float] = None):
+        config = getattr(settings, 'LCA_PROGRESS', {})
+        self.channel = calculation_channel(calculation_id)
+        self.backend = backend or get_progress_backend()
+        self.min_interval = (
+            min_interval if min_interval is not None else config.get('MIN_INTERVAL', 0.25)
+        )
+        self._started = time.monotonic()
+        self._last_sent = 0.0
+
+    def start(self, total_steps: int) -> None:
+        self._started = time.monotonic()
+        self.backend.clear(self.channel)
+        self._publish('progress', {'steps_done': 0, 'total_steps': total_steps, 'percent': 0.0,
+                                   'eta_seconds': None, 'partial_totals': {}})
+
+    def step(self, steps_done: int, total_steps: int, partial_totals: Dict[str, float]) -> None:
+        now = time.monotonic()
+        # Throttle intermediate updates so large models don't flood the channel
+        if steps_done < total_steps and now - self._last_sent < self.min_interval:
+            return
+        elapsed = now - self._started
+        eta = (elapsed / steps_done) * (total_steps - steps_done) if steps_done else None
+        self._publish('progress', {
+            'steps_done': steps_done,
+            'total_steps': total_steps,
+            'percent': round(steps_done / total_steps * 100, 2) if total_steps else 100.0,
+            'elapsed_seconds': round(elapsed, 3),
+            'eta_seconds': round(eta, 3) if eta is not None else None,
+            'partial_totals': dict(partial_totals),
+        })
+
+    def complete(self, results: Dict[str, Any]) -> None:
+        self._publish('result', {
+            'environmental_impacts': results.get('environmental_impacts', {}),
+            'circularity_metrics': results.get('circularity_metrics', {}),
+            'calculation_time': results.get('calculation_time'),
+        })
+
+    def fail(self, message: str) -> None:
+        self._publish('error', {'message': message})
+
+    def _publish(self, event_type: str, data: Dict[str, Any]) -> None:
+        try:
+            self.backend.publish(self.channel, event_type, data)
+            self._last_sent = time.monotonic()
+        except Exception as e:
+            # Progress is best-effort and must never fail the calculation
+            logger.warning(f"Failed to publish progress for {self.channel}: {str(e)}")
+
+
+def coalesce_events(events: List[Event]) -> List[Event]:
+    """Drop superseded progress events, keeping the latest one and all terminal events"""
+    coalesced = []
+    pending_progress = None
+    for event in events:
+        if event[1] == 'progress':
+            pending_progress = event
+        else:
+            if pending_progress is not None:
+                coalesced.append(pending_progress)
+                pending_progress = None
+            coalesced.append(event)
+    if pending_progress is not None:
+        coalesced.append(pending_progress)
+    return coalesced
+
+
+def format_sse(offset: str, event_type: str, data: Dict[str, Any]) -> str:
+    return f"id: {offset}\nevent: {event_type}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream_progress(channel: str, after: Optional[str] = None, backend=None):
+    """Async generator of server-sent event frames for a progress channel.
+
+    Events are pulled from the backend only when the previous frame has been
+    handed to the server, so a slow client never causes unbounded buffering;
+    instead the intermediate progress updates it missed are coalesced.
+    """
+    config = getattr(settings, 'LCA_PROGRESS', {})
+    backend = backend or get_progress_backend()
+    batch_size = config.get('BATCH_SIZE', 50)
+    heartbeat = config.get('HEARTBEAT_INTERVAL', 15)
+    idle_timeout = config.get('IDLE_TIMEOUT', 300)
+
+    yield f"retry: {config.get('RETRY_MS', 3000)}\n\n"
+
+    last_activity = time.monotonic()
+    while True:
+        events, truncated = await asyncio.to_thread(backend.read, channel, after, batch_size)
+        if truncated:
+            yield format_sse(after or '0', 'reset', {'reason': 'offset_expired'})
+        if events:
+            last_activity = time.monotonic()
+            for offset, event_type, data in coalesce_events(events):
+                yield format_sse(offset, event_type, data)
+                if event_type in TERMINAL_EVENTS:
+                    return
+            after = events[-1][0]
+            continue
+
+        if time.monotonic() - last_activity > idle_timeout:
+            return
+        if not await backend.wait(channel, after, heartbeat):
+            # Comment frames keep proxies from closing an idle connection
+            yield ": keep-alive\n\n"
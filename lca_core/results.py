@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from django.db.models import Sum
+from itertools import islice
+from typing import Dict, List, Any, Iterable, Optional
+import logging
+from lca_tool.routers import use_replica
+from .models import LCACalculation, CalculationResult
+
+logger = logging.getLogger(__name__)
+
+
+class CalculationResultStore:
+    """Columnar storage for per-step calculation results.
+
+    ``process_breakdown[step_id][impact]`` is flattened into one
+    ``CalculationResult`` row per (calculation, step, impact), so analytical
+    queries read only the impact they need instead of parsing whole result
+    blobs, and load straight into NumPy arrays.
+    """
+
+    def __init__(self, batch_size: int = 2000):
+        self.batch_size = batch_size
+
+    def store(self, calculation: LCACalculation, results: Dict[str, Any],
+              step_order: Optional[Dict[str, int]] = None) -> int:
+        """Replace the stored rows for a calculation with its latest breakdown"""
+        breakdown = results['lca_results']['process_breakdown']
+        step_order = step_order or {step_id: index for index, step_id in enumerate(breakdown)}
+        rows = [
+            CalculationResult(
+                project_id=calculation.project_id,
+                calculation_id=calculation.pk,
+                step_id=step_id,
+                step_order=step_order.get(step_id, 0),
+                impact=impact,
+                value=float(value),
+            )
+            for step_id, step_impacts in breakdown.items()
+            for impact, value in step_impacts.items()
+        ]
+
+        with transaction.atomic():
+            CalculationResult.objects.filter(calculation_id=calculation.pk).delete()
+            CalculationResult.objects.bulk_create(rows, batch_size=self.batch_size)
+
+        logger.info(f"Stored {len(rows)} result rows for calculation {calculation.pk}")
+        return len(rows)
+
+    @use_replica()
+    def impact_arrays(self, impact: str, project_id=None,
+                      calculation_ids: Optional[Iterable[int]] = None) -> Dict[str, np.ndarray]:
+        """Column arrays (calculation_id, step_id, step_order, value) for one impact"""
+        queryset = CalculationResult.objects.filter(impact=impact)
+        if project_id is not None:
+            queryset = queryset.filter(project_id=project_id)
+        if calculation_ids is not None:
+            queryset = queryset.filter(calculation_id__in=list(calculation_ids))
+
+        # A narrow values_list projection skips model instantiation. Rows are
+        # read in chunks and each chunk's columns are packed straight into
+        # typed arrays, so only one chunk of row tuples is alive at a time
+        rows = queryset.order_by('calculation_id', 'step_order').values_list(
+            'calculation_id', 'step_id', 'step_order', 'value'
+        ).iterator(chunk_size=self.batch_size)
+        dtypes = {'calculation_id': np.int64, 'step_id': object, 'step_order': np.int32, 'value': np.float64}
+        chunks = {name: [] for name in dtypes}
+        while True:
+            chunk = list(islice(rows, self.batch_size))
+            if not chunk:
+                break
+            for (name, dtype), column in zip(dtypes.items(), zip(*chunk)):
+                chunks[name].append(np.fromiter(column, dtype=dtype, count=len(chunk)))
+        return {
+            name: np.concatenate(chunks[name]) if chunks[name] else np.empty(0, dtype=dtype)
+            for name, dtype in dtypes.items()
+        }
+
+    def impact_frame(self, impact: str, project_id=None,
+                     calculation_ids: Optional[Iterable[int]] = None) -> pd.DataFrame:
+        """Long-format DataFrame for one impact, backed by the column arrays"""
+        return pd.DataFrame(
+            self.impact_arrays(impact, project_id=project_id, calculation_ids=calculation_ids),
+            copy=False,
+        )
+
+    def step_matrix(self, impact: str, project_id=None) -> pd.DataFrame:
+        """Calculations x steps matrix of one impact (e.g. climate_change per step)"""
+        frame = self.impact_frame(impact, project_id=project_id)
+        if frame.empty:
+            return frame
+        return frame.pivot_table(
+            index='calculation_id', columns='step_id', values='value', aggfunc='sum'
+        )
+
+    @use_replica()
+    def totals(self, impacts: List[str], project_id=None,
+               project_ids: Optional[Iterable[int]] = None) -> pd.DataFrame:
+        """Total impacts per calculation, aggregated in the database"""
+        queryset = CalculationResult.objects.filter(impact__in=impacts)
+        if project_id is not None:
+            queryset = queryset.filter(project_id=project_id)
+        if project_ids is not None:
+            queryset = queryset.filter(project_id__in=list(project_ids))
+        rows = queryset.values('calculation_id', 'impact').annotate(total=Sum('value')).order_by()
+        frame = pd.DataFrame.from_records(rows, columns=['calculation_id', 'impact', 'total'])
+        if frame.empty:
+            return frame
+        return frame.pivot(index='calculation_id', columns='impact', values='total')
@@ -0,0 +1,80 @@
+import logging
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+from .services import LCACalculationService, ScenarioCalculation
+
+logger = logging.getLogger(__name__)
+
+
+class ScenarioEvaluator:
+    """Evaluates many scenario overlays against one calculation in a single matrix product.
+
+    Step impacts are linear in material quantities, energy amounts and
+    emission masses, so each distinct flow (material + recycled content,
+    energy type, emission) becomes a column with a per-unit impact vector
+    obtained once from the exact engine. A scenario is then a row of flow
+    amounts, and all scenarios are evaluated as ``amounts @ factors``.
+    """
+
+    def __init__(self, calculation, service: Optional[LCACalculationService] = None):
+        self.service = service or LCACalculationService()
+        self.impacts = list(self.service.impact_methods)
+        self.steps = list(calculation.process_steps.all().order_by('order'))
+        # Overlays are applied to the preloaded steps, never re-queried
+        self.base = ScenarioCalculation(calculation, self.steps)
+        self._columns: Dict[Tuple[str, str, float], int] = {}
+        self._factors: List[np.ndarray] = []
+
+    def _column(self, kind: str, key: str, recycled_content: float = 0.0) -> int:
+        column_key = (kind, key.lower() if kind == 'material' else key, float(recycled_content))
+        column = self._columns.get(column_key)
+        if column is None:
+            if kind == 'material':
+                per_unit = self.service._calculate_material_impacts(
+                    {'material': key, 'quantity': 1.0, 'recycled_content': recycled_content}
+                )
+            elif kind == 'energy':
+                per_unit = self.service._calculate_energy_impacts({'type': key, 'amount': 1.0})
+            else:
+                per_unit = self.service._calculate_emission_impacts(key, 1.0)
+            column = len(self._factors)
+            self._columns[column_key] = column
+            self._factors.append(np.array([per_unit.get(impact, 0.0) for impact in self.impacts]))
+        return column
+
+    def _flows(self, steps: List[Any]) -> List[Tuple[int, float]]:
+        flows = []
+        for step in steps:
+            for material in step.input_materials:
+                flows.append((
+                    self._column('material', material.get('material', ''), material.get('recycled_content', 0)),
+                    material.get('quantity', 0),
+                ))
+            for energy in step.energy_inputs:
+                flows.append((self._column('energy', energy.get('type', 'electricity_grid')), energy.get('amount', 0)))
+            for emission, amount in step.emissions.items():
+                flows.append((self._column('emission', emission), amount))
+        return flows
+
+    def scenario(self, overlay: Dict[str, Any]) -> ScenarioCalculation:
+        return self.service._apply_scenario_changes(self.base, overlay) if overlay else self.base
+
+    def evaluate(self, overlays: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Impacts and circularity metrics for the baseline (row 0) and each overlay"""
+        scenarios = [self.base] + [self.scenario(overlay) for overlay in overlays]
+        flows = [self._flows(list(scenario.process_steps)) for scenario in scenarios]
+
+        amounts = np.zeros((len(scenarios), len(self._factors)))
+        for row, scenario_flows in enumerate(flows):
+            if scenario_flows:
+                columns, values = zip(*scenario_flows)
+                np.add.at(amounts[row], np.array(columns), np.array(values, dtype=np.float64))
+        factors = np.vstack(self._factors) if self._factors else np.zeros((0, len(self.impacts)))
+
+        circularity = [self.service._calculate_circularity_metrics(scenario) for scenario in scenarios]
+        return {
+            'impacts': self.impacts,
+            'values': amounts @ factors,
+            'circularity': circularity,
+        }
@@ -1,83 +1,158 @@
 import numpy as np
 import pandas as pd
 from django.conf import settings
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
+import copy
 import logging
 import time
 from .models import LCACalculation, ProcessStep
-from materials.models import Material, MaterialProperty
+from .progress import ProgressReporter
+from .results import CalculationResultStore
+from materials.models import Material
+from processes.allocation import AllocationEngine
 from processes.models import Process
 from ai_models.services import ParameterPredictionService, RecommendationEngine
+from circularity.services import CircularityEngine
 
 logger = logging.getLogger(__name__)
 
 
+class ScenarioSteps(list):
+    """In-memory process steps supporting the queryset calls used by the calculation"""
+    
+    def all(self):
+        return self
+    
+    def order_by(self, field_name: str):
+        reverse = field_name.startswith('-')
+        return ScenarioSteps(sorted(self, key=lambda step: getattr(step, field_name.lstrip('-')), reverse=reverse))
+    
+    def filter(self, **lookups):
+        return ScenarioSteps(
+            step for step in self if all(getattr(step, name) == value for name, value in lookups.items())
+        )
+
+
+class ScenarioCalculation:
+    """A calculation with scenario-modified process steps; everything else is the original's"""
+    
+    def __init__(self, calculation: LCACalculation, steps: List[Any]):
+        self._calculation = calculation
+        self.process_steps = ScenarioSteps(steps)
+    
+    def __getattr__(self, name):
+        return getattr(self._calculation, name)
+
+
 class LCACalculationService:
     """Service for performing LCA calculations"""
     
     def __init__(self):
+        # Impact categories and the MaterialProperty holding each one's per-kg factor
         self.impact_methods = {
-            'climate_change': self._calculate_climate_change,
-            'fossil_depletion': self._calculate_fossil_depletion,
-            'metal_depletion': self._calculate_metal_depletion,
-            'water_depletion': self._calculate_water_depletion,
-            'acidification': self._calculate_acidification,
-            'eutrophication': self._calculate_eutrophication,
-            'ozone_depletion': self._calculate_ozone_depletion,
-            'land_use': self._calculate_land_use,
-            'particulate_matter': self._calculate_particulate_matter,
-            'toxicity_human': self._calculate_human_toxicity,
-            'toxicity_eco': self._calculate_ecotoxicity,
+            category: f"{category}_factor"
+            for category in (
+                'climate_change', 'fossil_depletion', 'metal_depletion', 'water_depletion',
+                'acidification', 'eutrophication', 'ozone_depletion', 'land_use',
+                'particulate_matter', 'toxicity_human', 'toxicity_eco',
+            )
         }
+        self.parameter_predictor = ParameterPredictionService() if settings.ENABLE_AI_FEATURES else None
+        self.circularity_engine = CircularityEngine()
+        self.allocation_engine = AllocationEngine(self)
     
-    def calculate_lca(self, calculation: LCACalculation) -> Dict[str, Any]:
-        """Main LCA calculation method"""
+    def calculate_lca(self, calculation: LCACalculation,
+                      progress: Optional[ProgressReporter] = None) -> Dict[str, Any]:
+        """Main LCA calculation method.
+
+        When a ``ProgressReporter`` is given, step progress, partial totals and
+        the final results are published to the calculation's progress stream.
+        """
         start_time = time.time()
         
         try:
             # Get process steps
-            process_steps = calculation.process_steps.all().order_by('order')
+            process_steps = list(calculation.process_steps.all().order_by('order'))
             
-            if not process_steps.exists():
+            if not process_steps:
                 raise ValueError("No process steps defined for calculation")
             
+            # Estimate missing energy inputs / emissions in one batched pass
+            if self.parameter_predictor:
+                try:
+                    self.parameter_predictor.fill_missing_parameters(
+                        process_steps, calculation=calculation
+                    )
+                except Exception as e:
+                    logger.warning(f"Parameter prediction skipped: {str(e)}")
+            
             # Initialize results
             environmental_impacts = {}
             process_impacts = {}
             circularity_metrics = {}
+            total_steps = len(process_steps)
+            if progress:
+                progress.start(total_steps)
+            
+            # Multi-output processes attribute only their reference product's share
+            allocation = self.allocation_engine.allocate(process_steps)
             
             # Calculate impacts for each step
-            for step in process_steps:
+            for index, step in enumerate(process_steps, start=1):
                 step_impacts = self._calculate_step_impacts(step)
                 process_impacts[str(step.id)] = step_impacts
                 
-                # Aggregate impacts
-                for impact, value in step_impacts.items():
-                    environmental_impacts[impact] = environmental_impacts.get(impact, 0) + value
+                if progress:
+                    # Running totals for the progress stream only
+                    for impact, value in allocation.step(index - 1, step_impacts).items():
+                        environmental_impacts[impact] = environmental_impacts.get(impact, 0) + value
+                    progress.step(index, total_steps, environmental_impacts)
+            
+            process_impacts, environmental_impacts = allocation.apply(process_impacts)
             
             # Calculate circularity metrics
-            circularity_metrics = self._calculate_circularity_metrics(calculation)
+            circularity_metrics = self._calculate_circularity_metrics(calculation, process_steps)
             
             # Prepare results
             results = {
                 'lca_results': {
                     'total_impacts': environmental_impacts,
                     'process_breakdown': process_impacts,
-                    'functional_unit': calculation.project.functional_unit,
-                    'system_boundary': calculation.project.system_boundary,
+                    'functional_unit': getattr(calculation.project, 'functional_unit', ''),
+                    'system_boundary': getattr(calculation.project, 'system_boundary', ''),
+                    'allocation': allocation.details(),
                 },
                 'environmental_impacts': environmental_impacts,
                 'circularity_metrics': circularity_metrics,
+                'estimated_parameters': {
+                    str(step.id): step.estimated_fields
+                    for step in process_steps if getattr(step, 'estimated_fields', None)
+                },
                 'calculation_time': time.time() - start_time,
             }
             
+            if progress:
+                progress.complete(results)
+            
             logger.info(f"LCA calculation completed for {calculation.name}")
             return results
             
         except Exception as e:
             logger.error(f"LCA calculation failed: {str(e)}")
+            if progress:
+                progress.fail(str(e))
             raise
     
+    def calculate_and_store(self, calculation: LCACalculation,
+                            progress: Optional[ProgressReporter] = None) -> Dict[str, Any]:
+        """Run a calculation and persist its per-step results in columnar form"""
+        results = self.calculate_lca(calculation, progress=progress)
+        steps = list(calculation.process_steps.all())
+        step_order = {str(step.id): step.order for step in steps}
+        CalculationResultStore().store(calculation, results, step_order=step_order)
+        self.circularity_engine.store(calculation, steps)
+        return results
+    
     def _calculate_step_impacts(self, step: ProcessStep) -> Dict[str, float]:
         """Calculate environmental impacts for a single process step"""
         impacts = {}
@@ -119,16 +194,18 @@ class LCACalculationService:
         try:
             material = Material.objects.get(name__iexact=material_name)
             
-            # Get impact factors per kg
-            for impact_category in self.impact_methods.keys():
-                try:
-                    factor = MaterialProperty.objects.get(
-                        material=material,
-                        property_name=f"{impact_category}_factor"
-                    ).value
-                    impacts[impact_category] = quantity * factor
-                except MaterialProperty.DoesNotExist:
-                    impacts[impact_category] = 0
+            # Get impact factors per kg in one query
+            factors = dict(material.properties.filter(
+                property_name__in=self.impact_methods.values()
+            ).values_list('property_name', 'value'))
+            for impact_category, property_name in self.impact_methods.items():
+                impacts[impact_category] = quantity * factors.get(property_name, 0)
+            
+            recycled_content = material_input.get('recycled_content', 0)
+            if recycled_content:
+                for impact, reduction in self._recycled_impact_reduction(material, recycled_content).items():
+                    if impact in impacts:
+                        impacts[impact] *= 1 - reduction
                     
         except Material.DoesNotExist:
             logger.warning(f"Material {material_name} not found, using defaults")
@@ -139,6 +216,23 @@ class LCACalculationService:
         
         return impacts
     
+    def _recycled_impact_reduction(self, material: Material, recycled_content: float) -> Dict[str, float]:
+        """Fractional impact reductions for a recycled share, scaled linearly from the
+        closest recycled variant's ``impact_reduction_factors``"""
+        variants = [
+            variant for variant in material.recycled_variants.all()
+            if variant.recycled_content > 0 and variant.impact_reduction_factors
+        ]
+        if not variants:
+            return {}
+        variant = min(variants, key=lambda variant: abs(variant.recycled_content - recycled_content))
+        scale = recycled_content / variant.recycled_content
+        reductions = {}
+        for impact, factor in variant.impact_reduction_factors.items():
+            factor = factor / 100 if factor > 1 else factor  # Stored as a fraction or a percentage
+            reductions[impact] = min(max(factor * scale, 0.0), 1.0)
+        return reductions
+    
     def _calculate_energy_impacts(self, energy_input: Dict[str, Any]) -> Dict[str, float]:
         """Calculate impacts from energy inputs"""
         impacts = {}
@@ -203,64 +297,12 @@ class LCACalculationService:
         
         return impacts
     
-    def _calculate_circularity_metrics(self, calculation: LCACalculation) -> Dict[str, float]:
-        """Calculate circularity indicators"""
-        metrics = {}
-        
-        # Get all process steps
-        steps = calculation.process_steps.all()
-        
-        # Recycled content percentage
-        total_material_input = 0
-        recycled_material_input = 0
-        
-        for step in steps:
-            for material in step.input_materials:
-                quantity = material.get('quantity', 0)
-                recycled_content = material.get('recycled_content', 0)
-                total_material_input += quantity
-                recycled_material_input += quantity * (recycled_content / 100)
-        
-        metrics['recycled_content_percentage'] = (
-            (recycled_material_input / total_material_input * 100) 
-            if total_material_input > 0 else 0
-        )
-        
-        # End-of-life recovery rate
-        eol_steps = steps.filter(category='end_of_life')
-        total_waste = 0
-        recovered_waste = 0
-        
-        for step in eol_steps:
-            for waste in step.waste_outputs:
-                quantity = waste.get('quantity', 0)
-                recovery_rate = waste.get('recovery_rate', 0)
-                total_waste += quantity
-                recovered_waste += quantity * (recovery_rate / 100)
-        
-        metrics['recovery_rate'] = (
-            (recovered_waste / total_waste * 100) 
-            if total_waste > 0 else 0
-        )
-        
-        # Material efficiency (output/input ratio)
-        total_output = sum(
-            sum(material.get('quantity', 0) for material in step.output_materials)
-            for step in steps
-        )
-        
-        metrics['material_efficiency'] = (
-            (total_output / total_material_input * 100)
-            if total_material_input > 0 else 0
-        )
-        
-        # Overall circularity score (weighted average)
-        weights = {'recycled_content_percentage': 0.3, 'recovery_rate': 0.4, 'material_efficiency': 0.3}
-        metrics['overall_score'] = sum(
-            metrics[metric] * weight for metric, weight in weights.items()
-        )
-        
-        return metrics
+    def _calculate_circularity_metrics(self, calculation: LCACalculation,
+                                       steps: Optional[List[Any]] = None) -> Dict[str, float]:
+        """Calculate circularity indicators in one pass over the (preloaded) steps"""
+        if steps is None:
+            steps = list(calculation.process_steps.all())
+        return self.circularity_engine.metrics(steps)
     
     def sensitivity_analysis(self, calculation: LCACalculation, parameters: Dict[str, Any]) -> Dict[str, Any]:
         """Perform sensitivity analysis on key parameters"""
@@ -434,10 +476,84 @@ class LCACalculationService:
         return calculation
     
     def _apply_scenario_changes(self, calculation: LCACalculation, changes: Dict[str, Any]):
-        """Apply scenario changes to calculation"""
-        # This would create a modified calculation with the specified changes
-        # For now, return the original calculation
-        return calculation
+        """Apply a scenario overlay to in-memory copies of the calculation's steps.
+
+        ``changes`` maps overlay kinds to lists of changes:
+
+        - ``recycled_content``: ``{'material', 'value'}`` sets recycled content (%)
+        - ``substitution``: ``{'from', 'to'}`` swaps input materials
+        - ``energy_switch``: ``{'from', 'to', 'share'}`` moves a share of energy to another source
+        - ``scale``: ``{'target', 'factor', 'material'?}`` scales energy, transport, waste or materials
+        - ``recovery_rate``: ``{'value'}`` sets end-of-life recovery rates (%)
+
+        Nothing is saved; the returned object exposes the scenario steps
+        through ``process_steps`` like the original calculation.
+        """
+        steps = [copy.copy(step) for step in calculation.process_steps.all()]
+        for step in steps:
+            for attribute in ('input_materials', 'output_materials', 'energy_inputs', 'emissions', 'waste_outputs'):
+                setattr(step, attribute, copy.deepcopy(getattr(step, attribute)))
+
+        for change in changes.get('recycled_content', []):
+            for step in steps:
+                for material in step.input_materials:
+                    if self._material_matches(material.get('material', ''), change['material']):
+                        material['recycled_content'] = change['value']
+
+        for change in changes.get('substitution', []):
+            for step in steps:
+                for material in step.input_materials:
+                    if self._material_matches(material.get('material', ''), change['from']):
+                        material['material'] = change['to']
+                        material['recycled_content'] = 0
+
+        for change in changes.get('energy_switch', []):
+            share = change.get('share', 100) / 100
+            for step in steps:
+                switched = []
+                for energy in step.energy_inputs:
+                    energy_type = energy.get('type', 'electricity_grid')
+                    if energy_type == change['to'] or (change.get('from') and energy_type != change['from']):
+                        switched.append(energy)
+                        continue
+                    amount = energy.get('amount', 0)
+                    if share < 1:
+                        switched.append({**energy, 'amount': amount * (1 - share)})
+                    switched.append({**energy, 'type': change['to'], 'amount': amount * share})
+                step.energy_inputs = switched
+
+        for change in changes.get('scale', []):
+            factor = change['factor']
+            for step in steps:
+                target = change['target']
+                if target == 'energy' or (target == 'transport' and step.category == 'transport'):
+                    for energy in step.energy_inputs:
+                        energy['amount'] = energy.get('amount', 0) * factor
+                    if target == 'transport':
+                        step.emissions = {gas: amount * factor for gas, amount in step.emissions.items()}
+                elif target == 'waste':
+                    for waste in step.waste_outputs:
+                        waste['quantity'] = waste.get('quantity', 0) * factor
+                elif target == 'material':
+                    for material in step.input_materials:
+                        if not change.get('material') or self._material_matches(
+                            material.get('material', ''), change['material']
+                        ):
+                            material['quantity'] = material.get('quantity', 0) * factor
+
+        for change in changes.get('recovery_rate', []):
+            for step in steps:
+                if step.category == 'end_of_life':
+                    for waste in step.waste_outputs:
+                        waste['recovery_rate'] = change['value']
+
+        return ScenarioCalculation(calculation, steps)
+    
+    @staticmethod
+    def _material_matches(name: str, query: str) -> bool:
+        name = name.lower().replace('aluminium', 'aluminum')
+        query = query.lower().replace('aluminium', 'aluminum').strip()
+        return bool(query) and (query in name or name in query)
     
     def _identify_improvements(self, impact_differences: Dict, circularity_differences: Dict) -> List[str]:
         """Identify improvements from scenario analysis"""
@@ -458,22 +574,14 @@ class AIRecommendationService:
     """Service for generating AI-driven recommendations"""
     
     def __init__(self):
-        if settings.ENABLE_AI_FEATURES:
-            self.recommendation_engine = RecommendationEngine()
-        else:
-            self.recommendation_engine = None
+        self.recommendation_engine = RecommendationEngine()
     
     def generate_suggestions(self, calculation: LCACalculation) -> List[Dict[str, Any]]:
-        """Generate AI-driven improvement suggestions"""
-        if not self.recommendation_engine:
-            return self._get_rule_based_suggestions(calculation)
-        
+        """Generate improvement suggestions ranked by simulated impact reduction"""
         try:
-            # Use AI model to generate suggestions
-            suggestions = self.recommendation_engine.generate_recommendations(calculation)
-            return suggestions
+            return self.recommendation_engine.generate_recommendations(calculation)
         except Exception as e:
-            logger.warning(f"AI recommendation failed, using rule-based: {str(e)}")
+            logger.warning(f"Simulated recommendations failed, using rule-based: {str(e)}")
             return self._get_rule_based_suggestions(calculation)
     
     def _get_rule_based_suggestions(self, calculation: LCACalculation) -> List[Dict[str, Any]]:
@@ -481,8 +589,7 @@ class AIRecommendationService:
         suggestions = []
         
         # Analyze environmental impacts
-        impacts = calculation.environmental_impacts
-        climate_change = impacts.get('climate_change', 0)
+        climate_change = calculation.carbon_footprint
         
         if climate_change > 10:  # High carbon footprint
             suggestions.append({
@@ -495,7 +602,7 @@ class AIRecommendationService:
             })
         
         # Analyze circularity metrics
-        circularity = calculation.circularity_metrics
+        circularity = CircularityEngine().metrics(list(calculation.process_steps.all()))
         recycled_content = circularity.get('recycled_content_percentage', 0)
         
         if recycled_content < 30:  # Low recycled content
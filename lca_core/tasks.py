@@ -0,0 +1,42 @@
+import logging
+from typing import List
+
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(acks_late=True, ignore_result=True)
+def recalculate_calculations(calculation_ids: List[int]) -> None:
+    """Recalculate and store results of calculations whose library data changed"""
+    from .models import LCACalculation
+    from .progress import ProgressReporter
+    from .services import LCACalculationService
+
+    service = LCACalculationService()
+    recalculated = 0
+    for calculation in LCACalculation.objects.filter(pk__in=calculation_ids).order_by('pk'):
+        try:
+            service.calculate_and_store(calculation, progress=ProgressReporter(calculation.pk))
+            recalculated += 1
+        except Exception as e:
+            logger.error(f"Recalculation of calculation {calculation.pk} failed: {str(e)}")
+    logger.info(f"Recalculated {recalculated} of {len(calculation_ids)} calculations")
+
+
+@shared_task(acks_late=True, ignore_result=True)
+def run_calculation(calculation_id: int) -> None:
+    """Calculate and store one calculation, streaming progress to its SSE channel"""
+    from .models import LCACalculation
+    from .progress import ProgressReporter
+    from .services import LCACalculationService
+
+    calculation = LCACalculation.objects.filter(pk=calculation_id).first()
+    if calculation is None:
+        logger.warning(f"Calculation {calculation_id} no longer exists")
+        return
+    try:
+        LCACalculationService().calculate_and_store(calculation, progress=ProgressReporter(calculation.pk))
+    except Exception as e:
+        # The reporter has already published the error event
+        logger.error(f"Calculation {calculation_id} failed: {str(e)}")
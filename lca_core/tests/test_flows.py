@@ -0,0 +1,63 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from lca_core.flows import FlowGraphBuilder
+from lca_core.models import LCACalculation, LCAProject, ProcessStep
+
+
+class FlowGraphTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('analyst', password='secret')
+        project = LCAProject.objects.create(name='Bottle', owner=self.user)
+        self.calculation = LCACalculation.objects.create(project=project, name='Baseline')
+        ProcessStep.objects.create(
+            calculation=self.calculation, name='Molding', order=1, category='manufacturing',
+            input_materials=[{'material': 'PET', 'quantity': 10}],
+            output_materials=[{'material': 'Preform', 'quantity': 9}],
+            energy_inputs=[{'type': 'electricity_grid', 'amount': 5}],
+            waste_outputs=[{'quantity': 1, 'recovery_rate': 50}],
+        )
+        ProcessStep.objects.create(
+            calculation=self.calculation, name='Blowing', order=2, category='manufacturing',
+            input_materials=[{'material': 'Preform', 'quantity': 9}],
+            output_materials=[{'material': 'Bottle', 'quantity': 9}],
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_flows_endpoint_links_stages(self):
+        response = self.client.get(f"/api/calculations/{self.calculation.pk}/flows/", {'threshold': 0})
+        self.assertEqual(response.status_code, 200)
+        nodes = {node['id']: index for index, node in enumerate(response.data['nodes'])}
+        links = {(link['source'], link['target']) for link in response.data['links']}
+        self.assertEqual(response.data['steps'], 2)
+        molding, blowing = (f"step:{step.pk}" for step in self.calculation.process_steps.order_by('order'))
+        self.assertIn((nodes['material:pet'], nodes[molding]), links)
+        self.assertIn((nodes[molding], nodes[blowing]), links)
+        self.assertIn((nodes[blowing], nodes['product:bottle']), links)
+
+    def test_graph_is_cached_until_calculation_or_steps_change(self):
+        url = f"/api/calculations/{self.calculation.pk}/flows/"
+        first = self.client.get(url).data
+        self.assertEqual(self.client.get(url).data, first)
+
+        step = self.calculation.process_steps.get(order=1)
+        step.input_materials = [{'material': 'PET', 'quantity': 12}]
+        step.save()
+        edited = self.client.get(url).data
+        self.assertNotEqual(edited, first)
+        self.assertAlmostEqual(edited['totals']['mass_input'], 12.0)
+
+        ProcessStep.objects.filter(calculation=self.calculation).delete()
+        self.assertEqual(self.client.get(url).data['steps'], 0)
+
+    def test_invalid_threshold_is_rejected(self):
+        response = self.client.get(f"/api/calculations/{self.calculation.pk}/flows/", {'threshold': 5})
+        self.assertEqual(response.status_code, 400)
+
+    def test_mass_balance(self):
+        graph = FlowGraphBuilder(threshold=0).build(self.calculation.process_steps.order_by('order'))
+        self.assertAlmostEqual(graph['totals']['mass_input'], 10.0)
+        sinks = sum(node['value'] for node in graph['nodes'] if node['column'] == 3)
+        self.assertAlmostEqual(sinks, 10.0)
@@ -0,0 +1,161 @@
+import json
+import os
+import runpy
+import subprocess
+import sys
+import unittest
+import warnings
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase
+from rest_framework.test import APITestCase
+
+from lca_core.models import LCACalculation, LCAProject, ProcessStep
+from lca_core.progress import InMemoryProgressBackend, RedisProgressBackend, calculation_channel
+from lca_core.tasks import run_calculation
+
+
+async def read_body(response):
+    return b''.join([chunk async for chunk in response.streaming_content]).decode()
+
+
+def redis_available(url):
+    try:
+        import redis
+        return redis.Redis.from_url(url, socket_connect_timeout=0.5).ping()
+    except Exception:
+        return False
+
+
+# Publishes a whole run the way a Celery worker process would
+PUBLISH_RUN = '''
+import sys
+import django
+django.setup()
+from lca_core.progress import ProgressReporter, RedisProgressBackend
+reporter = ProgressReporter(sys.argv[2], backend=RedisProgressBackend(sys.argv[1]), min_interval=0)
+reporter.start(2)
+reporter.step(1, 2, {'climate_change': 1.5})
+reporter.step(2, 2, {'climate_change': 3.0})
+reporter.complete({'environmental_impacts': {'climate_change': 3.0}})
+'''
+
+
+def parse_events(body):
+    """(event, data) pairs of an SSE body, skipping retry and comment frames"""
+    events = []
+    for frame in body.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in frame.splitlines() if not line.startswith(':'))
+        if 'event' in fields:
+            events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+
+class CalculationProgressTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('analyst', password='secret')
+        project = LCAProject.objects.create(name='Frames', owner=self.user)
+        self.calculation = LCACalculation.objects.create(project=project, name='Baseline')
+        for order, name in enumerate(['Extrusion', 'Welding', 'Painting'], start=1):
+            ProcessStep.objects.create(
+                calculation=self.calculation, name=name, order=order, category='manufacturing',
+                input_materials=[{'material': 'Steel', 'quantity': 2}],
+                energy_inputs=[{'type': 'electricity_grid', 'amount': 4}],
+            )
+        # Calculations run in this process here, so the in-memory log is shared
+        patcher = mock.patch('lca_core.progress._backend', InMemoryProgressBackend())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client.force_login(self.user)
+
+    def stream(self, **headers):
+        response = self.client.get(f"/api/calculations/{self.calculation.pk}/progress/", **headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return parse_events(async_to_sync(read_body)(response))
+
+    @mock.patch('lca_core.tasks.run_calculation.delay')
+    def test_calculate_queues_a_run(self, delay):
+        response = self.client.post(f"/api/calculations/{self.calculation.pk}/calculate/")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['progress_url'], f"/api/calculations/{self.calculation.pk}/progress/")
+        delay.assert_called_once_with(self.calculation.pk)
+
+    def test_stream_reports_steps_and_final_result(self):
+        run_calculation(self.calculation.pk)
+        events = self.stream()
+
+        self.assertEqual([event for event, _ in events], ['progress', 'result'])
+        progress, result = events[0][1], events[1][1]
+        # Intermediate updates are coalesced into the latest one
+        self.assertEqual((progress['steps_done'], progress['total_steps']), (3, 3))
+        self.assertEqual(progress['percent'], 100.0)
+        self.assertAlmostEqual(result['environmental_impacts']['climate_change'], 3 * (2 * 2.1 + 4 * 0.5))
+        self.assertAlmostEqual(progress['partial_totals']['climate_change'],
+                               result['environmental_impacts']['climate_change'])
+
+    def test_stream_resumes_after_last_event_id(self):
+        run_calculation(self.calculation.pk)
+        first = self.client.get(f"/api/calculations/{self.calculation.pk}/progress/")
+        offsets = [line[4:] for line in async_to_sync(read_body)(first).splitlines()
+                   if line.startswith('id: ')]
+
+        events = self.stream(HTTP_LAST_EVENT_ID=offsets[0])
+        self.assertEqual([event for event, _ in events], ['result'])
+
+    def test_failed_run_streams_an_error(self):
+        self.calculation.process_steps.all().delete()
+        run_calculation(self.calculation.pk)
+        events = self.stream()
+        self.assertEqual(events, [('error', {'message': 'No process steps defined for calculation'})])
+
+    def test_stream_requires_ownership(self):
+        other = User.objects.create_user('other', password='secret')
+        self.client.force_login(other)
+        response = self.client.get(f"/api/calculations/{self.calculation.pk}/progress/")
+        self.assertEqual(response.status_code, 404)
+
+
+class ProgressBackendSettingsTests(SimpleTestCase):
+    def load_settings(self, **environ):
+        with mock.patch.dict(os.environ, environ), mock.patch('dotenv.load_dotenv'), warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            return runpy.run_module('lca_tool.settings')
+
+    def test_defaults_to_redis_when_tasks_run_in_workers(self):
+        settings = self.load_settings(LCA_PROGRESS_BACKEND='', CELERY_TASK_ALWAYS_EAGER='False')
+        self.assertEqual(settings['LCA_PROGRESS']['BACKEND'], 'redis')
+
+    def test_eager_tasks_keep_events_in_memory(self):
+        settings = self.load_settings(LCA_PROGRESS_BACKEND='', CELERY_TASK_ALWAYS_EAGER='True')
+        self.assertEqual(settings['LCA_PROGRESS']['BACKEND'], 'memory')
+
+
+@unittest.skipUnless(redis_available(settings.LCA_PROGRESS['REDIS_URL']), 'Redis is not reachable')
+class CrossProcessProgressTests(APITestCase):
+    def setUp(self):
+        self.url = settings.LCA_PROGRESS['REDIS_URL']
+        self.user = User.objects.create_user('analyst', password='secret')
+        project = LCAProject.objects.create(name='Frames', owner=self.user)
+        self.calculation = LCACalculation.objects.create(project=project, name='Baseline')
+        backend = RedisProgressBackend(self.url)
+        backend.clear(calculation_channel(self.calculation.pk))
+        self.addCleanup(backend.clear, calculation_channel(self.calculation.pk))
+        patcher = mock.patch('lca_core.progress._backend', backend)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client.force_login(self.user)
+
+    def test_stream_sees_events_published_by_another_process(self):
+        subprocess.run([sys.executable, '-c', PUBLISH_RUN, self.url, str(self.calculation.pk)],
+                       env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'lca_tool.settings'},
+                       check=True, timeout=60)
+
+        response = self.client.get(f"/api/calculations/{self.calculation.pk}/progress/")
+        events = parse_events(async_to_sync(read_body)(response))
+        self.assertEqual([event for event, _ in events], ['progress', 'result'])
+        self.assertEqual(events[0][1]['steps_done'], 2)
+        self.assertEqual(events[1][1]['environmental_impacts'], {'climate_change': 3.0})
@@ -0,0 +1,56 @@
+import numpy as np
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from lca_core.models import LCACalculation, LCAProject
+from lca_core.results import CalculationResultStore
+
+
+def breakdown(*steps):
+    return {'lca_results': {'process_breakdown': dict(steps)}}
+
+
+class CalculationResultStoreTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('analyst', password='secret')
+        self.project = LCAProject.objects.create(name='Frames', owner=user)
+        self.first = LCACalculation.objects.create(project=self.project, name='Baseline')
+        self.second = LCACalculation.objects.create(project=self.project, name='Recycled')
+        # A batch smaller than the row count exercises the chunked column packing
+        self.store = CalculationResultStore(batch_size=2)
+        self.store.store(self.first, breakdown(
+            ('1', {'climate_change': 4.0, 'water_use': 1.0}),
+            ('2', {'climate_change': 2.5}),
+        ))
+        self.store.store(self.second, breakdown(
+            ('3', {'climate_change': 1.5}),
+            ('4', {'climate_change': 0.5}),
+        ))
+
+    def test_impact_arrays_are_typed_columns(self):
+        arrays = self.store.impact_arrays('climate_change', project_id=self.project.pk)
+        self.assertEqual(arrays['calculation_id'].dtype, np.int64)
+        self.assertEqual(arrays['step_order'].dtype, np.int32)
+        self.assertEqual(arrays['value'].dtype, np.float64)
+        np.testing.assert_array_equal(arrays['calculation_id'],
+                                      [self.first.pk, self.first.pk, self.second.pk, self.second.pk])
+        self.assertEqual(list(arrays['step_id']), ['1', '2', '3', '4'])
+        np.testing.assert_allclose(arrays['value'], [4.0, 2.5, 1.5, 0.5])
+
+    def test_impact_arrays_filter_calculations(self):
+        arrays = self.store.impact_arrays('climate_change', calculation_ids=[self.second.pk])
+        np.testing.assert_allclose(arrays['value'], [1.5, 0.5])
+
+    def test_missing_impact_gives_empty_arrays(self):
+        arrays = self.store.impact_arrays('land_use')
+        self.assertEqual(len(arrays['value']), 0)
+        self.assertEqual(arrays['value'].dtype, np.float64)
+        self.assertTrue(self.store.impact_frame('land_use').empty)
+
+    def test_store_replaces_rows_and_step_matrix_pivots(self):
+        self.store.store(self.first, breakdown(('1', {'climate_change': 3.0})))
+        matrix = self.store.step_matrix('climate_change', project_id=self.project.pk)
+        self.assertEqual(matrix.loc[self.first.pk, '1'], 3.0)
+        self.assertEqual(list(matrix.columns), ['1', '3', '4'])
+        self.assertTrue(np.isnan(matrix.loc[self.first.pk, '3']))
+        self.assertEqual(matrix.loc[self.second.pk, '4'], 0.5)
@@ -0,0 +1,48 @@
+import numpy as np
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from lca_core.models import LCACalculation, LCAProject, ProcessStep
+from lca_core.scenarios import ScenarioEvaluator
+
+
+class ScenarioEvaluatorTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('analyst', password='secret')
+        project = LCAProject.objects.create(name='Frames', owner=user)
+        self.calculation = LCACalculation.objects.create(project=project, name='Baseline')
+        ProcessStep.objects.create(
+            calculation=self.calculation, name='Extrusion', order=1, category='manufacturing',
+            input_materials=[{'material': 'Steel', 'quantity': 2}],
+            energy_inputs=[{'type': 'electricity_grid', 'amount': 10}],
+        )
+        ProcessStep.objects.create(
+            calculation=self.calculation, name='Recycling', order=2, category='end_of_life',
+            waste_outputs=[{'quantity': 2, 'recovery_rate': 20}],
+        )
+        self.evaluator = ScenarioEvaluator(self.calculation)
+        self.climate = self.evaluator.impacts.index('climate_change')
+
+    def test_overlays_are_ranked_by_simulated_impact(self):
+        overlays = [
+            {'substitution': [{'from': 'steel', 'to': 'Copper'}]},
+            {'energy_switch': [{'to': 'electricity_renewable'}]},
+            {'scale': [{'target': 'energy', 'factor': 0.5}]},
+        ]
+        climate = self.evaluator.evaluate(overlays)['values'][:, self.climate]
+
+        np.testing.assert_allclose(climate, [
+            2 * 2.1 + 10 * 0.5,  # Baseline
+            2 * 3.2 + 10 * 0.5,
+            2 * 2.1 + 10 * 0.05,
+            2 * 2.1 + 5 * 0.5,
+        ])
+        self.assertEqual(list(np.argsort(climate)), [2, 3, 0, 1])
+
+    def test_overlays_leave_the_stored_steps_untouched(self):
+        results = self.evaluator.evaluate([{'recovery_rate': [{'value': 90}]}])
+        before, after = results['circularity']
+        self.assertGreater(after['overall_score'], before['overall_score'])
+        np.testing.assert_allclose(results['values'][0], results['values'][1])
+        step = self.calculation.process_steps.get(order=2)
+        self.assertEqual(step.waste_outputs[0]['recovery_rate'], 20)
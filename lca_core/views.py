@@ -1,10 +1,21 @@
-from rest_framework import viewsets
+from types import SimpleNamespace
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from rest_framework import exceptions, status, viewsets
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from lca_tool.routers import ReplicaReadMixin
 from .models import LCAProject, LCACalculation
+from .progress import calculation_channel, stream_progress
 from .serializers import LCAProjectSerializer, LCACalculationSerializer
 
+UUID_PATTERN = r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}'
 
-class LCAProjectViewSet(viewsets.ModelViewSet):
+
+class LCAProjectViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     """Simplified ViewSet for LCA Projects"""
     serializer_class = LCAProjectSerializer
     permission_classes = [IsAuthenticated]
@@ -16,10 +27,188 @@ class LCAProjectViewSet(viewsets.ModelViewSet):
         serializer.save(owner=self.request.user)
 
 
-class LCACalculationViewSet(viewsets.ModelViewSet):
+class LCACalculationViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     """Simplified ViewSet for LCA Calculations"""
     serializer_class = LCACalculationSerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
         return LCACalculation.objects.filter(project__owner=self.request.user)
+    
+    @action(detail=True, methods=['post'])
+    def calculate(self, request, pk=None):
+        """Queue a calculation run; progress and results stream from the ``progress`` endpoint"""
+        from .tasks import run_calculation
+        
+        calculation = self.get_object()
+        if not calculation.process_steps.exists():
+            return Response({'error': 'No process steps defined for calculation'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        run_calculation.delay(calculation.pk)
+        return Response({
+            'status': 'queued',
+            'progress_url': reverse('calculation_progress', args=[calculation.pk]),
+        }, status=status.HTTP_202_ACCEPTED)
+    
+    @action(detail=True, methods=['post'])
+    def ask(self, request, pk=None):
+        """Answer a natural-language what-if question about this calculation"""
+        from ai_models.nlp import NLQueryService
+        
+        query = (request.data.get('query') or '').strip()
+        if not query:
+            return Response({'error': 'query is required'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(query) > 500:
+            return Response({'error': 'query is too long'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        calculation = self.get_object()
+        try:
+            answer = NLQueryService().answer(
+                calculation, query, user=request.user, session_id=request.data.get('session_id', '')
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(answer)
+    
+    @action(detail=True, methods=['post'])
+    def optimize(self, request, pk=None):
+        """Queue a search of process parameter bounds for lower weighted impacts or a circularity Pareto front"""
+        from processes.models import OptimizationRun
+        from processes.optimization import evaluation_budget
+        from processes.tasks import run_optimization
+        
+        calculation = self.get_object()
+        weights = request.data.get('weights') or {}
+        mode = request.data.get('mode', 'weighted')
+        try:
+            population_size = int(request.data.get('population_size', 100))
+            generations = int(request.data.get('generations', 100))
+            seed = int(request.data.get('seed', 0))
+            if not isinstance(weights, dict):
+                raise ValueError('"weights" must be an object of impact categories')
+            if mode not in dict(OptimizationRun.MODES):
+                raise ValueError(f"Unknown optimization mode: {mode}")
+            evaluation_budget(population_size, generations)
+        except (TypeError, ValueError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        run = OptimizationRun.objects.create(
+            calculation=calculation, mode=mode, weights=weights, population_size=population_size,
+            generations=generations, seed=seed, created_by=request.user,
+        )
+        run_optimization.delay(str(run.pk))
+        return Response({
+            'id': str(run.pk),
+            'status': run.status,
+            'status_url': reverse('lcacalculation-optimization', args=[calculation.pk, run.pk]),
+        }, status=status.HTTP_202_ACCEPTED)
+    
+    @action(detail=True, methods=['get'], url_path=rf'optimizations/(?P<run_id>{UUID_PATTERN})')
+    def optimization(self, request, pk=None, run_id=None):
+        """Status and, once completed, the solutions of an optimization run"""
+        from processes.models import OptimizationRun
+        
+        calculation = self.get_object()
+        run = OptimizationRun.objects.filter(calculation=calculation, pk=run_id).first()
+        if run is None:
+            return Response({'error': 'Optimization not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({
+            'id': str(run.pk),
+            'status': run.status,
+            'mode': run.mode,
+            'created_at': run.created_at,
+            'completed_at': run.completed_at,
+            'error': run.error_message or None,
+            'results': run.results if run.status == 'completed' else None,
+        })
+    
+    @action(detail=True, methods=['post'])
+    def estimate(self, request, pk=None):
+        """Near-instant impacts for the stored or edited (``process_steps``) steps"""
+        from ai_models.surrogate import SurrogateService
+        
+        calculation = self.get_object()
+        steps = request.data.get('process_steps')
+        if steps is not None:
+            if not isinstance(steps, list) or not all(isinstance(step, dict) for step in steps):
+                return Response({'error': '"process_steps" must be a list of objects'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            steps = [_draft_step(index, step) for index, step in enumerate(steps)]
+        try:
+            return Response(SurrogateService().estimate_or_calculate(calculation, steps, user=request.user))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    @action(detail=True, methods=['post'])
+    def recommendations(self, request, pk=None):
+        """Simulate and rank circularity interventions, replacing the unvalidated improvements"""
+        from .services import AIRecommendationService
+        
+        calculation = self.get_object()
+        return Response({'recommendations': AIRecommendationService().generate_suggestions(calculation)})
+    
+    @action(detail=True, methods=['get'])
+    def flows(self, request, pk=None):
+        """Aggregated material and energy flow graph (Sankey nodes/links) of the process steps"""
+        from .flows import calculation_flow_graph
+        
+        calculation = self.get_object()
+        try:
+            threshold = request.query_params.get('threshold')
+            graph = calculation_flow_graph(
+                calculation,
+                threshold=float(threshold) if threshold is not None else None,
+                group_by=request.query_params.get('group_by', 'auto'),
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(graph)
+
+def _draft_step(index, data):
+    """Unsaved process step from the editor, with the attributes the engine reads"""
+    return SimpleNamespace(
+        id=data.get('id', f"draft-{index}"),
+        name=data.get('name', ''),
+        order=data.get('order', index),
+        category=data.get('category', ''),
+        input_materials=data.get('input_materials') or [],
+        output_materials=data.get('output_materials') or [],
+        energy_inputs=data.get('energy_inputs') or [],
+        emissions=data.get('emissions') or {},
+        waste_outputs=data.get('waste_outputs') or [],
+    )
+
+
+def _authenticate(request):
+    """Resolve the user from the session or a DRF token header"""
+    if request.user.is_authenticated:
+        return request.user
+    try:
+        result = TokenAuthentication().authenticate(request)
+    except exceptions.AuthenticationFailed:
+        return None
+    return result[0] if result else None
+
+
+async def calculation_progress(request, pk):
+    """Server-sent event stream of a calculation's progress and final results.
+
+    Clients resume after a reconnect by sending the last received event id
+    (``Last-Event-ID`` header, or ``?offset=`` for clients that cannot set it).
+    """
+    user = await sync_to_async(_authenticate)(request)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+    
+    owned = await LCACalculation.objects.filter(pk=pk, project__owner=user).aexists()
+    if not owned:
+        return JsonResponse({'detail': 'Not found.'}, status=404)
+    
+    offset = request.headers.get('Last-Event-ID') or request.GET.get('offset')
+    response = StreamingHttpResponse(
+        stream_progress(calculation_channel(pk), after=offset),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,86 @@
+"""
+Database configuration helpers.
+
+Builds Django ``DATABASES`` entries from ``DATABASE_URL`` style connection
+strings so the same settings module works for the local SQLite quick start,
+the docker-compose Postgres service and NeonDB.
+"""
+
+from pathlib import Path
+from typing import Dict, Any, Optional
+from urllib.parse import urlsplit, unquote, parse_qsl
+
+ENGINES = {
+    'postgres': 'django.db.backends.postgresql',
+    'postgresql': 'django.db.backends.postgresql',
+    'pgsql': 'django.db.backends.postgresql',
+    'sqlite': 'django.db.backends.sqlite3',
+}
+
+
+def parse_database_url(url: str, base_dir: Optional[Path] = None) -> Dict[str, Any]:
+    """Convert a database URL into a Django database settings dict"""
+    parts = urlsplit(url)
+    scheme = parts.scheme.split('+')[0]
+    if scheme not in ENGINES:
+        raise ValueError(f"Unsupported database URL scheme: {parts.scheme}")
+
+    if scheme == 'sqlite':
+        # sqlite:///relative.db, sqlite:////absolute.db or sqlite:///:memory:
+        path = unquote(parts.path[1:] if parts.path.startswith('/') else parts.path)
+        if path in ('', ':memory:'):
+            name = ':memory:'
+        else:
+            name = Path(path)
+            if not name.is_absolute() and base_dir is not None:
+                name = (base_dir / name).resolve()
+        return {'ENGINE': ENGINES[scheme], 'NAME': name}
+
+    options = dict(parse_qsl(parts.query))
+    return {
+        'ENGINE': ENGINES[scheme],
+        'NAME': unquote(parts.path.lstrip('/')),
+        'USER': unquote(parts.username or ''),
+        'PASSWORD': unquote(parts.password or ''),
+        'HOST': parts.hostname or '',
+        'PORT': str(parts.port or ''),
+        'OPTIONS': options,
+    }
+
+
+def build_database_config(url: str, base_dir: Optional[Path] = None, conn_max_age: int = 600,
+                          pooler: str = '', health_checks: bool = True) -> Dict[str, Any]:
+    """Database settings with persistent connections.
+
+    ``conn_max_age`` keeps connections open across requests (``None`` means
+    unlimited). With ``pooler='pgbouncer'`` the connection goes through a
+    transaction-mode pooler such as PgBouncer or Neon's ``-pooler`` endpoint,
+    which cannot keep server-side cursors open between transactions.
+    """
+    config = parse_database_url(url, base_dir=base_dir)
+    config['CONN_MAX_AGE'] = conn_max_age
+    # Ping reused connections at the start of each request so a connection
+    # dropped by the server or pooler is replaced instead of raising
+    config['CONN_HEALTH_CHECKS'] = health_checks
+    if config['ENGINE'] == ENGINES['sqlite']:
+        return config
+
+    options = config['OPTIONS']
+    options.setdefault('connect_timeout', 10)
+    if 'neon.tech' in config['HOST']:
+        options.setdefault('sslmode', 'require')
+    if pooler == 'pgbouncer':
+        config['DISABLE_SERVER_SIDE_CURSORS'] = True
+    return config
+
+
+def build_databases(default_url: str, replica_urls=(), base_dir: Optional[Path] = None,
+                    **config_kwargs) -> Dict[str, Dict[str, Any]]:
+    """DATABASES setting with a primary and optional read replicas (replica_1, ...)"""
+    databases = {'default': build_database_config(default_url, base_dir=base_dir, **config_kwargs)}
+    for index, url in enumerate(replica_urls, start=1):
+        replica = build_database_config(url, base_dir=base_dir, **config_kwargs)
+        # Tests run against the primary; replicas mirror it
+        replica['TEST'] = {'MIRROR': 'default'}
+        databases[f"replica_{index}"] = replica
+    return databases
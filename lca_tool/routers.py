@@ -0,0 +1,207 @@
+"""
+Database routing between the primary and read replicas.
+
+Reads go to a replica only when the code running them has declared itself
+read-only: safe (GET/HEAD/OPTIONS) requests, ViewSet actions listed in
+``ReplicaReadMixin.replica_actions`` and blocks wrapped in ``use_replica()``
+(reporting and analytics services). Everything else, including all writes
+and migrations, uses the primary.
+
+After a client writes, its reads stay on the primary for
+``DATABASE_REPLICA_STICKY_SECONDS`` so it always sees its own changes, and
+replicas lagging more than ``DATABASE_REPLICA_MAX_LAG`` seconds are skipped.
+"""
+
+import logging
+import random
+import threading
+import time
+from contextlib import ContextDecorator
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.db import connections
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# 'replica', 'primary' or None (use the primary)
+_target: ContextVar[Optional[str]] = ContextVar('db_target', default=None)
+# Per-request state shared with any copied contexts: {'pinned': bool, 'wrote': bool}
+_request_state: ContextVar[Optional[dict]] = ContextVar('db_request_state', default=None)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+STICKY_COOKIE = 'lca_primary_pin'
+# Freshly created sessions and tokens must be visible immediately after login
+PRIMARY_ONLY_APPS = ('sessions', 'authtoken')
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith('replica_')]
+
+
+def pin_to_primary() -> None:
+    """Route the rest of the current request to the primary"""
+    state = _request_state.get()
+    if state is not None:
+        state['pinned'] = True
+        state['wrote'] = True
+
+
+def is_pinned() -> bool:
+    state = _request_state.get()
+    return bool(state and state['pinned'])
+
+
+class _RoutingContext(ContextDecorator):
+    def __init__(self, target: str):
+        self.target = target
+        self._tokens = []
+
+    def __enter__(self):
+        self._tokens.append(_target.set(self.target))
+        return self
+
+    def __exit__(self, *exc):
+        _target.reset(self._tokens.pop())
+        return False
+
+    def _recreate_cm(self):
+        # Used as a decorator, each call gets its own token stack so concurrent
+        # calls in other threads never reset each other's tokens
+        return _RoutingContext(self.target)
+
+
+def use_replica():
+    """Context manager/decorator for read-only services such as reporting exports"""
+    return _RoutingContext('replica')
+
+
+def use_primary():
+    """Context manager/decorator forcing reads onto the primary"""
+    return _RoutingContext('primary')
+
+
+def postgres_replica_lag(alias: str) -> float:
+    """Seconds the replica is behind its primary"""
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return 0.0
+    with connection.cursor() as cursor:
+        # A replica that has replayed everything it received is current, however
+        # long ago the primary last committed; otherwise lag is the age of the
+        # last replayed transaction
+        cursor.execute(
+            "SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0 "
+            "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+            "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+        )
+        return float(cursor.fetchone()[0])
+
+
+class ReplicaLagMonitor:
+    """Caches replica lag measurements so routing never waits on a lag query"""
+
+    def __init__(self):
+        self._lag: Dict[str, Tuple[float, float]] = {}  # alias -> (lag, measured_at)
+        self._lock = threading.Lock()
+
+    def lag(self, alias: str) -> float:
+        interval = getattr(settings, 'DATABASE_REPLICA_LAG_CHECK_INTERVAL', 5)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._lag.get(alias)
+        if cached and now - cached[1] < interval:
+            return cached[0]
+
+        check = import_string(getattr(
+            settings, 'DATABASE_REPLICA_LAG_FUNCTION', 'lca_tool.routers.postgres_replica_lag'
+        ))
+        try:
+            lag = check(alias)
+        except Exception as e:
+            logger.warning(f"Replica lag check failed for {alias}: {str(e)}")
+            lag = float('inf')
+        with self._lock:
+            self._lag[alias] = (lag, now)
+        return lag
+
+    def healthy_replicas(self):
+        max_lag = getattr(settings, 'DATABASE_REPLICA_MAX_LAG', 10)
+        return [alias for alias in replica_aliases() if self.lag(alias) <= max_lag]
+
+    def reset(self):
+        with self._lock:
+            self._lag.clear()
+
+
+lag_monitor = ReplicaLagMonitor()
+
+
+class PrimaryReplicaRouter:
+    """Send declared read-only work to a replica that is not lagging"""
+
+    def db_for_read(self, model, **hints):
+        if _target.get() != 'replica' or is_pinned():
+            return 'default'
+        if model is not None and model._meta.app_label in PRIMARY_ONLY_APPS:
+            return 'default'
+        replicas = lag_monitor.healthy_replicas()
+        return random.choice(replicas) if replicas else 'default'
+
+    def db_for_write(self, model, **hints):
+        # Later reads in this request must see the write
+        pin_to_primary()
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+class ReplicaRoutingMiddleware:
+    """Route safe requests to replicas and keep writers on the primary for a while"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = {'pinned': STICKY_COOKIE in request.COOKIES, 'wrote': False}
+        state_token = _request_state.set(state)
+        target_token = _target.set('replica' if request.method in SAFE_METHODS else 'primary')
+        try:
+            response = self.get_response(request)
+        finally:
+            _target.reset(target_token)
+            _request_state.reset(state_token)
+
+        if request.method not in SAFE_METHODS or state['wrote']:
+            if response.status_code < 400:
+                response.set_cookie(
+                    STICKY_COOKIE, '1',
+                    max_age=getattr(settings, 'DATABASE_REPLICA_STICKY_SECONDS', 10),
+                    httponly=True, samesite='Lax',
+                )
+        return response
+
+
+class ReplicaReadMixin:
+    """ViewSet mixin routing only the listed read-only actions to replicas"""
+    replica_actions = ('list', 'retrieve')
+
+    def initial(self, request, *args, **kwargs):
+        self._db_target_token = _target.set(
+            'replica' if self.action in self.replica_actions else 'primary'
+        )
+        super().initial(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_db_target_token', None)
+        if token is not None:
+            _target.reset(token)
+            self._db_target_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
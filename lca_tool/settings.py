@@ -2,6 +2,8 @@ import os
 from pathlib import Path
 from dotenv import load_dotenv
 
+from .database import build_databases
+
 # Load environment variables
 load_dotenv()
 
@@ -29,6 +31,12 @@ INSTALLED_APPS = [
     
     # LCA Apps (basic setup)
     'lca_core',
+    'reporting',
+    'materials',
+    'processes',
+    'ai_models',
+    'circularity',
+    'data_integration',
 ]
 
 MIDDLEWARE = [
@@ -40,6 +48,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'lca_tool.routers.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'lca_tool.urls'
@@ -63,12 +72,22 @@ TEMPLATES = [
 WSGI_APPLICATION = 'lca_tool.wsgi.application'
 
 # Database
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
-}
+# DATABASE_URL selects the primary (SQLite quick start, docker-compose Postgres
+# or NeonDB). DATABASE_REPLICA_URLS is a comma-separated list of read replicas.
+DATABASES = build_databases(
+    os.getenv('DATABASE_URL') or f"sqlite:///{BASE_DIR / 'db.sqlite3'}",
+    replica_urls=[url for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url],
+    base_dir=BASE_DIR,
+    conn_max_age=int(os.getenv('DB_CONN_MAX_AGE', '600')),  # Persistent connections (seconds)
+    pooler=os.getenv('DB_POOLER', ''),  # 'pgbouncer' for transaction-mode poolers (e.g. Neon -pooler)
+)
+DATABASE_ROUTERS = ['lca_tool.routers.PrimaryReplicaRouter']
+# Keep a client's reads on the primary for this long after it writes
+DATABASE_REPLICA_STICKY_SECONDS = int(os.getenv('DATABASE_REPLICA_STICKY_SECONDS', '10'))
+# Replicas further behind than this (seconds) are skipped until they catch up
+DATABASE_REPLICA_MAX_LAG = float(os.getenv('DATABASE_REPLICA_MAX_LAG', '10'))
+DATABASE_REPLICA_LAG_CHECK_INTERVAL = 5
+DATABASE_REPLICA_LAG_FUNCTION = 'lca_tool.routers.postgres_replica_lag'
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -131,6 +150,18 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_CREDENTIALS = True
 
+# Cache: Redis shared across workers when CACHE_URL is set, per-process memory otherwise
+CACHE_URL = os.getenv('CACHE_URL', '')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': CACHE_URL,
+        'KEY_PREFIX': 'lca',
+    } if CACHE_URL else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
 # Celery Configuration
 CELERY_BROKER_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
@@ -138,6 +169,60 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+CELERY_TASK_ALWAYS_EAGER = os.getenv('CELERY_TASK_ALWAYS_EAGER', 'False').lower() == 'true'
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1  # Report renders are long; don't hoard them on one worker
+CELERY_BEAT_SCHEDULE = {
+    'prune-ai-audit-logs': {
+        'task': 'ai_models.tasks.prune_ai_audit_logs',
+        'schedule': 24 * 60 * 60,
+    },
+    'compute-model-drift': {
+        'task': 'ai_models.tasks.compute_model_drift',
+        'schedule': 60 * 60,  # Each run only fills periods that have no log yet
+    },
+    'update-impact-surrogate': {
+        'task': 'ai_models.tasks.update_impact_surrogate',
+        'schedule': 15 * 60,  # Folds in calculations stored since the last run
+    },
+    'refresh-feature-store': {
+        'task': 'ai_models.tasks.refresh_feature_store',
+        'schedule': 60 * 60,  # Appends rows changed since each source's watermark
+    },
+    'sync-data-sources': {
+        'task': 'data_integration.tasks.sync_data_sources',
+        'schedule': 15 * 60,  # Each source only fetches changes after its checkpoint
+    },
+}
+
+# Calculation progress streaming (server-sent events)
+# 'memory' keeps events in-process and only works when tasks run eagerly;
+# otherwise calculations run in Celery workers and events go through Redis.
+LCA_PROGRESS = {
+    'BACKEND': os.getenv('LCA_PROGRESS_BACKEND') or ('memory' if CELERY_TASK_ALWAYS_EAGER else 'redis'),
+    'REDIS_URL': os.getenv('REDIS_URL', 'redis://localhost:6379/0'),
+    'MAX_EVENTS': 1000,  # Events retained per calculation for resume
+    'TTL': 3600,  # Seconds a finished stream is kept in Redis
+    'MIN_INTERVAL': 0.25,  # Minimum seconds between intermediate progress events
+    'BATCH_SIZE': 50,
+    'HEARTBEAT_INTERVAL': 15,
+    'IDLE_TIMEOUT': 300,
+    'RETRY_MS': 3000,
+}
+
+# Rendered report artifacts (content-addressed, LRU-evicted)
+REPORT_ARTIFACTS = {
+    'ROOT': MEDIA_ROOT / 'report_artifacts',
+    'MAX_BYTES': int(os.getenv('REPORT_ARTIFACT_MAX_BYTES', str(2 * 1024 ** 3))),
+    'LOCK_TIMEOUT': 60,  # Seconds without a heartbeat before a render's lock is considered abandoned
+    'RETRY_COUNTDOWN': 5,  # Seconds before a task waiting on another worker's render checks again
+    'WAIT_TIMEOUT': 900,  # Seconds a task waits on another worker's render before failing the report
+}
+
+# Charts and sections shared between report renders (content-addressed, LRU-evicted)
+REPORT_SECTION_CACHE = {
+    'ROOT': MEDIA_ROOT / 'report_cache',
+    'MAX_BYTES': int(os.getenv('REPORT_SECTION_CACHE_MAX_BYTES', str(256 * 1024 ** 2))),
+}
 
 # File Upload Settings
 FILE_UPLOAD_MAX_MEMORY_SIZE = int(os.getenv('MAX_UPLOAD_SIZE', '10485760'))  # 10MB
@@ -146,10 +231,109 @@ DATA_UPLOAD_MAX_MEMORY_SIZE = FILE_UPLOAD_MAX_MEMORY_SIZE
 # AI/ML Configuration
 ML_MODEL_PATH = os.getenv('ML_MODEL_PATH', BASE_DIR / 'models')
 ENABLE_AI_FEATURES = os.getenv('ENABLE_AI_FEATURES', 'True').lower() == 'true'
+AI_MODEL_CACHE_SIZE = int(os.getenv('AI_MODEL_CACHE_SIZE', '8'))  # Loaded models kept per worker
+
+# Micro-batched inference for prediction/regression models
+AI_INFERENCE = {
+    'MAX_BATCH_SIZE': int(os.getenv('AI_INFERENCE_MAX_BATCH_SIZE', '64')),
+    'MAX_WAIT_MS': float(os.getenv('AI_INFERENCE_MAX_WAIT_MS', '5')),
+    'STATS_FLUSH_INTERVAL': float(os.getenv('AI_INFERENCE_STATS_FLUSH_INTERVAL', '5')),
+    'TIMEOUT': float(os.getenv('AI_INFERENCE_TIMEOUT', '10')),
+}
+
+# Natural-language what-if queries: parsed intents and scenario results are cached
+NL_QUERY = {
+    'INTENT_CACHE_SIZE': int(os.getenv('NL_QUERY_INTENT_CACHE_SIZE', '1024')),
+    'CACHE_TIMEOUT': int(os.getenv('NL_QUERY_CACHE_TIMEOUT', '86400')),
+}
+
+# Sankey flow graphs: minor flows below THRESHOLD of the total are merged,
+# and models with more than MAX_STAGE_NODES steps are grouped by category
+FLOW_GRAPH = {
+    'THRESHOLD': float(os.getenv('FLOW_GRAPH_THRESHOLD', '0.01')),
+    'MAX_STAGE_NODES': int(os.getenv('FLOW_GRAPH_MAX_STAGE_NODES', '40')),
+    'MAX_NODES_PER_TYPE': int(os.getenv('FLOW_GRAPH_MAX_NODES_PER_TYPE', '25')),
+    'CACHE_TIMEOUT': int(os.getenv('FLOW_GRAPH_CACHE_TIMEOUT', '86400')),
+}
+
+# Sector whose CircularityBenchmark rows analyses are compared against by default
+CIRCULARITY_BENCHMARK_SECTOR = os.getenv('CIRCULARITY_BENCHMARK_SECTOR', 'general')
+
+# Dynamic circularity simulation: product lifetime at average durability and
+# the projection horizon, both in years
+CIRCULARITY_SIMULATION = {
+    'PRODUCT_LIFETIME': float(os.getenv('CIRCULARITY_SIMULATION_PRODUCT_LIFETIME', '10')),
+    'HORIZON': int(os.getenv('CIRCULARITY_SIMULATION_HORIZON', '50')),
+    'MAX_HORIZON': 200,
+    'MAX_SCENARIOS': int(os.getenv('CIRCULARITY_SIMULATION_MAX_SCENARIOS', '20')),
+}
+
+# Feature store: partitioned Parquet extracts of calculation history for training
+FEATURE_STORE = {
+    'ROOT': Path(os.getenv('FEATURE_STORE_ROOT', BASE_DIR / 'feature_store')),
+    'BATCH_SIZE': int(os.getenv('FEATURE_STORE_BATCH_SIZE', '5000')),
+}
+
+# Surrogate impact model for interactive editing; below these thresholds the
+# exact engine answers instead
+IMPACT_SURROGATE = {
+    'ALPHA': float(os.getenv('IMPACT_SURROGATE_ALPHA', '0.001')),
+    'MIN_TRAINING_SIZE': int(os.getenv('IMPACT_SURROGATE_MIN_TRAINING_SIZE', '20')),
+    'MAX_RELATIVE_UNCERTAINTY': float(os.getenv('IMPACT_SURROGATE_MAX_RELATIVE_UNCERTAINTY', '0.1')),
+}
+
+# Allocation of multi-output process impacts: none, mass, economic or
+# system_expansion; factors are cached per process version
+LCA_ALLOCATION = {
+    'METHOD': os.getenv('LCA_ALLOCATION_METHOD', 'mass'),
+    'CACHE_TIMEOUT': int(os.getenv('LCA_ALLOCATION_CACHE_TIMEOUT', str(7 * 24 * 60 * 60))),
+}
+
+# Process parameter optimizer: independent GA islands, run as a Celery job;
+# MAX_POPULATION caps one generation (Pareto ranking compares every pair) and
+# MAX_EVALUATIONS caps islands x population x (generations + 1) per run
+PROCESS_OPTIMIZATION = {
+    'ISLANDS': int(os.getenv('OPTIMIZATION_ISLANDS', '0')),
+    'MAX_POPULATION': int(os.getenv('OPTIMIZATION_MAX_POPULATION', '1000')),
+    'MAX_EVALUATIONS': int(os.getenv('OPTIMIZATION_MAX_EVALUATIONS', '200000')),
+}
+
+# Buffered Prediction/NLQueryLog writes and their retention window
+AI_AUDIT = {
+    'BATCH_SIZE': int(os.getenv('AI_AUDIT_BATCH_SIZE', '500')),
+    'FLUSH_INTERVAL': float(os.getenv('AI_AUDIT_FLUSH_INTERVAL', '2')),
+    'RETENTION_DAYS': int(os.getenv('AI_AUDIT_RETENTION_DAYS', '90')),
+}
+
+# Offline import of EcoSpold 2 / ILCD / JSON-LD background databases; rows
+# are written in transactions of about BATCH_SIZE exchanges
+BACKGROUND_IMPORT = {
+    'ROOT': Path(os.getenv('BACKGROUND_IMPORT_ROOT', MEDIA_ROOT / 'background_imports')),
+    'BATCH_SIZE': int(os.getenv('BACKGROUND_IMPORT_BATCH_SIZE', '20000')),
+}
+
+# Incremental sync of the material and process libraries from change feeds:
+# file drops under ROOT or paged HTTP feeds
+DATA_SYNC = {
+    'ROOT': Path(os.getenv('DATA_SYNC_ROOT', MEDIA_ROOT / 'data_sync')),
+    'BATCH_SIZE': int(os.getenv('DATA_SYNC_BATCH_SIZE', '1000')),
+    'PAGE_SIZE': int(os.getenv('DATA_SYNC_PAGE_SIZE', '1000')),
+    'TIMEOUT': float(os.getenv('DATA_SYNC_TIMEOUT', '30')),
+}
 
 # OpenLCA Configuration
 OPENLCA_HOST = os.getenv('OPENLCA_HOST', 'localhost')
 OPENLCA_PORT = int(os.getenv('OPENLCA_PORT', '8080'))
+OPENLCA = {
+    'POOL_SIZE': int(os.getenv('OPENLCA_POOL_SIZE', '4')),
+    'TIMEOUT': float(os.getenv('OPENLCA_TIMEOUT', '30')),
+    'RETRY_INTERVAL': float(os.getenv('OPENLCA_RETRY_INTERVAL', '30')),  # Seconds before retrying an unreachable server
+    'POLL_INTERVAL': 0.2,
+    'MAX_WAIT': float(os.getenv('OPENLCA_MAX_WAIT', '600')),
+    'CACHE_TIMEOUT': int(os.getenv('OPENLCA_CACHE_TIMEOUT', '86400')),
+    'MAX_BATCH_SIZE': int(os.getenv('OPENLCA_MAX_BATCH_SIZE', '100')),
+    'DEFAULT_IMPACT_METHOD': os.getenv('OPENLCA_IMPACT_METHOD', ''),
+}
 
 # External APIs
 ECOINVENT_API_KEY = os.getenv('ECOINVENT_API_KEY', '')
@@ -0,0 +1,211 @@
+import tempfile
+import threading
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.db import connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from lca_core.models import LCACalculation
+from lca_tool import routers
+from lca_tool.routers import (
+    STICKY_COOKIE, PrimaryReplicaRouter, ReplicaRoutingMiddleware, lag_monitor, postgres_replica_lag,
+    use_primary, use_replica,
+)
+from materials.models import MaterialCategory
+
+
+def lag_of(value):
+    return mock.Mock(return_value=value)
+
+
+class PostgresReplicaLagTests(SimpleTestCase):
+    def connection(self, vendor, lag=0):
+        connection = mock.MagicMock(vendor=vendor)
+        cursor = connection.cursor.return_value.__enter__.return_value
+        cursor.fetchone.return_value = (lag,)
+        return connection, cursor
+
+    def test_lag_query_compares_wal_positions(self):
+        connection, cursor = self.connection('postgresql', lag=2.5)
+        with mock.patch.object(routers, 'connections', {'replica_1': connection}):
+            self.assertEqual(postgres_replica_lag('replica_1'), 2.5)
+        sql = cursor.execute.call_args.args[0]
+        self.assertIn('pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0', sql)
+        self.assertIn('now() - pg_last_xact_replay_timestamp()', sql)
+
+    def test_other_backends_have_no_lag(self):
+        connection, cursor = self.connection('sqlite')
+        with mock.patch.object(routers, 'connections', {'replica_1': connection}):
+            self.assertEqual(postgres_replica_lag('replica_1'), 0.0)
+        cursor.execute.assert_not_called()
+
+
+@mock.patch('lca_tool.routers.replica_aliases', return_value=['replica_1'])
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        lag_monitor.reset()
+        self.addCleanup(lag_monitor.reset)
+        self.router = PrimaryReplicaRouter()
+
+    def route(self, model=LCACalculation):
+        return self.router.db_for_read(model)
+
+    @override_settings(DATABASE_REPLICA_LAG_FUNCTION='lca_tool.tests.test_routers.no_lag')
+    def test_only_declared_reads_use_the_replica(self, aliases):
+        self.assertEqual(self.route(), 'default')
+        with use_replica():
+            self.assertEqual(self.route(), 'replica_1')
+            self.assertEqual(self.route(Session), 'default')
+            with use_primary():
+                self.assertEqual(self.route(), 'default')
+
+    @override_settings(DATABASE_REPLICA_LAG_FUNCTION='lca_tool.tests.test_routers.high_lag')
+    def test_lagging_replica_is_skipped(self, aliases):
+        with use_replica():
+            self.assertEqual(self.route(), 'default')
+
+    @override_settings(DATABASE_REPLICA_LAG_FUNCTION='lca_tool.tests.test_routers.failing_lag')
+    def test_failed_lag_check_is_treated_as_lagging(self, aliases):
+        with use_replica(), self.assertLogs('lca_tool.routers', level='WARNING'):
+            self.assertEqual(self.route(), 'default')
+
+    @override_settings(DATABASE_REPLICA_LAG_FUNCTION='lca_tool.tests.test_routers.counted_lag')
+    def test_lag_is_measured_once_per_interval(self, aliases):
+        counted_lag.reset_mock()
+        with use_replica():
+            self.route()
+            self.route()
+        counted_lag.assert_called_once_with('replica_1')
+
+    @override_settings(DATABASE_REPLICA_LAG_FUNCTION='lca_tool.tests.test_routers.no_lag')
+    def test_writes_pin_the_request_to_the_primary(self, aliases):
+        middleware = ReplicaRoutingMiddleware(lambda request: self.write_then_read())
+        response = middleware(RequestFactory().get('/api/projects/'))
+        self.assertEqual(self.reads, ['default'])
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+        middleware = ReplicaRoutingMiddleware(lambda request: self.read())
+        middleware(RequestFactory().get('/api/projects/'))
+        self.assertEqual(self.reads, ['replica_1'])
+
+        request = RequestFactory().get('/api/projects/')
+        request.COOKIES[STICKY_COOKIE] = '1'
+        middleware(request)
+        self.assertEqual(self.reads, ['default'])
+
+    def write_then_read(self):
+        self.assertEqual(self.router.db_for_write(LCACalculation), 'default')
+        return self.read()
+
+    def read(self):
+        self.reads = [self.route()]
+        return HttpResponse()
+
+
+class RoutingContextTests(SimpleTestCase):
+    def test_decorated_function_is_safe_across_threads(self):
+        first_in, second_in, first_out = threading.Event(), threading.Event(), threading.Event()
+        targets, errors = {}, []
+
+        @use_replica()
+        def routed(role):
+            targets[role] = routers._target.get()
+            if role == 'first':
+                first_in.set()
+                second_in.wait(5)
+            else:
+                second_in.set()
+                first_out.wait(5)
+
+        def run(role):
+            try:
+                routed(role)
+            except Exception as e:
+                errors.append(e)
+
+        # The first thread enters, the second enters, then the first leaves first
+        first = threading.Thread(target=run, args=('first',))
+        second = threading.Thread(target=run, args=('second',))
+        first.start()
+        first_in.wait(5)
+        second.start()
+        first.join(5)
+        first_out.set()
+        second.join(5)
+        self.assertEqual(errors, [])
+        self.assertEqual(targets, {'first': 'replica', 'second': 'replica'})
+        self.assertIsNone(routers._target.get())
+
+
+class SQLiteReplicaRoutingTests(TestCase):
+    """Routes between two real SQLite databases holding different rows.
+
+    The replica alias is added after the test database is set up, so it is a
+    plain file database that the test transaction does not wrap.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.replica_dir = tempfile.TemporaryDirectory()
+        settings.DATABASES['replica_1'] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': str(Path(cls.replica_dir.name) / 'replica.sqlite3'),
+        }
+        connections.configure_settings(settings.DATABASES)
+        with connections['replica_1'].schema_editor() as editor:
+            editor.create_model(MaterialCategory)
+        MaterialCategory.objects.using('replica_1').create(name='Replicated')
+
+    @classmethod
+    def tearDownClass(cls):
+        connections['replica_1'].close()
+        del connections['replica_1']
+        del settings.DATABASES['replica_1']
+        cls.replica_dir.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        lag_monitor.reset()
+        self.addCleanup(lag_monitor.reset)
+        MaterialCategory.objects.create(name='Written to the primary')
+
+    def names(self):
+        return list(MaterialCategory.objects.order_by('pk').values_list('name', flat=True))
+
+    def test_declared_reads_use_the_replica(self):
+        self.assertEqual(self.names(), ['Written to the primary'])
+        with use_replica():
+            self.assertEqual(self.names(), ['Replicated'])
+
+    def test_safe_requests_read_the_replica_until_they_write(self):
+        def view(request):
+            before = self.names()
+            MaterialCategory.objects.create(name='Created in the request')
+            after = self.names()
+            return HttpResponse(f"{before}|{after}")
+
+        request = RequestFactory().get('/api/materials/')
+        response = ReplicaRoutingMiddleware(view)(request)
+        self.assertEqual(response.content.decode(), "['Replicated']|"
+                         "['Written to the primary', 'Created in the request']")
+
+        request = RequestFactory().get('/api/materials/')
+        request.COOKIES[STICKY_COOKIE] = '1'
+        response = ReplicaRoutingMiddleware(lambda request: HttpResponse(str(self.names())))(request)
+        self.assertIn('Created in the request', response.content.decode())
+
+    @override_settings(DATABASE_REPLICA_MAX_LAG=-1)
+    def test_lagging_replica_falls_back_to_the_primary(self):
+        with use_replica():
+            self.assertEqual(self.names(), ['Written to the primary'])
+
+
+no_lag = lag_of(0.0)
+high_lag = lag_of(60.0)
+failing_lag = mock.Mock(side_effect=RuntimeError('connection refused'))
+counted_lag = lag_of(0.0)
@@ -6,17 +6,31 @@ from rest_framework.routers import DefaultRouter
 from rest_framework.authtoken.views import obtain_auth_token
 
 # Import simplified API viewsets
-from lca_core.views import LCAProjectViewSet, LCACalculationViewSet
+from lca_core.views import LCAProjectViewSet, LCACalculationViewSet, calculation_progress
 from lca_core.home_views import home, api_status
+from reporting.views import ExportViewSet, ReportViewSet
+from circularity.views import CircularityIndicatorViewSet, CircularityAnalysisViewSet
+from data_integration.views import DataSourceViewSet, ImportViewSet, OpenLCAViewSet
+from ai_models.views import AIModelViewSet, PredictionViewSet
 
 # Create API router
 router = DefaultRouter()
 router.register(r'projects', LCAProjectViewSet, basename='lcaproject')
 router.register(r'calculations', LCACalculationViewSet, basename='lcacalculation')
+router.register(r'exports', ExportViewSet, basename='export')
+router.register(r'reports', ReportViewSet, basename='report')
+router.register(r'circularity/indicators', CircularityIndicatorViewSet, basename='circularityindicator')
+router.register(r'circularity/analyses', CircularityAnalysisViewSet, basename='circularityanalysis')
+router.register(r'data-sources', DataSourceViewSet, basename='datasource')
+router.register(r'imports', ImportViewSet, basename='importjob')
+router.register(r'openlca', OpenLCAViewSet, basename='openlca')
+router.register(r'ai/models', AIModelViewSet, basename='aimodel')
+router.register(r'ai/predictions', PredictionViewSet, basename='prediction')
 
 urlpatterns = [
     path('', home, name='home'),
     path('admin/', admin.site.urls),
+    path('api/calculations/<int:pk>/progress/', calculation_progress, name='calculation_progress'),
     path('api/', include(router.urls)),
     path('api/status/', api_status, name='api_status'),
     path('api/auth/', obtain_auth_token, name='api_token_auth'),
@@ -0,0 +1,111 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:00
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Material',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=200, unique=True)),
+                ('common_names', models.JSONField(blank=True, default=list, help_text='Alternative names')),
+                ('material_type', models.CharField(choices=[('metal', 'Metal'), ('polymer', 'Polymer'), ('ceramic', 'Ceramic'), ('composite', 'Composite'), ('natural', 'Natural'), ('other', 'Other')], max_length=20)),
+                ('density', models.FloatField(help_text='Density in kg/m³', validators=[django.core.validators.MinValueValidator(0)])),
+                ('recyclable', models.BooleanField(default=True)),
+                ('recycling_efficiency', models.FloatField(default=0.0, help_text='Recycling efficiency percentage', validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)])),
+                ('durability_score', models.FloatField(default=0.0, help_text='Material durability score (0-10)', validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(10)])),
+                ('reusability_potential', models.FloatField(default=0.0, help_text='Reusability potential percentage', validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)])),
+                ('data_source', models.CharField(blank=True, max_length=100)),
+                ('data_quality_score', models.FloatField(default=3.0, help_text='Data quality score (1-5)', validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(5)])),
+                ('last_updated', models.DateTimeField(auto_now=True)),
+                ('geographic_scope', models.CharField(default='Global', max_length=100)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RecycledMaterial',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=200)),
+                ('recycled_content', models.FloatField(help_text='Percentage of recycled content', validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)])),
+                ('quality_factor', models.FloatField(default=1.0, help_text='Quality compared to virgin material (0-1)', validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(1)])),
+                ('performance_factor', models.FloatField(default=1.0, help_text='Performance compared to virgin material (0-1)', validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(1)])),
+                ('impact_reduction_factors', models.JSONField(default=dict, help_text='Impact reduction compared to virgin material')),
+                ('availability_score', models.FloatField(default=3.0, help_text='Market availability score (1-5)', validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(5)])),
+                ('cost_factor', models.FloatField(default=1.0, help_text='Cost relative to virgin material', validators=[django.core.validators.MinValueValidator(0)])),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('base_material', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recycled_variants', to='materials.material')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MaterialCategory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('description', models.TextField(blank=True)),
+                ('parent_category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='materials.materialcategory')),
+            ],
+            options={
+                'verbose_name_plural': 'Material Categories',
+            },
+        ),
+        migrations.AddField(
+            model_name='material',
+            name='category',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='materials.materialcategory'),
+        ),
+        migrations.CreateModel(
+            name='MaterialSubstitution',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('technical_feasibility', models.FloatField(help_text='Technical feasibility score (0-10)', validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(10)])),
+                ('economic_feasibility', models.FloatField(help_text='Economic feasibility score (0-10)', validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(10)])),
+                ('performance_ratio', models.FloatField(default=1.0, help_text='Performance of substitute relative to original')),
+                ('environmental_benefit', models.JSONField(default=dict, help_text='Environmental impact comparison')),
+                ('circularity_benefit', models.JSONField(default=dict, help_text='Circularity improvement metrics')),
+                ('implementation_requirements', models.TextField(blank=True)),
+                ('barriers', models.TextField(blank=True)),
+                ('validated', models.BooleanField(default=False)),
+                ('validation_date', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('original_material', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='substitution_options', to='materials.material')),
+                ('substitute_material', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='substitution_targets', to='materials.material')),
+            ],
+            options={
+                'unique_together': {('original_material', 'substitute_material')},
+            },
+        ),
+        migrations.CreateModel(
+            name='MaterialProperty',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('property_name', models.CharField(max_length=100)),
+                ('property_type', models.CharField(choices=[('physical', 'Physical Property'), ('chemical', 'Chemical Property'), ('environmental', 'Environmental Impact Factor'), ('economic', 'Economic Property'), ('circularity', 'Circularity Indicator')], max_length=20)),
+                ('value', models.FloatField()),
+                ('unit', models.CharField(choices=[('kg', 'Kilograms'), ('kg_co2_eq', 'kg CO2-equivalent'), ('kg_so2_eq', 'kg SO2-equivalent'), ('kg_po4_eq', 'kg PO4-equivalent'), ('kg_oil_eq', 'kg oil-equivalent'), ('kg_fe_eq', 'kg Fe-equivalent'), ('m3', 'Cubic meters'), ('m2_year', 'Square meter-years'), ('ctu_h', 'CTUh (Human toxicity)'), ('ctu_e', 'CTUe (Ecotoxicity)'), ('mj', 'Megajoules'), ('usd', 'US Dollars'), ('percent', 'Percentage'), ('dimensionless', 'Dimensionless')], max_length=20)),
+                ('uncertainty_type', models.CharField(choices=[('none', 'No uncertainty'), ('range', 'Range (min-max)'), ('normal', 'Normal distribution'), ('lognormal', 'Log-normal distribution')], default='none', max_length=20)),
+                ('uncertainty_value', models.FloatField(blank=True, help_text='Standard deviation or range', null=True)),
+                ('reference', models.CharField(blank=True, max_length=200)),
+                ('year', models.PositiveIntegerField(blank=True, null=True)),
+                ('geographic_scope', models.CharField(default='Global', max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('material', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='properties', to='materials.material')),
+            ],
+            options={
+                'unique_together': {('material', 'property_name', 'geographic_scope')},
+            },
+        ),
+    ]
@@ -0,0 +1,273 @@
+import hashlib
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.functions import Lower
+
+logger = logging.getLogger(__name__)
+
+_config = getattr(settings, 'LCA_ALLOCATION', {})
+
+ALLOCATION_METHODS = ('none', 'mass', 'economic', 'system_expansion')
+# Preferred MaterialProperty names for a material's price, best first
+PRICE_PROPERTIES = ('price', 'market_price', 'economic_value')
+
+
+@dataclass(frozen=True)
+class ProcessAllocation:
+    """Share of a multi-output process's impacts attributed to its reference product.
+
+    Partitioning (mass, economic) scales the process impacts by the
+    reference output's share. System expansion keeps every impact on the
+    reference product and subtracts ``credits`` per unit of reference output:
+    the avoided production of the co-products as virgin material.
+    """
+    method: str
+    reference: str = ''
+    shares: Dict[str, float] = field(default_factory=dict)
+    scale: float = 1.0
+    credits: Dict[str, float] = field(default_factory=dict)
+    reference_quantity: float = 1.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'method': self.method, 'reference': self.reference, 'shares': self.shares,
+            'factor': self.scale, 'credits_per_unit': self.credits,
+        }
+
+    def reference_output(self, output_materials: Iterable[Dict[str, Any]]) -> float:
+        """Quantity of the reference product a step makes; one process run if it lists none"""
+        for output in output_materials or []:
+            if (output.get('material', '') or '').lower() == self.reference.lower():
+                return float(output.get('quantity', 0) or 0)
+        return self.reference_quantity
+
+
+NO_ALLOCATION = ProcessAllocation('none')
+
+
+class StepAllocations:
+    """Allocation of every process step, applied to the step impact matrix at once"""
+
+    def __init__(self, step_ids: List[str], allocations: List[ProcessAllocation], reference_outputs: List[float]):
+        self.step_ids = step_ids
+        self.allocations = allocations
+        self.scale = np.array([allocation.scale for allocation in allocations], dtype=np.float64)
+        self.reference_outputs = np.array(reference_outputs, dtype=np.float64)
+
+    def step(self, position: int, impacts: Dict[str, float]) -> Dict[str, float]:
+        allocation = self.allocations[position]
+        amount = self.reference_outputs[position]
+        allocated = {impact: value * allocation.scale for impact, value in impacts.items()}
+        for impact, credit in allocation.credits.items():
+            allocated[impact] = allocated.get(impact, 0.0) - credit * amount
+        return allocated
+
+    def apply(self, process_impacts: Dict[str, Dict[str, float]]) -> Tuple[Dict[str, Dict[str, float]], Dict[str, float]]:
+        """Allocated per-step impacts and their totals.
+
+        A credited impact the step did not report itself (e.g. a co-product's
+        avoided water use) is still listed for that step, so the breakdown
+        always sums to the totals.
+        """
+        impacts = sorted(
+            {impact for step_impacts in process_impacts.values() for impact in step_impacts}
+            | {impact for allocation in self.allocations for impact in allocation.credits}
+        )
+        matrix = np.array([
+            [process_impacts.get(step_id, {}).get(impact, 0.0) for impact in impacts] for step_id in self.step_ids
+        ], dtype=np.float64).reshape(len(self.step_ids), len(impacts))
+        credits = np.array([
+            [allocation.credits.get(impact, 0.0) for impact in impacts] for allocation in self.allocations
+        ], dtype=np.float64).reshape(matrix.shape)
+        credits *= self.reference_outputs[:, None]
+        allocated = matrix * self.scale[:, None] - credits
+        breakdown = {
+            step_id: {
+                impact: float(value) for impact, value, credit in zip(impacts, row, step_credits)
+                if impact in process_impacts.get(step_id, {}) or credit
+            }
+            for step_id, row, step_credits in zip(self.step_ids, allocated, credits)
+        }
+        totals = dict(zip(impacts, allocated.sum(axis=0).tolist()))
+        return breakdown, totals
+
+    def details(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            step_id: allocation.to_dict()
+            for step_id, allocation in zip(self.step_ids, self.allocations) if allocation.method != 'none'
+        }
+
+
+class AllocationEngine:
+    """Computes allocation factors of multi-output processes, cached per process version.
+
+    A step is matched to its ``Process`` by name, as the calculation does.
+    Factors are keyed on the process's ``updated_at`` and on a digest of the
+    catalog data they read (co-product prices or impact factors), so editing
+    a process or one of its output materials invalidates them; steps
+    without a process record use their own outputs and are not cached.
+    """
+
+    def __init__(self, service=None, method: Optional[str] = None, timeout: Optional[int] = None):
+        self.service = service
+        self.method = method or _config.get('METHOD', 'mass')
+        if self.method not in ALLOCATION_METHODS:
+            raise ValueError(f"Unknown allocation method {self.method}; use one of {', '.join(ALLOCATION_METHODS)}")
+        self.timeout = timeout if timeout is not None else _config.get('CACHE_TIMEOUT', 7 * 24 * 60 * 60)
+
+    @staticmethod
+    def _outputs(output_materials: Iterable[Dict[str, Any]]) -> List[Tuple[str, float, bool]]:
+        outputs = []
+        for output in output_materials or []:
+            quantity = float(output.get('quantity', 0) or 0)
+            if quantity > 0:
+                outputs.append((output.get('material', '') or 'unknown', quantity, bool(output.get('reference'))))
+        return outputs
+
+    def allocate(self, steps: List[Any]) -> StepAllocations:
+        step_ids = [str(step.id) for step in steps]
+        if self.method == 'none':
+            return StepAllocations(step_ids, [NO_ALLOCATION] * len(steps), [0.0] * len(steps))
+
+        from .models import Process
+
+        names = {step.name.lower() for step in steps}
+        processes = {
+            process.lower_name: process
+            for process in Process.objects.annotate(lower_name=Lower('name')).filter(
+                lower_name__in=names
+            ).only('id', 'name', 'output_materials', 'updated_at')
+        } if names else {}
+        versions = self.material_versions(processes.values())
+        keys = {
+            name: f"allocation:{self.method}:{process.pk}:{process.updated_at.isoformat()}:{versions[process.pk]}"
+            for name, process in processes.items()
+        }
+        cached = cache.get_many(list(keys.values())) if keys else {}
+        computed = {}
+        allocations = []
+        for step in steps:
+            name = step.name.lower()
+            key = keys.get(name)
+            if key is None:
+                # No process record: the step's own outputs, not cached
+                outputs = self._outputs(step.output_materials)
+                allocations.append(self.factors(outputs) if len(outputs) > 1 else NO_ALLOCATION)
+                continue
+            if key not in cached and key not in computed:
+                outputs = self._outputs(processes[name].output_materials)
+                computed[key] = self.factors(outputs) if len(outputs) > 1 else NO_ALLOCATION
+            allocations.append(cached[key] if key in cached else computed[key])
+        if computed:
+            cache.set_many(computed, self.timeout)
+            logger.info(f"Computed {self.method} allocation factors for {len(computed)} processes")
+        reference_outputs = [
+            allocation.reference_output(step.output_materials) if allocation.credits else 0.0
+            for step, allocation in zip(steps, allocations)
+        ]
+        return StepAllocations(step_ids, allocations, reference_outputs)
+
+    def material_versions(self, processes: Iterable[Any]) -> Dict[Any, str]:
+        """Digest per process of the output materials' catalog data its factors depend on.
+
+        Mass allocation reads none. Economic allocation reads 'economic'
+        MaterialProperty rows; system expansion reads whether each material
+        exists and its property rows (the impact factors).
+        """
+        processes = list(processes)
+        if self.method not in ('economic', 'system_expansion') or not processes:
+            return {process.pk: '' for process in processes}
+        from materials.models import Material, MaterialProperty
+
+        names = {
+            name.lower() for process in processes for name, _, _ in self._outputs(process.output_materials)
+        }
+        rows: Dict[str, List[Any]] = {}
+        properties = MaterialProperty.objects.annotate(material_name=Lower('material__name')).filter(
+            material_name__in=names
+        )
+        if self.method == 'economic':
+            properties = properties.filter(property_type='economic')
+        else:
+            for name in Material.objects.annotate(material_name=Lower('name')).filter(
+                material_name__in=names
+            ).values_list('material_name', flat=True):
+                rows.setdefault(name, []).append('material')
+        for material, *row in properties.order_by(
+            'material_name', 'property_name', 'property_type', 'geographic_scope'
+        ).values_list('material_name', 'property_name', 'property_type', 'geographic_scope', 'value'):
+            rows.setdefault(material, []).append(row)
+
+        versions = {}
+        for process in processes:
+            materials = sorted({name.lower() for name, _, _ in self._outputs(process.output_materials)})
+            payload = json.dumps([[name, rows.get(name, [])] for name in materials], separators=(',', ':'))
+            versions[process.pk] = hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+        return versions
+
+    def factors(self, outputs: List[Tuple[str, float, bool]]) -> ProcessAllocation:
+        """Allocation of one process from its (material, quantity, is_reference) outputs"""
+        reference = next((position for position, output in enumerate(outputs) if output[2]), 0)
+        names = [name for name, _, _ in outputs]
+        quantities = np.array([quantity for _, quantity, _ in outputs], dtype=np.float64)
+
+        if self.method == 'system_expansion':
+            credits: Dict[str, float] = {}
+            for position, (name, quantity, _) in enumerate(outputs):
+                if position == reference:
+                    continue
+                for impact, value in self._virgin_impacts(name, quantity / quantities[reference]).items():
+                    credits[impact] = credits.get(impact, 0.0) + value
+            return ProcessAllocation(
+                'system_expansion', names[reference], {names[reference]: 1.0}, 1.0, credits,
+                float(quantities[reference]),
+            )
+
+        method = self.method
+        weights = quantities
+        if method == 'economic':
+            prices = self.prices(names)
+            if all(name.lower() in prices for name in names):
+                weights = quantities * np.array([prices[name.lower()] for name in names])
+            else:
+                missing = [name for name in names if name.lower() not in prices]
+                logger.warning(f"No economic value for {', '.join(missing)}; allocating by mass")
+                method = 'mass'
+        if weights.sum() <= 0:
+            return NO_ALLOCATION
+        shares = weights / weights.sum()
+        return ProcessAllocation(
+            method, names[reference], dict(zip(names, shares.tolist())), float(shares[reference]), {}
+        )
+
+    @staticmethod
+    def prices(names: List[str]) -> Dict[str, float]:
+        """Price per unit of each material from its 'economic' MaterialProperty"""
+        from materials.models import MaterialProperty
+
+        lowered = {name.lower() for name in names}
+        candidates: Dict[str, Tuple[int, float]] = {}
+        for material, property_name, value in MaterialProperty.objects.annotate(
+            material_name=Lower('material__name')
+        ).filter(property_type='economic', material_name__in=lowered).values_list(
+            'material_name', 'property_name', 'value'
+        ):
+            rank = PRICE_PROPERTIES.index(property_name) if property_name in PRICE_PROPERTIES else len(PRICE_PROPERTIES)
+            if material not in candidates or rank < candidates[material][0]:
+                candidates[material] = (rank, value)
+        return {material: value for material, (_, value) in candidates.items()}
+
+    def _virgin_impacts(self, material: str, quantity: float) -> Dict[str, float]:
+        if self.service is None:
+            from lca_core.services import LCACalculationService
+
+            self.service = LCACalculationService()
+        return self.service._calculate_material_impacts(
+            {'material': material, 'quantity': quantity, 'recycled_content': 0}
+        )
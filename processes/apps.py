@@ -0,0 +1,7 @@
+from django.apps import AppConfig
+
+
+class ProcessesConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'processes'
+    verbose_name = 'Process Library'
@@ -0,0 +1,74 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcessCategory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('description', models.TextField(blank=True)),
+                ('parent_category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='processes.processcategory')),
+            ],
+            options={
+                'verbose_name_plural': 'Process Categories',
+            },
+        ),
+        migrations.CreateModel(
+            name='Process',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=200, unique=True)),
+                ('description', models.TextField()),
+                ('process_type', models.CharField(choices=[('extraction', 'Raw Material Extraction'), ('processing', 'Material Processing'), ('manufacturing', 'Manufacturing'), ('transport', 'Transportation'), ('energy', 'Energy Production'), ('waste_treatment', 'Waste Treatment'), ('recycling', 'Recycling')], max_length=20)),
+                ('input_materials', models.JSONField(default=list, help_text='Input materials and quantities')),
+                ('output_materials', models.JSONField(default=list, help_text='Output materials and quantities')),
+                ('energy_requirements', models.JSONField(default=dict, help_text='Energy requirements by type')),
+                ('impact_factors', models.JSONField(default=dict, help_text='Environmental impact factors')),
+                ('efficiency', models.FloatField(default=1.0, help_text='Process efficiency (0-1)')),
+                ('capacity', models.FloatField(blank=True, help_text='Process capacity', null=True)),
+                ('capacity_unit', models.CharField(blank=True, max_length=50)),
+                ('geographic_scope', models.CharField(default='Global', max_length=100)),
+                ('temporal_scope', models.CharField(blank=True, max_length=100)),
+                ('data_source', models.CharField(blank=True, max_length=100)),
+                ('data_quality_score', models.FloatField(default=3.0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='processes.processcategory')),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProcessParameter',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100)),
+                ('parameter_type', models.CharField(choices=[('input', 'Input Parameter'), ('output', 'Output Parameter'), ('efficiency', 'Efficiency Parameter'), ('environmental', 'Environmental Parameter'), ('economic', 'Economic Parameter')], max_length=20)),
+                ('default_value', models.FloatField()),
+                ('unit', models.CharField(max_length=50)),
+                ('min_value', models.FloatField(blank=True, null=True)),
+                ('max_value', models.FloatField(blank=True, null=True)),
+                ('uncertainty_type', models.CharField(default='none', max_length=20)),
+                ('uncertainty_value', models.FloatField(blank=True, null=True)),
+                ('description', models.TextField(blank=True)),
+                ('reference', models.CharField(blank=True, max_length=200)),
+                ('process', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='parameters', to='processes.process')),
+            ],
+            options={
+                'unique_together': {('process', 'name')},
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('lca_core', '0004_lcacalculation_updated_at'),
+        ('processes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OptimizationRun',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('mode', models.CharField(choices=[('weighted', 'Weighted Impacts'), ('pareto', 'Impact/Circularity Pareto Front')], default='weighted', max_length=20)),
+                ('weights', models.JSONField(blank=True, default=dict, help_text='Impact category weights')),
+                ('population_size', models.PositiveIntegerField(default=100)),
+                ('generations', models.PositiveIntegerField(default=100)),
+                ('seed', models.IntegerField(default=0)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('results', models.JSONField(blank=True, default=dict)),
+                ('error_message', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('calculation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='optimization_runs', to='lca_core.lcacalculation')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
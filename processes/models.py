@@ -1,4 +1,5 @@
 from django.db import models
+from django.contrib.auth.models import User
 import uuid
 
 
@@ -98,3 +99,41 @@ class ProcessParameter(models.Model):
     
     def __str__(self):
         return f"{self.process.name} - {self.name}"
+
+
+class OptimizationRun(models.Model):
+    """Background parameter optimization of one calculation"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    MODES = [
+        ('weighted', 'Weighted Impacts'),
+        ('pareto', 'Impact/Circularity Pareto Front'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    calculation = models.ForeignKey('lca_core.LCACalculation', on_delete=models.CASCADE,
+                                    related_name='optimization_runs')
+    mode = models.CharField(max_length=20, choices=MODES, default='weighted')
+    weights = models.JSONField(default=dict, blank=True, help_text="Impact category weights")
+    population_size = models.PositiveIntegerField(default=100)
+    generations = models.PositiveIntegerField(default=100)
+    seed = models.IntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    
+    results = models.JSONField(default=dict, blank=True)
+    error_message = models.TextField(blank=True)
+    
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Optimization of {self.calculation_id} ({self.status})"
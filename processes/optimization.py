@@ -0,0 +1,409 @@
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+from django.conf import settings
+from .models import ProcessParameter
+
+logger = logging.getLogger(__name__)
+
+# Circularity variables available for every candidate
+VECTOR_VARIABLES = ('recycled_content_percentage', 'recycled_content_rate', 'recovery_rate', 'material_efficiency')
+RECYCLED_CONTENT_GRID = np.linspace(0, 100, 11)
+
+
+@dataclass
+class ParameterEffect:
+    """How one ProcessParameter acts on a calculation's flows.
+
+    ``kind`` is ``scale`` (flow amounts multiplied by ``(value / default) ** exponent``),
+    ``recycled_content`` (absolute % on material flows) or ``recovery_rate``
+    (absolute % on end-of-life waste flows).
+    """
+    parameter_id: str
+    label: str
+    kind: str
+    default: float
+    lower: float
+    upper: float
+    flows: List[int] = field(default_factory=list)
+    exponent: float = 1.0
+
+
+class PopulationEvaluator:
+    """Evaluates impacts and circularity for a whole population of parameter vectors.
+
+    Built once from the calculation (all factor lookups happen here); holds
+    only NumPy arrays afterwards, so it is cheap to evaluate and to pickle
+    into worker processes.
+    """
+
+    def __init__(self, calculation, parameters: Optional[List[ProcessParameter]] = None):
+        from lca_core.scenarios import ScenarioEvaluator
+        from circularity.formulas import default_indicator_set, get_indicator_set
+
+        scenario = ScenarioEvaluator(calculation)
+        self.impacts = scenario.impacts
+        self.indicators = get_indicator_set()
+        if not self.indicators.variables <= set(VECTOR_VARIABLES):
+            # Only the mass-balance metrics are tracked per candidate
+            logger.warning("Circularity indicators need step-level data; optimizing against the default score")
+            self.indicators = default_indicator_set()
+        steps = scenario.steps
+
+        flows = []  # (kind, key, step index, amount, recycled content)
+        waste = []  # (step index, quantity, recovery rate)
+        total_output = 0.0
+        for index, step in enumerate(steps):
+            for material in step.input_materials:
+                flows.append(('material', material.get('material', ''), index,
+                              material.get('quantity', 0), material.get('recycled_content', 0)))
+            for energy in step.energy_inputs:
+                flows.append(('energy', energy.get('type', 'electricity_grid'), index, energy.get('amount', 0), 0))
+            for emission, amount in step.emissions.items():
+                flows.append(('emission', emission, index, amount, 0))
+            total_output += sum(material.get('quantity', 0) for material in step.output_materials)
+            if step.category == 'end_of_life':
+                for item in step.waste_outputs:
+                    waste.append((index, item.get('quantity', 0), item.get('recovery_rate', 0)))
+
+        self.flow_labels = [(kind, key, index) for kind, key, index, _, _ in flows]
+        self.amounts = np.array([amount for _, _, _, amount, _ in flows], dtype=np.float64)
+        self.material_flows = np.array([i for i, flow in enumerate(flows) if flow[0] == 'material'], dtype=int)
+        self.recycled_content = np.array([flows[i][4] for i in self.material_flows], dtype=np.float64)
+        self.total_output = total_output
+        self.waste_quantity = np.array([quantity for _, quantity, _ in waste], dtype=np.float64)
+        self.waste_recovery = np.array([rate for _, _, rate in waste], dtype=np.float64)
+
+        self.effects = self._effects(steps, flows, waste, parameters)
+        self.lower = np.array([effect.lower for effect in self.effects], dtype=np.float64)
+        self.upper = np.array([effect.upper for effect in self.effects], dtype=np.float64)
+        self.defaults = np.array([effect.default for effect in self.effects], dtype=np.float64)
+
+        # Per-unit impact factors; material flows whose recycled content is a
+        # decision variable get a factor grid to interpolate over instead
+        variable_rc = sorted({
+            flow for effect in self.effects if effect.kind == 'recycled_content' for flow in effect.flows
+        })
+        self.variable_rc_flows = np.array(variable_rc, dtype=int)
+        self.factors = np.vstack([
+            scenario._factors[scenario._column(kind, key, rc)] for kind, key, _, _, rc in flows
+        ]) if flows else np.zeros((0, len(self.impacts)))
+        self.rc_factor_grid = np.stack([
+            np.vstack([scenario._factors[scenario._column('material', flows[flow][1], rc)]
+                       for rc in RECYCLED_CONTENT_GRID])
+            for flow in variable_rc
+        ]) if variable_rc else np.zeros((0, len(RECYCLED_CONTENT_GRID), len(self.impacts)))
+        self._material_position = {flow: position for position, flow in enumerate(self.material_flows)}
+
+    @staticmethod
+    def _matches(name: str, query: str) -> bool:
+        name = name.lower().replace('aluminium', 'aluminum')
+        query = query.lower().replace('aluminium', 'aluminum')
+        return bool(query) and (query in name or name in query)
+
+    def _effects(self, steps, flows, waste, parameters) -> List[ParameterEffect]:
+        if parameters is None:
+            names = {step.name.lower() for step in steps}
+            parameters = [
+                parameter for parameter in ProcessParameter.objects.select_related('process').filter(
+                    min_value__isnull=False, max_value__isnull=False
+                )
+                if parameter.process.name.lower() in names
+            ]
+
+        effects = []
+        for parameter in parameters:
+            if parameter.min_value is None or parameter.max_value is None or parameter.min_value >= parameter.max_value:
+                continue
+            step_indices = {i for i, step in enumerate(steps) if step.name.lower() == parameter.process.name.lower()}
+            name = parameter.name.lower()
+            effect = ParameterEffect(
+                parameter_id=str(parameter.id),
+                label=f"{parameter.process.name}: {parameter.name}",
+                kind='scale',
+                default=parameter.default_value,
+                lower=parameter.min_value,
+                upper=parameter.max_value,
+            )
+            in_steps = [i for i, flow in enumerate(flows) if flow[2] in step_indices]
+
+            if name.startswith('recycled_content'):
+                material = name[len('recycled_content'):].strip('_ ')
+                effect.kind = 'recycled_content'
+                effect.flows = [i for i in in_steps if flows[i][0] == 'material'
+                                and (not material or self._matches(flows[i][1], material))]
+            elif name == 'recovery_rate':
+                effect.kind = 'recovery_rate'
+                effect.flows = [i for i, item in enumerate(waste) if item[0] in step_indices]
+            elif parameter.parameter_type == 'efficiency':
+                # Higher efficiency means proportionally fewer inputs
+                effect.exponent = -1.0
+                effect.flows = [i for i in in_steps if flows[i][0] in ('material', 'energy')]
+            elif parameter.parameter_type == 'input':
+                effect.flows = [
+                    i for i in in_steps
+                    if (flows[i][0] == 'energy' and (name == 'energy' or name == flows[i][1] or name.startswith('energy')))
+                    or (flows[i][0] == 'material' and self._matches(flows[i][1], name))
+                ]
+            elif parameter.parameter_type == 'environmental':
+                effect.flows = [i for i in in_steps if flows[i][0] == 'emission' and flows[i][1].lower() == name]
+
+            if effect.flows and (effect.kind != 'scale' or effect.default):
+                effects.append(effect)
+        return effects
+
+    @property
+    def dimensions(self) -> int:
+        return len(self.effects)
+
+    def evaluate(self, population: np.ndarray) -> Dict[str, np.ndarray]:
+        """``population`` is (n, dimensions); returns impacts (n, impacts) and circularity (n,)"""
+        population = np.atleast_2d(population)
+        size = population.shape[0]
+        multipliers = np.ones((size, len(self.amounts)))
+        recycled_content = np.repeat(self.recycled_content[None, :], size, axis=0)
+        recovery = np.repeat(self.waste_recovery[None, :], size, axis=0)
+
+        for column, effect in enumerate(self.effects):
+            values = population[:, column]
+            if effect.kind == 'scale':
+                multipliers[:, effect.flows] *= (values / effect.default)[:, None] ** effect.exponent
+            elif effect.kind == 'recycled_content':
+                positions = [self._material_position[flow] for flow in effect.flows]
+                recycled_content[:, positions] = values[:, None]
+            else:
+                recovery[:, effect.flows] = values[:, None]
+
+        amounts = self.amounts[None, :] * multipliers
+        impacts = amounts @ self.factors
+        if len(self.variable_rc_flows):
+            # Swap the fixed factors of variable-content flows for interpolated ones
+            impacts -= amounts[:, self.variable_rc_flows] @ self.factors[self.variable_rc_flows]
+            positions = [self._material_position[flow] for flow in self.variable_rc_flows]
+            grid_position = np.clip(recycled_content[:, positions] / 10.0, 0, len(RECYCLED_CONTENT_GRID) - 1)
+            lower = np.floor(grid_position).astype(int)
+            upper = np.minimum(lower + 1, len(RECYCLED_CONTENT_GRID) - 1)
+            weight = (grid_position - lower)[..., None]
+            flow_index = np.arange(len(self.variable_rc_flows))[None, :]
+            factors = (
+                self.rc_factor_grid[flow_index, lower] * (1 - weight)
+                + self.rc_factor_grid[flow_index, upper] * weight
+            )
+            impacts += np.einsum('pf,pfi->pi', amounts[:, self.variable_rc_flows], factors)
+
+        material_amounts = amounts[:, self.material_flows]
+        material_total = material_amounts.sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            recycled = np.where(
+                material_total > 0, (material_amounts * recycled_content).sum(axis=1) / material_total, 0.0
+            )
+            efficiency = np.where(material_total > 0, self.total_output / material_total * 100, 0.0)
+        waste_total = self.waste_quantity.sum()
+        recovered = (recovery * self.waste_quantity[None, :]).sum(axis=1) / waste_total if waste_total > 0 \
+            else np.zeros(size)
+        values = dict(zip(VECTOR_VARIABLES, (recycled, recycled, recovered, efficiency)))
+        circularity = np.broadcast_to(self.indicators.evaluate(values)['overall'], (size,))
+        return {'impacts': impacts, 'circularity': circularity}
+
+
+def optimization_islands(islands: Optional[int] = None) -> int:
+    config = getattr(settings, 'PROCESS_OPTIMIZATION', {})
+    return islands or config.get('ISLANDS') or 4
+
+
+def evaluation_budget(population_size: int, generations: int, islands: Optional[int] = None) -> int:
+    """Total candidate evaluations of a run, rejecting runs over ``MAX_EVALUATIONS``
+
+    ``population_size`` is also capped by ``MAX_POPULATION`` on its own, since
+    Pareto ranking compares every pair in a generation.
+    """
+    if population_size < 2 or generations < 1:
+        raise ValueError("population_size must be at least 2 and generations at least 1")
+    config = getattr(settings, 'PROCESS_OPTIMIZATION', {})
+    max_population = config.get('MAX_POPULATION', 1000)
+    if population_size > max_population:
+        raise ValueError(f"population_size is {population_size}; the limit is {max_population}")
+    evaluations = optimization_islands(islands) * population_size * (generations + 1)
+    limit = config.get('MAX_EVALUATIONS', 200000)
+    if evaluations > limit:
+        raise ValueError(f"Run needs {evaluations} evaluations; the limit is {limit}")
+    return evaluations
+
+
+# Upper bound on the elements of one (rows, n, objectives) comparison block
+RANKING_BLOCK_ELEMENTS = 1 << 20
+
+
+def non_dominated_ranks(objectives: np.ndarray) -> np.ndarray:
+    """Pareto rank (0 = front) for each row of a minimisation objective matrix"""
+    size, count = objectives.shape
+    # dominates[i, j]: i is no worse everywhere and strictly better somewhere than j.
+    # Built in row blocks so the per-objective comparisons never hold more
+    # than RANKING_BLOCK_ELEMENTS at once; only the boolean (n, n) result is kept.
+    dominates = np.empty((size, size), dtype=bool)
+    block = max(1, RANKING_BLOCK_ELEMENTS // max(1, size * count))
+    for start in range(0, size, block):
+        rows = objectives[start:start + block, None, :]
+        no_worse = (rows <= objectives[None, :, :]).all(axis=2)
+        better = (rows < objectives[None, :, :]).any(axis=2)
+        dominates[start:start + block] = no_worse & better
+    domination_count = dominates.sum(axis=0)
+    ranks = np.full(size, -1)
+    rank = 0
+    current = np.where(domination_count == 0)[0]
+    while current.size:
+        ranks[current] = rank
+        domination_count = domination_count - dominates[current].sum(axis=0)
+        domination_count[ranks >= 0] = -1
+        current = np.where(domination_count == 0)[0]
+        rank += 1
+    return ranks
+
+
+def crowding_distance(objectives: np.ndarray) -> np.ndarray:
+    size, count = objectives.shape
+    distance = np.zeros(size)
+    if size <= 2:
+        return np.full(size, np.inf)
+    for column in range(count):
+        order = np.argsort(objectives[:, column])
+        span = objectives[order[-1], column] - objectives[order[0], column]
+        distance[order[0]] = distance[order[-1]] = np.inf
+        if span > 0:
+            distance[order[1:-1]] += (objectives[order[2:], column] - objectives[order[:-2], column]) / span
+    return distance
+
+
+class ProcessOptimizer:
+    """Genetic search over ProcessParameter bounds.
+
+    ``weighted`` mode minimises a weighted sum of impacts normalised by the
+    baseline; ``pareto`` mode returns the non-dominated front of that
+    weighted impact against circularity score (NSGA-II style selection).
+    Independent islands with different seeds run in turn and their results
+    are merged; runs execute in Celery workers, which cannot start child
+    processes, so concurrency comes from running separate optimizations in
+    parallel. The total number of evaluations is capped by
+    ``PROCESS_OPTIMIZATION['MAX_EVALUATIONS']``.
+    """
+
+    def __init__(self, evaluator: PopulationEvaluator, weights: Optional[Dict[str, float]] = None,
+                 mode: str = 'weighted', population_size: int = 100, generations: int = 100,
+                 islands: Optional[int] = None, seed: int = 0):
+        if mode not in ('weighted', 'pareto'):
+            raise ValueError(f"Unknown optimization mode: {mode}")
+        if evaluator.dimensions == 0:
+            raise ValueError("No bounded process parameters apply to this calculation")
+        self.evaluator = evaluator
+        self.mode = mode
+        self.population_size = population_size
+        self.generations = generations
+        self.islands = optimization_islands(islands)
+        self.evaluations = evaluation_budget(population_size, generations, self.islands)
+        self.seed = seed
+
+        weights = weights or {'climate_change': 1.0}
+        unknown = set(weights) - set(evaluator.impacts)
+        if unknown:
+            raise ValueError(f"Unknown impact categories: {', '.join(sorted(unknown))}")
+        baseline = evaluator.evaluate(evaluator.defaults[None, :])['impacts'][0]
+        self.weight_vector = np.array([
+            weights.get(impact, 0.0) / abs(baseline[index]) if abs(baseline[index]) > 1e-12 else 0.0
+            for index, impact in enumerate(evaluator.impacts)
+        ])
+
+    def objectives(self, population: np.ndarray) -> np.ndarray:
+        results = self.evaluator.evaluate(population)
+        weighted = results['impacts'] @ self.weight_vector
+        if self.mode == 'weighted':
+            return weighted[:, None]
+        return np.column_stack([weighted, -results['circularity']])
+
+    def run(self) -> Dict[str, Any]:
+        populations = [self._evolve(self.seed + island) for island in range(self.islands)]
+        merged = np.unique(np.vstack(populations), axis=0)
+        return self._summarise(merged)
+
+    def _evolve(self, seed: int) -> np.ndarray:
+        rng = np.random.default_rng(seed)
+        lower, upper = self.evaluator.lower, self.evaluator.upper
+        span = upper - lower
+        population = lower + rng.random((self.population_size, len(lower))) * span
+        population[0] = np.clip(self.evaluator.defaults, lower, upper)
+        scores = self.objectives(population)
+
+        for _ in range(self.generations):
+            fitness = self._fitness(scores)
+            # Binary tournament selection
+            contenders = rng.integers(0, len(population), size=(self.population_size, 2))
+            winners = np.where(
+                fitness[contenders[:, 0]] <= fitness[contenders[:, 1]], contenders[:, 0], contenders[:, 1]
+            )
+            parents = population[winners]
+            # BLX-alpha crossover between shuffled parent pairs
+            partners = parents[rng.permutation(self.population_size)]
+            low, high = np.minimum(parents, partners), np.maximum(parents, partners)
+            extent = (high - low) * 0.5
+            children = rng.uniform(low - extent, high + extent)
+            # Gaussian mutation on ~1/d genes
+            mutate = rng.random(children.shape) < 1.0 / len(lower)
+            children = children + mutate * rng.normal(0, 0.1, children.shape) * span
+            children = np.clip(children, lower, upper)
+
+            child_scores = self.objectives(children)
+            combined = np.vstack([population, children])
+            combined_scores = np.vstack([scores, child_scores])
+            survivors = np.argsort(self._fitness(combined_scores), kind='stable')[:self.population_size]
+            population, scores = combined[survivors], combined_scores[survivors]
+        return population
+
+    def _fitness(self, scores: np.ndarray) -> np.ndarray:
+        """Lower is better: the objective itself, or Pareto rank with crowding as tie-break"""
+        if scores.shape[1] == 1:
+            return scores[:, 0]
+        ranks = non_dominated_ranks(scores)
+        crowding = crowding_distance(scores)
+        # Within a rank prefer larger crowding distance
+        finite = np.isfinite(crowding)
+        tie_break = np.full(len(crowding), 0.999)
+        tie_break[finite] = crowding[finite] / (1 + crowding[finite]) * 0.999
+        return ranks - tie_break
+
+    def _summarise(self, population: np.ndarray) -> Dict[str, Any]:
+        results = self.evaluator.evaluate(population)
+        baseline = self.evaluator.evaluate(self.evaluator.defaults[None, :])
+        scores = self.objectives(population)
+        if self.mode == 'weighted':
+            selected = np.argsort(scores[:, 0])[:1]
+        else:
+            front = np.where(non_dominated_ranks(scores) == 0)[0]
+            selected = front[np.argsort(scores[front, 0])]
+
+        solutions = [
+            {
+                'parameters': {
+                    effect.label: float(population[index, column])
+                    for column, effect in enumerate(self.evaluator.effects)
+                },
+                'parameter_ids': {
+                    effect.parameter_id: float(population[index, column])
+                    for column, effect in enumerate(self.evaluator.effects)
+                },
+                'impacts': dict(zip(self.evaluator.impacts, results['impacts'][index].tolist())),
+                'circularity_score': float(results['circularity'][index]),
+                'weighted_impact': float(scores[index, 0]),
+            }
+            for index in selected
+        ]
+        return {
+            'mode': self.mode,
+            'evaluations': self.evaluations,
+            'baseline': {
+                'impacts': dict(zip(self.evaluator.impacts, baseline['impacts'][0].tolist())),
+                'circularity_score': float(baseline['circularity'][0]),
+                'weighted_impact': float(self.objectives(self.evaluator.defaults[None, :])[0, 0]),
+            },
+            'solutions': solutions,
+        }
@@ -0,0 +1,41 @@
+import logging
+
+from celery import shared_task
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def run_optimization(run_id: str) -> None:
+    """Run a queued parameter optimization and store its solutions on the run"""
+    from .models import OptimizationRun
+    from .optimization import PopulationEvaluator, ProcessOptimizer
+
+    claimed = OptimizationRun.objects.filter(pk=run_id, status='pending').update(
+        status='running', started_at=timezone.now()
+    )
+    if not claimed:
+        logger.warning(f"Optimization {run_id} is not pending, skipping")
+        return
+    run = OptimizationRun.objects.select_related('calculation').get(pk=run_id)
+    try:
+        optimizer = ProcessOptimizer(
+            PopulationEvaluator(run.calculation),
+            weights=run.weights or None,
+            mode=run.mode,
+            population_size=run.population_size,
+            generations=run.generations,
+            seed=run.seed,
+        )
+        results = optimizer.run()
+    except Exception as e:
+        logger.error(f"Optimization {run_id} failed: {str(e)}")
+        OptimizationRun.objects.filter(pk=run_id).update(
+            status='failed', error_message=str(e), completed_at=timezone.now()
+        )
+        return
+    OptimizationRun.objects.filter(pk=run_id).update(
+        status='completed', results=results, completed_at=timezone.now()
+    )
+    logger.info(f"Optimization {run_id} completed with {results['evaluations']} evaluations")
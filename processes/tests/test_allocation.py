@@ -0,0 +1,98 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+
+from lca_core.models import LCACalculation, LCAProject, ProcessStep
+from materials.models import Material, MaterialProperty
+from processes.allocation import AllocationEngine, NO_ALLOCATION, ProcessAllocation, StepAllocations
+from processes.models import Process
+
+
+class StepAllocationsTests(SimpleTestCase):
+    def setUp(self):
+        # 2 kg of reference product; the co-product avoids 1 kg CO2 and 0.5 L water per kg
+        expansion = ProcessAllocation(
+            'system_expansion', 'Ingot', {'Ingot': 1.0}, 1.0, {'climate_change': 1.0, 'water_use': 0.5}, 2.0,
+        )
+        partition = ProcessAllocation('mass', 'Sheet', {'Sheet': 0.75, 'Offcut': 0.25}, 0.75, {})
+        self.allocations = StepAllocations(['1', '2', '3'], [expansion, partition, NO_ALLOCATION], [2.0, 0.0, 0.0])
+        self.process_impacts = {
+            '1': {'climate_change': 10.0},
+            '2': {'climate_change': 4.0, 'water_use': 8.0},
+            '3': {'climate_change': 1.0},
+        }
+
+    def test_credited_impacts_stay_in_the_breakdown(self):
+        breakdown, totals = self.allocations.apply(self.process_impacts)
+        self.assertEqual(breakdown['1'], {'climate_change': 8.0, 'water_use': -1.0})
+        self.assertEqual(breakdown['2'], {'climate_change': 3.0, 'water_use': 6.0})
+        self.assertEqual(breakdown['3'], {'climate_change': 1.0})
+        self.assertEqual(totals, {'climate_change': 12.0, 'water_use': 5.0})
+
+    def test_breakdown_sums_to_totals(self):
+        breakdown, totals = self.allocations.apply(self.process_impacts)
+        for impact, total in totals.items():
+            self.assertAlmostEqual(sum(step.get(impact, 0.0) for step in breakdown.values()), total)
+
+    def test_running_step_totals_match(self):
+        _, totals = self.allocations.apply(self.process_impacts)
+        running = {}
+        for position, step_id in enumerate(['1', '2', '3']):
+            for impact, value in self.allocations.step(position, self.process_impacts[step_id]).items():
+                running[impact] = running.get(impact, 0.0) + value
+        self.assertEqual(running, totals)
+
+
+class AllocationEngineCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        Process.objects.create(
+            name='Smelting', description='Primary smelting', process_type='manufacturing',
+            output_materials=[{'material': 'Ingot', 'quantity': 1, 'reference': True},
+                              {'material': 'Slag', 'quantity': 1}],
+        )
+        self.prices = {}
+        for name, price in (('Ingot', 3.0), ('Slag', 1.0)):
+            material = Material.objects.create(name=name, material_type='metal', density=2700)
+            self.prices[name] = MaterialProperty.objects.create(
+                material=material, property_name='price', property_type='economic', value=price, unit='kg',
+            )
+        self.slag_climate = MaterialProperty.objects.create(
+            material=Material.objects.get(name='Slag'), property_name='climate_change_factor',
+            property_type='environmental', value=2.0, unit='kg_co2_eq',
+        )
+        calculation = LCACalculation.objects.create(
+            project=LCAProject.objects.create(name='Frames', owner=User.objects.create_user('analyst')), name='Baseline'
+        )
+        ProcessStep.objects.create(calculation=calculation, name='Smelting', order=1, category='manufacturing',
+                                   output_materials=[{'material': 'Ingot', 'quantity': 2}])
+        self.steps = list(calculation.process_steps.all())
+
+    def allocation(self, method):
+        return AllocationEngine(method=method).allocate(self.steps).allocations[0]
+
+    def test_price_changes_reach_cached_economic_factors(self):
+        self.assertAlmostEqual(self.allocation('economic').scale, 0.75)
+        with mock.patch.object(AllocationEngine, 'factors', side_effect=AssertionError('not cached')):
+            self.assertAlmostEqual(self.allocation('economic').scale, 0.75)
+
+        # A queryset update sends no signals; the key still changes with the data
+        MaterialProperty.objects.filter(pk=self.prices['Slag'].pk).update(value=3.0)
+        self.assertAlmostEqual(self.allocation('economic').scale, 0.5)
+
+    def test_impact_factor_changes_reach_cached_credits(self):
+        self.assertAlmostEqual(self.allocation('system_expansion').credits['climate_change'], 2.0)
+        self.slag_climate.value = 0.5
+        self.slag_climate.save()
+        self.assertAlmostEqual(self.allocation('system_expansion').credits['climate_change'], 0.5)
+
+    def test_unrelated_materials_keep_the_cached_factors(self):
+        self.allocation('economic')
+        MaterialProperty.objects.create(
+            material=Material.objects.create(name='Copper', material_type='metal', density=8960),
+            property_name='price', property_type='economic', value=9.0, unit='kg',
+        )
+        with mock.patch.object(AllocationEngine, 'factors', side_effect=AssertionError('not cached')):
+            self.assertAlmostEqual(self.allocation('economic').scale, 0.75)
@@ -0,0 +1,106 @@
+from unittest import mock
+
+import numpy as np
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APITestCase
+
+from lca_core.models import LCACalculation, LCAProject, ProcessStep
+from processes.models import OptimizationRun, Process, ProcessParameter
+from processes.optimization import non_dominated_ranks
+from processes.tasks import run_optimization
+
+
+@override_settings(PROCESS_OPTIMIZATION={'ISLANDS': 2, 'MAX_POPULATION': 200, 'MAX_EVALUATIONS': 5000})
+class OptimizationRunTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('analyst', password='secret')
+        project = LCAProject.objects.create(name='Frames', owner=self.user)
+        self.calculation = LCACalculation.objects.create(project=project, name='Baseline')
+        ProcessStep.objects.create(
+            calculation=self.calculation, name='Extrusion', order=1, category='manufacturing',
+            input_materials=[{'material': 'Steel', 'quantity': 2}],
+            energy_inputs=[{'type': 'electricity_grid', 'amount': 10}],
+        )
+        process = Process.objects.create(name='Extrusion', description='Aluminium extrusion',
+                                         process_type='manufacturing')
+        ProcessParameter.objects.create(
+            process=process, name='electricity_grid', parameter_type='input', unit='kWh',
+            default_value=10, min_value=5, max_value=15,
+        )
+        self.client.force_authenticate(self.user)
+        self.url = f"/api/calculations/{self.calculation.pk}/optimize/"
+
+    @mock.patch('processes.tasks.run_optimization.delay')
+    def test_optimize_queues_a_run(self, delay):
+        response = self.client.post(self.url, {'population_size': 20, 'generations': 10}, format='json')
+
+        self.assertEqual(response.status_code, 202)
+        run = OptimizationRun.objects.get()
+        self.assertEqual((run.status, run.population_size, run.generations), ('pending', 20, 10))
+        delay.assert_called_once_with(str(run.pk))
+        self.assertEqual(response.data['status_url'],
+                         f"/api/calculations/{self.calculation.pk}/optimizations/{run.pk}/")
+
+    @mock.patch('processes.tasks.run_optimization.delay')
+    def test_total_evaluations_are_capped(self, delay):
+        # 2 islands x 100 x 26 = 5200 evaluations, over the limit of 5000
+        response = self.client.post(self.url, {'population_size': 100, 'generations': 25}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('limit is 5000', response.data['error'])
+        self.assertFalse(OptimizationRun.objects.exists())
+        delay.assert_not_called()
+
+    @mock.patch('processes.tasks.run_optimization.delay')
+    def test_population_size_is_capped(self, delay):
+        response = self.client.post(self.url, {'population_size': 201, 'generations': 1}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('limit is 200', response.data['error'])
+        delay.assert_not_called()
+
+    def test_completed_run_reports_solutions(self):
+        run = OptimizationRun.objects.create(calculation=self.calculation, population_size=20, generations=10)
+        run_optimization(str(run.pk))
+
+        response = self.client.get(f"/api/calculations/{self.calculation.pk}/optimizations/{run.pk}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'completed')
+        results = response.data['results']
+        self.assertEqual(results['evaluations'], 2 * 20 * 11)
+        best = results['solutions'][0]
+        self.assertAlmostEqual(best['parameters']['Extrusion: electricity_grid'], 5, places=3)
+        self.assertAlmostEqual(best['impacts']['climate_change'], 2 * 2.1 + 5 * 0.5, places=3)
+
+    def test_run_without_parameters_fails_cleanly(self):
+        ProcessParameter.objects.all().delete()
+        run = OptimizationRun.objects.create(calculation=self.calculation, population_size=20, generations=10)
+        run_optimization(str(run.pk))
+
+        run.refresh_from_db()
+        self.assertEqual(run.status, 'failed')
+        self.assertIn('No bounded process parameters', run.error_message)
+        # A finished run is never picked up again
+        run_optimization(str(run.pk))
+        run.refresh_from_db()
+        self.assertEqual(run.status, 'failed')
+
+    def test_runs_of_other_users_are_hidden(self):
+        run = OptimizationRun.objects.create(calculation=self.calculation)
+        self.client.force_authenticate(User.objects.create_user('other', password='secret'))
+        response = self.client.get(f"/api/calculations/{self.calculation.pk}/optimizations/{run.pk}/")
+        self.assertEqual(response.status_code, 404)
+
+
+class NonDominatedRanksTests(SimpleTestCase):
+    def test_fronts(self):
+        objectives = np.array([[1, 4], [2, 2], [4, 1], [2, 4], [3, 3], [4, 4], [1, 4]], dtype=float)
+        self.assertEqual(non_dominated_ranks(objectives).tolist(), [0, 0, 0, 1, 1, 2, 0])
+
+    def test_blocked_comparison_matches_a_single_block(self):
+        objectives = np.random.default_rng(3).random((60, 2))
+        expected = non_dominated_ranks(objectives)
+        with mock.patch('processes.optimization.RANKING_BLOCK_ELEMENTS', 7):
+            self.assertEqual(non_dominated_ranks(objectives).tolist(), expected.tolist())
@@ -0,0 +1,230 @@
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+
+logger = logging.getLogger(__name__)
+
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class ArtifactRenderInProgress(Exception):
+    """Another worker holds the render lock for this artifact"""
+
+
+class ReportArtifactStore:
+    """Content-addressed store of rendered report files with size-bounded LRU eviction.
+
+    Artifacts are keyed by a hash of everything that determines the output
+    (template version, parameters and input result versions), so a key never
+    needs invalidating: changed inputs simply produce a new key. Access
+    updates the file's mtime, which eviction uses as the LRU order.
+    """
+
+    def __init__(self, root: Optional[Path] = None, max_bytes: Optional[int] = None,
+                 lock_timeout: Optional[float] = None):
+        config = getattr(settings, 'REPORT_ARTIFACTS', {})
+        self.root = Path(root or config.get('ROOT') or Path(settings.MEDIA_ROOT) / 'report_artifacts')
+        self.max_bytes = max_bytes if max_bytes is not None else config.get('MAX_BYTES', 2 * 1024 ** 3)
+        self.lock_timeout = lock_timeout if lock_timeout is not None else config.get('LOCK_TIMEOUT', 60)
+
+    def path(self, key: str, extension: str) -> Path:
+        return self.root / key[:2] / f"{key}.{extension}"
+
+    def get(self, key: str, extension: str) -> Optional[Path]:
+        path = self.path(key, extension)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def exists(self, key: str, extension: str) -> bool:
+        return self.path(key, extension).exists()
+
+    def get_or_render(self, key: str, extension: str, render: Callable[[Path], None]) -> Path:
+        """Return the artifact, rendering it once even under concurrent requests.
+
+        The first caller takes a lock file and renders, touching the lock
+        every third of ``lock_timeout`` so long renders are never mistaken for
+        abandoned ones. Callers arriving while the render is in progress get
+        ``ArtifactRenderInProgress`` straight away rather than blocking, so
+        they can check back later. A lock left untouched for longer than
+        ``lock_timeout`` is treated as abandoned.
+        """
+        path = self.get(key, extension)
+        if path:
+            return path
+
+        lock_path = self.path(key, 'lock')
+        lock_path.parent.mkdir(parents=True, exist_ok=True)
+        if not self._acquire(lock_path):
+            path = self.get(key, extension)
+            if path:
+                return path
+            raise ArtifactRenderInProgress(f"Artifact {key} is being rendered by another worker")
+
+        try:
+            with self._heartbeat(lock_path):
+                # Another worker may have finished between our checks
+                path = self.get(key, extension)
+                if path:
+                    return path
+                return self._render(key, extension, render)
+        finally:
+            lock_path.unlink(missing_ok=True)
+
+    def _acquire(self, lock_path: Path, retry_stale: bool = True) -> bool:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                age = time.time() - lock_path.stat().st_mtime
+            except FileNotFoundError:
+                return False
+            if age > self.lock_timeout and retry_stale:
+                logger.warning(f"Removing stale artifact lock {lock_path.name}")
+                lock_path.unlink(missing_ok=True)
+                return self._acquire(lock_path, retry_stale=False)
+            return False
+        os.write(fd, str(os.getpid()).encode())
+        os.close(fd)
+        return True
+
+    @contextmanager
+    def _heartbeat(self, lock_path: Path):
+        stopped = threading.Event()
+
+        def beat():
+            while not stopped.wait(self.lock_timeout / 3):
+                try:
+                    os.utime(lock_path)
+                except FileNotFoundError:
+                    return
+
+        thread = threading.Thread(target=beat, name='artifact-lock-heartbeat', daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stopped.set()
+            thread.join()
+
+    def _render(self, key: str, extension: str, render: Callable[[Path], None]) -> Path:
+        path = self.path(key, extension)
+        with tempfile.TemporaryDirectory(dir=path.parent) as workdir:
+            tmp_path = Path(workdir) / path.name
+            render(tmp_path)
+            os.replace(tmp_path, path)
+        logger.info(f"Stored report artifact {path.name} ({path.stat().st_size} bytes)")
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep: Optional[Path] = None) -> int:
+        """Delete least recently used artifacts until the store fits in max_bytes"""
+        entries = []
+        total = 0
+        for path in self.root.glob('*/*'):
+            if path.suffix in ('.lock', '.tmp') or not path.is_file():
+                continue
+            stat = path.stat()
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if keep is not None and path == keep:
+                continue
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        if removed:
+            logger.info(f"Evicted {removed} report artifacts")
+        return removed
+
+    def clear(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+def serve_artifact(request, path: Path, etag: str, filename: str, content_type: str):
+    """File response with ETag revalidation and single byte-range support"""
+    quoted_etag = f'"{etag}"'
+    if_none_match = request.headers.get('If-None-Match', '')
+    if quoted_etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match == '*':
+        response = HttpResponseNotModified()
+        response['ETag'] = quoted_etag
+        return response
+
+    size = path.stat().st_size
+    range_header = request.headers.get('Range', '')
+    if_range = request.headers.get('If-Range')
+    byte_range = _parse_range(range_header, size) if range_header else None
+    if byte_range and (if_range is None or if_range == quoted_etag):
+        start, end = byte_range
+        if start > end:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f"bytes */{size}"
+            return response
+
+        handle = open(path, 'rb')
+        handle.seek(start)
+        length = end - start + 1
+        response = FileResponse(_read_range(handle, length), status=206, content_type=content_type)
+        response['Content-Length'] = str(length)
+        response['Content-Range'] = f"bytes {start}-{end}/{size}"
+    else:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+        response['Content-Length'] = str(size)
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = quoted_etag
+    response['Cache-Control'] = 'private, max-age=0, must-revalidate'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def _parse_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive (start, end) of a single byte range, or None when the header is invalid.
+
+    Invalid headers are ignored and the whole file is served (RFC 9110
+    section 14.2). A range beyond the end of the file comes back with
+    start > end, which is answered with 416.
+    """
+    match = RANGE_PATTERN.match(range_header.strip())
+    if not match:
+        return None
+    start_text, end_text = match.groups()
+    if start_text:
+        start = int(start_text)
+        if end_text and int(end_text) < start:
+            return None
+        end = min(int(end_text), size - 1) if end_text else size - 1
+        return start, end
+    if end_text:
+        # Suffix range: the last N bytes
+        return max(size - int(end_text), 0), size - 1
+    return None
+
+
+def _read_range(handle, length: int, block_size: int = 64 * 1024):
+    try:
+        remaining = length
+        while remaining > 0:
+            data = handle.read(min(block_size, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+    finally:
+        handle.close()
@@ -0,0 +1,195 @@
+import csv
+import io
+import logging
+from typing import List, Any, Iterator, Tuple
+
+from django.db import router
+from lca_core.models import LCACalculation, CalculationResult
+from lca_tool.routers import use_replica
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+def _calculations(project_ids: List[int]):
+    columns = [
+        ('calculation_id', 'int64', 'id'),
+        ('project_id', 'int64', 'project_id'),
+        ('project_name', 'string', 'project__name'),
+        ('name', 'string', 'name'),
+        ('carbon_footprint', 'float64', 'carbon_footprint'),
+        ('energy_use', 'float64', 'energy_use'),
+        ('water_use', 'float64', 'water_use'),
+        ('created_at', 'timestamp', 'created_at'),
+    ]
+    queryset = LCACalculation.objects.filter(project_id__in=project_ids).order_by('id')
+    return LCACalculation, queryset, columns
+
+
+def _breakdown(project_ids: List[int]):
+    columns = [
+        ('calculation_id', 'int64', 'calculation_id'),
+        ('step_id', 'string', 'step_id'),
+        ('step_order', 'int64', 'step_order'),
+        ('impact', 'string', 'impact'),
+        ('value', 'float64', 'value'),
+    ]
+    queryset = CalculationResult.objects.filter(project_id__in=project_ids).order_by(
+        'calculation_id', 'step_order', 'impact'
+    )
+    return CalculationResult, queryset, columns
+
+
+def _circularity(project_ids: List[int]):
+    from circularity.models import CircularityAnalysis
+
+    columns = [
+        ('calculation_id', 'int64', 'calculation_id'),
+        ('overall_circularity_score', 'float64', 'overall_circularity_score'),
+        ('material_circularity_score', 'float64', 'material_circularity_score'),
+        ('recycled_content_rate', 'float64', 'recycled_content_rate'),
+        ('recyclability_rate', 'float64', 'recyclability_rate'),
+        ('reuse_potential', 'float64', 'reuse_potential'),
+        ('material_efficiency', 'float64', 'material_efficiency'),
+        ('virgin_material_input', 'float64', 'virgin_material_input'),
+        ('recycled_material_input', 'float64', 'recycled_material_input'),
+        ('waste_output', 'float64', 'waste_output'),
+        ('recovered_materials', 'float64', 'recovered_materials'),
+        ('industry_percentile', 'float64', 'industry_percentile'),
+        ('updated_at', 'timestamp', 'updated_at'),
+    ]
+    queryset = CircularityAnalysis.objects.filter(
+        calculation__project_id__in=project_ids
+    ).order_by('calculation_id')
+    return CircularityAnalysis, queryset, columns
+
+
+EXPORT_DATASETS = {
+    'calculations': _calculations,
+    'breakdown': _breakdown,
+    'circularity': _circularity,
+}
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object whose contents are drained chunk by chunk"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class CalculationExporter:
+    """Streams calculation datasets as CSV, Arrow IPC or Parquet in constant memory"""
+
+    def __init__(self, dataset: str, project_ids: List[int], chunk_size: int = 5000):
+        if dataset not in EXPORT_DATASETS:
+            raise ValueError(f"Unknown export dataset: {dataset}")
+        self.model, queryset, self.columns = EXPORT_DATASETS[dataset](project_ids)
+        # Pick the database up front: the response body is generated after the
+        # view (and its routing context) has returned
+        with use_replica():
+            alias = router.db_for_read(self.model)
+        self.queryset = queryset.using(alias)
+        self.chunk_size = chunk_size
+
+    def stream(self, export_format: str) -> Iterator[bytes]:
+        writers = {
+            'csv': self._stream_csv,
+            'arrow': self._stream_arrow,
+            'parquet': self._stream_parquet,
+        }
+        if export_format not in writers:
+            raise ValueError(f"Unknown export format: {export_format}")
+        return writers[export_format]()
+
+    def _batches(self) -> Iterator[List[Tuple]]:
+        """Row batches read through a server-side cursor"""
+        fields = [source for _, _, source in self.columns]
+        rows = self.queryset.values_list(*fields).iterator(chunk_size=self.chunk_size)
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.chunk_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _stream_csv(self) -> Iterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow([name for name, _, _ in self.columns])
+        for batch in self._batches():
+            writer.writerows(batch)
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+        remaining = buffer.getvalue()
+        if remaining:
+            yield remaining.encode('utf-8')
+
+    def _arrow_schema(self):
+        import pyarrow as pa
+
+        types = {
+            'int64': pa.int64(),
+            'float64': pa.float64(),
+            'string': pa.string(),
+            'timestamp': pa.timestamp('us', tz='UTC'),
+        }
+        return pa.schema([(name, types[kind]) for name, kind, _ in self.columns])
+
+    def _record_batches(self, schema) -> Iterator[Any]:
+        import pyarrow as pa
+
+        for batch in self._batches():
+            arrays = [
+                pa.array([row[index] for row in batch], type=schema.field(index).type)
+                for index in range(len(self.columns))
+            ]
+            yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    def _stream_arrow(self) -> Iterator[bytes]:
+        import pyarrow as pa
+
+        schema = self._arrow_schema()
+        sink = _ChunkSink()
+        with pa.ipc.new_stream(sink, schema) as writer:
+            for record_batch in self._record_batches(schema):
+                writer.write_batch(record_batch)
+                yield sink.drain()
+        yield sink.drain()  # Trailing end-of-stream marker / file footer
+
+    def _stream_parquet(self) -> Iterator[bytes]:
+        import pyarrow.parquet as pq
+
+        schema = self._arrow_schema()
+        sink = _ChunkSink()
+        # One row group per batch keeps memory bounded by chunk_size
+        with pq.ParquetWriter(sink, schema, compression='snappy') as writer:
+            for record_batch in self._record_batches(schema):
+                writer.write_batch(record_batch)
+                yield sink.drain()
+        yield sink.drain()  # Trailing end-of-stream marker / file footer
@@ -0,0 +1,291 @@
+import io
+import logging
+from pathlib import Path
+from typing import Dict, List, Any
+
+from django.utils import timezone
+from .services import ReportDataCollector, SectionCache, content_hash
+
+logger = logging.getLogger(__name__)
+
+IMPACT_LABELS = {
+    'climate_change': 'Climate change (kg CO2-eq)',
+    'fossil_depletion': 'Fossil depletion (kg oil-eq)',
+    'metal_depletion': 'Metal depletion (kg Fe-eq)',
+    'water_depletion': 'Water depletion (m3)',
+    'acidification': 'Acidification (kg SO2-eq)',
+    'eutrophication': 'Eutrophication (kg PO4-eq)',
+    'ozone_depletion': 'Ozone depletion (kg CFC-11-eq)',
+    'land_use': 'Land use (m2a)',
+    'particulate_matter': 'Particulate matter (kg PM2.5-eq)',
+    'toxicity_human': 'Human toxicity (CTUh)',
+    'toxicity_eco': 'Ecotoxicity (CTUe)',
+}
+
+TABLE_CHUNK_ROWS = 100
+
+
+def render_impact_chart(title: str, impacts: Dict[str, float]) -> bytes:
+    """Horizontal bar chart of impact totals as PNG bytes"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    labels = [IMPACT_LABELS.get(impact, impact) for impact in impacts]
+    figure, axis = plt.subplots(figsize=(7, 0.35 * max(len(labels), 3) + 1))
+    try:
+        axis.barh(labels, list(impacts.values()), color='#2b6cb0')
+        axis.set_title(title)
+        axis.invert_yaxis()
+        figure.tight_layout()
+        buffer = io.BytesIO()
+        figure.savefig(buffer, format='png', dpi=120)
+        return buffer.getvalue()
+    finally:
+        plt.close(figure)
+
+
+def _fmt(value: Any) -> str:
+    if isinstance(value, float):
+        return f"{value:,.3g}" if abs(value) < 1000 else f"{value:,.0f}"
+    return '' if value is None else str(value)
+
+
+class BaseReportWriter:
+    """Common structure of a report: portfolio summary, per-project sections, appendix"""
+
+    def __init__(self, report, collector: ReportDataCollector, cache: SectionCache):
+        self.report = report
+        self.collector = collector
+        self.cache = cache
+
+    def write(self, path: Path) -> None:
+        raise NotImplementedError
+
+    def sections(self) -> List[Dict[str, Any]]:
+        """Project sections, reused from the cache while their results are unchanged"""
+        sections = []
+        for project in self.collector.project_summaries():
+            key = content_hash({'project': project, 'impacts': self.collector.impacts, 'v': 1})
+            sections.append(self.cache.get_json('sections', key, lambda project=project: {
+                'title': project['name'],
+                'chart_key': key,
+                'calculation_count': project['calculation_count'],
+                'rows': [
+                    ['Calculations', _fmt(project['calculation_count'])],
+                    ['Carbon footprint (kg CO2-eq)', _fmt(project['carbon_footprint'])],
+                    ['Energy use (MJ)', _fmt(project['energy_use'])],
+                    ['Water use (l)', _fmt(project['water_use'])],
+                ] + [
+                    [IMPACT_LABELS.get(impact, impact), _fmt(value)]
+                    for impact, value in sorted(project['impacts'].items())
+                ],
+                'impacts': project['impacts'],
+            }))
+        return sections
+
+    def chart(self, key: str, title: str, impacts: Dict[str, float]) -> bytes:
+        return self.cache.get_bytes('charts', key, lambda: render_impact_chart(title, impacts))
+
+    def portfolio(self) -> Dict[str, Any]:
+        summary = self.collector.portfolio_summary(self.collector.project_summaries())
+        summary['chart_key'] = content_hash({'portfolio': summary, 'v': 1})
+        return summary
+
+    def calculation_header(self) -> List[str]:
+        return ['Project', 'Calculation', 'Carbon footprint', 'Energy use', 'Water use'] + [
+            IMPACT_LABELS.get(impact, impact) for impact in self.collector.impacts
+        ]
+
+    def calculation_row(self, calculation: Dict[str, Any]) -> List[Any]:
+        return [
+            calculation['project'], calculation['name'], calculation['carbon_footprint'],
+            calculation['energy_use'], calculation['water_use'],
+        ] + [calculation['impacts'].get(impact) for impact in self.collector.impacts]
+
+    @property
+    def subtitle(self) -> str:
+        return f"Generated {timezone.now():%Y-%m-%d %H:%M} UTC"
+
+
+class PDFReportWriter(BaseReportWriter):
+    def write(self, path: Path) -> None:
+        from reportlab.lib import colors
+        from reportlab.lib.pagesizes import A4, landscape
+        from reportlab.lib.styles import getSampleStyleSheet
+        from reportlab.lib.units import cm
+        from reportlab.platypus import (
+            Image, LongTable, PageBreak, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle,
+        )
+
+        styles = getSampleStyleSheet()
+        table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1a365d')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('FONTSIZE', (0, 0), (-1, -1), 7),
+            ('GRID', (0, 0), (-1, -1), 0.25, colors.HexColor('#d1d5db')),
+        ])
+
+        sections = self.sections()
+        portfolio = self.portfolio()
+        story = [
+            Paragraph(self.report.title, styles['Title']),
+            Paragraph(self.subtitle, styles['Normal']),
+            Spacer(1, 0.5 * cm),
+            Paragraph('Portfolio summary', styles['Heading2']),
+            Table([['Metric', 'Value']] + [
+                ['Projects', _fmt(portfolio['project_count'])],
+                ['Calculations', _fmt(portfolio['calculation_count'])],
+                ['Carbon footprint (kg CO2-eq)', _fmt(portfolio['carbon_footprint'])],
+            ], style=table_style),
+        ]
+        if portfolio['impacts']:
+            png = self.chart(portfolio['chart_key'], 'Portfolio impacts', portfolio['impacts'])
+            story += [Spacer(1, 0.5 * cm), Image(io.BytesIO(png), width=16 * cm, height=9 * cm,
+                                                   kind='proportional')]
+
+        for section in sections:
+            story += [PageBreak(), Paragraph(section['title'], styles['Heading2']),
+                      Table([['Metric', 'Value']] + section['rows'], style=table_style)]
+            if section['impacts']:
+                png = self.chart(section['chart_key'], section['title'], section['impacts'])
+                story += [Spacer(1, 0.5 * cm), Image(io.BytesIO(png), width=16 * cm, height=9 * cm,
+                                                       kind='proportional')]
+
+        # Appendix tables are emitted in fixed-size chunks so layout cost stays linear
+        story += [PageBreak(), Paragraph('Calculations', styles['Heading2'])]
+        header = self.calculation_header()
+        chunk = []
+        for calculation in self.collector.calculations():
+            chunk.append([_fmt(value) for value in self.calculation_row(calculation)])
+            if len(chunk) >= TABLE_CHUNK_ROWS:
+                story.append(LongTable([header] + chunk, repeatRows=1, style=table_style))
+                chunk = []
+        if chunk:
+            story.append(LongTable([header] + chunk, repeatRows=1, style=table_style))
+
+        document = SimpleDocTemplate(str(path), pagesize=landscape(A4), title=self.report.title)
+        document.build(story)
+
+
+class DOCXReportWriter(BaseReportWriter):
+    def write(self, path: Path) -> None:
+        from docx import Document
+        from docx.shared import Cm
+
+        document = Document()
+        document.add_heading(self.report.title, level=0)
+        document.add_paragraph(self.subtitle)
+
+        sections = self.sections()
+        portfolio = self.portfolio()
+        document.add_heading('Portfolio summary', level=1)
+        self._add_table(document, ['Metric', 'Value'], [
+            ['Projects', _fmt(portfolio['project_count'])],
+            ['Calculations', _fmt(portfolio['calculation_count'])],
+            ['Carbon footprint (kg CO2-eq)', _fmt(portfolio['carbon_footprint'])],
+        ])
+        if portfolio['impacts']:
+            png = self.chart(portfolio['chart_key'], 'Portfolio impacts', portfolio['impacts'])
+            document.add_picture(io.BytesIO(png), width=Cm(16))
+
+        for section in sections:
+            document.add_heading(section['title'], level=1)
+            self._add_table(document, ['Metric', 'Value'], section['rows'])
+            if section['impacts']:
+                png = self.chart(section['chart_key'], section['title'], section['impacts'])
+                document.add_picture(io.BytesIO(png), width=Cm(16))
+
+        document.add_heading('Calculations', level=1)
+        self._add_table(document, self.calculation_header(), (
+            [_fmt(value) for value in self.calculation_row(calculation)]
+            for calculation in self.collector.calculations()
+        ))
+        document.save(str(path))
+
+    @staticmethod
+    def _add_table(document, header: List[str], rows) -> None:
+        table = document.add_table(rows=1, cols=len(header))
+        table.style = 'Light Grid Accent 1'
+        for cell, text in zip(table.rows[0].cells, header):
+            cell.text = text
+        for row in rows:
+            for cell, text in zip(table.add_row().cells, row):
+                cell.text = text
+
+
+class XLSXReportWriter(BaseReportWriter):
+    def write(self, path: Path) -> None:
+        import xlsxwriter
+
+        # constant_memory flushes each row to disk once the next row starts,
+        # so worksheets must be written strictly row by row
+        workbook = xlsxwriter.Workbook(str(path), {'constant_memory': True})
+        try:
+            bold = workbook.add_format({'bold': True, 'bg_color': '#1a365d', 'font_color': 'white'})
+            number = workbook.add_format({'num_format': '#,##0.000'})
+            sections = self.sections()
+            portfolio = self.portfolio()
+
+            summary = workbook.add_worksheet('Summary')
+            summary.write_row(0, 0, [self.report.title])
+            summary.write_row(1, 0, [self.subtitle])
+            summary.write_row(3, 0, ['Metric', 'Value'], bold)
+            rows = [
+                ('Projects', portfolio['project_count']),
+                ('Calculations', portfolio['calculation_count']),
+                ('Carbon footprint (kg CO2-eq)', portfolio['carbon_footprint']),
+            ] + [
+                (IMPACT_LABELS.get(impact, impact), value)
+                for impact, value in sorted(portfolio['impacts'].items())
+            ]
+            for index, (label, value) in enumerate(rows, start=4):
+                summary.write(index, 0, label)
+                summary.write_number(index, 1, value, number)
+            summary.set_column(0, 0, 36)
+            summary.set_column(1, 1, 18)
+            if portfolio['impacts']:
+                png = self.chart(portfolio['chart_key'], 'Portfolio impacts', portfolio['impacts'])
+                summary.insert_image(3, 3, 'portfolio.png', {'image_data': io.BytesIO(png)})
+
+            projects = workbook.add_worksheet('Projects')
+            impact_columns = self.collector.impacts
+            projects.write_row(0, 0, ['Project', 'Calculations'] + [
+                IMPACT_LABELS.get(impact, impact) for impact in impact_columns
+            ], bold)
+            for row_index, section in enumerate(sections, start=1):
+                projects.write(row_index, 0, section['title'])
+                projects.write_number(row_index, 1, section['calculation_count'])
+                for column, impact in enumerate(impact_columns, start=2):
+                    value = section['impacts'].get(impact)
+                    if value is not None:
+                        projects.write_number(row_index, column, value, number)
+
+            calculations = workbook.add_worksheet('Calculations')
+            calculations.write_row(0, 0, self.calculation_header(), bold)
+            for row_index, calculation in enumerate(self.collector.calculations(), start=1):
+                for column, value in enumerate(self.calculation_row(calculation)):
+                    if isinstance(value, (int, float)):
+                        calculations.write_number(row_index, column, value, number)
+                    elif value is not None:
+                        calculations.write_string(row_index, column, str(value))
+
+            if self.report.parameters.get('include_breakdown'):
+                breakdown = workbook.add_worksheet('Step breakdown')
+                breakdown.write_row(0, 0, ['Calculation', 'Step', 'Impact', 'Value'], bold)
+                for row_index, (calc_id, step_id, impact, value) in enumerate(
+                    self.collector.breakdown_rows(), start=1
+                ):
+                    breakdown.write_number(row_index, 0, calc_id)
+                    breakdown.write_string(row_index, 1, step_id)
+                    breakdown.write_string(row_index, 2, impact)
+                    breakdown.write_number(row_index, 3, value, number)
+        finally:
+            workbook.close()
+
+
+REPORT_WRITERS = {
+    'pdf': PDFReportWriter,
+    'docx': DOCXReportWriter,
+    'xlsx': XLSXReportWriter,
+}
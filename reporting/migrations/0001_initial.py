@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:12
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('lca_core', '0003_calculationresult'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Report',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=200)),
+                ('report_type', models.CharField(choices=[('esg', 'ESG Report'), ('portfolio', 'Portfolio Summary')], default='esg', max_length=20)),
+                ('file_format', models.CharField(choices=[('pdf', 'PDF'), ('docx', 'Word Document'), ('xlsx', 'Excel Workbook')], default='pdf', max_length=10)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('parameters', models.JSONField(blank=True, default=dict, help_text='Report options')),
+                ('file', models.FileField(blank=True, upload_to='reports/%Y/%m/')),
+                ('file_size', models.PositiveBigIntegerField(blank=True, help_text='File size in bytes', null=True)),
+                ('calculation_count', models.PositiveIntegerField(default=0)),
+                ('error_message', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reports', to=settings.AUTH_USER_MODEL)),
+                ('projects', models.ManyToManyField(related_name='reports', to='lca_core.lcaproject')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
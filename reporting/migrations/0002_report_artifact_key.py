@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reporting', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='report',
+            name='file',
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='artifact_key',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,51 @@
+from django.db import models
+from django.contrib.auth.models import User
+import uuid
+
+
+class Report(models.Model):
+    """Generated ESG/LCA report rendered in the background"""
+    REPORT_TYPES = [
+        ('esg', 'ESG Report'),
+        ('portfolio', 'Portfolio Summary'),
+    ]
+    
+    FILE_FORMATS = [
+        ('pdf', 'PDF'),
+        ('docx', 'Word Document'),
+        ('xlsx', 'Excel Workbook'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reports')
+    title = models.CharField(max_length=200)
+    report_type = models.CharField(max_length=20, choices=REPORT_TYPES, default='esg')
+    file_format = models.CharField(max_length=10, choices=FILE_FORMATS, default='pdf')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    
+    # Scope and options
+    projects = models.ManyToManyField('lca_core.LCAProject', related_name='reports')
+    parameters = models.JSONField(default=dict, blank=True, help_text="Report options")
+    
+    # Output (stored in the content-addressed artifact store)
+    artifact_key = models.CharField(max_length=64, blank=True, db_index=True)
+    file_size = models.PositiveBigIntegerField(null=True, blank=True, help_text="File size in bytes")
+    calculation_count = models.PositiveIntegerField(default=0)
+    error_message = models.TextField(blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.title} ({self.file_format}, {self.status})"
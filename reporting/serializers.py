@@ -0,0 +1,35 @@
+from rest_framework import serializers
+from lca_core.models import LCAProject
+from .models import Report
+
+
+class ReportSerializer(serializers.ModelSerializer):
+    projects = serializers.PrimaryKeyRelatedField(many=True, queryset=LCAProject.objects.all())
+    download_url = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Report
+        fields = [
+            'id', 'title', 'report_type', 'file_format', 'status', 'projects', 'parameters',
+            'file_size', 'calculation_count', 'error_message', 'download_url',
+            'created_at', 'started_at', 'completed_at',
+        ]
+        read_only_fields = [
+            'id', 'status', 'file_size', 'calculation_count', 'error_message',
+            'created_at', 'started_at', 'completed_at',
+        ]
+    
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is not None:
+            # Only the caller's own projects can be reported on
+            fields['projects'].child_relation.queryset = LCAProject.objects.filter(owner=request.user)
+        return fields
+    
+    def get_download_url(self, obj):
+        if obj.status != 'completed':
+            return None
+        request = self.context.get('request')
+        url = f"/api/reports/{obj.id}/download/"
+        return request.build_absolute_uri(url) if request else url
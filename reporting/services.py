@@ -0,0 +1,321 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Any, Callable, Iterator, Optional
+
+from django.conf import settings
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+from lca_core.models import LCACalculation, LCAProject, CalculationResult
+from lca_core.results import CalculationResultStore
+from lca_tool.routers import use_primary, use_replica
+from .artifacts import ArtifactRenderInProgress, ReportArtifactStore
+from .models import Report
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the report writers change their output
+REPORT_TEMPLATE_VERSION = 1
+
+REPORT_IMPACTS = [
+    'climate_change', 'fossil_depletion', 'metal_depletion', 'water_depletion',
+    'acidification', 'eutrophication', 'ozone_depletion', 'land_use',
+    'particulate_matter', 'toxicity_human', 'toxicity_eco',
+]
+
+
+def content_hash(payload: Any) -> str:
+    """Stable SHA-256 of JSON-serialisable report inputs"""
+    encoded = json.dumps(payload, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class SectionCache:
+    """Filesystem cache of rendered charts and report sections keyed by content hash.
+
+    Lives under MEDIA_ROOT so every Celery worker shares it; entries never go
+    stale because the key changes whenever the underlying results change.
+    Superseded entries are never read again, so ``evict`` trims the cache to
+    ``MAX_BYTES`` in least recently used order (hits update the mtime).
+    """
+
+    def __init__(self, root: Optional[Path] = None, max_bytes: Optional[int] = None):
+        config = getattr(settings, 'REPORT_SECTION_CACHE', {})
+        self.root = Path(root or config.get('ROOT') or Path(settings.MEDIA_ROOT) / 'report_cache')
+        self.max_bytes = max_bytes if max_bytes is not None else config.get('MAX_BYTES', 256 * 1024 ** 2)
+
+    def _path(self, kind: str, key: str, extension: str) -> Path:
+        return self.root / kind / key[:2] / f"{key}.{extension}"
+
+    def _read(self, path: Path) -> Optional[bytes]:
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            # Missing, or evicted by another worker since
+            return None
+        return data
+
+    def _write_atomic(self, path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as handle:
+            handle.write(data)
+        os.replace(tmp_path, path)
+
+    def get_bytes(self, kind: str, key: str, render: Callable[[], bytes], extension: str = 'png') -> bytes:
+        path = self._path(kind, key, extension)
+        data = self._read(path)
+        if data is not None:
+            return data
+        data = render()
+        self._write_atomic(path, data)
+        return data
+
+    def get_json(self, kind: str, key: str, build: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        path = self._path(kind, key, 'json')
+        cached = self._read(path)
+        if cached is not None:
+            return json.loads(cached)
+        data = build()
+        self._write_atomic(path, json.dumps(data, default=str).encode('utf-8'))
+        return data
+
+    def evict(self) -> int:
+        """Delete least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        total = 0
+        for path in self.root.glob('*/*/*'):
+            if path.suffix == '.tmp' or not path.is_file():
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        if removed:
+            logger.info(f"Evicted {removed} cached report sections")
+        return removed
+
+
+class ReportDataCollector:
+    """Loads the stored results a report needs using aggregate queries and streaming reads"""
+
+    def __init__(self, report: Report, chunk_size: int = 1000):
+        self.report = report
+        self.chunk_size = chunk_size
+        self.project_ids = list(report.projects.values_list('id', flat=True))
+        self.impacts = report.parameters.get('impacts') or REPORT_IMPACTS
+        self._totals = None
+        self._projects = None
+
+    @use_replica()
+    def calculation_totals(self) -> Dict[int, Dict[str, float]]:
+        """Impact totals per calculation (one small aggregated frame, not result blobs)"""
+        if self._totals is None:
+            frame = CalculationResultStore().totals(self.impacts, project_ids=self.project_ids)
+            self._totals = {} if frame.empty else {
+                int(calculation_id): row.dropna().to_dict()
+                for calculation_id, row in frame.iterrows()
+            }
+        return self._totals
+
+    @use_replica()
+    def calculation_count(self) -> int:
+        return LCACalculation.objects.filter(project_id__in=self.project_ids).count()
+
+    def calculations(self) -> Iterator[Dict[str, Any]]:
+        """Calculation rows in report order, streamed from the database"""
+        totals = self.calculation_totals()
+        with use_replica():
+            queryset = LCACalculation.objects.filter(
+                project_id__in=self.project_ids
+            ).order_by('project__name', 'name', 'id').values_list(
+                'id', 'project__name', 'name', 'carbon_footprint', 'energy_use', 'water_use', 'created_at'
+            )
+            for calc_id, project_name, name, carbon, energy, water, created_at in queryset.iterator(
+                chunk_size=self.chunk_size
+            ):
+                yield {
+                    'id': calc_id,
+                    'project': project_name,
+                    'name': name,
+                    'carbon_footprint': carbon,
+                    'energy_use': energy,
+                    'water_use': water,
+                    'created_at': created_at,
+                    'impacts': totals.get(calc_id, {}),
+                }
+
+    @use_replica()
+    def breakdown_rows(self) -> Iterator[tuple]:
+        """Per-step result rows for appendix sheets"""
+        queryset = CalculationResult.objects.filter(
+            project_id__in=self.project_ids, impact__in=self.impacts
+        ).order_by('calculation_id', 'step_order', 'impact').values_list(
+            'calculation_id', 'step_id', 'impact', 'value'
+        )
+        yield from queryset.iterator(chunk_size=self.chunk_size)
+
+    def project_summaries(self) -> List[Dict[str, Any]]:
+        """Aggregated figures per project, computed in the database"""
+        if self._projects is None:
+            self._projects = self._load_project_summaries()
+        return self._projects
+
+    @use_replica()
+    def _load_project_summaries(self) -> List[Dict[str, Any]]:
+        summaries = {
+            row['id']: {
+                'id': row['id'],
+                'name': row['name'],
+                'calculation_count': row['calculation_count'],
+                'carbon_footprint': row['carbon_footprint'] or 0.0,
+                'energy_use': row['energy_use'] or 0.0,
+                'water_use': row['water_use'] or 0.0,
+                'impacts': {},
+            }
+            for row in LCAProject.objects.filter(id__in=self.project_ids).order_by('name').values(
+                'id', 'name'
+            ).annotate(
+                calculation_count=Count('lcacalculation'),
+                carbon_footprint=Sum('lcacalculation__carbon_footprint'),
+                energy_use=Sum('lcacalculation__energy_use'),
+                water_use=Sum('lcacalculation__water_use'),
+            )
+        }
+        impact_rows = CalculationResult.objects.filter(
+            project_id__in=self.project_ids, impact__in=self.impacts
+        ).values('project_id', 'impact').annotate(total=Sum('value')).order_by()
+        for row in impact_rows:
+            summaries[row['project_id']]['impacts'][row['impact']] = row['total']
+        return list(summaries.values())
+
+    def portfolio_summary(self, projects: List[Dict[str, Any]]) -> Dict[str, Any]:
+        impacts = {}
+        for project in projects:
+            for impact, value in project['impacts'].items():
+                impacts[impact] = impacts.get(impact, 0) + value
+        return {
+            'project_count': len(projects),
+            'calculation_count': sum(project['calculation_count'] for project in projects),
+            'carbon_footprint': sum(project['carbon_footprint'] for project in projects),
+            'energy_use': sum(project['energy_use'] for project in projects),
+            'water_use': sum(project['water_use'] for project in projects),
+            'impacts': impacts,
+        }
+
+
+class ReportService:
+    """Renders reports from stored calculation results into the artifact store"""
+
+    def __init__(self, cache: Optional[SectionCache] = None,
+                 artifacts: Optional[ReportArtifactStore] = None):
+        self.cache = cache or SectionCache()
+        self.artifacts = artifacts or ReportArtifactStore()
+
+    @use_primary()
+    def artifact_key(self, report: Report) -> str:
+        """Hash of template version, parameters and the versions of every input.
+
+        Input versions come from aggregate queries per project: any added,
+        removed, edited or recalculated calculation changes a count, a max id
+        or a max ``updated_at``, so the key changes with the data.
+        """
+        project_ids = sorted(report.projects.values_list('id', flat=True))
+        projects = [
+            [project_id, name, updated_at]
+            for project_id, name, updated_at in LCAProject.objects.filter(
+                id__in=project_ids
+            ).order_by('id').values_list('id', 'name', 'updated_at')
+        ]
+        calculations = [
+            [row['project_id'], row['count'], row['max_id'], row['updated']]
+            for row in LCACalculation.objects.filter(project_id__in=project_ids).values(
+                'project_id'
+            ).annotate(count=Count('id'), max_id=Max('id'), updated=Max('updated_at')).order_by('project_id')
+        ]
+        results = [
+            [row['project_id'], row['count'], row['max_id']]
+            for row in CalculationResult.objects.filter(project_id__in=project_ids).values(
+                'project_id'
+            ).annotate(count=Count('id'), max_id=Max('id')).order_by('project_id')
+        ]
+        return content_hash({
+            'template': REPORT_TEMPLATE_VERSION,
+            'title': report.title,
+            'report_type': report.report_type,
+            'file_format': report.file_format,
+            'parameters': report.parameters,
+            'projects': projects,
+            'calculations': calculations,
+            'results': results,
+        })
+
+    def prepare(self, report: Report) -> bool:
+        """Attach the artifact key; complete the report at once if the artifact exists"""
+        report.artifact_key = self.artifact_key(report)
+        path = self.artifacts.get(report.artifact_key, report.file_format)
+        if path is None:
+            report.status = 'pending'
+            report.save(update_fields=['artifact_key', 'status'])
+            return False
+        self._complete(report, path, ReportDataCollector(report).calculation_count())
+        return True
+
+    def render(self, report: Report) -> Report:
+        from .generators import REPORT_WRITERS
+
+        report.status = 'running'
+        report.started_at = timezone.now()
+        report.error_message = ''
+        # Recompute: results may have changed since the report was queued
+        report.artifact_key = self.artifact_key(report)
+        report.save(update_fields=['status', 'started_at', 'error_message', 'artifact_key'])
+
+        try:
+            collector = ReportDataCollector(report)
+            writer = REPORT_WRITERS[report.file_format](report, collector, self.cache)
+            path = self.artifacts.get_or_render(report.artifact_key, report.file_format, writer.write)
+            self._complete(report, path, collector.calculation_count())
+            logger.info(f"Report {report.id} ready ({report.calculation_count} calculations)")
+        except ArtifactRenderInProgress:
+            # The worker holding the lock completes the artifact; the caller retries
+            report.status = 'pending'
+            report.save(update_fields=['status'])
+            raise
+        except Exception as e:
+            self.fail(report, str(e))
+            raise
+        finally:
+            # Once per report rather than per section write
+            self.cache.evict()
+        return report
+
+    def fail(self, report: Report, message: str) -> None:
+        logger.error(f"Report {report.id} failed: {message}")
+        report.status = 'failed'
+        report.error_message = message
+        report.completed_at = timezone.now()
+        report.save(update_fields=['status', 'error_message', 'completed_at'])
+
+    def _complete(self, report: Report, path: Path, calculation_count: int) -> None:
+        report.status = 'completed'
+        report.file_size = path.stat().st_size
+        report.calculation_count = calculation_count
+        report.completed_at = timezone.now()
+        report.save(update_fields=[
+            'artifact_key', 'status', 'file_size', 'calculation_count', 'completed_at'
+        ])
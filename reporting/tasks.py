@@ -0,0 +1,30 @@
+import logging
+
+from celery import shared_task
+from django.conf import settings
+from .artifacts import ArtifactRenderInProgress
+from .models import Report
+from .services import ReportService
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, acks_late=True, ignore_result=True, max_retries=None)
+def generate_report(self, report_id: str) -> None:
+    """Render a report in a worker so the API never blocks on it"""
+    try:
+        report = Report.objects.get(pk=report_id)
+    except Report.DoesNotExist:
+        logger.warning(f"Report {report_id} no longer exists, skipping")
+        return
+    service = ReportService()
+    try:
+        service.render(report)
+    except ArtifactRenderInProgress as e:
+        # Check back later instead of holding this worker while another renders
+        config = getattr(settings, 'REPORT_ARTIFACTS', {})
+        countdown = config.get('RETRY_COUNTDOWN', 5)
+        if self.request.retries * countdown >= config.get('WAIT_TIMEOUT', 900):
+            service.fail(report, f"Timed out waiting for artifact {report.artifact_key}")
+            return
+        raise self.retry(exc=e, countdown=countdown)
@@ -0,0 +1,114 @@
+import os
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+from celery.exceptions import Retry
+from django.contrib.auth.models import User
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from reporting.artifacts import ArtifactRenderInProgress, ReportArtifactStore, serve_artifact
+from reporting.models import Report
+from reporting.tasks import generate_report
+
+
+class ArtifactStoreTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.store = ReportArtifactStore(root=Path(tmp.name), max_bytes=10 ** 6, lock_timeout=0.3)
+        self.key = 'ab' + '0' * 62
+
+    def test_renders_once_and_reuses_the_artifact(self):
+        render = mock.Mock(side_effect=lambda path: path.write_bytes(b'report'))
+        first = self.store.get_or_render(self.key, 'pdf', render)
+        second = self.store.get_or_render(self.key, 'pdf', render)
+        self.assertEqual(first, second)
+        self.assertEqual(first.read_bytes(), b'report')
+        render.assert_called_once()
+        self.assertFalse(self.store.path(self.key, 'lock').exists())
+
+    def test_waiters_do_not_block_on_a_render_in_progress(self):
+        lock_path = self.store.path(self.key, 'lock')
+        lock_path.parent.mkdir(parents=True)
+        lock_path.touch()
+        render = mock.Mock()
+        with self.assertRaises(ArtifactRenderInProgress):
+            self.store.get_or_render(self.key, 'pdf', render)
+        render.assert_not_called()
+
+    def test_abandoned_lock_is_taken_over(self):
+        lock_path = self.store.path(self.key, 'lock')
+        lock_path.parent.mkdir(parents=True)
+        lock_path.touch()
+        stale = time.time() - 10
+        os.utime(lock_path, (stale, stale))
+        path = self.store.get_or_render(self.key, 'pdf', lambda path: path.write_bytes(b'report'))
+        self.assertEqual(path.read_bytes(), b'report')
+
+    def test_lock_is_refreshed_during_long_renders(self):
+        lock_path = self.store.path(self.key, 'lock')
+
+        def render(path):
+            time.sleep(self.store.lock_timeout * 2)
+            # Still fresh, so a second worker must not take it over
+            self.assertFalse(self.store._acquire(lock_path))
+            path.write_bytes(b'report')
+
+        self.store.get_or_render(self.key, 'pdf', render)
+
+
+class ServeArtifactTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / 'report.pdf'
+        self.path.write_bytes(b'0123456789')
+
+    def serve(self, range_header):
+        request = RequestFactory().get('/', HTTP_RANGE=range_header)
+        response = serve_artifact(request, self.path, etag='abc', filename='report.pdf',
+                                  content_type='application/pdf')
+        return response, b''.join(response.streaming_content) if response.status_code < 300 else b''
+
+    def test_single_ranges(self):
+        response, body = self.serve('bytes=2-4')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, b'234')
+        self.assertEqual(response['Content-Range'], 'bytes 2-4/10')
+        response, body = self.serve('bytes=-3')
+        self.assertEqual(body, b'789')
+
+    def test_invalid_ranges_are_ignored(self):
+        for header in ('bytes=-', 'bytes=5-2', 'items=0-1', 'bytes=0-1,3-4'):
+            with self.subTest(header=header):
+                response, body = self.serve(header)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(body, b'0123456789')
+
+    def test_unsatisfiable_range(self):
+        response, _ = self.serve('bytes=10-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+
+
+class GenerateReportTaskTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('analyst', password='secret')
+        self.report = Report.objects.create(owner=user, title='Annual')
+
+    @mock.patch('reporting.tasks.ReportService.render', side_effect=ArtifactRenderInProgress('busy'))
+    def test_retries_while_another_worker_renders(self, render):
+        with mock.patch.object(generate_report, 'retry', side_effect=Retry()) as retry:
+            with self.assertRaises(Retry):
+                generate_report(str(self.report.pk))
+        self.assertEqual(retry.call_args.kwargs['countdown'], 5)
+
+    @mock.patch('reporting.tasks.ReportService.render', side_effect=ArtifactRenderInProgress('busy'))
+    def test_fails_the_report_after_the_wait_timeout(self, render):
+        with override_settings(REPORT_ARTIFACTS={'RETRY_COUNTDOWN': 5, 'WAIT_TIMEOUT': 0}):
+            generate_report(str(self.report.pk))
+        self.report.refresh_from_db()
+        self.assertEqual(self.report.status, 'failed')
+        self.assertIn('Timed out', self.report.error_message)
@@ -0,0 +1,52 @@
+import csv
+import io
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from django.contrib.auth.models import User
+from rest_framework.test import APITestCase
+
+from circularity.models import CircularityAnalysis
+from lca_core.models import LCACalculation, LCAProject
+
+
+class CircularityExportTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('analyst', password='secret')
+        project = LCAProject.objects.create(name='Frames', owner=self.user)
+        self.calculation = LCACalculation.objects.create(project=project, name='Baseline')
+        CircularityAnalysis.objects.create(
+            calculation=self.calculation, overall_circularity_score=0.62,
+            recycled_content_rate=40.0, industry_percentile=75.0,
+        )
+        other = User.objects.create_user('other', password='secret')
+        other_project = LCAProject.objects.create(name='Hidden', owner=other)
+        CircularityAnalysis.objects.create(
+            calculation=LCACalculation.objects.create(project=other_project, name='Hidden'),
+            overall_circularity_score=0.1,
+        )
+        self.client.force_authenticate(self.user)
+
+    def export(self, file_format):
+        response = self.client.get('/api/exports/', {'dataset': 'circularity', 'file_format': file_format})
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def test_csv(self):
+        rows = list(csv.DictReader(io.StringIO(self.export('csv').decode('utf-8'))))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(int(rows[0]['calculation_id']), self.calculation.pk)
+        self.assertAlmostEqual(float(rows[0]['overall_circularity_score']), 0.62)
+
+    def test_arrow(self):
+        table = pa.ipc.open_stream(self.export('arrow')).read_all()
+        self.assertEqual(table.num_rows, 1)
+        self.assertEqual(table.schema.field('updated_at').type, pa.timestamp('us', tz='UTC'))
+        self.assertEqual(table.column('calculation_id').to_pylist(), [self.calculation.pk])
+        self.assertEqual(table.column('industry_percentile').to_pylist(), [75.0])
+
+    def test_parquet(self):
+        table = pq.read_table(io.BytesIO(self.export('parquet')))
+        self.assertEqual(table.num_rows, 1)
+        self.assertEqual(table.column('recycled_content_rate').to_pylist(), [40.0])
+        self.assertEqual(table.column('overall_circularity_score').to_pylist(), [0.62])
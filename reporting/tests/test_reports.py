@@ -0,0 +1,168 @@
+import io
+import os
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+import openpyxl
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, override_settings
+from docx import Document
+from rest_framework.test import APITestCase
+
+from lca_core.models import LCACalculation, LCAProject
+from lca_core.results import CalculationResultStore
+from reporting.models import Report
+from reporting.services import ReportService, SectionCache
+from reporting.tasks import generate_report
+
+
+def breakdown(*steps):
+    return {'lca_results': {'process_breakdown': dict(steps)}}
+
+
+class SectionCacheTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache = SectionCache(root=Path(tmp.name), max_bytes=25)
+
+    def put(self, key, age):
+        self.cache.get_bytes('charts', key, lambda: b'0123456789')
+        path = self.cache._path('charts', key, 'png')
+        stamp = time.time() - age
+        os.utime(path, (stamp, stamp))
+        return path
+
+    def test_evicts_least_recently_used_entries_over_the_limit(self):
+        oldest = self.put('aa' + '1' * 62, age=30)
+        middle = self.put('bb' + '2' * 62, age=20)
+        newest = self.put('cc' + '3' * 62, age=10)
+        # A hit makes the oldest entry the most recently used
+        render = mock.Mock()
+        self.assertEqual(self.cache.get_bytes('charts', 'aa' + '1' * 62, render), b'0123456789')
+        render.assert_not_called()
+
+        self.assertEqual(self.cache.evict(), 1)
+        self.assertTrue(oldest.exists())
+        self.assertFalse(middle.exists())
+        self.assertTrue(newest.exists())
+
+    def test_evicted_entries_are_rebuilt(self):
+        self.cache.max_bytes = 0
+        self.cache.get_json('sections', 'dd' + '4' * 62, lambda: {'title': 'Frames'})
+        self.cache.evict()
+        build = mock.Mock(return_value={'title': 'Frames'})
+        self.assertEqual(self.cache.get_json('sections', 'dd' + '4' * 62, build), {'title': 'Frames'})
+        build.assert_called_once()
+
+
+class ReportTestCase(APITestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        root = Path(tmp.name)
+        overrides = override_settings(
+            REPORT_ARTIFACTS={'ROOT': root / 'artifacts', 'MAX_BYTES': 10 ** 8},
+            REPORT_SECTION_CACHE={'ROOT': root / 'sections', 'MAX_BYTES': 10 ** 8},
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        self.user = User.objects.create_user('analyst', password='secret')
+        self.project = LCAProject.objects.create(name='Frames', owner=self.user)
+        store = CalculationResultStore()
+        for name, climate in (('Baseline', 4.0), ('Recycled', 1.5)):
+            calculation = LCACalculation.objects.create(project=self.project, name=name, carbon_footprint=climate)
+            store.store(calculation, breakdown(('1', {'climate_change': climate, 'acidification': 0.25})))
+
+    def create_report(self, file_format, **fields):
+        report = Report.objects.create(owner=self.user, title='Annual report', file_format=file_format, **fields)
+        report.projects.add(self.project)
+        return report
+
+    def render(self, file_format, **fields):
+        report = ReportService().render(self.create_report(file_format, **fields))
+        self.assertEqual(report.status, 'completed')
+        return ReportService().artifacts.get(report.artifact_key, file_format).read_bytes()
+
+
+class ReportRenderTests(ReportTestCase):
+    def test_pdf(self):
+        data = self.render('pdf')
+        self.assertTrue(data.startswith(b'%PDF-'))
+        self.assertIn(b'/Title (Annual report)', data)
+        # Summary, project section and appendix each start a page
+        self.assertEqual(data.count(b'/Type /Page\n'), 3)
+        self.assertIn(b'/Subtype /Image', data)
+
+    def test_docx(self):
+        document = Document(io.BytesIO(self.render('docx')))
+        headings = [paragraph.text for paragraph in document.paragraphs
+                    if paragraph.style.name.startswith(('Heading', 'Title'))]
+        self.assertEqual(headings, ['Annual report', 'Portfolio summary', 'Frames', 'Calculations'])
+        summary, section, calculations = document.tables
+        self.assertEqual(summary.rows[2].cells[1].text, '2')
+        self.assertEqual([row.cells[1].text for row in calculations.rows[1:]], ['Baseline', 'Recycled'])
+        self.assertEqual(len(document.inline_shapes), 2)
+
+    def test_xlsx(self):
+        workbook = openpyxl.load_workbook(io.BytesIO(self.render('xlsx', parameters={'include_breakdown': True})))
+        self.assertEqual(workbook.sheetnames, ['Summary', 'Projects', 'Calculations', 'Step breakdown'])
+        summary = {row[0]: row[1] for row in workbook['Summary'].iter_rows(min_row=5, values_only=True)}
+        self.assertEqual(summary['Calculations'], 2)
+        self.assertAlmostEqual(summary['Climate change (kg CO2-eq)'], 5.5)
+        rows = list(workbook['Calculations'].iter_rows(min_row=2, values_only=True))
+        self.assertEqual([(row[0], row[1], row[2]) for row in rows], [('Frames', 'Baseline', 4.0),
+                                                                      ('Frames', 'Recycled', 1.5)])
+        self.assertEqual(workbook['Step breakdown'].max_row, 5)
+
+
+class ReportEndpointTests(ReportTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+
+    @mock.patch('reporting.views.generate_report.delay', side_effect=generate_report)
+    def test_create_renders_and_downloads(self, delay):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/reports/', {
+                'title': 'Annual report', 'file_format': 'xlsx', 'projects': [self.project.pk],
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['status'], 'pending')
+        delay.assert_called_once_with(response.data['id'])
+
+        report = self.client.get(f"/api/reports/{response.data['id']}/").data
+        self.assertEqual(report['status'], 'completed')
+        self.assertEqual(report['calculation_count'], 2)
+
+        download = self.client.get(f"/api/reports/{response.data['id']}/download/")
+        self.assertEqual(download.status_code, 200)
+        self.assertEqual(download['Content-Disposition'], 'attachment; filename="Annual report.xlsx"')
+        workbook = openpyxl.load_workbook(io.BytesIO(b''.join(download.streaming_content)))
+        self.assertEqual(workbook['Projects']['A2'].value, 'Frames')
+
+    @mock.patch('reporting.views.generate_report.delay')
+    def test_identical_report_is_served_without_rendering(self, delay):
+        self.render('pdf')
+        response = self.client.post('/api/reports/', {
+            'title': 'Annual report', 'file_format': 'pdf', 'projects': [self.project.pk],
+        }, format='json')
+        self.assertEqual(response.data['status'], 'completed')
+        delay.assert_not_called()
+        download = self.client.get(f"/api/reports/{response.data['id']}/download/")
+        self.assertTrue(b''.join(download.streaming_content).startswith(b'%PDF-'))
+
+    def test_download_of_a_pending_report_conflicts(self):
+        report = self.create_report('pdf')
+        response = self.client.get(f"/api/reports/{report.pk}/download/")
+        self.assertEqual(response.status_code, 409)
+
+    def test_projects_of_other_users_are_rejected(self):
+        other = LCAProject.objects.create(name='Hidden', owner=User.objects.create_user('other', password='x'))
+        response = self.client.post('/api/reports/', {
+            'title': 'Annual report', 'file_format': 'pdf', 'projects': [other.pk],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
@@ -1,28 +1,118 @@
-from rest_framework import viewsets
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from lca_core.models import LCAProject
+from lca_tool.routers import ReplicaReadMixin
+from .artifacts import serve_artifact
+from .exports import EXPORT_DATASETS, EXPORT_FORMATS, CalculationExporter
+from .models import Report
+from .serializers import ReportSerializer
+from .services import ReportService
+from .tasks import generate_report
 
+REPORT_CONTENT_TYPES = {
+    'pdf': 'application/pdf',
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
 
-class ReportViewSet(viewsets.ModelViewSet):
+
+class ReportViewSet(ReplicaReadMixin,
+                    mixins.CreateModelMixin,
+                    mixins.ListModelMixin,
+                    mixins.RetrieveModelMixin,
+                    mixins.DestroyModelMixin,
+                    viewsets.GenericViewSet):
+    """ESG/LCA reports rendered asynchronously by Celery workers.
+
+    POST queues a report and returns immediately with status 'pending' (or
+    'completed' when an identical report was already rendered); clients poll
+    the report and fetch the file from ``download``.
+    """
+    serializer_class = ReportSerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return []
+        return Report.objects.filter(owner=self.request.user).prefetch_related('projects')
+    
+    def perform_create(self, serializer):
+        report = serializer.save(owner=self.request.user)
+        self._queue(report)
+    
+    def _queue(self, report):
+        if not ReportService().prepare(report):
+            # Identical concurrent requests all queue a task; the artifact
+            # store lets only one of them render and the rest reuse it
+            transaction.on_commit(lambda: generate_report.delay(str(report.id)))
+    
+    @action(detail=True, methods=['post'])
+    def regenerate(self, request, pk=None):
+        """Re-render a report against the latest stored results"""
+        report = self.get_object()
+        self._queue(report)
+        return Response(self.get_serializer(report).data, status=status.HTTP_202_ACCEPTED)
+    
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        report = self.get_object()
+        if report.status != 'completed':
+            return Response(
+                {'error': f"Report is {report.status}"},
+                status=status.HTTP_409_CONFLICT
+            )
+        path = ReportService().artifacts.get(report.artifact_key, report.file_format)
+        if path is None:
+            # Evicted from the artifact store: render it again
+            self._queue(report)
+            return Response(self.get_serializer(report).data, status=status.HTTP_202_ACCEPTED)
+        return serve_artifact(
+            request._request, path, etag=report.artifact_key,
+            filename=f"{report.title}.{report.file_format}",
+            content_type=REPORT_CONTENT_TYPES[report.file_format],
+        )
 
-    def get_serializer_class(self):
-        from rest_framework import serializers
-        class DummySerializer(serializers.Serializer):
-            pass
-        return DummySerializer
 
+class ExportViewSet(viewsets.ViewSet):
+    """Bulk export of calculation results for BI tools.
 
-class ExportViewSet(viewsets.ModelViewSet):
+    GET /api/exports/?dataset=breakdown&file_format=parquet&projects=1,2 streams
+    the selected projects' data without paginating or buffering it.
+    """
     permission_classes = [IsAuthenticated]
     
-    def get_queryset(self):
-        return []
-
-    def get_serializer_class(self):
-        from rest_framework import serializers
-        class DummySerializer(serializers.Serializer):
-            pass
-        return DummySerializer
+    def list(self, request):
+        dataset = request.query_params.get('dataset', 'calculations')
+        export_format = request.query_params.get('file_format', 'csv')
+        if dataset not in EXPORT_DATASETS:
+            return Response(
+                {'error': f"dataset must be one of {', '.join(EXPORT_DATASETS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {'error': f"file_format must be one of {', '.join(EXPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        projects = LCAProject.objects.filter(owner=request.user)
+        requested = request.query_params.get('projects')
+        if requested:
+            try:
+                projects = projects.filter(id__in=[int(pk) for pk in requested.split(',')])
+            except ValueError:
+                return Response(
+                    {'error': 'projects must be a comma-separated list of ids'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        project_ids = list(projects.values_list('id', flat=True))
+        
+        exporter = CalculationExporter(dataset, project_ids)
+        content_type, extension = EXPORT_FORMATS[export_format]
+        filename = f"lca_{dataset}_{timezone.now():%Y%m%d%H%M%S}.{extension}"
+        response = StreamingHttpResponse(exporter.stream(export_format), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response